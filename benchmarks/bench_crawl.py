@@ -0,0 +1,384 @@
+"""
+离线爬取基准测试：通过本地桩服务器回放页面，测量端到端吞吐量和各热点路径的耗时
+
+测量项:
+    spider   LianjiaSpider.run的端到端房源/秒
+    parser   各解析后端parse_list_page和parse_detail_page的单页耗时，流式解析详情页的单页耗时和读取的字节占比
+    pipeline CSVPipeline逐条写入和批量写入的行/秒，逐条清洗与按列清洗的行/秒
+    state    各状态后端在已有10k/100k/1M个ID时每页save_state的耗时
+
+用法:
+    python -m benchmarks.bench_crawl --output bench_crawl.json
+    python -m benchmarks.bench_crawl --archive data/archive --state-sizes 10000,100000
+    python -m benchmarks.bench_crawl --only spider,parser --baseline bench_crawl.json
+
+--archive指定页面归档目录时，解析测试使用归档中录制的详情页；列表页和端到端测试
+始终使用桩服务器生成的合成页面，--detail-padding在合成详情页末尾追加无关内容。结果JSON中包含当前提交，--baseline给出另一次
+结果文件时按同名指标输出变化比例。
+"""
+import io
+import codecs
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from unittest.mock import patch
+from lianjia_spider.config.settings import CONFIG
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.parser import create_parser
+from lianjia_spider.spider.stream_parser import DetailStreamParser
+from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.spider.frame_cleaner import clean_table
+from lianjia_spider.utils.archive import PageArchive, read_records
+from lianjia_spider.utils.state import create_state_manager
+from benchmarks.bench_output_formats import synthetic_items
+from benchmarks.stub_server import StubLianjiaServer
+
+BENCHMARKS = ('spider', 'parser', 'pipeline', 'state')
+STATE_BACKENDS = ('json', 'journal', 'sqlite')
+DEFAULT_STATE_SIZES = (10000, 100000, 1000000)
+
+# 基准测试期间关闭限速、延迟和可选的旁路功能，只保留抓取主路径
+BENCH_CONFIG = {
+    'RATE_LIMIT': 0,
+    'DELAY_RANGE': (0, 0),
+    'METRICS': False,
+    'HTTP_CACHE': False,
+    'ARCHIVE': False,
+    'ID_FILTER': False
+}
+
+def _git_commit() -> Optional[str]:
+    """当前提交的哈希，不在git仓库中时返回None"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _per_page(seconds: float, pages: int) -> Dict:
+    return {
+        'pages': pages,
+        'seconds': round(seconds, 4),
+        'ms_per_page': round(seconds / pages * 1000, 4),
+        'pages_per_sec': round(pages / seconds, 1)
+    }
+
+def bench_spider(pages: int, per_page: int, latency: float) -> Dict:
+    """
+    端到端抓取：桩服务器提供pages个列表页，每页per_page个房源
+
+    Returns:
+        Dict: 房源数、耗时、房源/秒和请求数
+    """
+    work_dir = tempfile.mkdtemp(prefix='lianjia_bench_')
+    server = StubLianjiaServer(pages=pages, per_page=per_page, latency=latency).start()
+    try:
+        with patch.dict(CONFIG, dict(BENCH_CONFIG, BASE_URL=server.base_url, DATA_DIR=work_dir)):
+            spider = LianjiaSpider()
+            # 爬虫逐条打印进度，计时期间丢弃输出
+            with redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                spider.run()
+                seconds = time.perf_counter() - start
+        listings = len(server.house_ids())
+        return {
+            'listings': listings,
+            'seconds': round(seconds, 4),
+            'listings_per_sec': round(listings / seconds, 1),
+            'requests': server.request_count,
+            'latency': latency
+        }
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def _synthetic_corpus(pages: int, per_page: int,
+                      detail_padding: int = 0) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """由桩服务器生成列表页和详情页，不经过网络"""
+    server = StubLianjiaServer(pages=pages, per_page=per_page).start()
+    server.detail_padding = detail_padding
+    try:
+        list_pages = [server.list_page(page) for page in range(1, pages + 1)]
+        detail_pages = [(house_id, server.detail_page(house_id)) for house_id in server.house_ids()]
+    finally:
+        server.stop()
+    return list_pages, detail_pages
+
+def _recorded_details(archive_dir: str, limit: int) -> List[Tuple[str, str]]:
+    """读取归档中每个房源最近一次抓取的详情页"""
+    archive = PageArchive(archive_dir)
+    try:
+        records = archive.records()[:limit]
+    finally:
+        archive.close()
+    return [(record.house_id, html) for record, html in read_records(archive_dir, records)]
+
+def _parser_backends() -> List[str]:
+    backends = ['bs4']
+    try:
+        create_parser('lxml')
+        backends.append('lxml')
+    except ImportError:
+        pass
+    return backends
+
+def bench_parser(pages: int, per_page: int, repeat: int, archive_dir: Optional[str] = None,
+                 detail_padding: int = 0) -> Dict:
+    """
+    单页解析耗时，每个后端将语料重复解析repeat遍
+
+    Returns:
+        Dict: 语料来源和各后端列表页、详情页的单页耗时
+    """
+    list_pages, detail_pages = _synthetic_corpus(pages, per_page, detail_padding)
+    source = 'synthetic'
+    if archive_dir:
+        recorded = _recorded_details(archive_dir, pages * per_page)
+        if recorded:
+            detail_pages, source = recorded, 'archive'
+        else:
+            print(f"归档{archive_dir}中没有详情页，使用合成语料", file=sys.stderr)
+
+    results = {}
+    for backend in _parser_backends():
+        parser = create_parser(backend)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for html in list_pages:
+                parser.parse_list_page(html)
+        list_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for house_id, html in detail_pages:
+                parser.parse_detail_page(html, house_id)
+        detail_seconds = time.perf_counter() - start
+        results[backend] = {
+            'list': _per_page(list_seconds, len(list_pages) * repeat),
+            'detail': _per_page(detail_seconds, len(detail_pages) * repeat)
+        }
+
+    # 流式解析只处理到必需字段齐全为止，另外记录读取的字节占比
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for house_id, html in detail_pages:
+            _stream_detail(html, house_id)
+    stream_seconds = time.perf_counter() - start
+    read = sum(_stream_detail(html, house_id) for house_id, html in detail_pages)
+    total = sum(len(html.encode('utf-8')) for _, html in detail_pages)
+    results['stream'] = {
+        'detail': _per_page(stream_seconds, len(detail_pages) * repeat),
+        'detail_bytes_read': round(read / total, 4) if total else 0.0
+    }
+    return {'corpus': source, 'backends': results}
+
+def _stream_detail(html: str, house_id: str) -> int:
+    """按STREAM_CHUNK_SIZE分块流式解析一个详情页，返回读取的字节数"""
+    body = html.encode('utf-8')
+    chunk_size = CONFIG['STREAM_CHUNK_SIZE']
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parser = DetailStreamParser()
+    read = 0
+    while read < len(body) and not parser.complete:
+        parser.feed(decoder.decode(body[read:read + chunk_size]))
+        read += chunk_size
+    parser.result(house_id)
+    return min(read, len(body))
+
+def bench_pipeline(rows: int, batch_size: int = 1000) -> Dict:
+    """
+    CSVPipeline写入：逐条写入与爬虫处理详情页的调用方式相同，批量写入与reparse/replay相同；
+    另外单独测量逐条清洗和按列清洗
+
+    Returns:
+        Dict: 行数、逐条写入的耗时和行/秒、批量写入和两种清洗方式的行/秒
+    """
+    work_dir = tempfile.mkdtemp(prefix='lianjia_bench_')
+    try:
+        items = list(synthetic_items(rows))
+        pipeline = CSVPipeline(os.path.join(work_dir, 'houses.csv'))
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for item in items:
+                pipeline.process_item(item)
+            pipeline.close()
+            seconds = time.perf_counter() - start
+
+        pipeline = CSVPipeline(os.path.join(work_dir, 'batch.csv'))
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            pipeline.process_items(items[offset:offset + batch_size])
+        pipeline.close()
+        batch_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for item in items:
+            pipeline._clean_row(item)
+        clean_item_seconds = time.perf_counter() - start
+        # 首次调用时生成正则，不计入耗时
+        clean_table(items[:1])
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            clean_table(items[offset:offset + batch_size])
+        clean_table_seconds = time.perf_counter() - start
+        return {
+            'rows': rows,
+            'seconds': round(seconds, 4),
+            'rows_per_sec': round(rows / seconds, 1),
+            'batch_size': batch_size,
+            'batch_rows_per_sec': round(rows / batch_seconds, 1),
+            'clean_item_rows_per_sec': round(rows / clean_item_seconds, 1),
+            'clean_table_rows_per_sec': round(rows / clean_table_seconds, 1)
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def _house_ids(start: int, count: int) -> List[str]:
+    return [str(106000000000 + i) for i in range(start, start + count)]
+
+def bench_state(sizes: Sequence[int], backends: Sequence[str] = STATE_BACKENDS,
+                saves: int = 5, per_page: int = 30) -> List[Dict]:
+    """
+    状态保存耗时：预先写入size个ID，再模拟saves个列表页，每页新增per_page个ID后保存一次
+
+    Returns:
+        List[Dict]: 每个后端和规模的预填充耗时、每次保存的平均和最大耗时、状态文件大小
+    """
+    results = []
+    for backend in backends:
+        for size in sizes:
+            work_dir = tempfile.mkdtemp(prefix='lianjia_bench_')
+            try:
+                progress_file = os.path.join(work_dir, 'progress.json')
+                with patch.dict(CONFIG, BENCH_CONFIG):
+                    state = create_state_manager(progress_file, backend)
+                    start = time.perf_counter()
+                    for offset in range(0, size, 10000):
+                        state.update_progress(1, _house_ids(offset, min(10000, size - offset)))
+                    state.save_state()
+                    populate_seconds = time.perf_counter() - start
+
+                    timings = []
+                    for page in range(saves):
+                        state.update_progress(page + 2, _house_ids(size + page * per_page, per_page))
+                        start = time.perf_counter()
+                        state.save_state()
+                        timings.append(time.perf_counter() - start)
+                    state.close()
+                results.append({
+                    'backend': backend,
+                    'ids': size,
+                    'populate_seconds': round(populate_seconds, 4),
+                    'save_mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+                    'save_max_ms': round(max(timings) * 1000, 3),
+                    'state_bytes': sum(os.path.getsize(os.path.join(work_dir, name))
+                                       for name in os.listdir(work_dir)
+                                       if os.path.isfile(os.path.join(work_dir, name)))
+                })
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+def flatten(report: Dict) -> Dict[str, float]:
+    """
+    将结果展开为指标名到数值的映射，用于比较两次结果
+
+    Returns:
+        Dict[str, float]: 如spider.listings_per_sec、parser.lxml.detail.ms_per_page、state.json.100000.save_mean_ms
+    """
+    results = report['results']
+    metrics = {}
+    if 'spider' in results:
+        metrics['spider.listings_per_sec'] = results['spider']['listings_per_sec']
+    if 'parser' in results:
+        for backend, pages in results['parser']['backends'].items():
+            for kind, stats in pages.items():
+                metrics[f'parser.{backend}.{kind}.ms_per_page'] = stats['ms_per_page']
+    if 'pipeline' in results:
+        for name in ('rows_per_sec', 'batch_rows_per_sec', 'clean_item_rows_per_sec', 'clean_table_rows_per_sec'):
+            metrics[f'pipeline.{name}'] = results['pipeline'][name]
+    for entry in results.get('state', []):
+        metrics[f"state.{entry['backend']}.{entry['ids']}.save_mean_ms"] = entry['save_mean_ms']
+    return metrics
+
+def compare(report: Dict, baseline: Dict) -> Dict[str, Dict]:
+    """
+    按同名指标比较本次结果和基准结果
+
+    Returns:
+        Dict[str, Dict]: 每个指标的基准值、本次值和比值（本次/基准）
+    """
+    current, previous = flatten(report), flatten(baseline)
+    return {
+        name: {'baseline': previous[name], 'current': value,
+               'ratio': round(value / previous[name], 3) if previous[name] else None}
+        for name, value in current.items() if name in previous
+    }
+
+def run(args: argparse.Namespace) -> Dict:
+    """按命令行参数运行所选的基准测试并返回结果"""
+    selected = args.only.split(',') if args.only else BENCHMARKS
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"未知的基准测试: {', '.join(sorted(unknown))}")
+
+    results = {}
+    if 'spider' in selected:
+        results['spider'] = bench_spider(args.pages, args.per_page, args.latency)
+    if 'parser' in selected:
+        results['parser'] = bench_parser(args.pages, args.per_page, args.repeat, args.archive,
+                                         args.detail_padding)
+    if 'pipeline' in selected:
+        results['pipeline'] = bench_pipeline(args.rows)
+    if 'state' in selected:
+        sizes = [int(size) for size in args.state_sizes.split(',')]
+        results['state'] = bench_state(sizes)
+    return {
+        'benchmark': 'crawl',
+        'commit': _git_commit(),
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='离线测量抓取、解析、写入和状态保存的性能')
+    parser.add_argument('--only', help=f"只运行指定的测试，逗号分隔: {','.join(BENCHMARKS)}")
+    parser.add_argument('--pages', type=int, default=20, help='桩服务器的列表页数量')
+    parser.add_argument('--per-page', type=int, default=30, help='每个列表页的房源数量')
+    parser.add_argument('--latency', type=float, default=0.0, help='桩服务器每个请求的模拟延迟（秒）')
+    parser.add_argument('--repeat', type=int, default=5, help='解析测试中语料的重复遍数')
+    parser.add_argument('--archive', help='页面归档目录，解析测试使用其中录制的详情页')
+    parser.add_argument('--detail-padding', type=int, default=0,
+                        help='合成详情页在房源信息之后追加的字符数，模拟真实页面的大小')
+    parser.add_argument('--rows', type=int, default=20000, help='写入测试的行数')
+    parser.add_argument('--state-sizes', default=','.join(str(size) for size in DEFAULT_STATE_SIZES),
+                        help='状态测试中已有ID的数量，逗号分隔')
+    parser.add_argument('--baseline', help='用于比较的另一次结果JSON文件')
+    parser.add_argument('--output', help='结果JSON文件路径，默认只打印')
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        report['baseline_commit'] = baseline.get('commit')
+        report['comparison'] = compare(report, baseline)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+if __name__ == '__main__':
+    main()
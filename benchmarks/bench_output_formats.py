@@ -0,0 +1,103 @@
+"""
+输出格式基准测试：比较CSV与Parquet的写入耗时、文件大小和pandas加载耗时
+
+用法:
+    python -m benchmarks.bench_output_formats --rows 200000 --output bench_formats.json
+"""
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from typing import Dict, Iterator
+import pandas as pd
+from lianjia_spider.spider.pipeline import CSVPipeline, BufferedCSVPipeline
+from lianjia_spider.spider.parquet_pipeline import ParquetPipeline
+
+DISTRICTS = ['高新 天府软件园', '锦江 春熙路', '武侯 桐梓林', '青羊 宽窄巷子', '成华 建设路', '金牛 营门口']
+ORIENTATIONS = ['南', '南 北', '东', '西', '东南', '西北']
+DECORATIONS = ['精装', '简装', '毛坯', '其他']
+
+def synthetic_items(rows: int, seed: int = 42) -> Iterator[Dict]:
+    """生成与详情页解析结果结构一致的合成房源数据"""
+    rng = random.Random(seed)
+    for i in range(rows):
+        area = rng.uniform(30, 250)
+        unit_price = rng.randint(8000, 60000)
+        yield {
+            'house_id': str(106100000000 + i),
+            'title': f'精装两居 南北通透 近地铁 业主诚心出售 {i}',
+            'total_price': f'{area * unit_price / 10000:.1f}万',
+            'unit_price': f'{unit_price}元/平米',
+            'community': f'测试小区{rng.randint(1, 3000)}',
+            'district': rng.choice(DISTRICTS),
+            'house_type': f'{rng.randint(1, 5)}室{rng.randint(1, 2)}厅',
+            'area': f'{area:.2f}平米',
+            'orientation': rng.choice(ORIENTATIONS),
+            'decoration': rng.choice(DECORATIONS),
+            'has_elevator': rng.choice(['有', '无']),
+            'floor': f'{rng.choice(["低", "中", "高"])}楼层(共{rng.randint(6, 33)}层)',
+            'build_year': f'{rng.randint(1990, 2022)}年建',
+            'crawl_time': '2025-02-10 21:00:00'
+        }
+
+def _directory_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+def _measure(name: str, pipeline, target: str, rows: int, loader) -> Dict:
+    start = time.perf_counter()
+    pipeline.process_items(synthetic_items(rows))
+    pipeline.close()
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = loader(target)
+    load_seconds = time.perf_counter() - start
+    assert len(df) == rows, f"{name}: 读取到{len(df)}行，期望{rows}行"
+
+    return {
+        'format': name,
+        'rows': rows,
+        'write_seconds': round(write_seconds, 4),
+        'write_rows_per_sec': round(rows / write_seconds, 1),
+        'file_bytes': _directory_size(target),
+        'load_seconds': round(load_seconds, 4)
+    }
+
+def run(rows: int) -> Dict:
+    """运行基准测试并返回结果"""
+    work_dir = tempfile.mkdtemp(prefix='lianjia_bench_')
+    try:
+        csv_file = os.path.join(work_dir, 'csv', 'houses.csv')
+        buffered_file = os.path.join(work_dir, 'buffered', 'houses.csv')
+        parquet_dir = os.path.join(work_dir, 'houses_parquet')
+        results = [
+            _measure('csv', CSVPipeline(csv_file), csv_file, rows, pd.read_csv),
+            _measure('csv_buffered', BufferedCSVPipeline(buffered_file, buffer_rows=10000, fsync='never'),
+                     buffered_file, rows, pd.read_csv),
+            _measure('parquet', ParquetPipeline(parquet_dir), parquet_dir, rows, pd.read_parquet)
+        ]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {'benchmark': 'output_formats', 'results': results}
+
+def main():
+    parser = argparse.ArgumentParser(description='比较CSV与Parquet输出性能')
+    parser.add_argument('--rows', type=int, default=100000, help='写入的行数')
+    parser.add_argument('--output', help='结果JSON文件路径，默认只打印')
+    args = parser.parse_args()
+
+    report = run(args.rows)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""
+本地链家桩服务器，用于在不访问真实网站的情况下测试爬虫和运行基准测试
+"""
+import re
+import csv
+import sys
+import time
+import hashlib
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    """客户端提前关闭连接时不输出异常堆栈的HTTP服务器"""
+
+    def handle_error(self, request, client_address) -> None:
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubLianjiaServer:
+    """模拟链家列表页和详情页的本地HTTP服务器"""
+
+    def __init__(self, pages: int = 2, per_page: int = 10, latency: float = 0.0,
+                 max_in_flight: int = 0):
+        """
+        初始化桩服务器
+
+        Args:
+            pages: 有房源的列表页数量
+            per_page: 每个列表页的房源数量
+            latency: 每个请求的模拟延迟（秒），运行中可修改
+            max_in_flight: 同时处理的请求超过该数量时返回429，0表示不限制
+        """
+        self.pages = pages
+        self.per_page = per_page
+        self.latency = latency
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.status_counts: Dict[int, int] = {}
+        self._faults = deque()
+        self.revisions: Dict[str, int] = {}
+        self.list_prices: Dict[str, int] = {}
+        # 详情页末尾追加的无关内容字符数，模拟真实页面中位于房源信息之后的大段内容
+        self.detail_padding = 0
+        self.request_count = 0
+        self.connection_count = 0
+        self.request_paths: List[str] = []
+        self.user_agents: List[str] = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """列表页基础URL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/ershoufang/"
+
+    def house_ids(self) -> List[str]:
+        """按列表页顺序返回全部房源ID"""
+        return [self._house_id(page, index)
+                for page in range(1, self.pages + 1)
+                for index in range(self.per_page)]
+
+    def start(self) -> 'StubLianjiaServer':
+        """启动服务器"""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 响应头和响应体分开写出，关闭Nagle算法避免与客户端延迟确认叠加产生约40ms的停顿
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                stub._count_connection()
+
+            def do_GET(self):
+                stub._record(self.path, self.headers.get('User-Agent', ''))
+                fault = stub._enter()
+                try:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    status, body, headers = fault or stub.handle(self.path)
+                finally:
+                    stub._exit()
+                payload = body.encode('utf-8')
+                if status == 200:
+                    # 支持条件请求：内容未变化时返回304
+                    etag = f'"{hashlib.md5(payload).hexdigest()}"'
+                    headers = dict(headers, ETag=etag, **{'Last-Modified': 'Mon, 10 Feb 2025 12:00:00 GMT'})
+                    if self.headers.get('If-None-Match') == etag:
+                        status, payload = 304, b''
+                stub._count_status(status)
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = QuietHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """停止服务器"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> 'StubLianjiaServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def inject_faults(self, status: int, count: int = 1,
+                      headers: Optional[Dict[str, str]] = None) -> None:
+        """
+        让接下来的count个请求返回指定状态码
+
+        Args:
+            status: 返回的HTTP状态码，如429、503
+            count: 受影响的请求数
+            headers: 额外响应头，如Retry-After
+        """
+        with self._lock:
+            for _ in range(count):
+                self._faults.append((status, 'injected fault', dict(headers or {})))
+
+    def handle(self, path: str):
+        """
+        根据路径生成响应
+
+        Returns:
+            tuple: (状态码, 响应体, 额外响应头)
+        """
+        if path.startswith('/ershoufang/pg'):
+            page = int(path[len('/ershoufang/pg'):].strip('/'))
+            return 200, self.list_page(page), {}
+        if path.startswith('/ershoufang/') and path.endswith('.html'):
+            house_id = path[len('/ershoufang/'):-len('.html')]
+            return 200, self.detail_page(house_id), {}
+        return 404, 'not found', {}
+
+    def list_page(self, page: int) -> str:
+        """生成列表页HTML"""
+        items = []
+        if 1 <= page <= self.pages:
+            for index in range(self.per_page):
+                house_id = self._house_id(page, index)
+                total_price = self.list_prices.get(house_id, 100 + index)
+                items.append(self._list_item(house_id, total_price, 10000 + index, f'测试小区{index}'))
+        return self._render_list(items, self.pages * self.per_page)
+
+    def _list_item(self, house_id: str, total_price, unit_price, community: str) -> str:
+        """生成列表页中的一个房源"""
+        return f'''
+            <div class="info clear">
+                <div class="title">
+                    <a href="{self.base_url}{house_id}.html" class="title">测试房源{house_id}</a>
+                </div>
+                <div class="priceInfo">
+                    <div class="totalPrice"><span>{total_price}</span>万</div>
+                    <div class="unitPrice"><span>{unit_price}</span>元/平米</div>
+                </div>
+                <div class="houseInfo">2室1厅 | 89.12平米 | 南 | 精装 | 中楼层(共18层) | 2010年建 | 板楼</div>
+                <div class="positionInfo">{community} - 高新</div>
+            </div>'''
+
+    def _render_list(self, items: List[str], total: int, region_bar: str = '') -> str:
+        """生成列表页外层HTML"""
+        return f'''{region_bar}
+        <div class="leftContent">
+            <h2 class="total">共找到<span>{total}</span>套成都二手房</h2>{''.join(items)}
+        </div>
+        '''
+
+    def detail_page(self, house_id: str) -> str:
+        """生成详情页HTML"""
+        revision = self.revisions.get(house_id)
+        suffix = f'（修订{revision}）' if revision else ''
+        return f'''
+        <div class="house-title">
+            <h1 class="main">测试房源详情{house_id}{suffix}</h1>
+        </div>
+        <div class="price">
+            <span class="total">500</span>万
+            <div class="text">
+                <span class="unitPriceValue">50000</span>元/平米
+            </div>
+        </div>
+        <div class="base">
+            <div class="content">
+                <ul>
+                    <li class="base"><span class="label">房屋户型：</span>2室1厅</li>
+                    <li class="base"><span class="label">所在楼层：</span>中楼层(共18层)</li>
+                    <li class="base"><span class="label">建筑面积：</span>89.12平米</li>
+                    <li class="base"><span class="label">房屋朝向：</span>南</li>
+                    <li class="base"><span class="label">装修情况：</span>精装</li>
+                    <li class="base"><span class="label">配备电梯：</span>有</li>
+                    <li class="base"><span class="label">建成年代：</span>2010年建</li>
+                </ul>
+            </div>
+        </div>
+        <div class="communityName">
+            <a>测试小区</a>
+        </div>
+        <div class="areaName">
+            <a>高新</a>
+            <a>天府软件园</a>
+        </div>
+        <div class="comments">{'评' * self.detail_padding}</div>
+        '''
+
+    def _house_id(self, page: int, index: int) -> str:
+        return str(106100000000 + page * 1000 + index)
+
+    def _enter(self):
+        """记录在途请求数，返回需要注入的故障响应"""
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            if self._faults:
+                return self._faults.popleft()
+            if self.max_in_flight and self.in_flight > self.max_in_flight:
+                return 429, 'too many requests', {}
+        return None
+
+    def _exit(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _count_connection(self) -> None:
+        with self._lock:
+            self.connection_count += 1
+
+    def _count_status(self, status: int) -> None:
+        with self._lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def _record(self, path: str, user_agent: str = '') -> None:
+        with self._lock:
+            self.request_count += 1
+            self.request_paths.append(path)
+            self.user_agents.append(user_agent)
+
+
+class ShardedStubServer(StubLianjiaServer):
+    """
+    带城区、商圈和价格/面积筛选的桩服务器
+
+    URL形如/ershoufang/{城区或商圈}/pg{页码}{筛选条件}/，每个筛选条件下最多返回page_cap页。
+    房源的价格段和面积段按编号轮流分配：价格段p1~p3，面积段a1~a2。
+    """
+
+    def __init__(self, regions: Dict[str, Dict[str, int]], per_page: int = 5, page_cap: int = 3,
+                 **kwargs):
+        """
+        初始化桩服务器
+
+        Args:
+            regions: 城区到{商圈: 房源数}的映射
+            per_page: 每个列表页的房源数量
+            page_cap: 每个筛选条件下最多可访问的列表页数
+        """
+        super().__init__(pages=0, per_page=per_page, **kwargs)
+        self.regions = regions
+        self.page_cap = page_cap
+        self.houses: List[Dict] = []
+        for district, areas in regions.items():
+            for area, count in areas.items():
+                for _ in range(count):
+                    number = len(self.houses)
+                    self.houses.append({
+                        'house_id': str(107100000000 + number),
+                        'district': district,
+                        'area': area,
+                        'p': number % 3 + 1,
+                        'a': number // 3 % 2 + 1
+                    })
+
+    def house_ids(self) -> List[str]:
+        """按城区、商圈顺序返回全部房源ID"""
+        return [house['house_id'] for house in self.houses]
+
+    def handle(self, path: str):
+        """根据路径生成响应，列表页支持区域和筛选条件"""
+        match = re.match(r'^/ershoufang/(?:([a-z0-9]+)/)?pg(\d+)((?:[pa]\d+)*)/$', path)
+        if match:
+            segment, page, filters = match.group(1), int(match.group(2)), match.group(3)
+            return 200, self.sharded_list_page(segment, page, filters), {}
+        return super().handle(path)
+
+    def sharded_list_page(self, segment: Optional[str], page: int, filters: str = '') -> str:
+        """生成区域和筛选条件下的列表页HTML"""
+        conditions = {name: int(value) for name, value in re.findall(r'([pa])(\d+)', filters)}
+        houses = [
+            house for house in self.houses
+            if segment in (None, house['district'], house['area'])
+            and all(house[name] == value for name, value in conditions.items())
+        ]
+        items = []
+        if 1 <= page <= self.page_cap:
+            start = (page - 1) * self.per_page
+            for house in houses[start:start + self.per_page]:
+                items.append(self._list_item(house['house_id'], house['p'] * 100, house['a'] * 10000,
+                                             f"{house['area']}小区"))
+        return self._render_list(items, len(houses), self._region_bar(segment))
+
+    def _region_bar(self, segment: Optional[str]) -> str:
+        """生成区域筛选栏，选中城区或商圈时第二行为同一城区的商圈"""
+        rows = [[f'<a href="/ershoufang/{district}/">{district}</a>' for district in self.regions]]
+        for district, areas in self.regions.items():
+            if segment == district or segment in areas:
+                rows.append([f'<a href="/ershoufang/{area}/">{area}</a>' for area in areas])
+        return '<div data-role="ershoufang">' + ''.join(
+            f"<div>{''.join(links)}</div>" for links in rows
+        ) + '</div>'
+
+
+def read_rows(csv_file: str) -> List[Dict[str, str]]:
+    """读取CSV文件的所有数据行"""
+    with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
@@ -2,6 +2,7 @@
 链家爬虫包
 """
 from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.async_spider import AsyncLianjiaSpider
 
 __version__ = '0.1.0'
-__all__ = ['LianjiaSpider']
+__all__ = ['LianjiaSpider', 'AsyncLianjiaSpider']
@@ -8,15 +8,120 @@ CONFIG = {
     'BASE_URL': 'https://cd.lianjia.com/ershoufang/',
     
     # 请求配置
-    'DELAY_RANGE': (2, 5),  # 随机延迟范围（秒）
+    'DELAY_RANGE': (2, 5),  # 未启用限速时每个详情页后的随机延迟范围（秒）
     'MAX_RETRIES': 3,       # 最大重试次数
     'BACKOFF_FACTOR': 2,    # 重试退避因子
+    'RETRY_AFTER_MAX': 600,  # 重试时遵循Retry-After响应头的最长等待（秒）
+    'BLOCKED_URL_PATTERN': r'captcha|hip\.lianjia\.com',  # 最终URL匹配该正则时视为被拦截（验证码页），不重试
+    
+    # 熔断配置
+    'CIRCUIT_BREAKER': False,  # 是否在失败率过高时暂停整个抓取
+    'CIRCUIT_WINDOW': 20,   # 统计失败率的最近请求数
+    'CIRCUIT_MIN_REQUESTS': 10,  # 窗口内至少有多少个请求才判断失败率
+    'CIRCUIT_FAILURE_RATE': 0.5,  # 失败率达到该值时打开熔断器（403、429、5xx、连接失败和验证码跳转计为失败）
+    'CIRCUIT_OPEN_SECONDS': 60,  # 打开后暂停的秒数（响应带Retry-After时取较大值），之后放行一个探测请求
+    'CIRCUIT_MAX_OPEN_SECONDS': 1800,  # 探测连续失败时暂停时间加倍的上限（秒）
+    
+    # 限速配置
+    'RATE_LIMIT': 0.3,      # 每秒允许的请求数，0表示改用DELAY_RANGE随机延迟
+    'RATE_BURST': 1,        # 空闲后允许连续发出的请求数
+    'RATE_JITTER': 1.0,     # 每个请求额外等待的最大随机秒数
+    'RATE_PER_HOST': True,  # 是否按主机分别限速
+    
+    # 引擎配置
+    'ENGINE': 'serial',     # 爬取引擎: serial(串行)、async(异步并发) 或 sharded(分片并行)
+    'CONCURRENCY': 8,       # 异步模式下同时进行的最大请求数
+    
+    # 多城市调度配置
+    'TARGETS': [],          # 抓取目标，如['cd/ershoufang:3', 'bj/ershoufang']（城市/频道:权重，频道目前只支持ershoufang），为空时只抓取BASE_URL
+    'SCHEDULER_WORKERS': 4,  # 多目标共用的抓取线程数
+    'SCHEDULER_ROUNDS': 1,  # 每个目标至少完成的遍数，大于1时先完成的目标从第1页重新开始，需要开启INCREMENTAL
+    
+    # 分布式配置
+    'QUEUE_BACKEND': 'sqlite',  # 任务队列后端: sqlite(同一台机器上的多进程) 或 memory(单进程内多线程)
+    'QUEUE_DB': 'queue.db',  # 任务队列数据库（位于DATA_DIR下）
+    'QUEUE_VISIBILITY_TIMEOUT': 300,  # 租约超时（秒），超时未确认的任务重新分配给其他节点
+    'QUEUE_MAX_ATTEMPTS': 3,  # 单个任务最多分配次数，超过后标记为失败
+    'QUEUE_ACK_BATCH': 20,  # 每写出多少个详情页确认一次任务
+    'QUEUE_POLL_INTERVAL': 1.0,  # 暂时没有可租用任务时的等待间隔（秒）
+    'DISTRIBUTED_WORKERS': 4,  # run命令在本机启动的工作进程数
+    
+    # 分片配置
+    'SHARD_WORKERS': 4,     # 分片模式下并行抓取的分片数
+    'SHARD_PAGE_CAP': 100,  # 单个筛选条件下最多可访问的列表页数
+    'SHARD_PRICE_FILTERS': ['p1', 'p2', 'p3', 'p4', 'p5', 'p6', 'p7'],  # 超过页数上限时按价格段拆分
+    'SHARD_AREA_FILTERS': ['a1', 'a2', 'a3', 'a4', 'a5', 'a6', 'a7'],  # 价格段仍超过上限时再按面积段拆分
+    
+    # 自适应并发配置
+    'ADAPTIVE_CONCURRENCY': False,  # 是否按延迟和错误率自动调整并发上限和请求速率
+    'AIMD_MIN_LIMIT': 1,    # 并发上限的下限
+    'AIMD_MAX_LIMIT': 32,   # 并发上限的上限
+    'AIMD_LATENCY_TARGET': 3.0,  # 目标请求延迟（秒），超过视为过载
+    'AIMD_BACKOFF': 0.5,    # 过载时并发上限和速率乘以该系数
+    'AIMD_COOLDOWN': 2.0,   # 两次降低之间的最短间隔（秒）
+    'AIMD_RATE_STEP': 0.05,  # 每次加性增加的请求速率（请求/秒）
+    'AIMD_MIN_RATE': 0.05,  # 请求速率下限
+    'AIMD_MAX_RATE': 2.0,   # 请求速率上限
+    'AIMD_SETPOINT_FILE': 'setpoint.jsonl',  # 设定值变化记录文件，空字符串表示不记录
+    
+    # 连接池配置
+    'POOL_SIZE': 10,        # 最多缓存的主机连接池数量
+    'POOL_PER_HOST': 10,    # 每个主机最多保持的keep-alive连接数
+    'POOL_IDLE_TIMEOUT': 60,  # 主机空闲超过该秒数后关闭其连接
+    
+    # 响应缓存配置
+    'HTTP_CACHE': False,    # 是否启用磁盘响应缓存
+    'HTTP_CACHE_DIR': 'http_cache',  # 缓存目录（位于DATA_DIR下）
+    'HTTP_CACHE_TTL': 24 * 3600,  # 缓存有效期（秒），过期后按ETag/Last-Modified重新验证
+    'HTTP_CACHE_MAX_BYTES': 1024 ** 3,  # 压缩后缓存总大小上限，超过时淘汰最久未使用的页面
+    
+    # 解析配置
+    'PARSER_BACKEND': 'auto',  # 解析后端: auto(使用bs4)、lxml 或 bs4；lxml更快，但标签未闭合时结果可能与bs4不同
+    'PARSE_WORKERS': 0,     # 详情页解析进程数，0表示在抓取线程中解析
+    'PARSE_MAX_PENDING': 64,  # 最多等待写出的解析结果数，超过时抓取端阻塞
+    'STREAM_DETAIL': False,  # 详情页流式解析：边下载边解析，必需字段齐全后停止下载（启用归档或解析进程池时不生效）
+    'STREAM_CHUNK_SIZE': 16 * 1024,  # 流式解析每次读取的字节数
+    'STREAM_DRAIN_BYTES': 64 * 1024,  # 停止解析时剩余内容不超过该字节数则读完，以便复用keep-alive连接
+    'LIST_ONLY': False,     # 仅列表模式：由列表页的房源信息生成数据，不抓取详情页
+    'ENRICH_DETAILS': False,  # 仅列表模式下是否在后台线程补抓详情页
+    'ENRICH_DIR': 'enriched',  # 补抓结果和进度目录（位于DATA_DIR下），文件名沿用OUTPUT_FILE/PROGRESS_FILE
     
     # 存储配置
     'DATA_DIR': 'data',
     'OUTPUT_FILE': 'houses.csv',
+    'OUTPUT_FORMAT': 'csv',  # 输出格式: csv 或 parquet(需要安装pyarrow)
+    'PARQUET_DIR': 'houses_parquet',  # Parquet分片文件目录
+    'PARQUET_ROW_GROUP_SIZE': 10000,  # 每个Parquet行组的行数
     'PROGRESS_FILE': 'progress.json',
+    'PIPELINE_BUFFER_ROWS': 0,  # CSV缓冲行数，0表示逐条写入
+    'PIPELINE_BUFFER_BYTES': 1024 * 1024,  # CSV缓冲的最大字符数
+    'PIPELINE_FSYNC': 'close',  # fsync策略: never、flush(每次批量写入后) 或 close(关闭时)
+    'CLEAN_BATCH_ROWS': 500,  # 批量写入达到该行数时用pyarrow按列清洗，0表示始终逐条清洗
+    'ARCHIVE': False,       # 是否将抓取的原始页面归档，供reparse重新解析
+    'ARCHIVE_DIR': 'archive',  # 归档目录（位于DATA_DIR下）
+    'ARCHIVE_SEGMENT_BYTES': 256 * 1024 * 1024,  # 单个分段文件的大小上限
+    'ARCHIVE_COMPRESSION': 'auto',  # 压缩格式: auto(已安装zstandard时使用zstd)、zstd 或 zlib
+    'ARCHIVE_LEVEL': 3,     # zstd压缩级别
     'SAVE_INTERVAL': 10,    # 每爬取10页保存一次进度
+    'STATE_BACKEND': 'json',  # 状态后端: json(全量快照)、journal(追加日志+定期合并) 或 sqlite(WAL数据库)
+    'STATE_BATCH_SIZE': 100,  # sqlite后端累计多少次更新提交一次事务
+    'JOURNAL_COMPACT_INTERVAL': 10000,  # 日志记录数达到该值时合并进快照
+    'JOURNAL_FSYNC': False,  # 每个检查点是否fsync日志文件
+    'ID_FILTER': False,     # 是否在查询已爬取ID之前使用布隆过滤器（每次启动时由进度重建，仅sqlite后端生效）
+    'ID_FILTER_DIR': 'id_filter',  # 布隆过滤器位图文件目录（位于DATA_DIR下）
+    'ID_FILTER_ERROR_RATE': 0.001,  # 布隆过滤器的误判率上限
+    'ID_FILTER_CAPACITY': 1000000,  # 布隆过滤器第一个分片的容量，超过后自动扩容
+    
+    # 增量抓取配置
+    'INCREMENTAL': False,   # 增量模式：每次从第1页开始，只抓取新增或列表页标题、价格有变化的房源
+    'LISTING_DB': 'listings.db',  # 列表页字段快照数据库（位于DATA_DIR下）
+    'PRICE_HISTORY_FILE': 'price_history.csv',  # 列表页字段变化历史（位于DATA_DIR下）
+    
+    # 运行指标配置
+    'METRICS': False,       # 是否输出运行指标（耗时直方图、下载字节数、页面吞吐量、重试次数）
+    'METRICS_INTERVAL': 60,  # 每隔多少秒向日志写入一次指标摘要并更新指标文件，0表示只在结束时输出
+    'METRICS_FILE': 'metrics.json',  # 指标JSON文件（位于DATA_DIR下），空字符串表示不写文件
+    'METRICS_PORT': 0,      # Prometheus文本格式/metrics端点的本机端口，0表示不启动
     
     # 日志配置
     'LOG_LEVEL': 'INFO',
@@ -0,0 +1,101 @@
+"""
+分布式抓取入口：协调器投放任务，多个工作进程从共享队列租用任务
+
+用法:
+    python -m lianjia_spider.distributed seed [--refresh] [--import-state]
+    python -m lianjia_spider.distributed worker [--id w1]
+    python -m lianjia_spider.distributed run --workers 4
+    python -m lianjia_spider.distributed status
+    python -m lianjia_spider.distributed merge --output data/houses_merged.csv
+"""
+import os
+import argparse
+import multiprocessing
+from typing import Optional
+from lianjia_spider.spider.queue_worker import Coordinator, QueueWorker, merge_partitions
+from lianjia_spider.utils.state import create_state_manager
+from lianjia_spider.utils.work_queue import create_work_queue
+from lianjia_spider.config.settings import CONFIG
+
+def _seed(refresh: bool, import_state: bool) -> None:
+    """投放起始任务，可导入单机模式已抓取的房源ID"""
+    queue = create_work_queue()
+    try:
+        scraped_ids = []
+        if import_state:
+            state = create_state_manager(os.path.join(CONFIG['DATA_DIR'], CONFIG['PROGRESS_FILE']))
+            scraped_ids = state.get_scraped_ids()
+            state.close()
+        Coordinator(queue).seed(refresh, scraped_ids)
+        print(Coordinator.format_stats(queue.stats()))
+    finally:
+        queue.close()
+
+def _status() -> None:
+    """输出队列中各状态的任务数"""
+    queue = create_work_queue()
+    try:
+        print(Coordinator.format_stats(queue.stats()))
+    finally:
+        queue.close()
+
+def _run_worker(worker_id: Optional[str] = None, max_tasks: Optional[int] = None) -> None:
+    """在当前进程中运行一个工作节点"""
+    queue = create_work_queue()
+    try:
+        QueueWorker(queue, worker_id).run(max_tasks)
+    finally:
+        queue.close()
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='基于共享任务队列的分布式抓取')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed = commands.add_parser('seed', help='投放起始任务')
+    seed.add_argument('--refresh', action='store_true', help='重新抓取全部列表页')
+    seed.add_argument('--import-state', action='store_true', help='导入单机模式进度中已抓取的房源ID')
+
+    worker = commands.add_parser('worker', help='运行一个工作节点')
+    worker.add_argument('--id', help='节点标识，默认为主机名-进程号')
+    worker.add_argument('--max-tasks', type=int, help='最多处理的任务数')
+
+    run = commands.add_parser('run', help='投放任务并在本机启动多个工作进程')
+    run.add_argument('--workers', type=int, default=CONFIG['DISTRIBUTED_WORKERS'], help='工作进程数')
+    run.add_argument('--refresh', action='store_true', help='重新抓取全部列表页')
+
+    commands.add_parser('status', help='查看队列进度')
+
+    merge = commands.add_parser('merge', help='合并各节点的输出分区，按房源ID去重')
+    merge.add_argument('--output', default=os.path.join(CONFIG['DATA_DIR'], 'houses_merged.csv'),
+                       help='合并后的CSV文件')
+    args = parser.parse_args()
+
+    if args.command == 'seed':
+        _seed(args.refresh, args.import_state)
+    elif args.command == 'worker':
+        _run_worker(args.id, args.max_tasks)
+    elif args.command == 'run':
+        if CONFIG['QUEUE_BACKEND'] == 'memory':
+            parser.error("memory队列不能在多个进程间共享，请使用sqlite后端")
+        _seed(args.refresh, False)
+        processes = [multiprocessing.Process(target=_run_worker, args=(f"{os.getpid()}-w{i}",))
+                     for i in range(args.workers)]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # 工作进程同样收到中断信号，等待它们保存进度
+            for process in processes:
+                process.join()
+        _status()
+    elif args.command == 'status':
+        _status()
+    elif args.command == 'merge':
+        count = merge_partitions(CONFIG['DATA_DIR'], args.output)
+        print(f"已合并{count}个房源到{args.output}")
+
+if __name__ == '__main__':
+    main()
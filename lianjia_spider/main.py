@@ -4,6 +4,9 @@
 import os
 import logging
 from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.async_spider import AsyncLianjiaSpider
+from lianjia_spider.spider.sharded_spider import ShardedLianjiaSpider
+from lianjia_spider.spider.scheduler import MultiCityScheduler
 from lianjia_spider.config.settings import CONFIG
 
 
@@ -26,7 +29,14 @@ def main():
     
     try:
         # 创建并运行爬虫
-        spider = LianjiaSpider()
+        if CONFIG['TARGETS']:
+            spider = MultiCityScheduler()
+        elif CONFIG['ENGINE'] == 'async':
+            spider = AsyncLianjiaSpider()
+        elif CONFIG['ENGINE'] == 'sharded':
+            spider = ShardedLianjiaSpider()
+        else:
+            spider = LianjiaSpider()
         spider.run()
     except KeyboardInterrupt:
         print("\n程序被用户中断")
@@ -0,0 +1,48 @@
+"""
+抓取后的类型转换入口：读取输出CSV，将价格、面积、年代转换为数值，拆分楼层和户型后另存
+
+用法:
+    python -m lianjia_spider.normalize --output data/houses_normalized.parquet
+"""
+import os
+import argparse
+import pandas as pd
+from lianjia_spider.spider.frame_cleaner import normalize_frame
+from lianjia_spider.config.settings import CONFIG
+
+def normalize_csv(input_file: str, output_file: str) -> int:
+    """
+    转换输出CSV并保存
+
+    Args:
+        input_file: 爬虫输出的CSV文件
+        output_file: 结果文件，扩展名为.parquet时保存为Parquet(需要安装pyarrow)，否则保存为CSV
+
+    Returns:
+        int: 行数
+    """
+    frame = pd.read_csv(input_file, dtype=str, keep_default_na=False, encoding='utf-8')
+    result = normalize_frame(frame)
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    if output_file.endswith('.parquet'):
+        result.to_parquet(output_file, index=False)
+    else:
+        result.to_csv(output_file, index=False, encoding='utf-8')
+    return len(result)
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='将输出CSV转换为带类型的表')
+    parser.add_argument('--input', default=os.path.join(CONFIG['DATA_DIR'], CONFIG['OUTPUT_FILE']),
+                        help='爬虫输出的CSV文件')
+    parser.add_argument('--output', default=os.path.join(CONFIG['DATA_DIR'], 'houses_normalized.csv'),
+                        help='结果文件，扩展名为.parquet时保存为Parquet')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        parser.error(f"输入文件不存在: {args.input}")
+    count = normalize_csv(args.input, args.output)
+    print(f"已转换{count}个房源，输出到{args.output}")
+
+if __name__ == '__main__':
+    main()
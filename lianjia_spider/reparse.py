@@ -0,0 +1,100 @@
+"""
+批量重新解析入口：顺序读取原始页面归档，用当前的解析器重新生成输出
+
+用法:
+    python -m lianjia_spider.reparse --output-dir data/reparse --workers 4
+"""
+import os
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+from lianjia_spider.spider.parser import create_parser
+from lianjia_spider.spider.pipeline import CSVPipeline, create_pipeline
+from lianjia_spider.utils.archive import ArchiveRecord, PageArchive, read_records
+from lianjia_spider.config.settings import CONFIG
+
+# 每个任务解析的页面数
+CHUNK_SIZE = 500
+
+def _parse_chunk(archive_dir: str, records: List[ArchiveRecord], backend: Optional[str] = None) -> List[Dict]:
+    """读取并解析一组归档记录，在工作进程中执行"""
+    parser = create_parser(backend)
+    items = []
+    for record, html in read_records(archive_dir, records):
+        item = parser.parse_detail_page(html, record.house_id)
+        # 保留原始抓取时间，重新解析的输出与当时抓取的结果可直接比较
+        item['crawl_time'] = record.crawl_time
+        items.append(item)
+    return items
+
+def _chunks(records: List[ArchiveRecord], size: int) -> Iterator[List[ArchiveRecord]]:
+    for start in range(0, len(records), size):
+        yield records[start:start + size]
+
+def reparse_archive(archive: PageArchive, pipeline: CSVPipeline, workers: int = 0,
+                    backend: Optional[str] = None, latest_only: bool = True,
+                    since: Optional[str] = None, until: Optional[str] = None) -> int:
+    """
+    重新解析归档中的详情页并写入数据管道
+
+    页面按分段和偏移顺序分块，每块由一个工作进程读取、解压和解析，
+    结果按块的顺序写出，输出顺序与归档顺序一致。
+
+    Args:
+        archive: 页面归档
+        pipeline: 输出数据管道
+        workers: 解析进程数，0表示在当前进程中解析
+        backend: 解析后端，默认使用CONFIG['PARSER_BACKEND']
+        latest_only: 每个房源只解析最近一次抓取的页面
+        since: 只解析该时间之后抓取的页面
+        until: 只解析该时间之前抓取的页面
+
+    Returns:
+        int: 输出的房源数量
+    """
+    records = archive.records(latest_only=latest_only, since=since, until=until)
+    chunks = _chunks(records, CHUNK_SIZE)
+    count = 0
+    if workers > 0:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parse = partial(_parse_chunk, archive.archive_dir, backend=backend)
+            for items in executor.map(parse, chunks):
+                pipeline.process_items(items)
+                count += len(items)
+    else:
+        for chunk in chunks:
+            items = _parse_chunk(archive.archive_dir, chunk, backend)
+            pipeline.process_items(items)
+            count += len(items)
+    return count
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='从原始页面归档批量重新解析详情页')
+    parser.add_argument('--archive-dir', default=os.path.join(CONFIG['DATA_DIR'], CONFIG['ARCHIVE_DIR']),
+                        help='归档目录')
+    parser.add_argument('--output-dir', default=os.path.join(CONFIG['DATA_DIR'], 'reparse'),
+                        help='输出目录，文件名和格式沿用OUTPUT_FILE/OUTPUT_FORMAT配置，已有的输出会被覆盖')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='解析进程数，0表示单进程')
+    parser.add_argument('--parser', choices=['auto', 'lxml', 'bs4'], help='解析后端')
+    parser.add_argument('--all-versions', action='store_true', help='输出每个房源的全部抓取版本')
+    parser.add_argument('--since', help='只解析该时间之后抓取的页面，如2025-02-01 00:00:00')
+    parser.add_argument('--until', help='只解析该时间之前抓取的页面')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.archive_dir):
+        parser.error(f"归档目录不存在: {args.archive_dir}")
+
+    archive = PageArchive(args.archive_dir)
+    pipeline = create_pipeline(args.output_dir, overwrite=True)
+    try:
+        count = reparse_archive(archive, pipeline, workers=args.workers, backend=args.parser,
+                                latest_only=not args.all_versions, since=args.since, until=args.until)
+    finally:
+        pipeline.close()
+        archive.close()
+    print(f"已重新解析{count}个页面，输出到{args.output_dir}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+离线重放入口：不访问网络，用响应缓存中的详情页重新解析并输出
+
+用法:
+    python -m lianjia_spider.replay --output-dir data/replay
+"""
+import os
+import re
+import argparse
+from typing import Optional
+from lianjia_spider.spider.parser import create_parser
+from lianjia_spider.spider.pipeline import CSVPipeline, create_pipeline
+from lianjia_spider.utils.http_cache import HttpCache, cached_response
+from lianjia_spider.config.settings import CONFIG
+
+DETAIL_URL = re.compile(r'/(\d+)\.html')
+
+# 每批交给数据管道的房源数
+BATCH_SIZE = 1000
+
+def replay_from_cache(cache: HttpCache, pipeline: CSVPipeline, backend: Optional[str] = None) -> int:
+    """
+    按首次抓取的顺序重新解析缓存中的全部详情页
+
+    Args:
+        cache: 响应缓存
+        pipeline: 输出数据管道
+        backend: 解析后端，默认使用CONFIG['PARSER_BACKEND']
+
+    Returns:
+        int: 输出的房源数量
+    """
+    parser = create_parser(backend)
+    batch = []
+    count = 0
+    for entry in cache.iter_entries():
+        match = DETAIL_URL.search(entry.url)
+        if not match:
+            continue
+        body = cache.read(entry)
+        if body is None:
+            print(f"缓存内容丢失，跳过: {entry.url}")
+            continue
+        html = cached_response(entry, body).text
+        batch.append(parser.parse_detail_page(html, match.group(1)))
+        if len(batch) >= BATCH_SIZE:
+            pipeline.process_items(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        pipeline.process_items(batch)
+        count += len(batch)
+    return count
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='从响应缓存离线重新解析详情页')
+    parser.add_argument('--cache-dir', default=os.path.join(CONFIG['DATA_DIR'], CONFIG['HTTP_CACHE_DIR']),
+                        help='响应缓存目录')
+    parser.add_argument('--output-dir', default=os.path.join(CONFIG['DATA_DIR'], 'replay'),
+                        help='输出目录，文件名和格式沿用OUTPUT_FILE/OUTPUT_FORMAT配置，已有的输出会被覆盖')
+    parser.add_argument('--parser', choices=['auto', 'lxml', 'bs4'], help='解析后端')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.cache_dir):
+        parser.error(f"缓存目录不存在: {args.cache_dir}")
+
+    cache = HttpCache(args.cache_dir)
+    pipeline = create_pipeline(args.output_dir, overwrite=True)
+    try:
+        count = replay_from_cache(cache, pipeline, args.parser)
+    finally:
+        pipeline.close()
+        cache.close()
+    print(f"已从缓存重新解析{count}个房源，输出到{args.output_dir}")
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,15 @@
 爬虫核心模块
 """
 from .spider import LianjiaSpider
-from .parser import Parser
-from .pipeline import CSVPipeline
+from .async_spider import AsyncLianjiaSpider
+from .sharded_spider import ShardedLianjiaSpider
+from .shards import Shard, ShardPlanner
+from .scheduler import CrawlTarget, MultiCityScheduler
+from .queue_worker import Coordinator, QueueWorker
+from .parser import Parser, create_parser
+from .fast_parser import LxmlParser
+from .pipeline import CSVPipeline, BufferedCSVPipeline
+from .parse_pool import ParsePool
+from .enrich import DetailEnricher
 
-__all__ = ['LianjiaSpider', 'Parser', 'CSVPipeline']
+__all__ = ['LianjiaSpider', 'AsyncLianjiaSpider', 'ShardedLianjiaSpider', 'Shard', 'ShardPlanner', 'CrawlTarget', 'MultiCityScheduler', 'Coordinator', 'QueueWorker', 'Parser', 'LxmlParser', 'create_parser', 'CSVPipeline', 'BufferedCSVPipeline', 'ParsePool', 'DetailEnricher']
@@ -0,0 +1,215 @@
+"""
+异步爬虫引擎模块，并发获取列表页和详情页
+"""
+import asyncio
+import random
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, List, Dict, Tuple, Union
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.parse_pool import ParsePool
+from lianjia_spider.utils.transport import create_transport
+from lianjia_spider.utils.concurrency import AdaptiveSlots
+from lianjia_spider.config.settings import CONFIG
+
+class AsyncLianjiaSpider(LianjiaSpider):
+    """
+    基于asyncio的链家爬虫
+
+    同一时间最多有concurrency个请求在进行中（启用自适应并发时由控制器动态调整），
+    下一列表页与当前页的详情页并发获取。
+    启用限速器时在事件循环中等待令牌，不占用并发槽位和线程；否则每个请求完成后随机延迟。
+    解析、数据管道和状态管理沿用LianjiaSpider的组件，输出与串行模式一致。
+    """
+
+    def __init__(self, concurrency: Optional[int] = None,
+                 delay_range: Optional[Tuple[float, float]] = None):
+        """
+        初始化异步爬虫
+
+        Args:
+            concurrency: 最大并发请求数，默认使用CONFIG['CONCURRENCY']
+            delay_range: 未启用限速器时每个请求完成后占用并发槽位的随机延迟范围（秒），默认使用CONFIG['DELAY_RANGE']
+        """
+        self.concurrency = concurrency or CONFIG['CONCURRENCY']
+        self.delay_range = delay_range if delay_range is not None else CONFIG['DELAY_RANGE']
+        super().__init__()
+        # 每个并发请求都需要一个线程和一个可复用的连接
+        self.max_concurrency = self.concurrency
+        if self.concurrency_controller is not None:
+            self.max_concurrency = max(self.concurrency, self.concurrency_controller.max_limit)
+        self.transport.close()
+        self.transport = create_transport(per_host_limit=max(CONFIG['POOL_PER_HOST'], self.max_concurrency))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[Union[asyncio.Semaphore, AdaptiveSlots]] = None
+
+    async def _fetch_page_async(self, url: str, fetch: Optional[Callable[[str], Any]] = None) -> Any:
+        """
+        在线程池中获取页面内容，受并发数限制
+
+        Args:
+            url: 页面URL
+            fetch: 在工作线程中获取页面的函数，默认为_fetch_page
+
+        Returns:
+            fetch的返回值，默认为页面HTML内容
+        """
+        fetch = fetch or self._fetch_page
+        loop = asyncio.get_running_loop()
+        if self.transport.is_fresh(url):
+            # 缓存有效期内的页面不访问网络，无需等待；缓存随后失效时由_request同步限速
+            async with self._semaphore:
+                return await loop.run_in_executor(self._executor, fetch, url)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(url)
+            async with self._semaphore:
+                return await loop.run_in_executor(self._executor, self._fetch_prepaid, url, fetch)
+        async with self._semaphore:
+            html = await loop.run_in_executor(self._executor, fetch, url)
+            await self._async_delay()
+        return html
+
+    def _fetch_prepaid(self, url: str, fetch: Optional[Callable[[str], Any]] = None) -> Any:
+        """在工作线程中获取页面，首次请求的令牌已由事件循环取得"""
+        self._local.prepaid = True
+        try:
+            return (fetch or self._fetch_page)(url)
+        finally:
+            self._local.prepaid = False
+
+    async def _async_delay(self) -> None:
+        """随机延迟，不阻塞其他请求"""
+        delay = random.uniform(self.delay_range[0], self.delay_range[1])
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def crawl_list_page_async(self, page: int) -> Tuple[List[Dict], Optional[int]]:
+        """
+        异步爬取列表页
+
+        Args:
+            page: 页码
+
+        Returns:
+            tuple: (房源列表, 总数量)
+        """
+        url = f"{self.base_url}pg{page}/"
+        html = await self._fetch_page_async(url)
+        return self.parser.parse_list_page(html)
+
+    async def crawl_detail_page_async(self, house_id: str, url: str) -> Dict:
+        """
+        异步爬取详情页
+
+        Args:
+            house_id: 房源ID
+            url: 详情页URL
+
+        Returns:
+            Dict: 房源详细信息
+        """
+        if self._streams_detail():
+            return await self._fetch_page_async(url, partial(self._stream_detail_page, house_id))
+        html = await self._fetch_page_async(url)
+        if self.parse_pool is not None:
+            return await self.parse_pool.parse_async(html, house_id)
+        return self.parser.parse_detail_page(html, house_id)
+
+    async def crawl(self) -> None:
+        """并发爬取所有页面"""
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        if self.concurrency_controller is not None:
+            # 并发上限由控制器按延迟和错误率动态调整
+            self._semaphore = AdaptiveSlots(self.concurrency_controller)
+        else:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        current_page = self._start_page()
+        print(f"从第{current_page}页开始爬取（异步模式，并发数{self.concurrency}）...")
+        if CONFIG['PARSE_WORKERS'] > 0 and self.parse_pool is None:
+            self.parse_pool = ParsePool()
+        self._start_enricher()
+
+        next_list = asyncio.ensure_future(self.crawl_list_page_async(current_page))
+        try:
+            while True:
+                houses, total = await next_list
+                if not houses:
+                    print(f"第{current_page}页没有找到房源，爬虫结束")
+                    break
+
+                print(f"正在处理第{current_page}页，找到{len(houses)}个房源")
+
+                if total is not None:
+                    self._record_progress(self.state_manager.update_progress, current_page, [], total)
+
+                # 预取下一列表页，与本页详情页并发
+                next_list = asyncio.ensure_future(self.crawl_list_page_async(current_page + 1))
+
+                pending = []
+                seen = set()
+                for house in houses:
+                    house_id = house['house_id']
+                    self._submit_enrichment(house)
+                    if house_id in seen:
+                        print(f"房源{house_id}已爬取，跳过")
+                        continue
+                    if not self._should_fetch(house):
+                        continue
+                    seen.add(house_id)
+                    if CONFIG['LIST_ONLY']:
+                        # 仅列表模式不抓取详情页
+                        self._store_listing(current_page, house)
+                        continue
+                    pending.append(house)
+
+                tasks = [
+                    asyncio.ensure_future(self.crawl_detail_page_async(house['house_id'], house['link']))
+                    for house in pending
+                ]
+
+                # 按列表页顺序写入，保证输出顺序与串行模式一致
+                for house, task in zip(pending, tasks):
+                    house_id = house['house_id']
+                    try:
+                        detail = await task
+                        self._store_detail(current_page, house_id, detail, house)
+                    except Exception as e:
+                        print(f"处理房源{house_id}失败: {e}")
+                        continue
+
+                if current_page % CONFIG['SAVE_INTERVAL'] == 0:
+                    self.save_progress()
+                    print(f"已保存爬取进度到第{current_page}页")
+
+                current_page += 1
+        finally:
+            if not next_list.done():
+                next_list.cancel()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._close_parse_pool()
+
+    def run(self) -> None:
+        """运行异步爬虫"""
+        self._start_metrics()
+        try:
+            asyncio.run(self.crawl())
+
+        except KeyboardInterrupt:
+            print("\n检测到中断信号，正在保存进度...")
+            self._close_enricher(wait=False)
+            self._flush_pipeline()
+            self.state_manager.save_state()
+            print("进度已保存，爬虫已安全停止")
+
+        except Exception as e:
+            print(f"爬虫运行异常: {e}")
+            self._flush_pipeline()
+            self.state_manager.save_state()
+            raise
+
+        finally:
+            self.close()
+            self._print_transport_stats()
+            self._stop_metrics()
+            self.transport.close()
+            print("爬虫运行完成")
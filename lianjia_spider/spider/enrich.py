@@ -0,0 +1,138 @@
+"""
+详情页补抓模块，仅列表模式下在后台线程中抓取详情页补全电梯、完整区域等字段
+"""
+import os
+import queue
+import threading
+from typing import Callable, List, Optional
+from lianjia_spider.spider.parser import Parser
+from lianjia_spider.spider.pipeline import CSVPipeline, create_pipeline
+from lianjia_spider.utils.state import StateManager, create_state_manager
+from lianjia_spider.config.settings import CONFIG
+
+# 队列结束标记
+_STOP = None
+
+class DetailEnricher:
+    """
+    后台详情页补抓
+
+    列表页写入后把房源提交到队列，后台线程逐个抓取详情页，解析结果写入单独的数据管道，
+    已补抓的房源记录在单独的状态文件中，中断后再次运行时只补抓剩余的房源。
+    抓取函数与主爬虫共用，因此补抓请求同样经过限速器和重试。
+    """
+
+    def __init__(self, fetch: Callable[[str], str], parser: Parser,
+                 pipeline: CSVPipeline, state_manager: StateManager,
+                 delay: Optional[Callable[[], None]] = None):
+        """
+        初始化详情页补抓
+
+        Args:
+            fetch: 获取页面HTML的函数
+            parser: 详情页解析器
+            pipeline: 补抓结果的数据管道
+            state_manager: 记录已补抓房源的状态管理器
+            delay: 每个详情页之后调用的延迟函数，未启用限速器时传入
+        """
+        self.fetch = fetch
+        self.parser = parser
+        self.pipeline = pipeline
+        self.state_manager = state_manager
+        self.delay = delay
+        self.enriched = 0
+        self.failed = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._submitted = set()
+        # 已写入数据管道、等待管道写出后再记录进度的房源
+        self._unflushed: List[str] = []
+        self._thread = threading.Thread(target=self._worker, name='detail-enricher', daemon=True)
+        self._thread.start()
+
+    def submit(self, house_id: str, url: str) -> None:
+        """
+        提交需要补抓的房源，已补抓或已提交的房源忽略
+
+        Args:
+            house_id: 房源ID
+            url: 详情页URL
+        """
+        if house_id in self._submitted or self.state_manager.is_scraped(house_id):
+            return
+        self._submitted.add(house_id)
+        self._queue.put((house_id, url))
+
+    @property
+    def pending(self) -> int:
+        """等待补抓的房源数"""
+        return self._queue.qsize()
+
+    def _worker(self) -> None:
+        """后台线程：依次抓取、解析并写入详情页"""
+        while True:
+            task = self._queue.get()
+            if task is _STOP:
+                break
+            house_id, url = task
+            try:
+                detail = self.parser.parse_detail_page(self.fetch(url), house_id)
+                self.pipeline.process_item(detail)
+                self._unflushed.append(house_id)
+                if not self.pipeline.pending_rows:
+                    self._commit_progress()
+                self.enriched += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"补抓房源{house_id}详情页失败: {e}")
+            if self.delay is not None:
+                self.delay()
+
+    def _commit_progress(self) -> None:
+        """数据写出后记录已补抓的房源"""
+        if self._unflushed:
+            self.state_manager.update_progress(0, self._unflushed)
+            self.state_manager.checkpoint()
+            self._unflushed = []
+
+    def close(self, wait: bool = True) -> None:
+        """
+        停止后台线程并保存补抓进度
+
+        Args:
+            wait: 为True时等待队列中的房源全部补抓完成，否则丢弃未开始的房源
+        """
+        if not wait:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+        self._queue.put(_STOP)
+        self._thread.join()
+        self.pipeline.close()
+        self._commit_progress()
+        self.state_manager.save_state()
+        self.state_manager.close()
+        print(f"详情页补抓完成{self.enriched}个，失败{self.failed}个")
+
+def create_enricher(fetch: Callable[[str], str], parser: Parser, data_dir: str,
+                    delay: Optional[Callable[[], None]] = None) -> DetailEnricher:
+    """
+    在数据目录下创建详情页补抓，输出到CONFIG['ENRICH_DIR']子目录
+
+    Args:
+        fetch: 获取页面HTML的函数
+        parser: 详情页解析器
+        data_dir: 数据目录
+        delay: 每个详情页之后调用的延迟函数
+
+    Returns:
+        DetailEnricher: 详情页补抓
+    """
+    enrich_dir = os.path.join(data_dir, CONFIG['ENRICH_DIR'])
+    return DetailEnricher(
+        fetch, parser,
+        create_pipeline(enrich_dir),
+        create_state_manager(os.path.join(enrich_dir, CONFIG['PROGRESS_FILE'])),
+        delay
+    )
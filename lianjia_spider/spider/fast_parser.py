@@ -0,0 +1,201 @@
+"""
+基于lxml的快速页面解析模块，标签闭合规范时输出与BeautifulSoup解析器完全一致
+"""
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from lianjia_spider.spider.parser import Parser
+from lianjia_spider.utils.metrics import timed
+
+try:
+    from lxml import etree
+except ImportError:  # lxml为可选依赖，未安装时使用BeautifulSoup解析
+    etree = None
+
+# BeautifulSoup的.text不包含这些标签内的文本
+NON_TEXT_TAGS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+
+def _has_class(name: str) -> str:
+    """生成与BeautifulSoup class_匹配规则一致的XPath条件"""
+    if ' ' in name:
+        return f"normalize-space(@class)='{name}'"
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+if etree is not None:
+    TOTAL_COUNT = etree.XPath(f"//h2[{_has_class('total')}]")
+    HOUSE_ITEMS = etree.XPath(f"//div[{_has_class('info clear')}]")
+    TITLE_LINK = etree.XPath(f".//a[{_has_class('title')}]")
+    PRICE_INFO = etree.XPath(f".//div[{_has_class('priceInfo')}]")
+    TOTAL_PRICE_DIV = etree.XPath(f".//div[{_has_class('totalPrice')}]")
+    UNIT_PRICE_DIV = etree.XPath(f".//div[{_has_class('unitPrice')}]")
+    HOUSE_INFO = etree.XPath(f".//div[{_has_class('houseInfo')}]")
+    POSITION_INFO = etree.XPath(f".//div[{_has_class('positionInfo')}]")
+    SPAN = etree.XPath(".//span")
+    LINK = etree.XPath(".//a")
+
+    DETAIL_TITLE = etree.XPath(f"//h1[{_has_class('main')}]")
+    DETAIL_TOTAL = etree.XPath(f"//span[{_has_class('total')}]")
+    DETAIL_UNIT = etree.XPath(f"//span[{_has_class('unitPriceValue')}]")
+    BASE_ITEMS = etree.XPath(f"//li[{_has_class('base')}]")
+    LABEL = etree.XPath(f".//span[{_has_class('label')}]")
+    COMMUNITY = etree.XPath(f"//div[{_has_class('communityName')}]")
+    AREA_NAME = etree.XPath(f"//div[{_has_class('areaName')}]")
+
+def _parse(html: str):
+    """解析HTML，空文档返回空的根元素，与BeautifulSoup对空文档的处理一致"""
+    root = etree.HTML(html) if html else None
+    return root if root is not None else etree.Element('html')
+
+def _first(xpath: 'etree.XPath', node) -> Optional['etree._Element']:
+    """返回XPath匹配的第一个元素，等价于BeautifulSoup的find"""
+    result = xpath(node)
+    return result[0] if result else None
+
+def _text(element) -> str:
+    """提取元素文本，等价于BeautifulSoup的.text"""
+    if element.tag in NON_TEXT_TAGS:
+        return ''.join(element.itertext())
+    if not len(element):
+        return element.text or ''
+    parts = [element.text or '']
+    for child in element:
+        if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+            parts.append(_text(child))
+        parts.append(child.tail or '')
+    return ''.join(parts)
+
+def require_element(element):
+    """模拟BeautifulSoup在元素不存在时继续访问属性抛出的异常，lxml解析器和流式解析器共用"""
+    if element is None:
+        raise AttributeError("'NoneType' object has no attribute 'find'")
+    return element
+
+
+class LxmlParser(Parser):
+    """
+    lxml快速解析器
+
+    使用预编译的XPath代替BeautifulSoup的find/find_all，字段提取和异常处理逻辑
+    与Parser逐行对应，输出的字典内容和键顺序与Parser一致。标签未闭合时两者构建的树不同，
+    例如未闭合的li.base，BeautifulSoup把后续li嵌套在其中，lxml则自动闭合，字段值可能不同，
+    因此只在显式指定lxml后端时使用。
+    """
+
+    @staticmethod
+    @timed('parse_list_seconds')
+    def parse_list_page(html: str) -> Tuple[List[Dict], Optional[int]]:
+        """
+        解析列表页面
+
+        Args:
+            html: 页面HTML内容
+
+        Returns:
+            tuple: (房源列表, 总数量)
+        """
+        root = _parse(html)
+        houses = []
+
+        # 解析总数量
+        total_count = None
+        try:
+            count_div = _first(TOTAL_COUNT, root)
+            if count_div is not None:
+                count_text = _first(SPAN, count_div)
+                if count_text is not None:
+                    total_count = int(_text(count_text).strip())
+        except Exception:
+            pass
+
+        # 解析房源列表
+        for item in HOUSE_ITEMS(root):
+            try:
+                title_elem = _first(TITLE_LINK, item)
+                if title_elem is None:
+                    continue
+
+                link = title_elem.get('href', '')
+                house_id = re.search(r'/(\d+).html', link)
+                if not house_id:
+                    continue
+
+                total_price = ''
+                unit_price = ''
+                price_elem = _first(PRICE_INFO, item)
+                if price_elem is not None:
+                    total_div = require_element(_first(TOTAL_PRICE_DIV, price_elem))
+                    total_price = _text(require_element(_first(SPAN, total_div))).strip()
+                    unit_div = require_element(_first(UNIT_PRICE_DIV, price_elem))
+                    unit_price = _text(require_element(_first(SPAN, unit_div))).strip()
+
+                house_info = _text(require_element(_first(HOUSE_INFO, item))).strip()
+                position_info = _text(require_element(_first(POSITION_INFO, item))).strip()
+
+                houses.append({
+                    'house_id': house_id.group(1),
+                    'title': _text(title_elem).strip(),
+                    'link': link,
+                    'total_price': total_price,
+                    'unit_price': unit_price,
+                    'house_info': house_info,
+                    'position_info': position_info
+                })
+            except Exception as e:
+                print(f"解析房源信息失败: {e}")
+                continue
+
+        return houses, total_count
+
+    @staticmethod
+    @timed('parse_detail_seconds')
+    def parse_detail_page(html: str, house_id: str) -> Dict:
+        """
+        解析详情页面
+
+        Args:
+            html: 页面HTML内容
+            house_id: 房源ID
+
+        Returns:
+            Dict: 房源详细信息
+        """
+        root = _parse(html)
+        result = {
+            'house_id': house_id,
+            'crawl_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+        try:
+            title = _first(DETAIL_TITLE, root)
+            result['title'] = _text(title).strip() if title is not None else ''
+
+            total_price = _first(DETAIL_TOTAL, root)
+            unit_price = _first(DETAIL_UNIT, root)
+            result['total_price'] = _text(total_price).strip() if total_price is not None else ''
+            result['unit_price'] = _text(unit_price).strip() if unit_price is not None else ''
+
+            for item in BASE_ITEMS(root):
+                label = _first(LABEL, item)
+                if label is None:
+                    continue
+
+                label_raw = _text(label)
+                label_text = label_raw.strip().rstrip('：')
+                value = _text(item).replace(label_raw, '').strip()
+
+                field_name = Parser.FIELD_MAPPING.get(label_text)
+                if field_name:
+                    result[field_name] = value
+
+            community = _first(COMMUNITY, root)
+            if community is not None:
+                result['community'] = _text(require_element(_first(LINK, community))).strip()
+
+            area_div = _first(AREA_NAME, root)
+            if area_div is not None:
+                result['district'] = ' '.join([_text(a).strip() for a in LINK(area_div)])
+
+        except Exception as e:
+            print(f"解析详情页失败: {e}")
+
+        return result
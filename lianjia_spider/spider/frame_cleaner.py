@@ -0,0 +1,127 @@
+"""
+按列清洗模块，将一批解析结果转换为列，用pyarrow计算函数对整列做字符串提取，
+再转换为DataFrame做类型转换和拆分
+"""
+import sys
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List
+import pandas as pd
+from lianjia_spider.spider.schema import SCHEMA, Column
+from lianjia_spider.config.settings import CSV_HEADERS
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow为可选依赖，未安装时数据管道逐条清洗
+    pa = None
+    pc = None
+
+FLOOR_PATTERN = r'^(?P<楼层位置>[^(（]*?)\s*[(（]共(?P<总楼层>\d+)层[)）]'
+ROOMS_PATTERN = r'(\d+)[室房]'
+HALLS_PATTERN = r'(\d+)厅'
+AREA_PATTERN = r'(\d+(?:\.\d+)?)'
+
+@lru_cache(maxsize=None)
+def _non_number_pattern() -> str:
+    """
+    匹配extract_number会丢弃的字符的RE2正则
+
+    str.isdigit()除十进制数字外还包括上标、带圈数字等，RE2的\\p{Nd}也不包括较新版本Unicode中的数字，
+    因此逐个列出以保持与逐条清洗的结果一致，连续的码位合并为区间。
+    """
+    ranges: List[List[int]] = []
+    for code in range(sys.maxunicode + 1):
+        if chr(code).isdigit():
+            if ranges and ranges[-1][1] == code - 1:
+                ranges[-1][1] = code
+            else:
+                ranges.append([code, code])
+    members = ''.join(chr(start) if start == end else f'{chr(start)}-{chr(end)}' for start, end in ranges)
+    return f'[^.{members}]+'
+
+def _column(items: List[Dict], column: Column) -> 'pa.Array':
+    """
+    清洗一列
+
+    缺失的字段为空字符串，值为None时与str(None)一致为'None'，数字字段的空值保持为空字符串。
+    值不是字符串时抛出pyarrow异常，由调用方改为逐条清洗。
+    """
+    source = column.source
+    values = pa.array([item.get(source, '') for item in items], type=pa.string())
+    if column.kind == 'number':
+        return pc.replace_substring_regex(pc.fill_null(values, ''), _non_number_pattern(), '')
+    values = pc.fill_null(values, 'None')
+    if column.kind == 'id':
+        return values
+    # utf8_trim_whitespace去除的字符与str.strip()相同
+    return pc.utf8_trim_whitespace(values)
+
+def clean_table(items: Iterable[Dict]) -> 'pa.Table':
+    """
+    按列清洗一批解析结果
+
+    清洗规则与SCHEMA.clean_row相同，缺失的字段为空字符串，抓取时间为空时使用当前时间。
+
+    Args:
+        items: 解析器输出的房源数据字典，字段值为字符串或None
+
+    Returns:
+        pa.Table: 列为CSV_HEADERS的字符串表
+    """
+    if pa is None:
+        raise ImportError("按列清洗需要安装pyarrow: pip install pyarrow")
+    items = list(items)
+    columns = {column.name: _column(items, column) for column in SCHEMA.columns}
+    crawl_time = columns['抓取时间']
+    columns['抓取时间'] = pc.if_else(pc.equal(crawl_time, ''),
+                                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'), crawl_time)
+    return pa.table(columns)
+
+def clean_frame(items: Iterable[Dict]) -> pd.DataFrame:
+    """
+    按列清洗一批解析结果并转换为DataFrame
+
+    Args:
+        items: 解析器输出的房源数据字典，字段值为字符串或None
+
+    Returns:
+        pd.DataFrame: 列为CSV_HEADERS、类型为pyarrow字符串的表
+    """
+    return clean_table(items).to_pandas(types_mapper={pa.string(): pd.StringDtype('pyarrow')}.get)
+
+def normalize_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    将清洗后的字符串表转换为便于分析的类型
+
+    总价、单价和面积转换为浮点数，建筑年代转换为整数，抓取时间转换为时间；
+    楼层拆分为楼层位置和总楼层，户型拆分为室和厅。无法解析的值为空。
+
+    Args:
+        frame: clean_frame的结果，或读取输出CSV得到的字符串表
+
+    Returns:
+        pd.DataFrame: 新的表，拆分出的列紧跟在原列之后
+    """
+    frame = frame.astype({name: 'string' for name in CSV_HEADERS if name in frame.columns})
+    result = frame.copy()
+    for name in ('总价', '单价'):
+        result[name] = pd.to_numeric(frame[name], errors='coerce').astype('float64')
+    area = frame['面积'].str.extract(AREA_PATTERN, expand=False)
+    result['面积'] = pd.to_numeric(area, errors='coerce').astype('float64')
+    result['建筑年代'] = pd.to_numeric(frame['建筑年代'], errors='coerce').astype('Int64')
+    result['抓取时间'] = pd.to_datetime(frame['抓取时间'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+
+    floor = frame['楼层'].str.extract(FLOOR_PATTERN)
+    rooms = frame['户型'].str.extract(ROOMS_PATTERN, expand=False)
+    halls = frame['户型'].str.extract(HALLS_PATTERN, expand=False)
+    derived = [
+        ('楼层', '楼层位置', floor['楼层位置'].str.strip()),
+        ('楼层', '总楼层', pd.to_numeric(floor['总楼层'], errors='coerce').astype('Int64')),
+        ('户型', '室', pd.to_numeric(rooms, errors='coerce').astype('Int64')),
+        ('户型', '厅', pd.to_numeric(halls, errors='coerce').astype('Int64'))
+    ]
+    # 按倒序插入，同一原列后的多个新列保持列表中的顺序
+    for source, name, values in reversed(derived):
+        result.insert(result.columns.get_loc(source) + 1, name, values)
+    return result
@@ -0,0 +1,171 @@
+"""
+Parquet数据处理管道，按列式格式增量写入房源数据
+"""
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.config.settings import CONFIG, CSV_HEADERS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow为可选依赖，只在使用Parquet输出时需要
+    pa = None
+    pq = None
+
+NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+INTEGER_PATTERN = re.compile(r'\d+')
+
+def _to_float(value: str) -> Optional[float]:
+    """提取文本中的第一个数字并转换为浮点数，无法提取时返回None"""
+    match = NUMBER_PATTERN.search(value or '')
+    return float(match.group()) if match else None
+
+def _to_int(value: str) -> Optional[int]:
+    """提取文本中的第一个整数，无法提取时返回None"""
+    match = INTEGER_PATTERN.search(value or '')
+    return int(match.group()) if match else None
+
+def _to_str(value: str) -> Optional[str]:
+    """空字符串转换为None"""
+    return value if value else None
+
+def _to_timestamp(value: str) -> Optional[datetime]:
+    """解析抓取时间"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    except (TypeError, ValueError):
+        return None
+
+# 列类型与转换函数，列顺序与CSV_HEADERS一致
+COLUMN_TYPES = {
+    '房源ID': ('string', _to_str),
+    '标题': ('string', _to_str),
+    '总价': ('float64', _to_float),
+    '单价': ('float64', _to_float),
+    '小区名': ('string', _to_str),
+    '区域': ('dictionary', _to_str),
+    '户型': ('string', _to_str),
+    '面积': ('float64', _to_float),
+    '朝向': ('dictionary', _to_str),
+    '装修': ('dictionary', _to_str),
+    '电梯': ('string', _to_str),
+    '楼层': ('string', _to_str),
+    '建筑年代': ('int32', _to_int),
+    '抓取时间': ('timestamp', _to_timestamp)
+}
+
+def parquet_schema() -> 'pa.Schema':
+    """构建Parquet文件的列类型定义"""
+    types = {
+        'string': pa.string(),
+        'dictionary': pa.dictionary(pa.int32(), pa.string()),
+        'float64': pa.float64(),
+        'int32': pa.int32(),
+        'timestamp': pa.timestamp('s')
+    }
+    return pa.schema([(name, types[COLUMN_TYPES[name][0]]) for name in CSV_HEADERS])
+
+
+class ParquetPipeline(CSVPipeline):
+    """
+    Parquet数据处理管道
+
+    清洗规则与CSVPipeline相同，清洗后的数据按列缓冲，每满row_group_size行写出一个行组，
+    内存占用与总行数无关。Parquet文件不能追加，文件尾写入之前不可读，因此每次flush
+    （爬虫按SAVE_INTERVAL保存进度时）关闭当前分片文件，之后的数据写入新的分片文件，
+    可用pandas.read_parquet(目录)一次读取全部分片。未关闭的分片中的行计入pending_rows，
+    爬虫在分片关闭后才提交这些房源的进度，进程被强制终止时它们会重新抓取。
+    """
+
+    def __init__(self, output_dir: str, row_group_size: Optional[int] = None):
+        """
+        初始化Parquet处理管道
+
+        Args:
+            output_dir: 输出目录
+            row_group_size: 每个行组的行数，默认使用CONFIG['PARQUET_ROW_GROUP_SIZE']
+        """
+        if pa is None:
+            raise ImportError("Parquet输出需要安装pyarrow: pip install pyarrow")
+        self.output_dir = output_dir
+        self.row_group_size = row_group_size or CONFIG['PARQUET_ROW_GROUP_SIZE']
+        self.schema = parquet_schema()
+        super().__init__(self._part_path())
+        self._columns: Dict[str, List] = {name: [] for name in CSV_HEADERS}
+        self._converters = [COLUMN_TYPES[name][1] for name in CSV_HEADERS]
+        self._buffered_rows = 0
+        self._writer = None
+        # 已写入当前未关闭分片的行数
+        self._open_rows = 0
+        self.row_groups = 0
+        self.parts = 0
+
+    def _part_path(self) -> str:
+        """生成新分片文件的路径"""
+        part_name = f"part-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{os.getpid()}.parquet"
+        return os.path.join(self.output_dir, part_name)
+
+    def _init_csv_file(self) -> None:
+        """创建输出目录，文件在写入第一个行组时创建"""
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def _write_to_csv(self, row: tuple) -> None:
+        """
+        将清洗后的数据写入列缓冲区
+
+        Args:
+            row: 处理后的一行数据
+        """
+        self._write_rows([row])
+
+    def _write_rows(self, rows: List[tuple]) -> None:
+        """
+        将多行数据按列转换后写入缓冲区，满一个行组时写出
+
+        Args:
+            rows: 处理后的数据行列表，列顺序与CSV_HEADERS一致
+        """
+        columns = [self._columns[name] for name in CSV_HEADERS]
+        for row in rows:
+            for column, convert, value in zip(columns, self._converters, row):
+                column.append(convert(value))
+            self._buffered_rows += 1
+            if self._buffered_rows >= self.row_group_size:
+                self._write_row_group()
+                columns = [self._columns[name] for name in CSV_HEADERS]
+
+    def _write_row_group(self) -> None:
+        """将缓冲的行写出为当前分片中的一个行组，需要时打开新的分片文件"""
+        if not self._buffered_rows:
+            return
+        table = pa.Table.from_pydict(self._columns, schema=self.schema)
+        if self._writer is None:
+            if self.parts:
+                self.file_path = self._part_path()
+            self._writer = pq.ParquetWriter(self.file_path, self.schema, compression='zstd')
+            self.parts += 1
+        self._writer.write_table(table, row_group_size=self._buffered_rows)
+        self.row_groups += 1
+        self._open_rows += self._buffered_rows
+        self._columns = {name: [] for name in CSV_HEADERS}
+        self._buffered_rows = 0
+
+    @property
+    def pending_rows(self) -> int:
+        """缓冲区和未关闭分片中的行数，这些行在进程被终止时不可读"""
+        return self._buffered_rows + self._open_rows
+
+    def flush(self) -> None:
+        """写出缓冲的行并关闭当前分片，使其可读；之后的数据写入新的分片"""
+        self._write_row_group()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._open_rows = 0
+
+    def close(self) -> None:
+        """写出剩余数据并关闭文件"""
+        self.flush()
@@ -0,0 +1,123 @@
+"""
+多进程解析模块，将详情页解析从抓取线程中分离到进程池
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Callable, Deque, Dict, Optional, Tuple
+from lianjia_spider.spider.parser import create_parser
+from lianjia_spider.config.settings import CONFIG
+
+_worker_parser = None
+
+def _init_worker(backend: str) -> None:
+    """进程池工作进程初始化，每个进程只创建一次解析器"""
+    global _worker_parser
+    _worker_parser = create_parser(backend)
+
+def _parse_detail(html: str, house_id: str) -> Dict:
+    """在工作进程中解析详情页"""
+    return _worker_parser.parse_detail_page(html, house_id)
+
+
+class ParsePool:
+    """
+    详情页解析进程池
+
+    抓取得到的HTML提交到进程池解析，解析结果按提交顺序交给回调写入数据管道，
+    因此输出顺序与串行解析一致。未写出的结果数达到max_pending时submit阻塞，
+    抓取端随之放慢，避免解析或写入落后时内存无限增长；异步引擎的parse_async同样
+    最多有max_pending个未完成的解析任务。
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 backend: Optional[str] = None):
+        """
+        初始化解析进程池
+
+        Args:
+            workers: 解析进程数，默认使用CONFIG['PARSE_WORKERS']
+            max_pending: 最多等待写出的结果数，默认使用CONFIG['PARSE_MAX_PENDING']
+            backend: 解析后端，默认使用CONFIG['PARSER_BACKEND']
+        """
+        self.workers = workers or CONFIG['PARSE_WORKERS']
+        self.max_pending = max_pending or CONFIG['PARSE_MAX_PENDING']
+        self.backend = backend or CONFIG['PARSER_BACKEND']
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.backend,)
+        )
+        self._pending: Deque[Tuple[str, Future, Callable[[Dict], None], Optional[Callable[[], None]]]] = deque()
+        # parse_async的并发上限，在事件循环中首次使用时创建
+        self._async_slots: Optional[asyncio.Semaphore] = None
+
+    def submit(self, html: str, house_id: str, callback: Callable[[Dict], None],
+               on_error: Optional[Callable[[], None]] = None) -> None:
+        """
+        提交详情页解析任务
+
+        Args:
+            html: 详情页HTML
+            house_id: 房源ID
+            callback: 解析完成后按提交顺序调用，参数为解析结果
+            on_error: 解析失败时代替callback调用（可选）
+        """
+        # 背压：等待最早的结果写出后再接收新任务
+        while len(self._pending) >= self.max_pending:
+            self._complete_head()
+        future = self.executor.submit(_parse_detail, html, house_id)
+        self._pending.append((house_id, future, callback, on_error))
+        self.drain()
+
+    async def parse_async(self, html: str, house_id: str) -> Dict:
+        """
+        在进程池中解析详情页，供异步引擎使用，未完成的任务达到max_pending时等待
+
+        Args:
+            html: 详情页HTML
+            house_id: 房源ID
+
+        Returns:
+            Dict: 房源详细信息
+        """
+        if self._async_slots is None:
+            self._async_slots = asyncio.Semaphore(self.max_pending)
+        async with self._async_slots:
+            return await asyncio.wrap_future(self.executor.submit(_parse_detail, html, house_id))
+
+    def drain(self) -> None:
+        """按顺序写出队首已完成的结果，不阻塞"""
+        while self._pending and self._pending[0][1].done():
+            self._complete_head()
+
+    def join(self) -> None:
+        """等待所有已提交的任务完成并写出"""
+        while self._pending:
+            self._complete_head()
+
+    def _complete_head(self) -> None:
+        """等待队首任务完成并调用回调"""
+        house_id, future, callback, on_error = self._pending.popleft()
+        try:
+            try:
+                item = future.result()
+            except Exception:
+                if on_error is not None:
+                    on_error()
+                raise
+            callback(item)
+        except Exception as e:
+            print(f"处理房源{house_id}失败: {e}")
+
+    @property
+    def pending(self) -> int:
+        """等待写出的结果数"""
+        return len(self._pending)
+
+    def close(self) -> None:
+        """写出剩余结果并关闭进程池"""
+        try:
+            self.join()
+        finally:
+            self.executor.shutdown(wait=True, cancel_futures=True)
@@ -5,11 +5,24 @@ from typing import Dict, List, Optional, Tuple
 from bs4 import BeautifulSoup
 import re
 from datetime import datetime
+from lianjia_spider.utils.metrics import timed
+from lianjia_spider.spider.schema import SCHEMA
+from lianjia_spider.config.settings import CONFIG
 
 class Parser:
     """链家页面解析器"""
     
+    # 详情页标签到字段名的映射，由输出字段定义编译
+    FIELD_MAPPING = SCHEMA.labels
+    
+    # 列表页区域筛选栏的data-role属性
+    REGION_BAR = re.compile(r'^(ershoufang|chengjiao|zufang)$')
+    
+    # 列表页房源信息中的装修情况
+    DECORATIONS = ('精装', '简装', '毛坯', '其他')
+    
     @staticmethod
+    @timed('parse_list_seconds')
     def parse_list_page(html: str) -> Tuple[List[Dict], Optional[int]]:
         """
         解析列表页面
@@ -76,6 +89,97 @@ class Parser:
         return houses, total_count
     
     @staticmethod
+    def parse_regions(html: str) -> Tuple[List[str], List[str]]:
+        """
+        解析列表页的区域筛选栏
+        
+        第一行为城区，选中某个城区后第二行为该城区下的商圈。
+        
+        Args:
+            html: 页面HTML内容
+            
+        Returns:
+            tuple: (城区路径段列表, 商圈路径段列表)，如(['jinjiang', 'gaoxin'], ['chunxilu'])
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        region_bar = soup.find('div', attrs={'data-role': Parser.REGION_BAR})
+        if region_bar is None:
+            return [], []
+        rows = []
+        for row in region_bar.find_all('div', recursive=False)[:2]:
+            segments = []
+            for link in row.find_all('a', href=True):
+                match = re.search(r'/([a-z0-9]+)/?$', link['href'])
+                if match and match.group(1) not in segments:
+                    segments.append(match.group(1))
+            rows.append(segments)
+        rows += [[]] * (2 - len(rows))
+        return rows[0], rows[1]
+    
+    @staticmethod
+    def parse_house_info(house_info: str) -> Dict:
+        """
+        解析列表页的房源信息字符串
+        
+        如"2室1厅 | 89.12平米 | 南 | 精装 | 中楼层(共18层) | 2010年建 | 板楼"，
+        各部分按内容识别，缺少某一项时不影响其他字段。
+        
+        Args:
+            house_info: 房源信息字符串
+            
+        Returns:
+            Dict: 户型、面积、朝向、装修、楼层、建成年代中识别到的字段
+        """
+        result = {}
+        for part in (p.strip() for p in house_info.split('|')):
+            if not part:
+                continue
+            if '室' in part or '厅' in part:
+                result.setdefault('house_type', part)
+            elif part.endswith('平米'):
+                result.setdefault('area', part)
+            elif '楼层' in part or re.search(r'共\d+层', part):
+                result.setdefault('floor', part)
+            elif re.match(r'\d{4}年', part):
+                result.setdefault('build_year', part)
+            elif part in Parser.DECORATIONS:
+                result.setdefault('decoration', part)
+            elif all(c in '东南西北 ' for c in part):
+                result.setdefault('orientation', part)
+        return result
+    
+    @staticmethod
+    def parse_list_item(house: Dict) -> Dict:
+        """
+        将列表页房源转换为与详情页解析结果相同的字段，供仅列表模式直接写入
+        
+        列表页没有电梯信息，区域只有商圈名称。
+        
+        Args:
+            house: parse_list_page返回的房源
+            
+        Returns:
+            Dict: 房源信息
+        """
+        result = {
+            'house_id': house['house_id'],
+            'crawl_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'title': house.get('title', ''),
+            'total_price': house.get('total_price', ''),
+            'unit_price': house.get('unit_price', '')
+        }
+        result.update(Parser.parse_house_info(house.get('house_info') or ''))
+        
+        # 位置信息格式为"小区 - 商圈"
+        position = [p.strip() for p in (house.get('position_info') or '').split(' - ')]
+        if position[0]:
+            result['community'] = position[0]
+        if len(position) > 1:
+            result['district'] = position[-1]
+        return result
+    
+    @staticmethod
+    @timed('parse_detail_seconds')
     def parse_detail_page(html: str, house_id: str) -> Dict:
         """
         解析详情页面
@@ -115,22 +219,7 @@ class Parser:
                 value = item.text.replace(label.text, '').strip()
                 
                 # 映射字段名
-                field_mapping = {
-                    '房屋户型': 'house_type',
-                    '所在楼层': 'floor',
-                    '建筑面积': 'area',
-                    '户型结构': 'structure',
-                    '建筑类型': 'building_type',
-                    '房屋朝向': 'orientation',
-                    '建筑结构': 'construction',
-                    '装修情况': 'decoration',
-                    '梯户比例': 'elevator_ratio',
-                    '配备电梯': 'has_elevator',
-                    '产权年限': 'property_term',
-                    '建成年代': 'build_year'
-                }
-                
-                field_name = field_mapping.get(label_text)
+                field_name = Parser.FIELD_MAPPING.get(label_text)
                 if field_name:
                     result[field_name] = value
             
@@ -148,3 +237,26 @@ class Parser:
             print(f"解析详情页失败: {e}")
             
         return result
+
+
+def create_parser(backend: Optional[str] = None) -> Parser:
+    """
+    根据配置创建页面解析器
+    
+    Args:
+        backend: 解析后端，auto、lxml或bs4，默认使用CONFIG['PARSER_BACKEND']；
+            auto使用bs4，lxml对未闭合标签的处理与BeautifulSoup不同，需显式指定
+        
+    Returns:
+        Parser: 解析器实例
+    """
+    backend = backend or CONFIG['PARSER_BACKEND']
+    if backend in ('auto', 'bs4'):
+        return Parser()
+    
+    from lianjia_spider.spider.fast_parser import LxmlParser, etree
+    if backend == 'lxml':
+        if etree is None:
+            raise ImportError("lxml解析后端需要安装lxml: pip install lxml")
+        return LxmlParser()
+    raise ValueError(f"未知的解析后端: {backend}")
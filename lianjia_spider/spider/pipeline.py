@@ -1,11 +1,17 @@
 """
 数据处理管道，负责数据清洗和存储
 """
+import io
 import os
 import csv
-from typing import Dict, List
-from datetime import datetime
-from lianjia_spider.config.settings import CSV_HEADERS
+from typing import Dict, Iterator, List, Optional
+from lianjia_spider.utils.metrics import timed
+from lianjia_spider.spider.schema import SCHEMA
+from lianjia_spider.config.settings import CONFIG, CSV_HEADERS
+
+def table_rows(table) -> Iterator[tuple]:
+    """按CSV_HEADERS的顺序逐行返回按列清洗结果中的值"""
+    return zip(*(table.column(name).to_pylist() for name in CSV_HEADERS))
 
 class CSVPipeline:
     """CSV数据处理管道"""
@@ -31,6 +37,7 @@ class CSVPipeline:
                 writer = csv.writer(f)
                 writer.writerow(CSV_HEADERS)
     
+    @timed('pipeline_item_seconds')
     def process_item(self, item: Dict) -> None:
         """
         处理单个房源数据并写入CSV
@@ -40,10 +47,10 @@ class CSVPipeline:
         """
         try:
             # 数据清洗和转换
-            processed_item = self._clean_item(item)
+            row = self._clean_row(item)
             
             # 写入CSV文件
-            self._write_to_csv(processed_item)
+            self._write_to_csv(row)
         except Exception as e:
             print(f"处理数据项失败: {e}")
     
@@ -51,11 +58,45 @@ class CSVPipeline:
         """
         批量处理房源数据
         
+        数量达到CONFIG['CLEAN_BATCH_ROWS']时用pyarrow按列清洗，结果与逐条清洗相同；
+        按列清洗失败时退回逐条清洗，跳过有问题的数据项。
+        
         Args:
             items: 房源数据列表
         """
+        items = list(items)
+        if 0 < CONFIG['CLEAN_BATCH_ROWS'] <= len(items):
+            table = self._clean_table(items)
+            if table is not None:
+                try:
+                    self._write_table(table)
+                except Exception as e:
+                    print(f"批量写入数据失败: {e}")
+                return
+        
+        rows = []
         for item in items:
-            self.process_item(item)
+            try:
+                rows.append(self._clean_row(item))
+            except Exception as e:
+                print(f"处理数据项失败: {e}")
+        
+        try:
+            self._write_rows(rows)
+        except Exception as e:
+            print(f"批量写入数据失败: {e}")
+    
+    @property
+    def pending_rows(self) -> int:
+        """已接收但尚未写入磁盘的行数，逐条写入模式下始终为0"""
+        return 0
+    
+    def flush(self) -> None:
+        """将缓冲的数据写入文件，逐条写入模式下无需处理"""
+    
+    def close(self) -> None:
+        """关闭数据管道"""
+        self.flush()
     
     def _clean_item(self, item: Dict) -> Dict:
         """
@@ -67,76 +108,193 @@ class CSVPipeline:
         Returns:
             Dict: 清洗后的数据字典
         """
-        cleaned = {}
-        
-        # 提取数值
-        def extract_number(text: str) -> str:
-            if not text:
-                return ''
-            numbers = ''.join(filter(lambda x: x.isdigit() or x == '.', text))
-            return numbers if numbers else ''
-        
-        # 字段映射关系（英文字段名到中文字段名）
-        field_mapping = {
-            'house_id': '房源ID',
-            'title': '标题',
-            'total_price': '总价',
-            'unit_price': '单价',
-            'community': '小区名',
-            'district': '区域',
-            'house_type': '户型',
-            'area': '面积',
-            'orientation': '朝向',
-            'decoration': '装修',
-            'has_elevator': '电梯',
-            'floor': '楼层',
-            'build_year': '建筑年代',
-            'crawl_time': '抓取时间'
-        }
-        
-        # 清洗规则
-        clean_rules = {
-            '房源ID': lambda x: str(x),
-            '标题': lambda x: str(x).strip(),
-            '总价': lambda x: extract_number(x),
-            '单价': lambda x: extract_number(x),
-            '小区名': lambda x: str(x).strip(),
-            '区域': lambda x: str(x).strip(),
-            '户型': lambda x: str(x).strip(),
-            '面积': lambda x: str(x).strip(),
-            '朝向': lambda x: str(x).strip(),
-            '装修': lambda x: str(x).strip(),
-            '电梯': lambda x: str(x).strip(),
-            '楼层': lambda x: str(x).strip(),
-            '建筑年代': lambda x: extract_number(x),
-            '抓取时间': lambda x: str(x).strip()
-        }
-        
-        # 应用清洗规则
-        for en_field, value in item.items():
-            if en_field in field_mapping:
-                cn_field = field_mapping[en_field]
-                if cn_field in clean_rules:
-                    cleaned[cn_field] = clean_rules[cn_field](value)
-        
-        # 添加爬取时间
-        if 'crawl_time' not in cleaned:
-            cleaned['抓取时间'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        return cleaned
-    
-    def _write_to_csv(self, item: Dict) -> None:
+        return SCHEMA.clean_dict(item)
+    
+    def _clean_row(self, item: Dict) -> tuple:
+        """
+        清洗和标准化数据项，结果按CSV_HEADERS的顺序排列
+        
+        Args:
+            item: 原始数据字典
+            
+        Returns:
+            tuple: 清洗后的一行数据
+        """
+        return SCHEMA.clean_row(item)
+    
+    def _clean_table(self, items: List[Dict]):
+        """
+        按列清洗一批数据项
+        
+        Args:
+            items: 原始数据字典列表
+            
+        Returns:
+            Optional[pa.Table]: 列为CSV_HEADERS的字符串表，未安装pyarrow或清洗失败时返回None
+        """
+        # pandas和pyarrow导入较慢，只在批量清洗时加载
+        from lianjia_spider.spider import frame_cleaner
+        if frame_cleaner.pa is None:
+            return None
+        try:
+            return frame_cleaner.clean_table(items)
+        except Exception as e:
+            print(f"按列清洗失败，改为逐条清洗: {e}")
+            return None
+    
+    def _write_to_csv(self, row: tuple) -> None:
         """
         将数据写入CSV文件
         
         Args:
-            item: 处理后的数据字典
+            row: 处理后的一行数据
         """
         try:
             with open(self.file_path, 'a', encoding='utf-8', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-                writer.writerow(item)
+                writer = csv.writer(f)
+                writer.writerow(row)
         except Exception as e:
             print(f"写入CSV失败: {e}")
             # 可以考虑实现备份机制
             raise
+    
+    def _write_rows(self, rows: List[tuple]) -> None:
+        """
+        一次打开文件写入多行数据
+        
+        Args:
+            rows: 处理后的数据行列表
+        """
+        if not rows:
+            return
+        with open(self.file_path, 'a', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerows(rows)
+    
+    def _write_table(self, table) -> None:
+        """
+        将按列清洗的结果写入文件，逐列取值后按行写出
+        
+        Args:
+            table: 列为CSV_HEADERS的字符串表
+        """
+        self._write_rows(list(table_rows(table)))
+
+
+class BufferedCSVPipeline(CSVPipeline):
+    """
+    带缓冲的CSV数据处理管道
+    
+    保持一个打开的文件句柄，数据行先序列化到内存缓冲区，达到行数或字节阈值时批量写入。
+    进程被强制终止时，最多丢失一个缓冲区的数据；爬虫在pending_rows为0之后才提交这些房源的进度，
+    丢失的房源下次运行时会重新抓取。
+    """
+    
+    FSYNC_POLICIES = ('never', 'flush', 'close')
+    
+    def __init__(self, file_path: str, buffer_rows: Optional[int] = None,
+                 buffer_bytes: Optional[int] = None, fsync: Optional[str] = None):
+        """
+        初始化带缓冲的CSV处理管道
+        
+        Args:
+            file_path: CSV文件路径
+            buffer_rows: 缓冲的最大行数，默认使用CONFIG['PIPELINE_BUFFER_ROWS']
+            buffer_bytes: 缓冲的最大字符数，默认使用CONFIG['PIPELINE_BUFFER_BYTES']
+            fsync: fsync策略，never(从不)、flush(每次写入后)或close(关闭时)，默认使用CONFIG['PIPELINE_FSYNC']
+        """
+        super().__init__(file_path)
+        self.buffer_rows = buffer_rows or CONFIG['PIPELINE_BUFFER_ROWS']
+        self.buffer_bytes = buffer_bytes or CONFIG['PIPELINE_BUFFER_BYTES']
+        self.fsync = fsync or CONFIG['PIPELINE_FSYNC']
+        if self.fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"未知的fsync策略: {self.fsync}")
+        
+        self._file = open(self.file_path, 'a', encoding='utf-8', newline='')
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._buffered_rows = 0
+    
+    def _write_to_csv(self, row: tuple) -> None:
+        """
+        将数据行写入缓冲区，超过阈值时写入文件
+        
+        Args:
+            row: 处理后的一行数据
+        """
+        self._write_rows([row])
+    
+    def _write_rows(self, rows: List[tuple]) -> None:
+        """
+        将多行数据写入缓冲区，超过阈值时写入文件
+        
+        Args:
+            rows: 处理后的数据行列表
+        """
+        self._writer.writerows(rows)
+        self._buffered_rows += len(rows)
+        if self._buffered_rows >= self.buffer_rows or self._buffer.tell() >= self.buffer_bytes:
+            self.flush()
+    
+    @property
+    def pending_rows(self) -> int:
+        """缓冲区中尚未写入文件的行数"""
+        return self._buffered_rows
+    
+    def flush(self) -> None:
+        """将缓冲区内容写入文件"""
+        if self._file is None or not self._buffered_rows:
+            return
+        try:
+            self._file.write(self._buffer.getvalue())
+            self._file.flush()
+            if self.fsync == 'flush':
+                os.fsync(self._file.fileno())
+        except Exception as e:
+            print(f"写入CSV失败: {e}")
+            raise
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._buffered_rows = 0
+    
+    def close(self) -> None:
+        """写入剩余数据并关闭文件"""
+        if self._file is None:
+            return
+        self.flush()
+        if self.fsync != 'never':
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+
+def create_pipeline(data_dir: str, output_format: Optional[str] = None, overwrite: bool = False) -> CSVPipeline:
+    """
+    根据配置创建数据管道
+    
+    Args:
+        data_dir: 数据目录
+        output_format: 输出格式，csv或parquet，默认使用CONFIG['OUTPUT_FORMAT']
+        overwrite: 是否先删除已有的输出，重新解析等一次性生成完整输出的场景使用，避免重复运行时追加重复数据
+        
+    Returns:
+        CSVPipeline: 数据管道实例，CSV格式下PIPELINE_BUFFER_ROWS大于0时带缓冲
+    """
+    output_format = output_format or CONFIG['OUTPUT_FORMAT']
+    if output_format == 'parquet':
+        from lianjia_spider.spider.parquet_pipeline import ParquetPipeline
+        output_dir = os.path.join(data_dir, CONFIG['PARQUET_DIR'])
+        if overwrite and os.path.isdir(output_dir):
+            for name in os.listdir(output_dir):
+                if name.endswith('.parquet'):
+                    os.remove(os.path.join(output_dir, name))
+        return ParquetPipeline(output_dir)
+    if output_format != 'csv':
+        raise ValueError(f"未知的输出格式: {output_format}")
+    
+    file_path = os.path.join(data_dir, CONFIG['OUTPUT_FILE'])
+    if overwrite and os.path.exists(file_path):
+        os.remove(file_path)
+    if CONFIG['PIPELINE_BUFFER_ROWS'] > 0:
+        return BufferedCSVPipeline(file_path)
+    return CSVPipeline(file_path)
@@ -0,0 +1,214 @@
+"""
+分布式抓取模块，协调器向共享任务队列投放列表页，多个工作节点租用任务并写入各自的输出分区
+"""
+import os
+import csv
+import glob
+import math
+import time
+import socket
+import threading
+from typing import Dict, Iterable, List, Optional
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.utils.work_queue import Task, WorkQueue
+from lianjia_spider.config.settings import CONFIG, CSV_HEADERS
+
+def worker_dir(worker_id: str, data_dir: Optional[str] = None) -> str:
+    """工作节点的输出分区目录，如data/workers/host-123"""
+    return os.path.join(data_dir or CONFIG['DATA_DIR'], 'workers', worker_id)
+
+def merge_partitions(data_dir: str, output_file: str) -> int:
+    """
+    合并各工作节点输出的CSV分区，同一房源只保留最后抓取的一行
+
+    Args:
+        data_dir: 数据根目录，分区位于其下的workers/*/
+        output_file: 合并后的CSV文件路径
+
+    Returns:
+        int: 合并后的房源数
+    """
+    rows: Dict[str, Dict] = {}
+    for partition in sorted(glob.glob(os.path.join(worker_dir('*', data_dir), CONFIG['OUTPUT_FILE']))):
+        with open(partition, encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                current = rows.get(row['房源ID'])
+                if current is None or row['抓取时间'] >= current['抓取时间']:
+                    rows[row['房源ID']] = row
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_HEADERS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows.values())
+    return len(rows)
+
+
+class Coordinator:
+    """
+    分布式抓取协调器
+
+    只负责投放起始任务和汇总进度：第1页列表任务由工作节点抓取后，
+    按页面给出的房源总数展开其余列表页任务，列表页再展开为详情页任务。
+    """
+
+    def __init__(self, queue: WorkQueue):
+        """
+        初始化协调器
+
+        Args:
+            queue: 共享任务队列
+        """
+        self.queue = queue
+
+    def seed(self, refresh: bool = False, scraped_ids: Iterable[str] = ()) -> int:
+        """
+        投放起始任务
+
+        Args:
+            refresh: 重新抓取全部列表页，已完成的详情页任务仍然去重
+            scraped_ids: 单机模式已抓取的房源ID，导入后不再分配
+
+        Returns:
+            int: 新增的任务数
+        """
+        imported = self.queue.mark_done('detail', scraped_ids)
+        if imported:
+            print(f"已导入{imported}个已抓取的房源ID")
+        if refresh:
+            print(f"重新抓取{self.queue.reset('list')}个列表页")
+        return self.queue.put_many('list', [('1', {'page': 1})]) + imported
+
+    @staticmethod
+    def format_stats(stats: Dict[str, int]) -> str:
+        """格式化各状态的任务数"""
+        return (f"队列: 待处理{stats['ready']}，处理中{stats['leased']}，"
+                f"已完成{stats['done']}，失败{stats['failed']}")
+
+
+class QueueWorker(LianjiaSpider):
+    """
+    分布式抓取工作节点
+
+    从共享队列租用任务：列表页任务展开为详情页任务（以房源ID去重，已完成的ID
+    保留在队列中，各节点不会重复抓取），详情页任务抓取后写入本节点的输出分区。
+    详情页任务在数据管道写出之后才确认，每QUEUE_ACK_BATCH个任务确认一次；
+    节点异常退出时未确认的任务在租约超时后重新分配，因此输出为至少一次语义，
+    合并分区时需要按房源ID去重。
+    """
+
+    def __init__(self, queue: WorkQueue, worker_id: Optional[str] = None,
+                 base_url: Optional[str] = None, data_dir: Optional[str] = None):
+        """
+        初始化工作节点
+
+        Args:
+            queue: 共享任务队列
+            worker_id: 节点标识，默认为主机名-进程号
+            base_url: 列表页基础URL，默认使用CONFIG['BASE_URL']
+            data_dir: 数据根目录，输出写入其下的workers/<worker_id>，默认使用CONFIG['DATA_DIR']
+        """
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        super().__init__(base_url, worker_dir(self.worker_id, data_dir))
+        self.queue = queue
+        self.processed = 0
+        self.lost_leases = 0
+        self._unacked: List[Task] = []
+        self._stop = threading.Event()
+
+    def process(self, task: Task) -> None:
+        """处理一个任务"""
+        if task.kind == 'list':
+            self._process_list(task)
+        elif task.kind == 'detail':
+            self._process_detail(task)
+        else:
+            raise ValueError(f"未知的任务类型: {task.kind}")
+        self.processed += 1
+
+    def _process_list(self, task: Task) -> None:
+        """抓取列表页，投放详情页任务和后续列表页任务后立即确认"""
+        page = task.payload['page']
+        houses, total = self.crawl_list_page(page)
+        if houses:
+            added = self.queue.put_many(
+                'detail', ((house['house_id'], dict(house, page=page)) for house in houses)
+            )
+            print(f"第{page}页找到{len(houses)}个房源，新增{added}个详情页任务")
+            if total is not None and page == 1:
+                # 链家列表最多可访问SHARD_PAGE_CAP页
+                pages = min(math.ceil(total / len(houses)), CONFIG['SHARD_PAGE_CAP'])
+                next_pages = range(2, pages + 1)
+            elif total is None:
+                next_pages = [page + 1]
+            else:
+                next_pages = []
+            self.queue.put_many('list', ((str(n), {'page': n}) for n in next_pages))
+        if self.rate_limiter is None:
+            self._random_delay()
+        self._ack([task])
+
+    def _process_detail(self, task: Task) -> None:
+        """抓取详情页并写入，确认推迟到数据写出之后"""
+        house = task.payload
+        detail = self.crawl_detail_page(house['house_id'], house['link'])
+        self._store_detail(house['page'], house['house_id'], detail)
+        self._unacked.append(task)
+        if self.rate_limiter is None:
+            self._random_delay()
+        if len(self._unacked) >= CONFIG['QUEUE_ACK_BATCH']:
+            self.commit()
+
+    def _ack(self, tasks: List[Task]) -> None:
+        for task in tasks:
+            if not self.queue.ack(task):
+                # 租约已超时，任务可能已被其他节点重新处理
+                self.lost_leases += 1
+                print(f"任务{task.kind}:{task.key}的租约已超时")
+
+    def commit(self) -> None:
+        """写出缓冲数据并确认已写出的详情页任务"""
+        if self._unacked:
+            self.save_progress()
+            self._ack(self._unacked)
+            self._unacked = []
+
+    def stop(self) -> None:
+        """通知工作节点在当前任务完成后退出"""
+        self._stop.set()
+
+    def run(self, max_tasks: Optional[int] = None) -> None:
+        """
+        运行工作节点，直到队列中没有待处理和处理中的任务
+
+        Args:
+            max_tasks: 最多处理的任务数，None表示不限制
+        """
+        print(f"工作节点{self.worker_id}启动，输出目录: {self.data_dir}")
+        self._start_metrics()
+        try:
+            while not self._stop.is_set() and (max_tasks is None or self.processed < max_tasks):
+                task = self.queue.lease(self.worker_id)
+                if task is None:
+                    self.commit()
+                    if not self.queue.unfinished():
+                        break
+                    # 其他节点的任务可能还会展开新任务
+                    time.sleep(CONFIG['QUEUE_POLL_INTERVAL'])
+                    continue
+                try:
+                    self.process(task)
+                except Exception as e:
+                    print(f"任务{task.kind}:{task.key}处理失败: {e}")
+                    self.queue.release(task)
+
+        except KeyboardInterrupt:
+            print("\n检测到中断信号，正在保存进度...")
+
+        finally:
+            self.commit()
+            self.close()
+            print(f"工作节点{self.worker_id}处理了{self.processed}个任务，"
+                  f"租约超时{self.lost_leases}个")
+            self._print_transport_stats()
+            self._stop_metrics()
+            self.transport.close()
@@ -0,0 +1,206 @@
+"""
+多城市调度模块，按权重在多个城市/频道目标之间轮转，共用一个抓取线程池
+"""
+import os
+import threading
+from typing import Dict, Iterable, NamedTuple, Optional, Union
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.utils.transport import create_transport
+from lianjia_spider.utils.metrics import create_metrics_reporter
+from lianjia_spider.config.settings import CONFIG
+
+# 支持的频道：目前只有二手房。成交（chengjiao）和租房（zufang）的页面结构不同，
+# 用二手房的选择器解析不到房源，会被当作已抓完，因此在有对应解析器之前拒绝这些目标
+CATEGORIES = ('ershoufang',)
+
+class CrawlTarget(NamedTuple):
+    """抓取目标"""
+    city: str               # 城市子域名，如cd、bj
+    category: str = 'ershoufang'
+    weight: int = 1         # 调度权重，越大分到的列表页越多
+
+    @property
+    def name(self) -> str:
+        """目标名称，如cd/ershoufang"""
+        return f"{self.city}/{self.category}"
+
+    @property
+    def base_url(self) -> str:
+        """列表页基础URL"""
+        return f"https://{self.city}.lianjia.com/{self.category}/"
+
+    def data_dir(self, data_root: Optional[str] = None) -> str:
+        """目标的进度和输出目录，如data/cd/ershoufang"""
+        return os.path.join(data_root or CONFIG['DATA_DIR'], self.city, self.category)
+
+    @classmethod
+    def parse(cls, spec: Union[str, Dict, 'CrawlTarget']) -> 'CrawlTarget':
+        """
+        解析目标配置
+
+        Args:
+            spec: "cd/ershoufang:3"形式的字符串，或含city、category、weight的字典
+
+        Returns:
+            CrawlTarget: 抓取目标
+        """
+        if isinstance(spec, CrawlTarget):
+            target = spec
+        elif isinstance(spec, dict):
+            target = cls(spec['city'], spec.get('category', 'ershoufang'), int(spec.get('weight', 1)))
+        else:
+            name, _, weight = spec.partition(':')
+            city, _, category = name.partition('/')
+            target = cls(city, category or 'ershoufang', int(weight or 1))
+        if target.category not in CATEGORIES:
+            raise ValueError(f"不支持的频道: {target.category}，目前只支持{'、'.join(CATEGORIES)}")
+        if target.weight < 1:
+            raise ValueError(f"目标{target.name}的权重必须为正整数")
+        return target
+
+
+class MultiCityScheduler:
+    """
+    多城市抓取调度器
+
+    每个目标有独立的LianjiaSpider，进度文件和输出位于DATA_DIR/城市/频道下，
+    所有目标共用一个传输层、限速器（按主机分别限速）和并发控制器。
+    调度的单位是一个列表页及其详情页：多个工作线程用平滑加权轮询选择下一个目标，
+    同一目标同一时间只有一个线程在抓取，因此各目标内部的写入顺序与串行模式一致。
+    rounds大于1时，完成一遍的目标从第1页重新开始，直到所有目标都完成rounds遍，
+    权重高的目标在此期间刷新的次数更多。刷新需要开启CONFIG['INCREMENTAL']，
+    按列表页快照重新抓取有变化的房源；否则已爬取的房源都会被跳过，因此拒绝这种配置。
+    """
+
+    def __init__(self, targets: Optional[Iterable] = None, workers: Optional[int] = None,
+                 rounds: Optional[int] = None, base_urls: Optional[Dict[str, str]] = None):
+        """
+        初始化调度器
+
+        Args:
+            targets: 目标列表，元素为CrawlTarget、字符串或字典，默认使用CONFIG['TARGETS']
+            workers: 抓取线程数，默认使用CONFIG['SCHEDULER_WORKERS']
+            rounds: 每个目标至少完成的遍数，默认使用CONFIG['SCHEDULER_ROUNDS']
+            base_urls: 目标名称到列表页基础URL的映射，用于覆盖默认的链家地址
+        """
+        self.targets = [CrawlTarget.parse(spec) for spec in (targets if targets is not None else CONFIG['TARGETS'])]
+        if not self.targets:
+            raise ValueError("没有配置抓取目标")
+        names = [target.name for target in self.targets]
+        if len(set(names)) != len(names):
+            raise ValueError(f"抓取目标重复: {names}")
+        self.workers = workers or CONFIG['SCHEDULER_WORKERS']
+        self.rounds = rounds or CONFIG['SCHEDULER_ROUNDS']
+        if self.rounds > 1 and not CONFIG['INCREMENTAL']:
+            raise ValueError("刷新模式（rounds大于1）需要开启CONFIG['INCREMENTAL']，否则重新抓取时所有房源都会被跳过")
+        base_urls = base_urls or {}
+
+        # 第一个目标的爬虫创建共用组件，其余目标共用
+        self.spiders: Dict[str, LianjiaSpider] = {}
+        shared = None
+        for target in self.targets:
+            spider = LianjiaSpider(base_urls.get(target.name, target.base_url), target.data_dir(), shared)
+            if shared is None:
+                # 每个工作线程需要一个可复用的连接
+                spider.transport.close()
+                spider.transport = create_transport(per_host_limit=max(CONFIG['POOL_PER_HOST'], self.workers))
+                shared = spider
+            self.spiders[target.name] = spider
+        self.transport = shared.transport
+
+        self._cond = threading.Condition()
+        self._stop = False
+        self._current = {target.name: 0 for target in self.targets}
+        self._cursors = {name: spider._start_page() for name, spider in self.spiders.items()}
+        self._busy = set()
+        self._active = set(names)
+        self.passes = {name: 0 for name in names}
+        self.pages = {name: 0 for name in names}
+
+    def _pick(self) -> Optional[CrawlTarget]:
+        """平滑加权轮询选择下一个空闲目标，没有空闲目标时返回None"""
+        candidates = [t for t in self.targets if t.name in self._active and t.name not in self._busy]
+        if not candidates:
+            return None
+        total = sum(target.weight for target in candidates)
+        for target in candidates:
+            self._current[target.name] += target.weight
+        chosen = max(candidates, key=lambda target: self._current[target.name])
+        self._current[chosen.name] -= total
+        return chosen
+
+    def _finished(self) -> bool:
+        return all(count >= self.rounds for count in self.passes.values())
+
+    def _worker(self) -> None:
+        """工作线程：反复选择目标抓取一个列表页"""
+        while True:
+            with self._cond:
+                while True:
+                    if self._stop or not self._active:
+                        return
+                    target = self._pick()
+                    if target is not None:
+                        break
+                    self._cond.wait()
+                self._busy.add(target.name)
+                page = self._cursors[target.name]
+
+            spider = self.spiders[target.name]
+            try:
+                more = spider.crawl_page(page)
+            except Exception as e:
+                print(f"目标{target.name}第{page}页抓取失败，停止该目标: {e}")
+                more = None
+            if more is False:
+                spider.save_progress()
+
+            with self._cond:
+                self._busy.discard(target.name)
+                self.pages[target.name] += 1
+                if more:
+                    self._cursors[target.name] = page + 1
+                elif more is None:
+                    self._active.discard(target.name)
+                else:
+                    self.passes[target.name] += 1
+                    if self.rounds > 1 and not self._finished():
+                        # 刷新模式：从第1页重新开始
+                        self._cursors[target.name] = 1
+                    else:
+                        self._active.discard(target.name)
+                if self.rounds > 1 and self._finished():
+                    self._active.clear()
+                self._cond.notify_all()
+
+    def run(self) -> None:
+        """运行调度器，直到所有目标完成"""
+        print(f"开始抓取{len(self.targets)}个目标（线程数{self.workers}）: "
+              f"{', '.join(f'{t.name}×{t.weight}' for t in self.targets)}")
+        first = self.spiders[self.targets[0].name]
+        first.metrics_reporter = create_metrics_reporter()
+        if first.metrics_reporter is not None:
+            first.metrics_reporter.start()
+        threads = [threading.Thread(target=self._worker, name=f'scheduler-{i}', daemon=True)
+                   for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            print("\n检测到中断信号，正在保存进度...")
+            with self._cond:
+                self._stop = True
+                self._cond.notify_all()
+            for thread in threads:
+                thread.join()
+        finally:
+            for name, spider in self.spiders.items():
+                spider.close()
+                print(f"目标{name}: 抓取{self.pages[name]}个列表页，完成{self.passes[name]}遍")
+            first._print_transport_stats()
+            first._stop_metrics()
+            self.transport.close()
+            print("爬虫运行完成")
@@ -0,0 +1,139 @@
+"""
+输出字段定义模块，由CSV_HEADERS编译出解析器的标签映射和数据管道的清洗计划
+"""
+from datetime import datetime
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+from lianjia_spider.config.settings import CSV_HEADERS
+
+# 清洗方式: id(转换为字符串)、text(转换为字符串并去除首尾空白)、number(只保留数字和小数点)
+CLEAN_KINDS = ('id', 'text', 'number')
+
+# 输出列的定义: 列名 -> (解析结果字段名, 详情页标签, 清洗方式)
+COLUMN_DEFINITIONS = {
+    '房源ID': ('house_id', (), 'id'),
+    '标题': ('title', (), 'text'),
+    '总价': ('total_price', (), 'number'),
+    '单价': ('unit_price', (), 'number'),
+    '小区名': ('community', (), 'text'),
+    '区域': ('district', (), 'text'),
+    '户型': ('house_type', ('房屋户型',), 'text'),
+    '面积': ('area', ('建筑面积',), 'text'),
+    '朝向': ('orientation', ('房屋朝向',), 'text'),
+    '装修': ('decoration', ('装修情况',), 'text'),
+    '电梯': ('has_elevator', ('配备电梯',), 'text'),
+    '楼层': ('floor', ('所在楼层',), 'text'),
+    '建筑年代': ('build_year', ('建成年代',), 'number'),
+    '抓取时间': ('crawl_time', (), 'text')
+}
+
+# 详情页中解析但不输出的标签
+EXTRA_LABELS = {
+    '户型结构': 'structure',
+    '建筑类型': 'building_type',
+    '建筑结构': 'construction',
+    '梯户比例': 'elevator_ratio',
+    '产权年限': 'property_term'
+}
+
+class _NumberChars(dict):
+    """
+    str.translate的转换表：数字和小数点保留，其余字符删除
+
+    每个字符第一次出现时按str.isdigit()判断并缓存，之后的查询都在C中完成。
+    """
+
+    def __missing__(self, code: int) -> Optional[int]:
+        char = chr(code)
+        value = code if char.isdigit() or char == '.' else None
+        self[code] = value
+        return value
+
+_NUMBER_CHARS = _NumberChars()
+
+def extract_number(text: str) -> str:
+    """提取文本中的数字和小数点"""
+    if not text:
+        return ''
+    return text.translate(_NUMBER_CHARS)
+
+def clean_text(value) -> str:
+    """转换为字符串并去除首尾空白"""
+    if value.__class__ is str:
+        return value.strip()
+    return str(value).strip()
+
+CLEANERS: Dict[str, Callable] = {
+    'id': str,
+    'text': clean_text,
+    'number': extract_number
+}
+
+class Column(NamedTuple):
+    """一个输出列"""
+    name: str
+    source: str
+    labels: Tuple[str, ...]
+    kind: str
+
+
+class Schema:
+    """
+    编译后的输出字段定义
+
+    按列顺序保存每列的解析结果字段名和清洗函数，清洗结果是与列顺序一致的元组，
+    可直接交给csv.writer。只需在模块加载时构建一次。
+    """
+
+    def __init__(self, headers: Sequence[str] = CSV_HEADERS):
+        """
+        编译字段定义
+
+        Args:
+            headers: 输出列名，必须都在COLUMN_DEFINITIONS中
+        """
+        self.columns = tuple(Column(name, *COLUMN_DEFINITIONS[name]) for name in headers)
+        self.headers = tuple(headers)
+        # 解析结果字段名 -> 列名
+        self.field_mapping = {column.source: column.name for column in self.columns}
+        # 详情页标签 -> 解析结果字段名
+        self.labels = dict(EXTRA_LABELS)
+        self.labels.update((label, column.source) for column in self.columns for label in column.labels)
+        self.number_columns = tuple(column.name for column in self.columns if column.kind == 'number')
+        self._plan = tuple((column.source, CLEANERS[column.kind]) for column in self.columns)
+        self._time_index = self.headers.index('抓取时间')
+
+    def clean_row(self, item: Dict) -> tuple:
+        """
+        清洗一个解析结果
+
+        Args:
+            item: 解析结果字典，不在定义中的字段被忽略
+
+        Returns:
+            tuple: 按列顺序的清洗结果，缺失的字段为空字符串，抓取时间为空时使用当前时间
+        """
+        row = [clean(item[source]) if source in item else '' for source, clean in self._plan]
+        if not row[self._time_index]:
+            row[self._time_index] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return tuple(row)
+
+    def clean_dict(self, item: Dict) -> Dict:
+        """
+        清洗一个解析结果，返回以列名为键的字典
+
+        Returns:
+            Dict: 只包含解析结果中存在的字段和抓取时间
+        """
+        cleaned = {name: clean(item[source])
+                   for name, (source, clean) in zip(self.headers, self._plan) if source in item}
+        if not cleaned.get('抓取时间'):
+            cleaned['抓取时间'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return cleaned
+
+    def to_dict(self, row: tuple) -> Dict:
+        """将清洗结果元组转换为以列名为键的字典"""
+        return dict(zip(self.headers, row))
+
+
+# 按CSV_HEADERS编译的默认字段定义
+SCHEMA = Schema()
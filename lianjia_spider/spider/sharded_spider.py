@@ -0,0 +1,169 @@
+"""
+分片并行爬虫模块，按分片计划由多个工作线程并行抓取列表页和详情页
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.shards import Shard, ShardPlanner
+from lianjia_spider.utils.transport import create_transport
+from lianjia_spider.config.settings import CONFIG
+
+class ShardedLianjiaSpider(LianjiaSpider):
+    """
+    分片并行的链家爬虫
+
+    首次运行时由ShardPlanner生成分片计划并保存在状态中，之后每个分片由一个工作线程
+    依次抓取列表页和详情页，分片的下一页页码作为游标保存在状态中，中断后从游标继续。
+    各线程共用传输层、限速器、数据管道和状态管理器，写入和状态更新由同一把锁串行化。
+    不使用解析进程池，解析在各工作线程中进行。
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        初始化分片爬虫
+
+        Args:
+            workers: 并行抓取的分片数，默认使用CONFIG['SHARD_WORKERS']
+        """
+        self.concurrency = workers or CONFIG['SHARD_WORKERS']
+        super().__init__()
+        self.workers = self.concurrency
+        # 每个工作线程需要一个可复用的连接
+        self.transport.close()
+        self.transport = create_transport(per_host_limit=max(CONFIG['POOL_PER_HOST'], self.workers))
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+
+    def plan_shards(self) -> List[Dict]:
+        """
+        读取状态中的分片计划，没有时重新规划并保存
+
+        Returns:
+            List[Dict]: 分片信息列表，含游标
+        """
+        shards = self.state_manager.get_shards()
+        if not shards:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                planner = ShardPlanner(self._fetch_page, self.parser, executor=executor,
+                                       base_url=self.base_url)
+                plan = planner.plan()
+            shards = {shard.key: shard.to_dict() for shard in plan}
+            self.state_manager.set_shards(shards)
+            self.state_manager.update_progress(1, [], sum(shard.total for shard in plan))
+            self.state_manager.save_state()
+            print(f"分片规划完成：{len(plan)}个分片，共请求{planner.probes}个列表页")
+        elif self.listing_store is not None:
+            # 增量模式每次运行都从各分片的第1页开始
+            for key in shards:
+                self.state_manager.update_shard(key, page=1, done=False)
+                shards[key].update(page=1, done=False)
+        return [dict(shard, key=key) for key, shard in shards.items()]
+
+    def _should_fetch(self, house: Dict) -> bool:
+        with self._lock:
+            return super()._should_fetch(house)
+
+    def _store_detail(self, page: int, house_id: str, detail: Dict,
+                      house: Optional[Dict] = None) -> None:
+        with self._lock:
+            super()._store_detail(page, house_id, detail, house)
+
+    def _submit_enrichment(self, house: Dict) -> None:
+        with self._lock:
+            super()._submit_enrichment(house)
+
+    def crawl_shard(self, cursor: Dict) -> int:
+        """
+        从游标处抓取一个分片
+
+        Args:
+            cursor: 分片信息，含key、page和pages
+
+        Returns:
+            int: 本次写入的房源数
+        """
+        shard = Shard.from_dict(cursor)
+        page = cursor['page']
+        count = 0
+        while page <= shard.pages and not self._stop.is_set():
+            houses, _ = self.parser.parse_list_page(self._fetch_page(shard.url(page, self.base_url)))
+            if not houses:
+                break
+            for house in houses:
+                if self._stop.is_set():
+                    return count
+                self._submit_enrichment(house)
+                if not self._should_fetch(house):
+                    continue
+                try:
+                    if CONFIG['LIST_ONLY']:
+                        detail = self.parser.parse_list_item(house)
+                    else:
+                        detail = self.crawl_detail_page(house['house_id'], house['link'])
+                        if self.rate_limiter is None:
+                            self._random_delay()
+                    self._store_detail(page, house['house_id'], detail, house)
+                    count += 1
+                except Exception as e:
+                    print(f"处理房源{house['house_id']}失败: {e}")
+            if CONFIG['LIST_ONLY'] and self.rate_limiter is None:
+                self._random_delay()
+
+            page += 1
+            with self._lock:
+                self._record_progress(self.state_manager.update_shard, shard.key, page=page)
+                if page % CONFIG['SAVE_INTERVAL'] == 0:
+                    self._save()
+
+        if not self._stop.is_set():
+            with self._lock:
+                self._record_progress(self.state_manager.update_shard, shard.key, done=True)
+            print(f"分片{shard.key}完成，写入{count}个房源")
+        return count
+
+    def _save(self) -> None:
+        """写出缓冲数据并保存进度"""
+        with self._lock:
+            self.save_progress()
+
+    def run(self) -> None:
+        """运行分片爬虫"""
+        self._start_enricher()
+        self._start_metrics()
+        try:
+            cursors = [cursor for cursor in self.plan_shards() if not cursor.get('done')]
+            if not cursors:
+                print("全部分片已完成")
+                return
+            print(f"开始抓取{len(cursors)}个分片（并行数{self.workers}）...")
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [(cursor['key'], executor.submit(self.crawl_shard, cursor)) for cursor in cursors]
+                try:
+                    for key, future in futures:
+                        try:
+                            future.result()
+                        except Exception as e:
+                            print(f"分片{key}抓取失败，下次运行时从游标继续: {e}")
+                except KeyboardInterrupt:
+                    # 通知工作线程在当前房源完成后退出
+                    self._stop.set()
+                    raise
+
+        except KeyboardInterrupt:
+            print("\n检测到中断信号，正在保存进度...")
+            self._close_enricher(wait=False)
+            self._save()
+            print("进度已保存，爬虫已安全停止")
+
+        except Exception as e:
+            print(f"爬虫运行异常: {e}")
+            self._save()
+            raise
+
+        finally:
+            self.close()
+            self._print_transport_stats()
+            self._stop_metrics()
+            self.transport.close()
+            print("爬虫运行完成")
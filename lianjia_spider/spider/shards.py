@@ -0,0 +1,171 @@
+"""
+分片规划模块，按城区、商圈和价格/面积筛选条件拆分列表页，使每个分片都不超过可访问的页数上限
+"""
+import math
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from lianjia_spider.spider.parser import Parser
+from lianjia_spider.config.settings import CONFIG
+
+class Shard(NamedTuple):
+    """列表页分片"""
+    path: str = ''      # 城区或商圈路径段，空字符串表示全城
+    filters: str = ''   # 筛选条件路径段，如p3、p3a2
+    total: int = 0      # 分片内的房源总数
+    pages: int = 1      # 需要抓取的列表页数
+
+    @property
+    def key(self) -> str:
+        """分片键，在状态中唯一标识分片"""
+        return f"{self.path}/{self.filters}"
+
+    def url(self, page: int, base_url: Optional[str] = None) -> str:
+        """
+        分片第page页的URL
+
+        Args:
+            page: 页码
+            base_url: 列表页基础URL，默认使用CONFIG['BASE_URL']
+
+        Returns:
+            str: 如https://cd.lianjia.com/ershoufang/jinjiang/pg2p3/
+        """
+        prefix = f"{self.path}/" if self.path else ''
+        return f"{base_url or CONFIG['BASE_URL']}{prefix}pg{page}{self.filters}/"
+
+    def to_dict(self) -> Dict:
+        """转换为保存在状态中的字典，游标从第1页开始"""
+        return {'path': self.path, 'filters': self.filters, 'total': self.total,
+                'pages': self.pages, 'page': 1, 'done': False}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Shard':
+        """由状态中的字典还原分片"""
+        return cls(data['path'], data['filters'], data.get('total', 0), data.get('pages', 1))
+
+
+class ShardPlanner:
+    """
+    分片规划器
+
+    先请求全城第1页得到房源总数，超过页数上限时按城区拆分；城区仍超过上限时按商圈拆分，
+    商圈仍超过上限时依次按价格段、价格段加面积段拆分。每个候选分片只请求第1页，
+    由parse_list_page返回的总数判断是否需要继续拆分，没有房源的分片直接丢弃。
+    """
+
+    def __init__(self, fetch: Callable[[str], str], parser: Optional[Parser] = None,
+                 page_cap: Optional[int] = None, price_filters: Optional[Sequence[str]] = None,
+                 area_filters: Optional[Sequence[str]] = None, executor: Optional[Executor] = None,
+                 base_url: Optional[str] = None):
+        """
+        初始化分片规划器
+
+        Args:
+            fetch: 获取页面HTML的函数
+            parser: 页面解析器，默认使用Parser
+            page_cap: 单个分片最多可访问的列表页数，默认使用CONFIG['SHARD_PAGE_CAP']
+            price_filters: 价格段筛选条件，默认使用CONFIG['SHARD_PRICE_FILTERS']
+            area_filters: 面积段筛选条件，默认使用CONFIG['SHARD_AREA_FILTERS']
+            executor: 用于并发请求同一层候选分片的线程池，为None时依次请求
+            base_url: 列表页基础URL，默认使用CONFIG['BASE_URL']
+        """
+        self.fetch = fetch
+        self.parser = parser or Parser()
+        self.page_cap = page_cap or CONFIG['SHARD_PAGE_CAP']
+        self.price_filters = list(price_filters if price_filters is not None else CONFIG['SHARD_PRICE_FILTERS'])
+        self.area_filters = list(area_filters if area_filters is not None else CONFIG['SHARD_AREA_FILTERS'])
+        self.executor = executor
+        self.base_url = base_url or CONFIG['BASE_URL']
+        self.page_size = 0
+        self.probes = 0
+        self.truncated: List[Shard] = []
+
+    def _probe(self, candidate: Tuple[str, str]) -> Tuple[Shard, str]:
+        """请求候选分片的第1页，返回带总数的分片和页面HTML"""
+        path, filters = candidate
+        html = self.fetch(Shard(path, filters).url(1, self.base_url))
+        houses, total = self.parser.parse_list_page(html)
+        self.probes += 1
+        self.page_size = max(self.page_size, len(houses))
+        if total is None:
+            total = len(houses)
+        return Shard(path, filters, total), html
+
+    def _probe_all(self, candidates: List[Tuple[str, str]]) -> List[Tuple[Shard, str]]:
+        """请求一组候选分片，结果顺序与候选顺序一致"""
+        if self.executor is not None:
+            return list(self.executor.map(self._probe, candidates))
+        return [self._probe(candidate) for candidate in candidates]
+
+    def _fits(self, shard: Shard) -> bool:
+        """分片的房源是否都能在页数上限内访问到"""
+        return shard.total <= self.page_cap * max(self.page_size, 1)
+
+    def _finalize(self, shard: Shard) -> Shard:
+        """按每页房源数计算需要抓取的页数"""
+        pages = math.ceil(shard.total / max(self.page_size, 1))
+        return shard._replace(pages=max(1, min(pages, self.page_cap)))
+
+    def plan(self) -> List[Shard]:
+        """
+        生成分片计划
+
+        Returns:
+            List[Shard]: 分片列表，按城区、商圈、筛选条件的顺序排列
+        """
+        root, html = self._probe(('', ''))
+        if self._fits(root):
+            return [self._finalize(root)] if root.total else []
+
+        districts, _ = self.parser.parse_regions(html)
+        if not districts:
+            return self._split_filters(root)
+
+        shards = []
+        seen = set()
+        for district, district_html in self._probe_all([(d, '') for d in districts]):
+            if not district.total:
+                continue
+            if self._fits(district):
+                shards.append(self._finalize(district))
+                continue
+            _, areas = self.parser.parse_regions(district_html)
+            # 商圈可能同时属于多个城区，只保留第一次出现的
+            areas = [area for area in areas if area not in seen and area not in districts]
+            seen.update(areas)
+            if not areas:
+                shards.extend(self._split_filters(district))
+                continue
+            for area, _ in self._probe_all([(a, '') for a in areas]):
+                if not area.total:
+                    continue
+                if self._fits(area):
+                    shards.append(self._finalize(area))
+                else:
+                    shards.extend(self._split_filters(area))
+        return shards
+
+    def _split_filters(self, shard: Shard) -> List[Shard]:
+        """按价格段拆分，价格段仍超过上限时再按面积段拆分"""
+        if not self.price_filters:
+            return self._accept(shard)
+        shards = []
+        candidates = [(shard.path, price) for price in self.price_filters]
+        for price_shard, _ in self._probe_all(candidates):
+            if not price_shard.total:
+                continue
+            if self._fits(price_shard) or not self.area_filters:
+                shards.extend(self._accept(price_shard))
+                continue
+            candidates = [(shard.path, price_shard.filters + area) for area in self.area_filters]
+            for area_shard, _ in self._probe_all(candidates):
+                if area_shard.total:
+                    shards.extend(self._accept(area_shard))
+        return shards
+
+    def _accept(self, shard: Shard) -> List[Shard]:
+        """接受无法继续拆分的分片，超过上限时记录为将被截断"""
+        if not self._fits(shard):
+            self.truncated.append(shard)
+            print(f"分片{shard.key}共{shard.total}个房源，超过页数上限，部分房源将无法访问")
+        return [self._finalize(shard)]
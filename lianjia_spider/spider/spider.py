@@ -4,28 +4,74 @@
 import os
 import time
 import random
+import threading
+from functools import partial
+from typing import Callable, Optional, List, Dict, Tuple
 import requests
-from typing import Optional, List, Dict, Tuple
 from lianjia_spider.utils.headers import HeadersManager
-from lianjia_spider.utils.state import StateManager
-from lianjia_spider.utils.retry import retry_on_failure
-from lianjia_spider.spider.parser import Parser
-from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.utils.state import create_state_manager
+from lianjia_spider.utils.retry import BlockedError, is_blocked, parse_retry_after, retry_on_failure
+from lianjia_spider.utils.circuit_breaker import CircuitBreaker, FAILURE_STATUSES, create_circuit_breaker
+from lianjia_spider.utils.transport import create_transport
+from lianjia_spider.utils.rate_limiter import RateLimiter, create_rate_limiter
+from lianjia_spider.utils.concurrency import AIMDController, create_concurrency_controller
+from lianjia_spider.utils.archive import PageArchive, create_archive
+from lianjia_spider.utils.listing_store import ListingStore, create_listing_store, NEW, UNCHANGED
+from lianjia_spider.utils.metrics import REGISTRY, MetricsReporter, create_metrics_reporter, timed
+from lianjia_spider.spider.parser import create_parser
+from lianjia_spider.spider.stream_parser import parse_detail_stream
+from lianjia_spider.spider.pipeline import create_pipeline
+from lianjia_spider.spider.parse_pool import ParsePool
+from lianjia_spider.spider.enrich import DetailEnricher, create_enricher
 from lianjia_spider.config.settings import CONFIG
 
 class LianjiaSpider:
     """链家爬虫实现"""
     
-    def __init__(self):
-        """初始化爬虫"""
+    # 串行引擎同一时间只有一个请求
+    concurrency = 1
+    
+    def __init__(self, base_url: Optional[str] = None, data_dir: Optional[str] = None,
+                 shared: Optional['LianjiaSpider'] = None):
+        """
+        初始化爬虫
+        
+        Args:
+            base_url: 列表页基础URL，默认使用CONFIG['BASE_URL']
+            data_dir: 进度、输出和归档所在目录，默认使用CONFIG['DATA_DIR']
+            shared: 与之共用传输层、限速器、并发控制器和熔断器的爬虫，为None时新建
+        """
+        self.base_url = base_url or CONFIG['BASE_URL']
+        self.data_dir = data_dir or CONFIG['DATA_DIR']
         self.headers_manager = HeadersManager()
-        self.state_manager = StateManager(
-            os.path.join(CONFIG['DATA_DIR'], CONFIG['PROGRESS_FILE'])
-        )
-        self.pipeline = CSVPipeline(
-            os.path.join(CONFIG['DATA_DIR'], CONFIG['OUTPUT_FILE'])
+        if shared is not None:
+            self.transport = shared.transport
+            self.rate_limiter: Optional[RateLimiter] = shared.rate_limiter
+            self.concurrency_controller: Optional[AIMDController] = shared.concurrency_controller
+            self.circuit_breaker: Optional[CircuitBreaker] = shared.circuit_breaker
+        else:
+            self.transport = create_transport()
+            self.rate_limiter = create_rate_limiter()
+            self.concurrency_controller = create_concurrency_controller(
+                self.rate_limiter, self.concurrency, self.data_dir
+            )
+            self.circuit_breaker = create_circuit_breaker()
+        self._local = threading.local()
+        self.state_manager = create_state_manager(
+            os.path.join(self.data_dir, CONFIG['PROGRESS_FILE'])
         )
-        self.parser = Parser()
+        self.pipeline = create_pipeline(self.data_dir)
+        self.archive: Optional[PageArchive] = create_archive(self.data_dir)
+        self.listing_store: Optional[ListingStore] = create_listing_store(self.data_dir)
+        self.parser = create_parser()
+        self.parse_pool: Optional[ParsePool] = None
+        self.enricher: Optional[DetailEnricher] = None
+        self.metrics_reporter: Optional[MetricsReporter] = None
+        # 数据管道写出之前暂存的进度更新，及其中的房源ID
+        self._unflushed: List[Callable[[], None]] = []
+        self._unflushed_ids = set()
+        # 已提交给解析进程池、结果尚未写入的房源ID
+        self._parsing_ids = set()
         
     @retry_on_failure(max_retries=CONFIG['MAX_RETRIES'])
     def _fetch_page(self, url: str) -> str:
@@ -38,11 +84,119 @@ class LianjiaSpider:
         Returns:
             str: 页面HTML内容
         """
-        headers = self.headers_manager.get_headers()
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.text
+        response = self._request(url)
+        html = response.text
+        if self.archive is not None and not getattr(response, 'from_cache', False):
+            self.archive.append(url, html)
+        return html
+    
+    @retry_on_failure(max_retries=CONFIG['MAX_RETRIES'])
+    def _stream_detail_page(self, house_id: str, url: str) -> Dict:
+        """
+        获取详情页并边下载边解析，必需字段齐全后停止下载
+        
+        Args:
+            house_id: 房源ID
+            url: 详情页URL
+            
+        Returns:
+            Dict: 房源详细信息
+        """
+        return parse_detail_stream(self._request(url, stream=True), house_id)
+    
+    def _request(self, url: str, stream: bool = False) -> requests.Response:
+        """
+        发送请求，经过限速和并发控制并记录指标
+        
+        Args:
+            url: 页面URL
+            stream: 为True时只读取响应头，响应体由调用方读取并计入下载字节数
+            
+        Returns:
+            requests.Response: 状态码为2xx的响应
+            
+        Raises:
+            BlockedError: 请求被重定向到验证码等拦截页面
+        """
+        # 缓存有效期内的页面不访问网络，不经过限速、并发控制和熔断；
+        # 有效期判断和读取在同一次查找中完成，其余情况都按网络请求处理
+        response = self.transport.get_cached(url)
+        if response is None:
+            headers = self.headers_manager.get_headers()
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_request()
+            self._throttle(url)
+            start = time.perf_counter()
+            try:
+                response = self.transport.get(url, headers=headers, timeout=30, stream=stream)
+            except Exception:
+                self._observe(time.perf_counter() - start, None)
+                self._record_outcome(False)
+                REGISTRY.inc('fetch_errors')
+                raise
+            latency = time.perf_counter() - start
+            self._observe(latency, response.status_code)
+            REGISTRY.observe('fetch_seconds', latency)
+            blocked = is_blocked(response)
+            self._record_outcome(not blocked and response.status_code not in FAILURE_STATUSES,
+                                 response.headers.get('Retry-After'))
+            if not stream and not getattr(response, 'from_cache', False):
+                REGISTRY.inc('bytes_downloaded', len(response.content))
+            if blocked:
+                response.close()
+                REGISTRY.inc('blocked_responses')
+                raise BlockedError(f"请求被重定向到拦截页面: {response.url}")
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        REGISTRY.inc('pages_fetched')
+        return response
+    
+    def _record_outcome(self, success: bool, retry_after: Optional[str] = None) -> None:
+        """
+        将请求结果反馈给熔断器
+        
+        Args:
+            success: 请求是否正常
+            retry_after: 响应的Retry-After响应头
+        """
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(success, parse_retry_after(retry_after))
     
+    def _streams_detail(self) -> bool:
+        """是否流式解析详情页，归档需要完整页面，解析进程池需要HTML，此时不使用"""
+        return CONFIG['STREAM_DETAIL'] and self.archive is None and self.parse_pool is None
+    
+    def _throttle(self, url: str) -> None:
+        """
+        等待限速器放行，每次请求（包括重试）都消耗一个令牌
+        
+        Args:
+            url: 页面URL
+        """
+        if self.rate_limiter is None:
+            return
+        if getattr(self._local, 'prepaid', False):
+            # 异步引擎已在事件循环中等待过本次请求的令牌
+            self._local.prepaid = False
+            return
+        with REGISTRY.timer('throttle_seconds'):
+            self.rate_limiter.acquire(url)
+    
+    def _observe(self, latency: float, status: Optional[int]) -> None:
+        """
+        将请求结果反馈给并发控制器
+        
+        Args:
+            latency: 请求耗时（秒）
+            status: HTTP状态码，没有响应时为None
+        """
+        if self.concurrency_controller is not None:
+            self.concurrency_controller.record(latency, status)
+    
+    @timed('delay_seconds')
     def _random_delay(self) -> None:
         """随机延迟，避免请求过快"""
         delay = random.uniform(CONFIG['DELAY_RANGE'][0], CONFIG['DELAY_RANGE'][1])
@@ -58,7 +212,7 @@ class LianjiaSpider:
         Returns:
             tuple: (房源列表, 总数量)
         """
-        url = f"{CONFIG['BASE_URL']}pg{page}/"
+        url = f"{self.base_url}pg{page}/"
         html = self._fetch_page(url)
         houses, total = self.parser.parse_list_page(html)
         return houses, total
@@ -74,77 +228,313 @@ class LianjiaSpider:
         Returns:
             Dict: 房源详细信息
         """
+        if self._streams_detail():
+            return self._stream_detail_page(house_id, url)
         html = self._fetch_page(url)
         return self.parser.parse_detail_page(html, house_id)
     
+    def _should_fetch(self, house: Dict) -> bool:
+        """
+        判断是否需要抓取房源详情页
+        
+        普通模式跳过已爬取的房源；增量模式只抓取新增或列表页标题、价格有变化的房源。
+        
+        Args:
+            house: 列表页中的房源
+            
+        Returns:
+            bool: 需要抓取时返回True
+        """
+        house_id = house['house_id']
+        if self.listing_store is None:
+            if self._is_scraped(house_id):
+                print(f"房源{house_id}已爬取，跳过")
+                return False
+            return True
+        
+        status = self.listing_store.compare(house)
+        if status == UNCHANGED:
+            self.listing_store.record(house)
+            print(f"房源{house_id}没有变化，跳过")
+            return False
+        if status == NEW and self._is_scraped(house_id):
+            # 启用增量模式之前已爬取的房源，以本次列表页字段作为比较基准
+            self.listing_store.record(house)
+            print(f"房源{house_id}已爬取，记录列表页字段")
+            return False
+        if status != NEW:
+            print(f"房源{house_id}标题或价格有变化，重新抓取")
+        return True
+    
+    def _store_listing(self, page: int, house: Dict) -> None:
+        """
+        仅列表模式：由列表页字段生成房源数据写入，并提交给后台补抓
+        
+        Args:
+            page: 房源所在列表页页码
+            house: 列表页中的房源
+        """
+        self._store_detail(page, house['house_id'], self.parser.parse_list_item(house), house)
+    
+    def _submit_enrichment(self, house: Dict) -> None:
+        """将房源提交给后台详情页补抓，未启用补抓时不处理"""
+        if self.enricher is not None:
+            self.enricher.submit(house['house_id'], house['link'])
+    
+    def _start_enricher(self) -> None:
+        """仅列表模式下按配置启动后台详情页补抓"""
+        if CONFIG['LIST_ONLY'] and CONFIG['ENRICH_DETAILS'] and self.enricher is None:
+            delay = self._random_delay if self.rate_limiter is None else None
+            self.enricher = create_enricher(self._fetch_page, self.parser, self.data_dir, delay)
+    
+    def _close_enricher(self, wait: bool = True) -> None:
+        """
+        关闭后台详情页补抓
+        
+        Args:
+            wait: 是否等待队列中的房源补抓完成
+        """
+        if self.enricher is not None:
+            self.enricher.close(wait)
+            self.enricher = None
+    
+    def _store_detail(self, page: int, house_id: str, detail: Dict,
+                      house: Optional[Dict] = None) -> None:
+        """
+        写入解析结果并记录进度
+        
+        Args:
+            page: 房源所在列表页页码
+            house_id: 房源ID
+            detail: 房源详细信息
+            house: 列表页中的房源，增量模式下详情页写入后才更新其快照
+        """
+        self.pipeline.process_item(detail)
+        self._unflushed_ids.add(house_id)
+        self._record_progress(self.state_manager.update_progress, page, [house_id])
+        if house is not None and self.listing_store is not None:
+            self.listing_store.record(house)
+        print(f"成功爬取房源: {house_id}")
+    
+    def _store_parsed(self, page: int, house_id: str, house: Dict, detail: Dict) -> None:
+        """写入解析进程池的结果"""
+        self._parsing_ids.discard(house_id)
+        self._store_detail(page, house_id, detail, house)
+    
+    def _is_scraped(self, house_id: str) -> bool:
+        """房源是否已爬取，包括正在解析的房源和已写入数据管道、进度尚未提交的房源"""
+        return (house_id in self._parsing_ids or house_id in self._unflushed_ids
+                or self.state_manager.is_scraped(house_id))
+    
+    def _record_progress(self, update: Callable[..., None], *args, **kwargs) -> None:
+        """
+        记录一次进度更新
+        
+        数据管道还有未写入磁盘的数据时先暂存，写出后再按顺序提交给状态管理器，
+        保证保存的进度不会超前于磁盘上的数据。
+        
+        Args:
+            update: 状态管理器的更新方法
+            *args: 传给update的位置参数
+            **kwargs: 传给update的关键字参数
+        """
+        self._unflushed.append(partial(update, *args, **kwargs))
+        if not self.pipeline.pending_rows:
+            self._commit_progress()
+    
+    def _commit_progress(self) -> None:
+        """将暂存的进度更新提交给状态管理器并做检查点"""
+        if not self._unflushed:
+            return
+        for update in self._unflushed:
+            update()
+        self._unflushed = []
+        self._unflushed_ids.clear()
+        self.state_manager.checkpoint()
+    
+    def _flush_pipeline(self) -> None:
+        """将数据管道中缓冲的数据写入磁盘，再提交暂存的进度"""
+        self.pipeline.flush()
+        self._commit_progress()
+    
+    def _flush_archive(self) -> None:
+        """将归档的页面和列表页快照写入磁盘并提交索引"""
+        if self.archive is not None:
+            self.archive.flush()
+        if self.listing_store is not None:
+            self.listing_store.flush()
+    
+    def _close_stores(self) -> None:
+        """关闭页面归档和列表页快照"""
+        if self.archive is not None:
+            self.archive.close()
+        if self.listing_store is not None:
+            self.listing_store.close()
+    
+    def _start_page(self) -> int:
+        """起始页码，增量模式每次从第1页开始"""
+        if self.listing_store is not None:
+            return 1
+        return self.state_manager.get_current_page()
+    
+    def _print_transport_stats(self) -> None:
+        """输出连接复用、缓存命中、ID过滤器、并发控制器和熔断器的统计"""
+        stats = self.transport.get_stats()
+        print(f"共发送{stats['requests']}个请求，新建连接{stats['connections_opened']}个，"
+              f"复用率{stats['reuse_ratio']:.1%}")
+        if 'cache_hits' in stats:
+            print(f"缓存命中{stats['cache_hits']}次，重新验证{stats['cache_revalidated']}次，"
+                  f"未命中{stats['cache_misses']}次")
+        filter_stats = self.state_manager.get_filter_stats()
+        if filter_stats is not None:
+            print(f"ID过滤器: 查询{filter_stats['lookups']}次，直接排除{filter_stats['skip_ratio']:.1%}，"
+                  f"误判{filter_stats['false_positives']}次（实际误判率{filter_stats['observed_error_rate']:.3%}，"
+                  f"上限{filter_stats['target_error_rate']:.3%}）")
+        if self.concurrency_controller is not None:
+            setpoint = self.concurrency_controller.setpoint
+            print(f"自适应并发: 并发上限{setpoint['limit']}，速率{setpoint['rate']}请求/秒")
+        if self.circuit_breaker is not None:
+            breaker_stats = self.circuit_breaker.get_stats()
+            print(f"熔断器: 打开{breaker_stats['opened']}次，请求累计等待{breaker_stats['paused_seconds']:.1f}秒")
+    
+    def _start_metrics(self) -> None:
+        """按配置启动指标输出"""
+        if self.metrics_reporter is None:
+            self.metrics_reporter = create_metrics_reporter(self.data_dir)
+            if self.metrics_reporter is not None:
+                self.metrics_reporter.start()
+    
+    def _stop_metrics(self) -> None:
+        """输出最终指标并停止指标输出"""
+        if self.metrics_reporter is not None:
+            self.metrics_reporter.stop()
+            self.metrics_reporter = None
+    
+    def _close_parse_pool(self) -> None:
+        """写出进程池中剩余的解析结果并关闭进程池"""
+        if self.parse_pool is not None:
+            self.parse_pool.close()
+            self.parse_pool = None
+    
+    def crawl_page(self, page: int) -> bool:
+        """
+        爬取一个列表页及其中需要抓取的详情页
+        
+        Args:
+            page: 页码
+            
+        Returns:
+            bool: 列表页有房源时返回True，没有房源表示已到最后一页
+        """
+        # 爬取列表页
+        houses, total = self.crawl_list_page(page)
+        if not houses:
+            print(f"第{page}页没有找到房源，爬虫结束")
+            return False
+        
+        print(f"正在处理第{page}页，找到{len(houses)}个房源")
+        
+        # 更新总数量
+        if total is not None:
+            self._record_progress(self.state_manager.update_progress, page, [], total)
+        
+        # 处理每个房源
+        for house in houses:
+            house_id = house['house_id']
+            self._submit_enrichment(house)
+            
+            # 检查是否已爬取或有变化
+            if not self._should_fetch(house):
+                continue
+            
+            if CONFIG['LIST_ONLY']:
+                # 仅列表模式不抓取详情页
+                self._store_listing(page, house)
+                continue
+            
+            try:
+                if self.parse_pool is not None:
+                    # 交给进程池解析，结果按顺序写入
+                    html = self._fetch_page(house['link'])
+                    # 结果写入前后面的列表页可能再次出现该房源，提交时即视为已爬取
+                    self._parsing_ids.add(house_id)
+                    self.parse_pool.submit(
+                        html, house_id,
+                        partial(self._store_parsed, page, house_id, house),
+                        partial(self._parsing_ids.discard, house_id)
+                    )
+                else:
+                    # 爬取详情页并写入
+                    detail = self.crawl_detail_page(house_id, house['link'])
+                    self._store_detail(page, house_id, detail, house)
+                
+                # 未启用限速器时使用随机延迟
+                if self.rate_limiter is None:
+                    self._random_delay()
+                
+            except Exception as e:
+                print(f"处理房源{house_id}失败: {e}")
+                continue
+        
+        # 仅列表模式下每个列表页之后延迟
+        if CONFIG['LIST_ONLY'] and self.rate_limiter is None:
+            self._random_delay()
+        
+        # 定期保存进度
+        if page % CONFIG['SAVE_INTERVAL'] == 0:
+            self.save_progress()
+            print(f"已保存爬取进度到第{page}页")
+        return True
+    
+    def save_progress(self) -> None:
+        """写出已解析的结果、缓冲数据和归档，并保存进度"""
+        if self.parse_pool is not None:
+            self.parse_pool.join()
+        self._flush_pipeline()
+        self._flush_archive()
+        self.state_manager.save_state()
+    
+    def close(self) -> None:
+        """关闭本爬虫的进程池、补抓线程、数据管道、归档和状态，不关闭传输层"""
+        self._close_parse_pool()
+        self._close_enricher()
+        self.pipeline.close()
+        self._commit_progress()
+        self._close_stores()
+        self.state_manager.close()
+    
     def run(self) -> None:
         """运行爬虫"""
-        current_page = self.state_manager.get_current_page()
+        current_page = self._start_page()
         print(f"从第{current_page}页开始爬取...")
+        if CONFIG['PARSE_WORKERS'] > 0 and self.parse_pool is None:
+            self.parse_pool = ParsePool()
+        self._start_enricher()
+        self._start_metrics()
         
         try:
-            while True:
-                # 爬取列表页
-                houses, total = self.crawl_list_page(current_page)
-                if not houses:
-                    print(f"第{current_page}页没有找到房源，爬虫结束")
-                    break
-                
-                print(f"正在处理第{current_page}页，找到{len(houses)}个房源")
-                
-                # 更新总数量
-                if total is not None:
-                    self.state_manager.update_progress(current_page, [], total)
-                
-                # 处理每个房源
-                for house in houses:
-                    house_id = house['house_id']
-                    
-                    # 检查是否已爬取
-                    if self.state_manager.is_scraped(house_id):
-                        print(f"房源{house_id}已爬取，跳过")
-                        continue
-                    
-                    try:
-                        # 爬取详情页
-                        detail = self.crawl_detail_page(house_id, house['link'])
-                        
-                        # 处理数据
-                        self.pipeline.process_item(detail)
-                        
-                        # 更新进度
-                        self.state_manager.update_progress(
-                            current_page,
-                            [house_id]
-                        )
-                        
-                        print(f"成功爬取房源: {house_id}")
-                        
-                        # 随机延迟
-                        self._random_delay()
-                        
-                    except Exception as e:
-                        print(f"处理房源{house_id}失败: {e}")
-                        continue
-                
-                # 定期保存进度
-                if current_page % CONFIG['SAVE_INTERVAL'] == 0:
-                    self.state_manager.save_state()
-                    print(f"已保存爬取进度到第{current_page}页")
-                
+            while self.crawl_page(current_page):
                 current_page += 1
                 
         except KeyboardInterrupt:
             print("\n检测到中断信号，正在保存进度...")
+            self._close_parse_pool()
+            self._close_enricher(wait=False)
+            self._flush_pipeline()
             self.state_manager.save_state()
             print("进度已保存，爬虫已安全停止")
             
         except Exception as e:
             print(f"爬虫运行异常: {e}")
+            self._close_parse_pool()
+            self._flush_pipeline()
             self.state_manager.save_state()
             raise
         
         finally:
             # 保存最终进度
-            self.state_manager.save_state()
+            self.close()
+            self._print_transport_stats()
+            self._stop_metrics()
+            self.transport.close()
             print("爬虫运行完成")
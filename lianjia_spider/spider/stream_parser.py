@@ -0,0 +1,253 @@
+"""
+详情页流式解析模块，边下载边用html.parser按事件提取字段，必需字段齐全后停止下载
+"""
+import time
+import codecs
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+import requests
+from lianjia_spider.spider.parser import Parser
+from lianjia_spider.spider.fast_parser import NON_TEXT_TAGS, require_element
+from lianjia_spider.utils.metrics import REGISTRY
+from lianjia_spider.config.settings import CONFIG
+
+# 没有结束标签的元素，与BeautifulSoup的html.parser树构建器一致
+VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta',
+    'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex',
+    'nextid', 'spacer'
+])
+
+# 必需的区块：标题、总价、单价、房源信息列表、小区、所在区域
+SECTIONS = ('title', 'total_price', 'unit_price', 'base', 'community', 'district')
+
+
+class DetailStreamParser(HTMLParser):
+    """
+    详情页事件解析器
+
+    按BeautifulSoup的规则维护打开的元素栈（结束标签关闭最近的同名元素，找不到时忽略），
+    只收集parse_detail_page用到的元素的文本。各区块的元素都已关闭时complete为True，
+    此时后续内容不会改变find的结果；房源信息列表以第一个li.base的父元素关闭为结束，
+    因此在此之后停止时，页面后部另一个列表中的li.base不会被收集。
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        # 打开的元素: [标签名, 该元素对应的区块名]
+        self._stack: List[list] = []
+        # 正在收集文本的片段列表，按所属元素在栈中的位置分组
+        self._captures: Dict[int, List[List[str]]] = {}
+        self._non_text = 0
+        self._done = set()
+
+        self.title: Optional[List[str]] = None
+        self.total_price: Optional[List[str]] = None
+        self.unit_price: Optional[List[str]] = None
+        # [li文本, label文本]，li中没有span.label时label为None
+        self.base_items: List[list] = []
+        self._base_depth: Optional[int] = None
+        self._item: Optional[list] = None
+        self._community_depth: Optional[int] = None
+        self.community_link: Optional[List[str]] = None
+        self._area_depth: Optional[int] = None
+        self.area_links: List[List[str]] = []
+
+    @property
+    def complete(self) -> bool:
+        """必需的区块是否都已结束"""
+        return len(self._done) == len(SECTIONS)
+
+    def _capture(self) -> List[str]:
+        """收集当前元素内的文本，直到该元素关闭"""
+        parts: List[str] = []
+        self._captures.setdefault(len(self._stack) - 1, []).append(parts)
+        return parts
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in VOID_TAGS:
+            return
+        classes = (dict(attrs).get('class') or '').split()
+        depth = len(self._stack)
+        entry = [tag, None]
+        self._stack.append(entry)
+        if tag in NON_TEXT_TAGS:
+            self._non_text += 1
+
+        if tag == 'h1' and self.title is None and 'main' in classes:
+            self.title = self._capture()
+            entry[1] = 'title'
+        elif tag == 'span':
+            if self.total_price is None and 'total' in classes:
+                self.total_price = self._capture()
+                entry[1] = 'total_price'
+            elif self.unit_price is None and 'unitPriceValue' in classes:
+                self.unit_price = self._capture()
+                entry[1] = 'unit_price'
+            if self._item is not None and self._item[1] is None and 'label' in classes:
+                self._item[1] = self._capture()
+        elif tag == 'li' and 'base' in classes:
+            if self._base_depth is None:
+                self._base_depth = depth - 1
+            self._item = [self._capture(), None]
+            self.base_items.append(self._item)
+            entry[1] = 'item'
+        elif tag == 'div':
+            if self._community_depth is None and 'communityName' in classes:
+                self._community_depth = depth
+            elif self._area_depth is None and 'areaName' in classes:
+                self._area_depth = depth
+        elif tag == 'a':
+            if self._open('community', self._community_depth) and self.community_link is None:
+                self.community_link = self._capture()
+            if self._open('district', self._area_depth):
+                self.area_links.append(self._capture())
+
+    def _open(self, section: str, depth: Optional[int]) -> bool:
+        """区块的容器元素是否已打开且尚未关闭"""
+        return depth is not None and section not in self._done
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                while len(self._stack) > index:
+                    self._pop()
+                return
+
+    def _pop(self) -> None:
+        """关闭栈顶元素，结束其文本收集并记录结束的区块"""
+        depth = len(self._stack) - 1
+        tag, section = self._stack.pop()
+        if tag in NON_TEXT_TAGS:
+            self._non_text -= 1
+        self._captures.pop(depth, None)
+        if section == 'item':
+            self._item = None
+        elif section is not None:
+            self._done.add(section)
+        if depth == self._base_depth:
+            self._done.add('base')
+        if depth == self._community_depth:
+            self._done.add('community')
+        if depth == self._area_depth:
+            self._done.add('district')
+
+    def handle_data(self, data: str) -> None:
+        if self._captures and not self._non_text:
+            for group in self._captures.values():
+                for parts in group:
+                    parts.append(data)
+
+    def result(self, house_id: str) -> Dict:
+        """
+        组装解析结果，字段、键顺序和异常处理与Parser.parse_detail_page一致
+
+        Args:
+            house_id: 房源ID
+
+        Returns:
+            Dict: 房源详细信息
+        """
+        result = {
+            'house_id': house_id,
+            'crawl_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+        try:
+            result['title'] = ''.join(self.title).strip() if self.title is not None else ''
+            result['total_price'] = ''.join(self.total_price).strip() if self.total_price is not None else ''
+            result['unit_price'] = ''.join(self.unit_price).strip() if self.unit_price is not None else ''
+
+            for item, label in self.base_items:
+                if label is None:
+                    continue
+
+                label_raw = ''.join(label)
+                label_text = label_raw.strip().rstrip('：')
+                value = ''.join(item).replace(label_raw, '').strip()
+
+                field_name = Parser.FIELD_MAPPING.get(label_text)
+                if field_name:
+                    result[field_name] = value
+
+            if self._community_depth is not None:
+                result['community'] = ''.join(require_element(self.community_link)).strip()
+
+            if self._area_depth is not None:
+                result['district'] = ' '.join([''.join(a).strip() for a in self.area_links])
+
+        except Exception as e:
+            print(f"解析详情页失败: {e}")
+
+        return result
+
+
+def parse_detail_stream(response: requests.Response, house_id: str, chunk_size: Optional[int] = None,
+                        drain_bytes: Optional[int] = None) -> Dict:
+    """
+    边读取响应体边解析详情页，必需字段齐全后停止读取
+
+    停止时如果已知剩余内容不超过drain_bytes则读完，使连接可以归还连接池复用，
+    否则关闭连接。页面缺少某个区块时读完整个响应体，结果与parse_detail_page相同。
+
+    Args:
+        response: 以stream=True发出的请求的响应
+        house_id: 房源ID
+        chunk_size: 每次读取的字节数，默认使用CONFIG['STREAM_CHUNK_SIZE']
+        drain_bytes: 停止时最多读完的剩余字节数，默认使用CONFIG['STREAM_DRAIN_BYTES']
+
+    Returns:
+        Dict: 房源详细信息
+    """
+    chunk_size = chunk_size or CONFIG['STREAM_CHUNK_SIZE']
+    drain_bytes = CONFIG['STREAM_DRAIN_BYTES'] if drain_bytes is None else drain_bytes
+    # 与response.text一致，响应头没有声明编码时按UTF-8解码
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+    parser = DetailStreamParser()
+    received = 0
+    parse_seconds = 0.0
+    chunks = response.iter_content(chunk_size)
+    try:
+        for chunk in chunks:
+            received += len(chunk)
+            text = decoder.decode(chunk)
+            start = time.perf_counter()
+            parser.feed(text)
+            parse_seconds += time.perf_counter() - start
+            if parser.complete:
+                break
+        else:
+            start = time.perf_counter()
+            parser.feed(decoder.decode(b'', final=True))
+            parser.close()
+            parse_seconds += time.perf_counter() - start
+
+        if parser.complete:
+            remaining = _remaining_bytes(response)
+            if remaining is not None and remaining <= drain_bytes:
+                for chunk in chunks:
+                    received += len(chunk)
+            elif remaining != 0:
+                REGISTRY.inc('detail_streams_stopped')
+    finally:
+        # 已读完的响应连接已归还连接池，未读完的关闭连接
+        response.close()
+
+    if not getattr(response, 'from_cache', False):
+        REGISTRY.inc('bytes_downloaded', received)
+    REGISTRY.observe('parse_detail_seconds', parse_seconds)
+    return parser.result(house_id)
+
+def _remaining_bytes(response: requests.Response) -> Optional[int]:
+    """按Content-Length计算未读取的字节数，未知时返回None"""
+    length = response.headers.get('Content-Length')
+    raw = response.raw
+    if not length or not length.isdigit() or raw is None or not hasattr(raw, 'tell'):
+        return None
+    return max(int(length) - raw.tell(), 0)
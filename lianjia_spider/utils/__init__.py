@@ -2,7 +2,17 @@
 工具模块
 """
 from .headers import HeadersManager
-from .state import StateManager
+from .state import StateManager, JournaledStateManager, create_state_manager
+from .sqlite_state import SQLiteStateManager
+from .bloom import BloomFilter, ScalableBloomFilter, create_id_filter
 from .retry import RetryStrategy, retry_on_failure
+from .transport import HttpTransport, create_transport
+from .http_cache import HttpCache, CachingTransport
+from .archive import PageArchive, create_archive
+from .listing_store import ListingStore, create_listing_store
+from .work_queue import WorkQueue, MemoryWorkQueue, SQLiteWorkQueue, create_work_queue
+from .metrics import MetricsRegistry, MetricsReporter, REGISTRY, timed, create_metrics_reporter
+from .rate_limiter import TokenBucket, RateLimiter, create_rate_limiter
+from .concurrency import AIMDController, AdaptiveSlots, create_concurrency_controller
 
-__all__ = ['HeadersManager', 'StateManager', 'RetryStrategy', 'retry_on_failure']
+__all__ = ['HeadersManager', 'StateManager', 'JournaledStateManager', 'create_state_manager', 'SQLiteStateManager', 'BloomFilter', 'ScalableBloomFilter', 'create_id_filter', 'RetryStrategy', 'retry_on_failure', 'HttpTransport', 'create_transport', 'HttpCache', 'CachingTransport', 'PageArchive', 'create_archive', 'ListingStore', 'create_listing_store', 'WorkQueue', 'MemoryWorkQueue', 'SQLiteWorkQueue', 'create_work_queue', 'MetricsRegistry', 'MetricsReporter', 'REGISTRY', 'timed', 'create_metrics_reporter', 'TokenBucket', 'RateLimiter', 'create_rate_limiter', 'AIMDController', 'AdaptiveSlots', 'create_concurrency_controller']
@@ -0,0 +1,307 @@
+"""
+原始页面归档模块，将抓取的HTML压缩追加到分段文件中，并按房源ID和抓取时间建立偏移索引
+"""
+import os
+import re
+import zlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from lianjia_spider.config.settings import CONFIG
+
+try:
+    import zstandard
+except ImportError:  # zstandard为可选依赖，未安装时使用zlib压缩
+    zstandard = None
+
+DETAIL_URL = re.compile(r'/(\d+)\.html')
+
+# 分段文件扩展名与压缩格式的对应关系
+SEGMENT_SUFFIXES = {'zstd': '.zst', 'zlib': '.zz'}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pages (
+    house_id TEXT,
+    crawl_time TEXT NOT NULL,
+    url TEXT NOT NULL,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_house ON pages (house_id, crawl_time);
+CREATE INDEX IF NOT EXISTS pages_position ON pages (segment, offset);
+'''
+
+class ArchiveRecord(NamedTuple):
+    """归档记录在分段文件中的位置"""
+    house_id: Optional[str]
+    crawl_time: str
+    url: str
+    segment: str
+    offset: int
+    length: int
+
+def _compressor(compression: str):
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=CONFIG['ARCHIVE_LEVEL']).compress
+    return lambda data: zlib.compress(data, 6)
+
+def _decompressor(segment: str):
+    if segment.endswith(SEGMENT_SUFFIXES['zstd']):
+        if zstandard is None:
+            raise ImportError("读取zstd归档需要安装zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress
+    return zlib.decompress
+
+def read_records(archive_dir: str, records: List[ArchiveRecord]) -> Iterator[Tuple[ArchiveRecord, str]]:
+    """
+    按给定顺序读取归档记录，同一分段内的连续记录复用文件句柄
+
+    Args:
+        archive_dir: 归档目录
+        records: 归档记录列表，按(segment, offset)排序时为顺序读取
+
+    Returns:
+        Iterator: (归档记录, HTML)
+    """
+    handle = None
+    current = None
+    decompress = None
+    try:
+        for record in records:
+            if record.segment != current:
+                if handle is not None:
+                    handle.close()
+                current = record.segment
+                handle = open(os.path.join(archive_dir, current), 'rb')
+                decompress = _decompressor(current)
+            handle.seek(record.offset)
+            yield record, decompress(handle.read(record.length)).decode('utf-8')
+    finally:
+        if handle is not None:
+            handle.close()
+
+
+class PageArchive:
+    """
+    原始页面归档
+
+    每个页面单独压缩成一帧追加到当前分段文件，分段超过segment_bytes后新建下一个分段，
+    已写完的分段不再修改。索引保存每个页面的房源ID、抓取时间、分段名、偏移和长度，
+    按分段和偏移排序即可顺序读取整个归档。索引按批提交，进程异常退出时
+    最后一批页面的数据已写入分段但可能没有索引。
+    """
+
+    def __init__(self, archive_dir: str, segment_bytes: Optional[int] = None,
+                 compression: Optional[str] = None, batch_size: Optional[int] = None):
+        """
+        初始化页面归档
+
+        Args:
+            archive_dir: 归档目录
+            segment_bytes: 单个分段文件的大小上限，默认使用CONFIG['ARCHIVE_SEGMENT_BYTES']
+            compression: 压缩格式，auto、zstd或zlib，默认使用CONFIG['ARCHIVE_COMPRESSION']
+            batch_size: 累计多少个页面提交一次索引，默认使用CONFIG['STATE_BATCH_SIZE']
+        """
+        compression = compression or CONFIG['ARCHIVE_COMPRESSION']
+        if compression == 'auto':
+            compression = 'zstd' if zstandard is not None else 'zlib'
+        if compression not in SEGMENT_SUFFIXES:
+            raise ValueError(f"未知的压缩格式: {compression}")
+        if compression == 'zstd' and zstandard is None:
+            raise ImportError("zstd压缩需要安装zstandard: pip install zstandard")
+
+        self.archive_dir = archive_dir
+        self.segment_bytes = segment_bytes or CONFIG['ARCHIVE_SEGMENT_BYTES']
+        self.compression = compression
+        self.batch_size = batch_size or CONFIG['STATE_BATCH_SIZE']
+        os.makedirs(archive_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._compress = _compressor(compression)
+        self._conn = sqlite3.connect(os.path.join(archive_dir, 'index.db'), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._pending = 0
+        self._segment: Optional[str] = None
+        self._handle = None
+
+    def _segments(self) -> List[str]:
+        """按编号排序的分段文件名"""
+        return sorted(name for name in os.listdir(self.archive_dir) if name.startswith('segment-'))
+
+    def _open_segment(self) -> None:
+        """打开最后一个分段继续追加，已满或格式不同时新建分段"""
+        segments = self._segments()
+        suffix = SEGMENT_SUFFIXES[self.compression]
+        if segments:
+            last = segments[-1]
+            size = os.path.getsize(os.path.join(self.archive_dir, last))
+            if last.endswith(suffix) and size < self.segment_bytes:
+                self._segment = last
+            else:
+                self._segment = f"segment-{int(last[8:14]) + 1:06d}{suffix}"
+        else:
+            self._segment = f"segment-000001{suffix}"
+        self._handle = open(os.path.join(self.archive_dir, self._segment), 'ab')
+
+    def append(self, url: str, html: str, house_id: Optional[str] = None,
+               crawl_time: Optional[str] = None) -> ArchiveRecord:
+        """
+        追加一个页面
+
+        Args:
+            url: 页面URL
+            html: 页面HTML
+            house_id: 房源ID，默认从详情页URL中提取，列表页为None
+            crawl_time: 抓取时间，默认为当前时间
+
+        Returns:
+            ArchiveRecord: 页面在归档中的位置
+        """
+        if house_id is None:
+            match = DETAIL_URL.search(url)
+            house_id = match.group(1) if match else None
+        crawl_time = crawl_time or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        frame = self._compress(html.encode('utf-8'))
+
+        with self._lock:
+            if self._handle is None or self._handle.tell() >= self.segment_bytes:
+                self.rotate()
+            offset = self._handle.tell()
+            self._handle.write(frame)
+            record = ArchiveRecord(house_id, crawl_time, url, self._segment, offset, len(frame))
+            self._conn.execute('INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?)', record)
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self.flush()
+        return record
+
+    def rotate(self) -> None:
+        """关闭当前分段，下一个页面写入新的分段"""
+        with self._lock:
+            if self._handle is not None:
+                self.flush()
+                self._handle.close()
+                self._handle = None
+            self._open_segment()
+
+    def flush(self) -> None:
+        """将分段数据写入磁盘并提交索引"""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.flush()
+            self._conn.commit()
+            self._pending = 0
+
+    def lookup(self, house_id: str) -> List[ArchiveRecord]:
+        """
+        查找房源的全部归档版本
+
+        Args:
+            house_id: 房源ID
+
+        Returns:
+            List[ArchiveRecord]: 按抓取时间排序的归档记录
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT * FROM pages WHERE house_id = ? ORDER BY crawl_time, rowid', (str(house_id),)
+            ).fetchall()
+        return [ArchiveRecord(*row) for row in rows]
+
+    def read(self, record: ArchiveRecord) -> str:
+        """
+        读取单个归档页面
+
+        Args:
+            record: 归档记录
+
+        Returns:
+            str: 页面HTML
+        """
+        with self._lock:
+            if record.segment == self._segment and self._handle is not None:
+                self._handle.flush()
+        return next(read_records(self.archive_dir, [record]))[1]
+
+    def records(self, latest_only: bool = True, since: Optional[str] = None,
+                until: Optional[str] = None) -> List[ArchiveRecord]:
+        """
+        列出详情页记录，按分段和偏移排序以便顺序读取
+
+        Args:
+            latest_only: 每个房源只保留最近一次抓取
+            since: 只包含该时间（含）之后抓取的页面，格式与crawl_time相同
+            until: 只包含该时间（含）之前抓取的页面
+
+        Returns:
+            List[ArchiveRecord]: 归档记录
+        """
+        conditions = ['house_id IS NOT NULL']
+        params = []
+        if since:
+            conditions.append('crawl_time >= ?')
+            params.append(since)
+        if until:
+            conditions.append('crawl_time <= ?')
+            params.append(until)
+        where = ' AND '.join(conditions)
+        if latest_only:
+            query = (f'SELECT * FROM pages WHERE rowid IN ('
+                     f'SELECT MAX(rowid) FROM pages WHERE {where} GROUP BY house_id) '
+                     f'ORDER BY segment, offset')
+        else:
+            query = f'SELECT * FROM pages WHERE {where} ORDER BY segment, offset'
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [ArchiveRecord(*row) for row in rows]
+
+    def get_stats(self) -> Dict:
+        """
+        获取归档统计
+
+        Returns:
+            Dict: 页面数、房源数、分段数和压缩后总大小
+        """
+        with self._lock:
+            pages, houses = self._conn.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT house_id) FROM pages'
+            ).fetchone()
+        segments = self._segments()
+        return {
+            'pages': pages,
+            'houses': houses,
+            'segments': len(segments),
+            'bytes': sum(os.path.getsize(os.path.join(self.archive_dir, name)) for name in segments)
+        }
+
+    def close(self) -> None:
+        """写入剩余数据并关闭分段文件和索引"""
+        with self._lock:
+            if self._conn is None:
+                return
+            self.flush()
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            self._conn.close()
+            self._conn = None
+
+def create_archive(data_dir: str) -> Optional[PageArchive]:
+    """
+    根据配置创建页面归档
+
+    Args:
+        data_dir: 数据目录
+
+    Returns:
+        Optional[PageArchive]: CONFIG['ARCHIVE']为False时返回None
+    """
+    if not CONFIG['ARCHIVE']:
+        return None
+    return PageArchive(os.path.join(data_dir, CONFIG['ARCHIVE_DIR']))
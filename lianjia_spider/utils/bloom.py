@@ -0,0 +1,212 @@
+"""
+布隆过滤器模块，位图通过内存映射保存在磁盘文件中，用于在查询已爬取ID之前快速排除新房源
+"""
+import os
+import math
+import mmap
+import glob
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional
+from lianjia_spider.config.settings import CONFIG
+
+def _hashes(key: str):
+    """由一次blake2b摘要得到两个64位哈希值，供双重哈希生成k个位置"""
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """
+    固定容量的布隆过滤器
+
+    位数组是一个内存映射文件，不占用Python堆内存，由操作系统按需换入换出。
+    插入数量不超过capacity时误判率不超过error_rate。
+    """
+
+    def __init__(self, path: str, capacity: int, error_rate: float):
+        """
+        创建空的布隆过滤器，已存在的文件被覆盖
+
+        Args:
+            path: 位图文件路径
+            capacity: 设计容量
+            error_rate: 达到设计容量时的误判率
+        """
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            f.truncate((self.num_bits + 7) // 8)
+        self._file = open(path, 'r+b')
+        self._bits = mmap.mmap(self._file.fileno(), 0)
+
+    def _positions(self, key: str) -> List[int]:
+        h1, h2 = _hashes(key)
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: str) -> None:
+        """插入一个键"""
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def full(self) -> bool:
+        """是否已达到设计容量"""
+        return self.count >= self.capacity
+
+    def estimated_error_rate(self) -> float:
+        """按当前插入数量估算的误判率"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def flush(self) -> None:
+        """将位图写回磁盘"""
+        self._bits.flush()
+
+    def close(self) -> None:
+        """写回并关闭位图文件"""
+        if self._bits is not None:
+            self._bits.flush()
+            self._bits.close()
+            self._file.close()
+            self._bits = None
+
+
+class ScalableBloomFilter:
+    """
+    可扩容的布隆过滤器
+
+    当前分片达到设计容量时新建一个容量乘以growth、误判率乘以tightening的分片，
+    各分片误判率之和收敛于error_rate。查询在所有分片中进行。
+    同时统计查询次数、由过滤器直接排除的次数和误判次数，误判由调用方在
+    查询精确集合后通过record_false_positive报告。
+    """
+
+    def __init__(self, directory: str, error_rate: Optional[float] = None,
+                 initial_capacity: Optional[int] = None, growth: int = 2, tightening: float = 0.5):
+        """
+        初始化可扩容布隆过滤器，目录中已有的分片文件被删除
+
+        Args:
+            directory: 分片文件目录
+            error_rate: 总误判率上限，默认使用CONFIG['ID_FILTER_ERROR_RATE']
+            initial_capacity: 第一个分片的容量，默认使用CONFIG['ID_FILTER_CAPACITY']
+            growth: 每个新分片的容量倍数
+            tightening: 每个新分片的误判率系数
+        """
+        self.directory = directory
+        self.error_rate = error_rate or CONFIG['ID_FILTER_ERROR_RATE']
+        self.initial_capacity = initial_capacity or CONFIG['ID_FILTER_CAPACITY']
+        self.growth = growth
+        self.tightening = tightening
+        self._lock = threading.Lock()
+        self.slices: List[BloomFilter] = []
+        self.lookups = 0
+        self.negatives = 0
+        self.false_positives = 0
+        self.clear()
+
+    def clear(self, expected: int = 0) -> None:
+        """
+        删除全部分片并新建第一个分片
+
+        Args:
+            expected: 预计插入的数量，第一个分片按其两倍预留容量
+        """
+        with self._lock:
+            for bloom in self.slices:
+                bloom.close()
+            for path in glob.glob(os.path.join(self.directory, 'slice-*.bloom')):
+                os.remove(path)
+            self.slices = []
+            self._add_slice(max(self.initial_capacity, expected * 2))
+
+    def _add_slice(self, capacity: int) -> None:
+        # 第i个分片的误判率为error_rate*(1-r)*r^i，总和不超过error_rate
+        error_rate = self.error_rate * (1 - self.tightening) * self.tightening ** len(self.slices)
+        path = os.path.join(self.directory, f'slice-{len(self.slices)}.bloom')
+        self.slices.append(BloomFilter(path, capacity, error_rate))
+
+    def add(self, key: str) -> None:
+        """插入一个键"""
+        with self._lock:
+            if self.slices[-1].full:
+                self._add_slice(self.slices[-1].capacity * self.growth)
+            self.slices[-1].add(key)
+
+    def update(self, keys: Iterable[str]) -> None:
+        """插入多个键"""
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        self.lookups += 1
+        if any(key in bloom for bloom in self.slices):
+            return True
+        self.negatives += 1
+        return False
+
+    def __len__(self) -> int:
+        return sum(bloom.count for bloom in self.slices)
+
+    def record_false_positive(self) -> None:
+        """记录一次误判：过滤器判断可能存在，精确集合中不存在"""
+        self.false_positives += 1
+
+    def get_stats(self) -> Dict:
+        """
+        获取过滤器统计
+
+        Returns:
+            Dict: 分片数、位图字节数、键数量、配置和估算的误判率、查询和误判次数
+        """
+        return {
+            'slices': len(self.slices),
+            'bytes': sum((bloom.num_bits + 7) // 8 for bloom in self.slices),
+            'count': len(self),
+            'target_error_rate': self.error_rate,
+            'estimated_error_rate': sum(bloom.estimated_error_rate() for bloom in self.slices),
+            'lookups': self.lookups,
+            'negatives': self.negatives,
+            'false_positives': self.false_positives,
+            # 不在集合中的键被误判为存在的比例
+            'observed_error_rate': self.false_positives / (self.negatives + self.false_positives)
+                                   if self.negatives + self.false_positives else 0.0,
+            'skip_ratio': self.negatives / self.lookups if self.lookups else 0.0
+        }
+
+    def flush(self) -> None:
+        """将全部分片写回磁盘"""
+        with self._lock:
+            for bloom in self.slices:
+                bloom.flush()
+
+    def close(self) -> None:
+        """关闭全部分片"""
+        with self._lock:
+            for bloom in self.slices:
+                bloom.close()
+
+
+def create_id_filter(data_dir: str) -> Optional[ScalableBloomFilter]:
+    """
+    按配置创建已爬取ID的布隆过滤器
+
+    Args:
+        data_dir: 数据目录，分片文件位于其下的ID_FILTER_DIR
+
+    Returns:
+        Optional[ScalableBloomFilter]: 未启用时返回None
+    """
+    if not CONFIG['ID_FILTER']:
+        return None
+    return ScalableBloomFilter(os.path.join(data_dir, CONFIG['ID_FILTER_DIR']))
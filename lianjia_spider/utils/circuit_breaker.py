@@ -0,0 +1,149 @@
+"""
+熔断模块，失败率过高时暂停整个抓取，等待后先发出一个探测请求再恢复
+"""
+import time
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+from lianjia_spider.utils.metrics import REGISTRY
+from lianjia_spider.config.settings import CONFIG
+
+# 熔断器状态
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# 计为失败的状态码：被拦截、限流和服务器错误
+FAILURE_STATUSES = frozenset([403, 429, 500, 502, 503, 504])
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    关闭状态下记录最近window个请求的结果，请求数不少于min_requests且失败率达到failure_rate时打开。
+    打开期间before_request阻塞所有请求，即暂停整个抓取；open_seconds秒（响应带Retry-After时
+    取两者中较大的值）后进入半开状态，只放行一个探测请求，其他请求继续等待。
+    探测成功则关闭并清空窗口；失败则重新打开，暂停时间加倍，最长max_open_seconds秒。
+    同一个实例可以在多个线程和爬虫实例之间共享，每个请求在同一线程中先调用before_request再调用record。
+    """
+
+    def __init__(self, window: Optional[int] = None, min_requests: Optional[int] = None,
+                 failure_rate: Optional[float] = None, open_seconds: Optional[float] = None,
+                 max_open_seconds: Optional[float] = None):
+        """
+        初始化熔断器
+
+        Args:
+            window: 统计失败率的最近请求数，默认使用CONFIG['CIRCUIT_WINDOW']
+            min_requests: 判断失败率所需的最少请求数，默认使用CONFIG['CIRCUIT_MIN_REQUESTS']
+            failure_rate: 打开熔断器的失败率，默认使用CONFIG['CIRCUIT_FAILURE_RATE']
+            open_seconds: 打开后暂停的秒数，默认使用CONFIG['CIRCUIT_OPEN_SECONDS']
+            max_open_seconds: 探测连续失败时暂停时间的上限，默认使用CONFIG['CIRCUIT_MAX_OPEN_SECONDS']
+        """
+        self.window = window or CONFIG['CIRCUIT_WINDOW']
+        self.min_requests = min(min_requests or CONFIG['CIRCUIT_MIN_REQUESTS'], self.window)
+        self.failure_rate = failure_rate or CONFIG['CIRCUIT_FAILURE_RATE']
+        self.open_seconds = open_seconds if open_seconds is not None else CONFIG['CIRCUIT_OPEN_SECONDS']
+        self.max_open_seconds = max(
+            max_open_seconds if max_open_seconds is not None else CONFIG['CIRCUIT_MAX_OPEN_SECONDS'],
+            self.open_seconds
+        )
+
+        self.state = CLOSED
+        self.opened = 0
+        self.paused_seconds = 0.0
+        self._outcomes: Deque[bool] = deque(maxlen=self.window)
+        self._backoff = self.open_seconds
+        self._open_until = 0.0
+        self._probing = False
+        self._local = threading.local()
+        self._cond = threading.Condition()
+
+    def before_request(self) -> None:
+        """请求前调用，熔断器打开时等待；半开状态下当前线程成为探测请求或继续等待"""
+        start = time.monotonic()
+        with self._cond:
+            while self.state != CLOSED:
+                now = time.monotonic()
+                if self.state == OPEN:
+                    if now < self._open_until:
+                        self._cond.wait(self._open_until - now)
+                        continue
+                    self._transition(HALF_OPEN)
+                    print("熔断器半开，发送探测请求")
+                if not self._probing:
+                    self._probing = True
+                    self._local.probe = True
+                    break
+                self._cond.wait()
+        waited = time.monotonic() - start
+        if waited > 0.001:
+            with self._cond:
+                self.paused_seconds += waited
+            REGISTRY.observe('circuit_wait_seconds', waited)
+
+    def record(self, success: bool, retry_after: Optional[float] = None) -> None:
+        """
+        记录一个请求的结果
+
+        Args:
+            success: 请求是否正常，被拦截、限流、服务器错误和连接失败为False
+            retry_after: 响应的Retry-After秒数，打开熔断器时暂停时间不少于该值
+        """
+        with self._cond:
+            if getattr(self._local, 'probe', False):
+                self._local.probe = False
+                self._probing = False
+                if success:
+                    self._outcomes.clear()
+                    self._backoff = self.open_seconds
+                    self._transition(CLOSED)
+                    print("探测请求成功，熔断器关闭，恢复抓取")
+                else:
+                    self._backoff = min(self._backoff * 2, self.max_open_seconds)
+                    self._open(retry_after, "探测请求失败")
+                self._cond.notify_all()
+                return
+
+            if self.state != CLOSED:
+                # 打开之前已发出的请求，结果不影响熔断器
+                return
+            self._outcomes.append(success)
+            total = len(self._outcomes)
+            failures = total - sum(self._outcomes)
+            if total >= self.min_requests and failures >= self.failure_rate * total:
+                self._open(retry_after, f"最近{total}个请求中{failures}个失败")
+
+    def _open(self, retry_after: Optional[float], reason: str) -> None:
+        """打开熔断器，调用方持有锁"""
+        seconds = max(self._backoff, min(retry_after or 0.0, self.max_open_seconds))
+        self._open_until = time.monotonic() + seconds
+        self.opened += 1
+        self._transition(OPEN)
+        print(f"{reason}，熔断器打开，暂停抓取{seconds:.0f}秒")
+
+    def _transition(self, state: str) -> None:
+        """切换状态并计数，调用方持有锁"""
+        self.state = state
+        REGISTRY.inc(f'circuit_{state}')
+
+    def get_stats(self) -> Dict:
+        """
+        获取熔断统计
+
+        Returns:
+            Dict: 当前状态、打开次数和请求累计等待秒数（多个请求同时等待时分别累计）
+        """
+        with self._cond:
+            return {'state': self.state, 'opened': self.opened, 'paused_seconds': round(self.paused_seconds, 3)}
+
+def create_circuit_breaker() -> Optional[CircuitBreaker]:
+    """
+    根据配置创建熔断器
+
+    Returns:
+        Optional[CircuitBreaker]: CONFIG['CIRCUIT_BREAKER']为False时返回None
+    """
+    if not CONFIG['CIRCUIT_BREAKER']:
+        return None
+    return CircuitBreaker()
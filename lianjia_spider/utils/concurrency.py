@@ -0,0 +1,234 @@
+"""
+自适应并发控制模块，按响应延迟和错误率调整并发上限和请求速率
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+from lianjia_spider.utils.rate_limiter import RateLimiter
+from lianjia_spider.config.settings import CONFIG
+
+# 表示服务器过载的状态码，出现时降低并发
+OVERLOAD_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+class AIMDController:
+    """
+    AIMD（加性增、乘性减）并发控制器
+
+    每完成约limit个正常请求，并发上限加1、请求速率加rate_step；
+    出现429/5xx、连接失败或延迟超过latency_target时，并发上限和速率乘以backoff。
+    降低后的cooldown秒内不再重复降低，避免同一批在途请求的失败被重复计算。
+    每次调整都会发布新的设定值：保存在history中、通知订阅者，并追加写入setpoint_file。
+    """
+
+    def __init__(self, initial_limit: Optional[int] = None, min_limit: Optional[int] = None,
+                 max_limit: Optional[int] = None, latency_target: Optional[float] = None,
+                 backoff: Optional[float] = None, cooldown: Optional[float] = None,
+                 rate_limiter: Optional[RateLimiter] = None, rate_step: Optional[float] = None,
+                 min_rate: Optional[float] = None, max_rate: Optional[float] = None,
+                 setpoint_file: Optional[str] = None):
+        """
+        初始化并发控制器
+
+        Args:
+            initial_limit: 初始并发上限，默认使用CONFIG['CONCURRENCY']
+            min_limit: 并发上限的下限，默认使用CONFIG['AIMD_MIN_LIMIT']
+            max_limit: 并发上限的上限，默认使用CONFIG['AIMD_MAX_LIMIT']
+            latency_target: 单个请求的目标延迟（秒），超过视为过载，默认使用CONFIG['AIMD_LATENCY_TARGET']
+            backoff: 过载时的乘性减小系数，默认使用CONFIG['AIMD_BACKOFF']
+            cooldown: 两次减小之间的最短间隔（秒），默认使用CONFIG['AIMD_COOLDOWN']
+            rate_limiter: 同步调整速率的限速器，为None时只调整并发上限
+            rate_step: 每次加性增加的速率（请求/秒），默认使用CONFIG['AIMD_RATE_STEP']
+            min_rate: 速率下限，默认使用CONFIG['AIMD_MIN_RATE']
+            max_rate: 速率上限，默认使用CONFIG['AIMD_MAX_RATE']
+            setpoint_file: 设定值变化的JSON Lines输出文件，为None时不写文件
+        """
+        self.min_limit = min_limit or CONFIG['AIMD_MIN_LIMIT']
+        self.max_limit = max_limit or CONFIG['AIMD_MAX_LIMIT']
+        self.latency_target = latency_target or CONFIG['AIMD_LATENCY_TARGET']
+        self.backoff = backoff or CONFIG['AIMD_BACKOFF']
+        self.cooldown = cooldown if cooldown is not None else CONFIG['AIMD_COOLDOWN']
+        self.rate_limiter = rate_limiter
+        self.rate_step = rate_step or CONFIG['AIMD_RATE_STEP']
+        self.min_rate = min_rate or CONFIG['AIMD_MIN_RATE']
+        self.max_rate = max_rate or CONFIG['AIMD_MAX_RATE']
+        self.setpoint_file = setpoint_file
+
+        initial = initial_limit or CONFIG['CONCURRENCY']
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._rate = rate_limiter.rate if rate_limiter is not None else None
+        self._successes = 0
+        self._last_decrease = float('-inf')
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[Dict], None]] = []
+        self.history: Deque[Dict] = deque(maxlen=1000)
+        self.counters = {'requests': 0, 'overloads': 0, 'slow': 0, 'errors': 0,
+                         'increases': 0, 'decreases': 0}
+
+        if self.setpoint_file:
+            setpoint_dir = os.path.dirname(self.setpoint_file)
+            if setpoint_dir:
+                os.makedirs(setpoint_dir, exist_ok=True)
+        self._publish('init')
+
+    @property
+    def limit(self) -> int:
+        """当前并发上限"""
+        return int(self._limit)
+
+    @property
+    def rate(self) -> Optional[float]:
+        """当前请求速率（请求/秒），未关联限速器时为None"""
+        return self._rate
+
+    @property
+    def setpoint(self) -> Dict:
+        """当前设定值"""
+        with self._lock:
+            return self._setpoint('current')
+
+    def subscribe(self, callback: Callable[[Dict], None]) -> None:
+        """
+        订阅设定值变化
+
+        Args:
+            callback: 每次调整后调用，参数为设定值字典
+        """
+        self._listeners.append(callback)
+
+    def record(self, latency: float, status: Optional[int]) -> None:
+        """
+        记录一次请求的结果
+
+        Args:
+            latency: 请求耗时（秒）
+            status: HTTP状态码，连接失败等没有响应时为None
+        """
+        with self._lock:
+            self.counters['requests'] += 1
+            if status is None:
+                self.counters['errors'] += 1
+                self._decrease('error')
+            elif status in OVERLOAD_STATUSES:
+                self.counters['overloads'] += 1
+                self._decrease(f'status_{status}')
+            elif latency > self.latency_target:
+                self.counters['slow'] += 1
+                self._decrease('latency')
+            elif status < 400:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self._increase()
+            # 其余4xx与服务器负载无关，不调整
+
+    def _increase(self) -> None:
+        """加性增加"""
+        self._successes = 0
+        limit = min(self._limit + 1, self.max_limit)
+        rate = self._rate
+        if rate is not None:
+            rate = min(rate + self.rate_step, self.max_rate)
+        if limit == self._limit and rate == self._rate:
+            return
+        self.counters['increases'] += 1
+        self._apply(limit, rate, 'increase')
+
+    def _decrease(self, reason: str) -> None:
+        """乘性减小，冷却期内只减小一次"""
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._successes = 0
+        limit = max(self._limit * self.backoff, self.min_limit)
+        rate = self._rate
+        if rate is not None:
+            rate = max(rate * self.backoff, self.min_rate)
+        self.counters['decreases'] += 1
+        self._apply(limit, rate, reason)
+
+    def _apply(self, limit: float, rate: Optional[float], reason: str) -> None:
+        """应用新的设定值并发布"""
+        self._limit = limit
+        if rate is not None and rate != self._rate:
+            self._rate = rate
+            self.rate_limiter.set_rate(rate)
+        self._publish(reason)
+
+    def _setpoint(self, reason: str) -> Dict:
+        return {
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+            'limit': self.limit,
+            'rate': round(self._rate, 4) if self._rate is not None else None,
+            'reason': reason
+        }
+
+    def _publish(self, reason: str) -> None:
+        """记录设定值并通知订阅者"""
+        setpoint = self._setpoint(reason)
+        self.history.append(setpoint)
+        if self.setpoint_file:
+            try:
+                with open(self.setpoint_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(setpoint, ensure_ascii=False) + '\n')
+            except Exception as e:
+                print(f"写入并发设定值失败: {e}")
+        for callback in self._listeners:
+            callback(setpoint)
+
+
+class AdaptiveSlots:
+    """
+    并发上限可变的异步信号量
+
+    每次获取槽位时读取控制器的当前上限；上限降低时已在进行的请求不受影响，
+    新请求等到在途数量降到上限以下才开始。
+    """
+
+    def __init__(self, controller: AIMDController):
+        """
+        初始化异步槽位
+
+        Args:
+            controller: 提供并发上限的控制器
+        """
+        self.controller = controller
+        self.in_use = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self) -> 'AdaptiveSlots':
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_use < self.controller.limit)
+            self.in_use += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        async with self._condition:
+            self.in_use -= 1
+            self._condition.notify_all()
+
+def create_concurrency_controller(rate_limiter: Optional[RateLimiter] = None,
+                                  initial_limit: Optional[int] = None,
+                                  data_dir: Optional[str] = None) -> Optional[AIMDController]:
+    """
+    根据配置创建并发控制器
+
+    Args:
+        rate_limiter: 需要同步调整速率的限速器
+        initial_limit: 初始并发上限，默认使用CONFIG['CONCURRENCY']
+        data_dir: 设定值文件所在目录，默认使用CONFIG['DATA_DIR']
+
+    Returns:
+        Optional[AIMDController]: CONFIG['ADAPTIVE_CONCURRENCY']为False时返回None
+    """
+    if not CONFIG['ADAPTIVE_CONCURRENCY']:
+        return None
+    setpoint_file = None
+    if CONFIG['AIMD_SETPOINT_FILE']:
+        setpoint_file = os.path.join(data_dir or CONFIG['DATA_DIR'], CONFIG['AIMD_SETPOINT_FILE'])
+    return AIMDController(initial_limit=initial_limit, rate_limiter=rate_limiter,
+                          setpoint_file=setpoint_file)
@@ -0,0 +1,388 @@
+"""
+HTTP响应缓存模块，将页面内容压缩保存在磁盘上并按ETag/Last-Modified条件重新验证
+"""
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+import requests
+from typing import Dict, Iterator, NamedTuple, Optional
+from requests.structures import CaseInsensitiveDict
+from lianjia_spider.utils.transport import HttpTransport
+from lianjia_spider.config.settings import CONFIG
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    content_type TEXT,
+    encoding TEXT,
+    stored_at REAL NOT NULL,
+    validated_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    refs INTEGER NOT NULL
+);
+'''
+
+class CacheEntry(NamedTuple):
+    """缓存条目"""
+    url: str
+    digest: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_type: Optional[str]
+    encoding: Optional[str]
+    stored_at: float
+    validated_at: float
+
+
+class HttpCache:
+    """
+    磁盘HTTP响应缓存
+
+    响应体按内容的SHA-256摘要保存为zlib压缩文件，内容相同的页面只保存一份；
+    URL到摘要、验证器和时间戳的索引保存在SQLite中。
+    缓存的压缩文件总大小超过max_bytes时，按最近访问时间淘汰最久未使用的条目。
+    """
+
+    def __init__(self, cache_dir: str, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        """
+        初始化响应缓存
+
+        Args:
+            cache_dir: 缓存目录
+            ttl: 条目验证后的有效期（秒），有效期内直接使用缓存，默认使用CONFIG['HTTP_CACHE_TTL']
+            max_bytes: 压缩后响应体的总大小上限，默认使用CONFIG['HTTP_CACHE_MAX_BYTES']
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl if ttl is not None else CONFIG['HTTP_CACHE_TTL']
+        self.max_bytes = max_bytes or CONFIG['HTTP_CACHE_MAX_BYTES']
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, 'index.db'), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self.total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM objects').fetchone()[0]
+        self.evictions = 0
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.z")
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """
+        查找URL对应的缓存条目
+
+        Args:
+            url: 页面URL
+
+        Returns:
+            Optional[CacheEntry]: 缓存条目，不存在时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT url, digest, etag, last_modified, content_type, encoding, stored_at, validated_at '
+                'FROM entries WHERE url = ?', (url,)
+            ).fetchone()
+        return CacheEntry(*row) if row else None
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """
+        判断条目是否仍在有效期内
+
+        Args:
+            entry: 缓存条目
+
+        Returns:
+            bool: 有效期内返回True，无需访问网络
+        """
+        return time.time() - entry.validated_at < self.ttl
+
+    def read(self, entry: CacheEntry) -> Optional[bytes]:
+        """
+        读取条目的响应体并更新访问时间
+
+        Args:
+            entry: 缓存条目
+
+        Returns:
+            Optional[bytes]: 解压后的响应体，文件丢失或损坏时删除条目并返回None
+        """
+        try:
+            with open(self._object_path(entry.digest), 'rb') as f:
+                body = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            with self._lock:
+                self._delete_entry(entry.url)
+                self._conn.commit()
+            return None
+        with self._lock:
+            self._conn.execute('UPDATE entries SET accessed_at = ? WHERE url = ?', (time.time(), entry.url))
+            self._conn.commit()
+        return body
+
+    def store(self, url: str, response: requests.Response) -> None:
+        """
+        保存响应
+
+        Args:
+            url: 页面URL
+            response: 状态码为200的响应
+        """
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        now = time.time()
+        with self._lock:
+            # 先删除旧条目，内容未变化时旧文件随即重新写入
+            self._delete_entry(url)
+            row = self._conn.execute('SELECT size FROM objects WHERE digest = ?', (digest,)).fetchone()
+            if row is None or not os.path.exists(path):
+                data = zlib.compress(body, 6)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                if row is None:
+                    self._conn.execute('INSERT INTO objects (digest, size, refs) VALUES (?, ?, 0)',
+                                       (digest, len(data)))
+                    self.total_bytes += len(data)
+
+            self._conn.execute(
+                'INSERT INTO entries (url, digest, etag, last_modified, content_type, encoding, '
+                'stored_at, validated_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, digest, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 response.headers.get('Content-Type'), response.encoding, now, now, now)
+            )
+            self._conn.execute('UPDATE objects SET refs = refs + 1 WHERE digest = ?', (digest,))
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, entry: CacheEntry, response: requests.Response) -> None:
+        """
+        服务器返回304后更新验证时间和验证器
+
+        Args:
+            entry: 缓存条目
+            response: 304响应
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'UPDATE entries SET validated_at = ?, accessed_at = ?, '
+                'etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?',
+                (now, now, response.headers.get('ETag'), response.headers.get('Last-Modified'), entry.url)
+            )
+            self._conn.commit()
+
+    def _delete_entry(self, url: str) -> None:
+        """删除条目，响应体不再被引用时一并删除"""
+        row = self._conn.execute('SELECT digest FROM entries WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return
+        digest = row[0]
+        self._conn.execute('DELETE FROM entries WHERE url = ?', (url,))
+        self._conn.execute('UPDATE objects SET refs = refs - 1 WHERE digest = ?', (digest,))
+        obj = self._conn.execute('SELECT size, refs FROM objects WHERE digest = ?', (digest,)).fetchone()
+        if obj is not None and obj[1] <= 0:
+            self._conn.execute('DELETE FROM objects WHERE digest = ?', (digest,))
+            self.total_bytes -= obj[0]
+            try:
+                os.remove(self._object_path(digest))
+            except OSError:
+                pass
+
+    def _evict(self) -> None:
+        """按最近访问时间淘汰条目，直到总大小不超过上限"""
+        while self.total_bytes > self.max_bytes:
+            row = self._conn.execute(
+                'SELECT url FROM entries ORDER BY accessed_at LIMIT 1'
+            ).fetchone()
+            if row is None:
+                break
+            self._delete_entry(row[0])
+            self.evictions += 1
+
+    def iter_entries(self) -> Iterator[CacheEntry]:
+        """
+        按首次保存的顺序遍历全部条目
+
+        Returns:
+            Iterator[CacheEntry]: 缓存条目
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT url, digest, etag, last_modified, content_type, encoding, stored_at, validated_at '
+                'FROM entries ORDER BY stored_at, rowid'
+            ).fetchall()
+        for row in rows:
+            yield CacheEntry(*row)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def close(self) -> None:
+        """关闭索引数据库"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class CachingTransport(HttpTransport):
+    """
+    带磁盘缓存的传输层
+
+    有效期内的页面直接从缓存返回；过期的页面携带If-None-Match/If-Modified-Since
+    重新请求，服务器返回304时使用缓存内容并刷新有效期。
+    """
+
+    def __init__(self, cache: Optional[HttpCache] = None, **kwargs):
+        """
+        初始化带缓存的传输层
+
+        Args:
+            cache: 响应缓存，默认在CONFIG['DATA_DIR']下的CONFIG['HTTP_CACHE_DIR']目录创建
+            **kwargs: 传给HttpTransport的连接池参数
+        """
+        super().__init__(**kwargs)
+        if cache is None:
+            cache = HttpCache(os.path.join(CONFIG['DATA_DIR'], CONFIG['HTTP_CACHE_DIR']))
+        self.cache = cache
+        self._cache_stats = {'hits': 0, 'revalidated': 0, 'misses': 0}
+
+    def is_fresh(self, url: str) -> bool:
+        """
+        判断URL是否可以直接从缓存返回
+
+        Args:
+            url: 页面URL
+
+        Returns:
+            bool: 缓存存在且在有效期内
+        """
+        entry = self.cache.lookup(url)
+        return entry is not None and self.cache.is_fresh(entry)
+
+    def get_cached(self, url: str) -> Optional[requests.Response]:
+        """
+        在一次缓存查找中判断有效期并读取内容
+
+        Args:
+            url: 页面URL
+
+        Returns:
+            Optional[requests.Response]: 有效期内的缓存响应，缓存不存在、已过期或内容丢失时为None
+        """
+        entry = self.cache.lookup(url)
+        if entry is None or not self.cache.is_fresh(entry):
+            return None
+        body = self.cache.read(entry)
+        if body is None:
+            return None
+        self._count('hits')
+        return cached_response(entry, body)
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 30,
+            stream: bool = False) -> requests.Response:
+        """
+        发送GET请求，优先使用缓存
+
+        Args:
+            url: 请求URL
+            headers: 本次请求的请求头
+            timeout: 超时时间（秒）
+            stream: 缓存需要完整的响应体，忽略该参数，始终读取全部内容
+
+        Returns:
+            requests.Response: 响应对象，来自缓存时from_cache为True
+        """
+        entry = self.cache.lookup(url)
+        if entry is not None and self.cache.is_fresh(entry):
+            body = self.cache.read(entry)
+            if body is not None:
+                self._count('hits')
+                return cached_response(entry, body)
+            entry = None
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                request_headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                request_headers['If-Modified-Since'] = entry.last_modified
+
+        response = super().get(url, headers=request_headers, timeout=timeout)
+        if response.status_code == 304 and entry is not None:
+            body = self.cache.read(entry)
+            if body is not None:
+                self.cache.refresh(entry, response)
+                self._count('revalidated')
+                return cached_response(entry, body)
+            # 缓存内容已丢失，去掉条件头重新请求
+            response = super().get(url, headers=headers, timeout=timeout)
+
+        self._count('misses')
+        if response.status_code == 200:
+            self.cache.store(url, response)
+        return response
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._cache_stats[name] += 1
+
+    def get_stats(self) -> Dict:
+        """
+        获取连接复用和缓存统计
+
+        Returns:
+            Dict: HttpTransport的统计，另含cache_hits、cache_revalidated、cache_misses
+        """
+        stats = super().get_stats()
+        with self._lock:
+            for name, value in self._cache_stats.items():
+                stats[f'cache_{name}'] = value
+        stats['cache_evictions'] = self.cache.evictions
+        return stats
+
+    def close(self) -> None:
+        """关闭连接和缓存索引"""
+        super().close()
+        self.cache.close()
+
+def cached_response(entry: CacheEntry, body: bytes) -> requests.Response:
+    """
+    由缓存内容构造响应对象
+
+    Args:
+        entry: 缓存条目
+        body: 响应体
+
+    Returns:
+        requests.Response: 状态码为200的响应
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.url = entry.url
+    response._content = body
+    response.encoding = entry.encoding
+    response.headers = CaseInsensitiveDict({
+        key: value for key, value in (('Content-Type', entry.content_type), ('ETag', entry.etag),
+                                      ('Last-Modified', entry.last_modified)) if value
+    })
+    response.from_cache = True
+    return response
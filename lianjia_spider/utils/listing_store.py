@@ -0,0 +1,173 @@
+"""
+列表页字段快照模块，记录每个房源最近一次的标题和价格，供增量抓取判断房源是否变化
+"""
+import os
+import csv
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from lianjia_spider.config.settings import CONFIG
+
+# 参与比较的列表页字段
+WATCHED_FIELDS = ('title', 'total_price', 'unit_price')
+
+# 价格变化历史文件表头
+HISTORY_HEADERS = ['房源ID', '变更时间', '原标题', '标题', '原总价', '总价', '原单价', '单价']
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS listings (
+    house_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    total_price TEXT NOT NULL,
+    unit_price TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    changed_at TEXT NOT NULL
+);
+'''
+
+# compare的返回值
+NEW = 'new'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+
+class ListingStore:
+    """
+    列表页字段快照
+
+    以房源ID为键保存上次抓取时列表页的标题、总价和单价。
+    字段有变化的房源在record时向历史文件追加一行，记录变化前后的值。
+    快照按批提交，历史文件在提交快照之前写入磁盘；进程异常退出时
+    最后一批变化会在下次运行时重新检测到并再次记录。
+    """
+
+    def __init__(self, db_path: str, history_file: str, batch_size: Optional[int] = None):
+        """
+        初始化列表页字段快照
+
+        Args:
+            db_path: 快照数据库路径
+            history_file: 价格变化历史CSV文件路径
+            batch_size: 累计多少次更新提交一次事务，默认使用CONFIG['STATE_BATCH_SIZE']
+        """
+        self.db_path = db_path
+        self.history_file = history_file
+        self.batch_size = batch_size or CONFIG['STATE_BATCH_SIZE']
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        os.makedirs(os.path.dirname(history_file) or '.', exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._pending = 0
+
+        new_file = not os.path.exists(history_file)
+        self._history = open(history_file, 'a', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._history)
+        if new_file:
+            self._writer.writerow(HISTORY_HEADERS)
+        self.changes = 0
+
+    def _snapshot(self, house_id: str) -> Optional[Tuple[str, str, str]]:
+        row = self._conn.execute(
+            'SELECT title, total_price, unit_price FROM listings WHERE house_id = ?', (str(house_id),)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    @staticmethod
+    def _values(house: Dict) -> Tuple[str, str, str]:
+        return tuple(str(house.get(field) or '') for field in WATCHED_FIELDS)
+
+    def compare(self, house: Dict) -> str:
+        """
+        将列表页字段与快照比较
+
+        Args:
+            house: parse_list_page返回的房源
+
+        Returns:
+            str: 'new'表示没有快照，'changed'表示标题或价格变化，'unchanged'表示没有变化
+        """
+        with self._lock:
+            snapshot = self._snapshot(house['house_id'])
+        if snapshot is None:
+            return NEW
+        return UNCHANGED if snapshot == self._values(house) else CHANGED
+
+    def record(self, house: Dict, crawl_time: Optional[str] = None) -> str:
+        """
+        保存列表页字段，字段有变化时追加历史记录
+
+        Args:
+            house: parse_list_page返回的房源
+            crawl_time: 抓取时间，默认为当前时间
+
+        Returns:
+            str: 与compare相同的比较结果
+        """
+        house_id = str(house['house_id'])
+        values = self._values(house)
+        now = crawl_time or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            snapshot = self._snapshot(house_id)
+            if snapshot is None:
+                status = NEW
+                self._conn.execute(
+                    'INSERT INTO listings VALUES (?, ?, ?, ?, ?, ?, ?)', (house_id, *values, now, now, now)
+                )
+            elif snapshot == values:
+                status = UNCHANGED
+                self._conn.execute('UPDATE listings SET last_seen = ? WHERE house_id = ?', (now, house_id))
+            else:
+                status = CHANGED
+                self._writer.writerow([house_id, now, snapshot[0], values[0], snapshot[1], values[1],
+                                       snapshot[2], values[2]])
+                self.changes += 1
+                self._conn.execute(
+                    'UPDATE listings SET title = ?, total_price = ?, unit_price = ?, last_seen = ?, '
+                    'changed_at = ? WHERE house_id = ?', (*values, now, now, house_id)
+                )
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self.flush()
+        return status
+
+    def flush(self) -> None:
+        """将历史记录写入磁盘并提交快照"""
+        with self._lock:
+            self._history.flush()
+            self._conn.commit()
+            self._pending = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM listings').fetchone()[0]
+
+    def close(self) -> None:
+        """提交剩余更新并关闭数据库和历史文件"""
+        with self._lock:
+            if self._conn is None:
+                return
+            self.flush()
+            self._history.close()
+            self._conn.close()
+            self._conn = None
+
+def create_listing_store(data_dir: str) -> Optional[ListingStore]:
+    """
+    根据配置创建列表页字段快照
+
+    Args:
+        data_dir: 数据目录
+
+    Returns:
+        Optional[ListingStore]: CONFIG['INCREMENTAL']为False时返回None
+    """
+    if not CONFIG['INCREMENTAL']:
+        return None
+    return ListingStore(os.path.join(data_dir, CONFIG['LISTING_DB']),
+                        os.path.join(data_dir, CONFIG['PRICE_HISTORY_FILE']))
@@ -0,0 +1,313 @@
+"""
+运行指标模块，统计抓取、解析、写入、保存进度和延迟等热点路径的耗时和计数
+"""
+import os
+import json
+import time
+import bisect
+import logging
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, Optional, Sequence
+from lianjia_spider.config.settings import CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 默认的耗时分桶上界（秒）
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 计入页面吞吐量的计数器
+PAGE_COUNTERS = ('pages_fetched',)
+
+class Histogram:
+    """固定分桶的耗时直方图，分位数按桶上界估算"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """记录一个观测值"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        估算分位数
+
+        Args:
+            q: 0到1之间的分位
+
+        Returns:
+            float: 第一个累计数量达到q的桶的上界，落在最后一个桶时返回最大值
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict:
+        """导出数量、总和、均值、分位数和各桶数量"""
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': round(self.max, 6),
+            'buckets': dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], self.counts))
+        }
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+
+    计数器和直方图按名称在首次使用时创建，所有方法都是线程安全的。
+    耗时直方图以_seconds结尾，导出时附带开始以来的页面吞吐量。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """清空全部指标并重新计时"""
+        with self._lock:
+            self.counters: Dict[str, float] = {}
+            self.histograms: Dict[str, Histogram] = {}
+            self.started = time.time()
+
+    def inc(self, name: str, value: float = 1) -> None:
+        """计数器加value"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """向耗时直方图记录一个观测值"""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """统计with块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict:
+        """
+        获取全部指标
+
+        Returns:
+            Dict: 运行时间、计数器、页面吞吐量和各直方图的统计
+        """
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            counters = dict(self.counters)
+            histograms = {name: histogram.to_dict() for name, histogram in self.histograms.items()}
+        pages = sum(counters.get(name, 0) for name in PAGE_COUNTERS)
+        return {
+            'uptime': round(elapsed, 3),
+            'counters': counters,
+            'pages_per_second': round(pages / elapsed, 3),
+            'timers': histograms
+        }
+
+    def summary(self) -> str:
+        """单行文字摘要，用于日志和运行结束时的输出"""
+        snapshot = self.snapshot()
+        counters = snapshot['counters']
+        parts = [f"页面{sum(counters.get(name, 0) for name in PAGE_COUNTERS):.0f}个"
+                 f"（{snapshot['pages_per_second']:.2f}页/秒）",
+                 f"下载{counters.get('bytes_downloaded', 0) / 1024 / 1024:.1f}MB",
+                 f"重试{counters.get('retries', 0):.0f}次"]
+        for name, timer in sorted(snapshot['timers'].items()):
+            parts.append(f"{name[:-len('_seconds')] if name.endswith('_seconds') else name}: "
+                         f"{timer['count']}次 共{timer['sum']:.2f}秒 p50={timer['p50']}秒 p95={timer['p95']}秒")
+        return '，'.join(parts)
+
+    def to_prometheus(self, prefix: str = 'lianjia') -> str:
+        """
+        导出为Prometheus文本格式
+
+        Args:
+            prefix: 指标名前缀
+
+        Returns:
+            str: 计数器导出为counter，直方图导出为histogram
+        """
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+        lines = []
+        for name, value in counters:
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:g}")
+        for name, histogram in histograms:
+            metric = f"{prefix}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum {histogram.sum:.6f}")
+            lines.append(f"{metric}_count {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path: str) -> None:
+        """将当前指标写入JSON文件，先写临时文件再替换"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, path)
+
+
+# 进程内共用的注册表
+REGISTRY = MetricsRegistry()
+
+def timed(name: str) -> Callable:
+    """
+    统计函数耗时的装饰器
+
+    Args:
+        name: 直方图名称，如parse_detail_seconds
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                REGISTRY.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class MetricsReporter:
+    """
+    指标输出
+
+    按间隔向日志写入摘要并更新JSON文件，可选地在本机端口提供Prometheus文本格式的/metrics。
+    启动时清空注册表，输出的吞吐量和耗时只包含本次运行。
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, interval: Optional[float] = None,
+                 json_file: Optional[str] = None, port: Optional[int] = None):
+        """
+        初始化指标输出
+
+        Args:
+            registry: 指标注册表
+            interval: 输出摘要和JSON文件的间隔（秒），0表示只在结束时输出，默认使用CONFIG['METRICS_INTERVAL']
+            json_file: JSON文件路径，为None时不写文件
+            port: Prometheus端点的端口，0表示不启动，默认使用CONFIG['METRICS_PORT']
+        """
+        self.registry = registry
+        self.interval = CONFIG['METRICS_INTERVAL'] if interval is None else interval
+        self.json_file = json_file
+        self.port = CONFIG['METRICS_PORT'] if port is None else port
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> 'MetricsReporter':
+        """启动定期输出线程和Prometheus端点"""
+        self.registry.reset()
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._loop, name='metrics-reporter', daemon=True)
+            self._thread.start()
+        if self.port:
+            registry = self.registry
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path != '/metrics':
+                        self.send_error(404)
+                        return
+                    body = registry.to_prometheus().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+            threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True).start()
+            print(f"指标端点: http://127.0.0.1:{self._server.server_address[1]}/metrics")
+        return self
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def report(self, final: bool = False) -> None:
+        """
+        输出摘要并更新JSON文件
+
+        Args:
+            final: 为True时是结束时的最终指标，打印到控制台，否则写入日志
+        """
+        summary = self.registry.summary()
+        if final:
+            print(f"运行指标: {summary}")
+        else:
+            logger.info("运行指标: %s", summary)
+        if self.json_file:
+            try:
+                self.registry.write_json(self.json_file)
+            except Exception as e:
+                print(f"写入指标文件失败: {e}")
+
+    def stop(self) -> None:
+        """停止输出线程和端点，并输出最终指标"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.report(final=True)
+
+
+def create_metrics_reporter(data_dir: Optional[str] = None) -> Optional[MetricsReporter]:
+    """
+    按配置创建指标输出
+
+    Args:
+        data_dir: JSON文件所在目录，默认使用CONFIG['DATA_DIR']
+
+    Returns:
+        Optional[MetricsReporter]: 未启用时返回None
+    """
+    if not CONFIG['METRICS']:
+        return None
+    json_file = None
+    if CONFIG['METRICS_FILE']:
+        json_file = os.path.join(data_dir or CONFIG['DATA_DIR'], CONFIG['METRICS_FILE'])
+    return MetricsReporter(json_file=json_file)
@@ -0,0 +1,196 @@
+"""
+限速模块，使用令牌桶控制请求速率
+"""
+import time
+import random
+import asyncio
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from lianjia_spider.config.settings import CONFIG
+
+class TokenBucket:
+    """
+    令牌桶
+
+    令牌以rate个/秒的速度补充，最多积累burst个。取令牌采用预约方式：
+    令牌不足时余额记为负数，调用方按欠额计算需要等待的时间，
+    因此多个线程或协程同时取令牌时按取用顺序排队，整体速率不超过rate。
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量，即空闲后允许连续发出的请求数
+        """
+        if rate <= 0:
+            raise ValueError(f"令牌补充速率必须大于0: {rate}")
+        self.rate = float(rate)
+        self.burst = max(int(burst), 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        """按经过的时间补充令牌"""
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        预约令牌
+
+        Args:
+            tokens: 需要的令牌数
+
+        Returns:
+            float: 调用方需要等待的秒数，0表示可以立即发送
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def set_rate(self, rate: float) -> None:
+        """
+        调整令牌补充速率，已积累的令牌保留
+
+        Args:
+            rate: 新的每秒补充令牌数
+        """
+        if rate <= 0:
+            raise ValueError(f"令牌补充速率必须大于0: {rate}")
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+
+class RateLimiter:
+    """
+    请求限速器
+
+    每个主机使用独立的令牌桶（per_host为False时所有请求共用一个桶）。
+    同一个实例可以在多个线程、协程或爬虫实例之间共享，请求总速率等于设定速率。
+    抖动只推迟单个请求的发送时间，不消耗额外令牌，不降低平均速率。
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None,
+                 jitter: Optional[float] = None, per_host: Optional[bool] = None):
+        """
+        初始化限速器
+
+        Args:
+            rate: 每秒允许的请求数，默认使用CONFIG['RATE_LIMIT']
+            burst: 允许的突发请求数，默认使用CONFIG['RATE_BURST']
+            jitter: 每个请求额外等待的最大随机秒数，默认使用CONFIG['RATE_JITTER']
+            per_host: 是否按主机分别限速，默认使用CONFIG['RATE_PER_HOST']
+        """
+        self.rate = rate or CONFIG['RATE_LIMIT']
+        self.burst = burst or CONFIG['RATE_BURST']
+        self.jitter = jitter if jitter is not None else CONFIG['RATE_JITTER']
+        self.per_host = per_host if per_host is not None else CONFIG['RATE_PER_HOST']
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.waited_seconds = 0.0
+
+    def _bucket(self, url: str) -> TokenBucket:
+        """获取URL所属主机的令牌桶"""
+        host = (urlsplit(url).hostname or '') if self.per_host else ''
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def reserve(self, url: str) -> float:
+        """
+        为请求预约令牌
+
+        Args:
+            url: 请求URL
+
+        Returns:
+            float: 发送请求前需要等待的秒数
+        """
+        wait = self._bucket(url).reserve()
+        if self.jitter > 0:
+            wait += random.uniform(0, self.jitter)
+        with self._lock:
+            self.requests += 1
+            self.waited_seconds += wait
+        return wait
+
+    def acquire(self, url: str) -> float:
+        """
+        阻塞等待直到可以发送请求
+
+        Args:
+            url: 请求URL
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, url: str) -> float:
+        """
+        异步等待直到可以发送请求，不阻塞事件循环
+
+        Args:
+            url: 请求URL
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        wait = self.reserve(url)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def set_rate(self, rate: float) -> None:
+        """
+        调整所有主机的请求速率
+
+        Args:
+            rate: 每秒允许的请求数
+        """
+        with self._lock:
+            self.rate = rate
+            buckets = list(self._buckets.values())
+        for bucket in buckets:
+            bucket.set_rate(rate)
+
+    def get_stats(self) -> Dict:
+        """
+        获取限速统计
+
+        Returns:
+            Dict: 请求数、累计等待时间和当前速率
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'waited_seconds': self.waited_seconds,
+                'rate': self.rate,
+                'hosts': len(self._buckets)
+            }
+
+def create_rate_limiter() -> Optional[RateLimiter]:
+    """
+    根据配置创建限速器
+
+    Returns:
+        Optional[RateLimiter]: CONFIG['RATE_LIMIT']为0时返回None，使用DELAY_RANGE随机延迟
+    """
+    if not CONFIG['RATE_LIMIT']:
+        return None
+    return RateLimiter()
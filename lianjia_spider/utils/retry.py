@@ -1,13 +1,89 @@
 """
 重试机制模块，处理请求失败的重试逻辑
 """
+import re
 import time
 import random
-from typing import Callable, TypeVar, Any
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional, TypeVar, Any
 from functools import wraps
+import requests
+from lianjia_spider.utils.metrics import REGISTRY
+from lianjia_spider.config.settings import CONFIG
 
 T = TypeVar('T')
 
+# 暂时性的4xx状态码，仍然重试；其他4xx是请求本身的问题或已被拦截，重试无意义
+RETRIABLE_CLIENT_STATUSES = frozenset([408, 425, 429])
+
+class BlockedError(Exception):
+    """请求被重定向到验证码等拦截页面"""
+
+def is_blocked(response: requests.Response) -> bool:
+    """
+    判断响应是否被重定向到了拦截页面
+
+    Args:
+        response: 响应对象
+
+    Returns:
+        bool: 最终URL匹配CONFIG['BLOCKED_URL_PATTERN']时返回True
+    """
+    url = getattr(response, 'url', None)
+    pattern = CONFIG['BLOCKED_URL_PATTERN']
+    return bool(pattern) and isinstance(url, str) and re.search(pattern, url) is not None
+
+def is_retriable(error: Exception) -> bool:
+    """
+    判断失败是否值得重试
+
+    被拦截和除408/425/429以外的4xx为致命错误，连接失败、超时、5xx和其他异常可以重试。
+
+    Args:
+        error: 请求抛出的异常
+
+    Returns:
+        bool: 可以重试时返回True
+    """
+    if isinstance(error, BlockedError):
+        return False
+    response = getattr(error, 'response', None)
+    if isinstance(error, requests.HTTPError) and response is not None:
+        status = response.status_code
+        return not 400 <= status < 500 or status in RETRIABLE_CLIENT_STATUSES
+    return True
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析Retry-After响应头
+
+    Args:
+        value: 秒数或HTTP日期
+
+    Returns:
+        Optional[float]: 需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+def retry_after(error: Exception) -> Optional[float]:
+    """返回异常所属响应的Retry-After秒数，没有时返回None"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    return parse_retry_after(response.headers.get('Retry-After'))
+
 class RetryStrategy:
     """重试策略实现"""
     
@@ -35,7 +111,7 @@ class RetryStrategy:
             函数执行结果
             
         Raises:
-            Exception: 重试耗尽后仍然失败
+            Exception: 致命错误，或重试耗尽后仍然失败
         """
         last_exception = None
         for attempt in range(self.max_retries + 1):
@@ -43,10 +119,19 @@ class RetryStrategy:
                 return func(*args, **kwargs)
             except Exception as e:
                 last_exception = e
+                if not is_retriable(e):
+                    REGISTRY.inc('fatal_errors')
+                    raise last_exception
                 if attempt == self.max_retries:
+                    REGISTRY.inc('retries_exhausted')
                     raise last_exception
                 
+                REGISTRY.inc('retries')
                 wait_time = self._calculate_wait_time(attempt)
+                # 服务器给出Retry-After时至少等待该时间
+                server_wait = retry_after(e)
+                if server_wait is not None:
+                    wait_time = max(wait_time, min(server_wait, CONFIG['RETRY_AFTER_MAX']))
                 print(f"请求失败，{wait_time:.2f}秒后进行第{attempt + 1}次重试: {str(e)}")
                 time.sleep(wait_time)
     
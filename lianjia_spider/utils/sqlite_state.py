@@ -0,0 +1,272 @@
+"""
+SQLite状态后端模块，使用WAL模式的嵌入式数据库保存爬虫进度
+"""
+import os
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+from datetime import datetime
+from lianjia_spider.utils.state import StateManager, apply_journal_record, decode_ids, read_journal, to_house_key
+from lianjia_spider.utils.metrics import timed
+from lianjia_spider.config.settings import CONFIG
+
+# 重建布隆过滤器时每次从游标读取的行数
+FETCH_BATCH_SIZE = 10000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scraped_ids (
+    -- 不声明类型：数字ID按整数保存，其余按文本保存
+    house_id PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+'''
+
+class SQLiteStateManager(StateManager):
+    """
+    SQLite状态管理器
+
+    已爬取ID保存在带主键索引的表中，不在内存中保留完整ID集合。
+    update_progress的写入按批提交，WAL模式允许其他进程在爬虫写入时并发读取。
+    """
+
+    def __init__(self, progress_file: str, db_file: Optional[str] = None,
+                 batch_size: Optional[int] = None):
+        """
+        初始化SQLite状态管理器
+
+        Args:
+            progress_file: 旧版JSON进度文件路径，数据库为空时从中导入
+            db_file: 数据库文件路径，默认与progress_file同名、后缀为.db
+            batch_size: 累计多少次更新提交一次事务，默认使用CONFIG['STATE_BATCH_SIZE']
+        """
+        self.db_file = db_file or f"{os.path.splitext(progress_file)[0]}.db"
+        self.batch_size = batch_size or CONFIG['STATE_BATCH_SIZE']
+        self._pending_updates = 0
+        self._scraped_count = 0
+        self._lock = threading.RLock()
+        self._conn = None
+        super().__init__(progress_file)
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库连接并初始化表结构"""
+        db_dir = os.path.dirname(self.db_file)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        conn.commit()
+        return conn
+
+    def _load_state(self) -> None:
+        """从数据库加载状态，数据库为空时导入旧版JSON进度"""
+        self._conn = self._connect()
+        meta = dict(self._conn.execute('SELECT key, value FROM meta'))
+        if 'current_page' not in meta and os.path.exists(self.progress_file):
+            self.import_json(self.progress_file)
+            meta = dict(self._conn.execute('SELECT key, value FROM meta'))
+
+        for key in ('current_page', 'total_items', 'last_update'):
+            if key in meta:
+                self.current_state[key] = meta[key]
+        if meta.get('shards'):
+            self.current_state['shards'] = json.loads(meta['shards'])
+        self._scraped_count = int(meta.get('scraped_count', 0))
+
+    def import_json(self, progress_file: str) -> None:
+        """
+        从JSON进度文件（及其日志）导入状态，只读取不修改旧文件
+
+        进度文件损坏时与StateManager一样记录错误，只重放日志。
+
+        Args:
+            progress_file: JSON进度文件路径
+        """
+        try:
+            with open(progress_file, 'r', encoding='utf-8') as f:
+                saved_state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"加载状态文件失败: {e}")
+            saved_state = {}
+        with self._lock:
+            # 先在StateManager的内存集合中还原快照并重放日志，再一次性写入数据库
+            self._scraped_index = decode_ids(saved_state)
+            for key in ('current_page', 'total_items', 'shards'):
+                if key in saved_state:
+                    self.current_state[key] = saved_state[key]
+            for record, _ in read_journal(f"{progress_file}.journal"):
+                apply_journal_record(self, record)
+            keys, self._scraped_index = self._scraped_index, set()
+            self._insert_ids(keys)
+            self._write_meta()
+            self._conn.commit()
+        print(f"已从{progress_file}导入{len(keys)}个房源ID")
+
+    def _insert_ids(self, house_ids: Iterable[str]) -> None:
+        """插入房源ID并累计新增数量"""
+        house_ids = list(house_ids)
+        cursor = self._conn.executemany(
+            'INSERT OR IGNORE INTO scraped_ids (house_id) VALUES (?)',
+            ((to_house_key(house_id),) for house_id in house_ids)
+        )
+        self._scraped_count += max(cursor.rowcount, 0)
+        if self.id_filter is not None:
+            self.id_filter.update(str(to_house_key(house_id)) for house_id in house_ids)
+
+    def _write_meta(self) -> None:
+        """写入页码、总数等元数据"""
+        meta = dict(self.current_state)
+        meta['scraped_count'] = self._scraped_count
+        meta['shards'] = json.dumps(meta['shards'], ensure_ascii=False, separators=(',', ':'))
+        self._conn.executemany(
+            'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+            meta.items()
+        )
+
+    @timed('save_state_seconds')
+    def save_state(self) -> None:
+        """提交未提交的更新"""
+        try:
+            with self._lock:
+                self.current_state['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                self._write_meta()
+                self._conn.commit()
+                self._pending_updates = 0
+        except Exception as e:
+            print(f"保存状态数据库失败: {e}")
+
+    def checkpoint(self) -> None:
+        """
+        检查点，每处理完一个房源调用一次
+
+        未提交的更新（包括分片游标）累计达到batch_size时才提交事务，
+        其余的由save_state和close提交。
+        """
+        if self._pending_updates >= self.batch_size:
+            self.save_state()
+
+    def close(self) -> None:
+        """提交并关闭数据库连接"""
+        if self._conn is not None:
+            self.save_state()
+            self._conn.close()
+            self._conn = None
+        self._close_filter()
+
+    def update_progress(self, page: int, house_ids: List[str], total_items: Optional[int] = None) -> None:
+        """
+        更新爬虫进度，累计batch_size次更新后提交
+
+        Args:
+            page: 当前页码，小于已记录的页码时忽略
+            house_ids: 新爬取的房源ID列表
+            total_items: 总房源数量（可选）
+        """
+        with self._lock:
+            self.current_state['current_page'] = max(self.current_state['current_page'], page)
+            if total_items is not None:
+                self.current_state['total_items'] = total_items
+            if house_ids:
+                self._insert_ids(house_ids)
+            self._pending_updates += 1
+            if self._pending_updates >= self.batch_size:
+                self.save_state()
+
+    def set_shards(self, shards: Dict[str, Dict]) -> None:
+        """替换分片计划并立即提交"""
+        with self._lock:
+            super().set_shards(shards)
+            self.save_state()
+
+    def update_shard(self, key: str, **fields) -> None:
+        """更新分片游标，随下一次检查点提交"""
+        with self._lock:
+            super().update_shard(key, **fields)
+            self._pending_updates += 1
+
+    @property
+    def scraped_ids(self) -> List[str]:
+        """已爬取的房源ID列表"""
+        return self.get_scraped_ids()
+
+    @scraped_ids.setter
+    def scraped_ids(self, value: Iterable[str]) -> None:
+        """替换已爬取的房源ID"""
+        with self._lock:
+            self._conn.execute('DELETE FROM scraped_ids')
+            self._scraped_count = 0
+            self._insert_ids(value)
+            self._pending_updates += 1
+            self._rebuild_filter()
+
+    def get_scraped_ids(self) -> List[str]:
+        """获取已爬取的房源ID列表（按ID排序）"""
+        with self._lock:
+            rows = self._conn.execute('SELECT house_id FROM scraped_ids ORDER BY house_id')
+            return [str(row[0]) for row in rows]
+
+    def _iter_keys(self) -> Iterator:
+        """按批从游标读取数据库中的全部索引键，不在内存中保留完整集合"""
+        cursor = self._conn.cursor()
+        try:
+            with self._lock:
+                cursor.execute('SELECT house_id FROM scraped_ids')
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row[0]
+        finally:
+            cursor.close()
+
+    def _contains(self, key) -> bool:
+        """在数据库中查询索引键"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT 1 FROM scraped_ids WHERE house_id = ?', (key,)
+            ).fetchone()
+        return row is not None
+
+    def get_progress(self) -> Dict:
+        """
+        获取进度信息
+
+        Returns:
+            Dict: 包含进度信息的字典
+        """
+        return {
+            'current_page': self.current_state['current_page'],
+            'scraped_count': self._scraped_count,
+            'total_items': self.current_state['total_items'],
+            'last_update': self.current_state['last_update']
+        }
+
+    @staticmethod
+    def read_progress(db_file: str) -> Dict:
+        """
+        以只读方式读取已提交的进度，可在爬虫运行时由其他进程调用
+
+        Args:
+            db_file: 数据库文件路径
+
+        Returns:
+            Dict: 包含进度信息的字典
+        """
+        conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+        try:
+            meta = dict(conn.execute('SELECT key, value FROM meta'))
+        finally:
+            conn.close()
+        return {
+            'current_page': int(meta.get('current_page', 1)),
+            'scraped_count': int(meta.get('scraped_count', 0)),
+            'total_items': int(meta.get('total_items', 0)),
+            'last_update': meta.get('last_update')
+        }
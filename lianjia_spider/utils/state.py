@@ -3,8 +3,98 @@
 """
 import json
 import os
-from typing import Dict, List, Optional
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from datetime import datetime
+from lianjia_spider.utils.bloom import ScalableBloomFilter, create_id_filter
+from lianjia_spider.utils.metrics import timed
+from lianjia_spider.config.settings import CONFIG
+
+HouseKey = Union[int, str]
+
+def to_house_key(house_id) -> HouseKey:
+    """
+    将房源ID转换为索引键，纯数字ID存为整数以节省内存
+
+    Args:
+        house_id: 房源ID
+
+    Returns:
+        整数或字符串形式的索引键
+    """
+    house_id = str(house_id).strip()
+    if house_id.isascii() and house_id.isdigit() and (house_id == '0' or not house_id.startswith('0')):
+        return int(house_id)
+    return house_id
+
+def encode_ids(keys: Iterable[HouseKey]) -> Dict[str, List]:
+    """
+    将房源ID集合编码为紧凑格式：数字ID排序后差分编码，其余ID原样保存
+
+    Args:
+        keys: 索引键集合
+
+    Returns:
+        Dict: 包含scraped_id_deltas和scraped_ids的字典
+    """
+    numbers = sorted(key for key in keys if isinstance(key, int))
+    others = sorted(key for key in keys if not isinstance(key, int))
+    deltas = [b - a for a, b in zip([0] + numbers, numbers)]
+    return {'scraped_id_deltas': deltas, 'scraped_ids': others}
+
+def decode_ids(saved_state: Dict) -> Set[HouseKey]:
+    """
+    从保存的状态中还原房源ID集合，兼容旧版的字符串列表格式
+
+    Args:
+        saved_state: 从文件读取的状态字典
+
+    Returns:
+        Set: 索引键集合
+    """
+    keys = set(accumulate(saved_state.get('scraped_id_deltas') or []))
+    keys.update(to_house_key(house_id) for house_id in saved_state.get('scraped_ids') or [])
+    return keys
+
+def read_journal(journal_file: str) -> Iterator[Tuple[Dict, int]]:
+    """
+    只读地逐条读取状态日志，遇到崩溃时写了一半的记录时停止
+
+    Args:
+        journal_file: 日志文件路径
+
+    Returns:
+        Iterator: (日志记录, 该记录的字节数)
+    """
+    if not os.path.exists(journal_file):
+        return
+    with open(journal_file, 'rb') as f:
+        for line in f:
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError('记录不完整')
+                record = json.loads(line)
+            except ValueError:
+                return
+            yield record, len(line)
+
+def apply_journal_record(manager: 'StateManager', record: Dict) -> None:
+    """
+    将一条日志记录应用到状态管理器的内存状态
+
+    使用StateManager自身的实现，不追加日志也不写数据库，日志式后端加载时和
+    SQLite后端导入旧版日志时共用。
+
+    Args:
+        manager: 状态管理器
+        record: 日志记录
+    """
+    if 'plan' in record:
+        StateManager.set_shards(manager, record['plan'])
+    elif 's' in record:
+        StateManager.update_shard(manager, record['s'], **record['f'])
+    else:
+        StateManager.update_progress(manager, record['p'], record.get('ids', []), record.get('t'))
 
 class StateManager:
     """状态管理器，负责爬虫断点续爬功能"""
@@ -20,10 +110,15 @@ class StateManager:
         self.progress_file = progress_file  # 保持向后兼容
         self.current_state = {
             'current_page': 1,
-            'scraped_ids': [],
             'total_items': 0,
-            'last_update': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'last_update': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            # 分片抓取的分片计划和每个分片的游标
+            'shards': {}
         }
+        # 已爬取房源ID的哈希索引，查询为O(1)
+        self._scraped_index: Set[HouseKey] = set()
+        # 可选的布隆过滤器，查询精确集合之前排除一定未爬取的房源
+        self.id_filter: Optional[ScalableBloomFilter] = None
         self._load_state()
         # 确保状态文件存在
         self.save_state()
@@ -34,34 +129,115 @@ class StateManager:
             if os.path.exists(self.progress_file):
                 with open(self.progress_file, 'r', encoding='utf-8') as f:
                     saved_state = json.load(f)
-                    self.current_state.update(saved_state)
+                self._scraped_index = decode_ids(saved_state)
+                for key in ('current_page', 'total_items', 'last_update', 'shards'):
+                    if key in saved_state:
+                        self.current_state[key] = saved_state[key]
         except Exception as e:
             print(f"加载状态文件失败: {e}")
     
+    @timed('save_state_seconds')
     def save_state(self) -> None:
         """保存当前状态到文件"""
         try:
             self.current_state['last_update'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             os.makedirs(os.path.dirname(self.progress_file), exist_ok=True)
-            with open(self.progress_file, 'w', encoding='utf-8') as f:
-                json.dump(self.current_state, f, ensure_ascii=False, indent=2)
+            state = dict(self.current_state)
+            state.update(encode_ids(self._scraped_index))
+            # 先写临时文件再替换，避免写入中途崩溃损坏进度文件
+            tmp_file = f"{self.progress_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.progress_file)
         except Exception as e:
             print(f"保存状态文件失败: {e}")
     
+    def checkpoint(self) -> None:
+        """
+        轻量级检查点，每处理完一个房源调用一次
+        
+        JSON模式下全量保存代价较高，依赖定期的save_state，此处不做处理。
+        """
+    
+    def close(self) -> None:
+        """保存状态并释放资源"""
+        self.save_state()
+        self._close_filter()
+    
+    def attach_filter(self, id_filter: ScalableBloomFilter) -> None:
+        """
+        启用布隆过滤器，并由精确集合重建
+        
+        Args:
+            id_filter: 布隆过滤器
+        """
+        self.id_filter = id_filter
+        self._rebuild_filter()
+    
+    def _rebuild_filter(self) -> None:
+        """清空布隆过滤器并插入精确集合中的全部ID"""
+        if self.id_filter is None:
+            return
+        self.id_filter.clear(self.get_progress()['scraped_count'])
+        self.id_filter.update(str(key) for key in self._iter_keys())
+    
+    def _iter_keys(self) -> Iterable[HouseKey]:
+        """遍历精确集合中的索引键"""
+        return iter(self._scraped_index)
+    
+    def _close_filter(self) -> None:
+        if self.id_filter is not None:
+            self.id_filter.close()
+    
+    def get_filter_stats(self) -> Optional[Dict]:
+        """布隆过滤器的统计，未启用时返回None"""
+        return self.id_filter.get_stats() if self.id_filter is not None else None
+    
     def update_progress(self, page: int, house_ids: List[str], total_items: Optional[int] = None) -> None:
         """
         更新爬虫进度
         
         Args:
-            page: 当前页码
+            page: 当前页码，小于已记录的页码时忽略（解析进程池的回调可能晚于下一页的更新）
             house_ids: 新爬取的房源ID列表
             total_items: 总房源数量（可选）
         """
-        self.current_state['current_page'] = page
-        self.current_state['scraped_ids'].extend(house_ids)
+        self.current_state['current_page'] = max(self.current_state['current_page'], page)
+        keys = [to_house_key(house_id) for house_id in house_ids]
+        self._scraped_index.update(keys)
+        if self.id_filter is not None:
+            self.id_filter.update(str(key) for key in keys)
         if total_items is not None:
             self.current_state['total_items'] = total_items
     
+    def get_shards(self) -> Dict[str, Dict]:
+        """
+        获取分片计划
+        
+        Returns:
+            Dict: 分片键到分片信息（路径、筛选条件、总数、游标页码、是否完成）的映射
+        """
+        return {key: dict(shard) for key, shard in self.current_state['shards'].items()}
+    
+    def set_shards(self, shards: Dict[str, Dict]) -> None:
+        """
+        替换分片计划
+        
+        Args:
+            shards: 分片键到分片信息的映射
+        """
+        self.current_state['shards'] = {key: dict(shard) for key, shard in shards.items()}
+    
+    def update_shard(self, key: str, **fields) -> None:
+        """
+        更新单个分片的游标
+        
+        Args:
+            key: 分片键
+            **fields: 要更新的字段，如page、done
+        """
+        self.current_state['shards'].setdefault(key, {}).update(fields)
+    
     @property
     def current_page(self) -> int:
         """当前页码"""
@@ -72,13 +248,36 @@ class StateManager:
         """设置当前页码"""
         self.current_state['current_page'] = value
     
+    @property
+    def scraped_ids(self) -> List[str]:
+        """已爬取的房源ID列表"""
+        return self.get_scraped_ids()
+    
+    @scraped_ids.setter
+    def scraped_ids(self, value: Iterable[str]) -> None:
+        """替换已爬取的房源ID"""
+        self._scraped_index = {to_house_key(house_id) for house_id in value}
+        self._rebuild_filter()
+    
+    @property
+    def total_items(self) -> int:
+        """总房源数量"""
+        return self.current_state['total_items']
+    
+    @total_items.setter
+    def total_items(self, value: int) -> None:
+        """设置总房源数量"""
+        self.current_state['total_items'] = value
+    
     def get_current_page(self) -> int:
         """获取当前页码"""
         return self.current_state['current_page']
     
     def get_scraped_ids(self) -> List[str]:
-        """获取已爬取的房源ID列表"""
-        return self.current_state['scraped_ids']
+        """获取已爬取的房源ID列表（按ID排序）"""
+        numbers = sorted(key for key in self._scraped_index if isinstance(key, int))
+        others = sorted(key for key in self._scraped_index if not isinstance(key, int))
+        return [str(key) for key in numbers] + others
     
     def get_total_items(self) -> int:
         """获取总房源数量"""
@@ -86,7 +285,7 @@ class StateManager:
     
     def is_scraped(self, house_id: str) -> bool:
         """
-        检查房源是否已被爬取
+        检查房源是否已被爬取，启用布隆过滤器时先由过滤器排除一定未爬取的房源
         
         Args:
             house_id: 房源ID
@@ -94,7 +293,19 @@ class StateManager:
         Returns:
             bool: 是否已爬取
         """
-        return house_id in self.current_state['scraped_ids']
+        key = to_house_key(house_id)
+        if self.id_filter is None:
+            return self._contains(key)
+        if str(key) not in self.id_filter:
+            return False
+        found = self._contains(key)
+        if not found:
+            self.id_filter.record_false_positive()
+        return found
+    
+    def _contains(self, key: HouseKey) -> bool:
+        """在精确集合中查询索引键"""
+        return key in self._scraped_index
     
     def get_progress(self) -> Dict:
         """
@@ -105,7 +316,147 @@ class StateManager:
         """
         return {
             'current_page': self.current_state['current_page'],
-            'scraped_count': len(self.current_state['scraped_ids']),
+            'scraped_count': len(self._scraped_index),
             'total_items': self.current_state['total_items'],
             'last_update': self.current_state['last_update']
         }
+
+
+class JournaledStateManager(StateManager):
+    """
+    日志式状态管理器
+    
+    每次update_progress向日志文件追加一条紧凑记录，日志记录数达到阈值时
+    合并进快照（progress.json）并清空日志。加载时先读快照再重放日志。
+    """
+    
+    def __init__(self, progress_file: str, compact_interval: Optional[int] = None,
+                 fsync: Optional[bool] = None):
+        """
+        初始化日志式状态管理器
+        
+        Args:
+            progress_file: 快照文件路径，日志文件为同名加.journal后缀
+            compact_interval: 日志记录数达到该值时合并快照，默认使用CONFIG['JOURNAL_COMPACT_INTERVAL']
+            fsync: 检查点是否调用fsync落盘，默认使用CONFIG['JOURNAL_FSYNC']
+        """
+        self.journal_file = f"{progress_file}.journal"
+        self.compact_interval = compact_interval or CONFIG['JOURNAL_COMPACT_INTERVAL']
+        self.fsync = CONFIG['JOURNAL_FSYNC'] if fsync is None else fsync
+        self._journal = None
+        self._journal_records = 0
+        super().__init__(progress_file)
+    
+    def _load_state(self) -> None:
+        """加载快照并重放日志"""
+        super()._load_state()
+        if not os.path.exists(self.journal_file):
+            return
+        
+        valid_size = 0
+        try:
+            for record, size in read_journal(self.journal_file):
+                apply_journal_record(self, record)
+                self._journal_records += 1
+                valid_size += size
+            # 崩溃时写了一半的记录，丢弃其后的内容
+            if valid_size < os.path.getsize(self.journal_file):
+                with open(self.journal_file, 'r+b') as f:
+                    f.truncate(valid_size)
+        except Exception as e:
+            print(f"重放状态日志失败: {e}")
+    
+    def _append(self, record: Dict) -> None:
+        """追加一条日志记录，记录数达到阈值时合并快照"""
+        if self._journal is None:
+            os.makedirs(os.path.dirname(self.journal_file), exist_ok=True)
+            self._journal = open(self.journal_file, 'a', encoding='utf-8')
+        self._journal.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._journal.flush()
+        self._journal_records += 1
+        
+        if self._journal_records >= self.compact_interval:
+            self.compact()
+    
+    def update_progress(self, page: int, house_ids: List[str], total_items: Optional[int] = None) -> None:
+        """
+        更新爬虫进度并追加日志记录
+        
+        Args:
+            page: 当前页码
+            house_ids: 新爬取的房源ID列表
+            total_items: 总房源数量（可选）
+        """
+        super().update_progress(page, house_ids, total_items)
+        record = {'p': page}
+        if house_ids:
+            record['ids'] = list(house_ids)
+        if total_items is not None:
+            record['t'] = total_items
+        self._append(record)
+    
+    def set_shards(self, shards: Dict[str, Dict]) -> None:
+        """替换分片计划并追加日志记录"""
+        super().set_shards(shards)
+        self._append({'plan': self.current_state['shards']})
+    
+    def update_shard(self, key: str, **fields) -> None:
+        """更新分片游标并追加日志记录"""
+        super().update_shard(key, **fields)
+        self._append({'s': key, 'f': fields})
+    
+    def checkpoint(self) -> None:
+        """将日志落盘，代价与记录数无关"""
+        if self._journal is not None and self.fsync:
+            os.fsync(self._journal.fileno())
+    
+    def save_state(self) -> None:
+        """保存状态：日志过长时合并快照，否则只做检查点"""
+        if self._journal_records >= self.compact_interval or not os.path.exists(self.progress_file):
+            self.compact()
+        else:
+            self.checkpoint()
+    
+    def compact(self) -> None:
+        """将日志合并进快照并清空日志"""
+        super().save_state()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        # 快照已包含全部日志内容，即使清空前崩溃，重放也是幂等的
+        if os.path.exists(self.journal_file):
+            open(self.journal_file, 'w').close()
+        self._journal_records = 0
+    
+    def close(self) -> None:
+        """合并快照并关闭日志文件"""
+        self.compact()
+        self._close_filter()
+
+
+def create_state_manager(progress_file: str, backend: Optional[str] = None) -> StateManager:
+    """
+    根据配置创建状态管理器
+    
+    Args:
+        progress_file: 进度文件路径
+        backend: 状态后端，json、journal或sqlite，默认使用CONFIG['STATE_BACKEND']
+        
+    Returns:
+        StateManager: 状态管理器实例
+    """
+    backend = backend or CONFIG['STATE_BACKEND']
+    if backend == 'sqlite':
+        from lianjia_spider.utils.sqlite_state import SQLiteStateManager
+        manager = SQLiteStateManager(progress_file)
+    elif backend == 'journal':
+        manager = JournaledStateManager(progress_file)
+    elif backend == 'json':
+        manager = StateManager(progress_file)
+    else:
+        raise ValueError(f"未知的状态后端: {backend}")
+    # json和journal后端的精确集合本身就在内存中，过滤器只增加开销，只在sqlite后端启用
+    id_filter = create_id_filter(os.path.dirname(progress_file)) if backend == 'sqlite' else None
+    if id_filter is not None:
+        manager.attach_filter(id_filter)
+    return manager
@@ -0,0 +1,171 @@
+"""
+HTTP传输层模块，维护带连接池的持久会话以复用keep-alive连接
+"""
+import time
+import threading
+import requests
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from lianjia_spider.config.settings import CONFIG
+
+class HttpTransport:
+    """基于requests.Session的连接池传输层"""
+
+    def __init__(self, pool_size: Optional[int] = None, per_host_limit: Optional[int] = None,
+                 idle_timeout: Optional[float] = None):
+        """
+        初始化传输层
+
+        Args:
+            pool_size: 最多缓存的主机连接池数量，默认使用CONFIG['POOL_SIZE']
+            per_host_limit: 每个主机最多保持的连接数，默认使用CONFIG['POOL_PER_HOST']
+            idle_timeout: 主机空闲超过该秒数后关闭其连接池，默认使用CONFIG['POOL_IDLE_TIMEOUT']
+        """
+        self.pool_size = pool_size or CONFIG['POOL_SIZE']
+        self.per_host_limit = per_host_limit or CONFIG['POOL_PER_HOST']
+        self.idle_timeout = idle_timeout if idle_timeout is not None else CONFIG['POOL_IDLE_TIMEOUT']
+
+        self._lock = threading.Lock()
+        self._last_used: Dict[str, float] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._disposed_connections = 0
+        self._disposed_requests = 0
+        self.evicted_pools = 0
+
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.per_host_limit,
+            pool_block=True
+        )
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        # 连接池被丢弃前先累计其计数，保证统计不丢失
+        self.adapter.poolmanager.pools.dispose_func = self._dispose_pool
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 30,
+            stream: bool = False) -> requests.Response:
+        """
+        发送GET请求，复用已建立的连接
+
+        Args:
+            url: 请求URL
+            headers: 本次请求的请求头
+            timeout: 超时时间（秒）
+            stream: 为True时只读取响应头，响应体由调用方通过iter_content读取，读完或close()后连接才归还连接池
+
+        Returns:
+            requests.Response: 响应对象
+        """
+        host = urlsplit(url).hostname
+        self._evict_idle()
+        with self._lock:
+            self._in_flight[host] = self._in_flight.get(host, 0) + 1
+        try:
+            return self.session.get(url, headers=headers, timeout=timeout, stream=stream)
+        finally:
+            with self._lock:
+                self._in_flight[host] -= 1
+                self._last_used[host] = time.monotonic()
+
+    def is_fresh(self, url: str) -> bool:
+        """
+        判断URL能否不经网络直接返回，无缓存的传输层始终返回False
+
+        Args:
+            url: 请求URL
+
+        Returns:
+            bool: 是否可以直接返回
+        """
+        return False
+
+    def get_cached(self, url: str) -> Optional[requests.Response]:
+        """
+        不经网络返回URL的响应，无缓存的传输层始终返回None
+
+        Args:
+            url: 请求URL
+
+        Returns:
+            Optional[requests.Response]: 可以直接返回的响应，需要访问网络时为None
+        """
+        return None
+
+    def _evict_idle(self) -> None:
+        """关闭空闲超时的主机连接池"""
+        now = time.monotonic()
+        with self._lock:
+            idle_hosts = [host for host, last_used in self._last_used.items()
+                          if now - last_used > self.idle_timeout and not self._in_flight.get(host)]
+            for host in idle_hosts:
+                del self._last_used[host]
+
+        if not idle_hosts:
+            return
+
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            if key.key_host in idle_hosts:
+                try:
+                    del pools[key]
+                except KeyError:
+                    continue
+                with self._lock:
+                    self.evicted_pools += 1
+
+    def _dispose_pool(self, pool) -> None:
+        """连接池被丢弃时累计计数并关闭连接"""
+        with self._lock:
+            self._disposed_connections += pool.num_connections
+            self._disposed_requests += pool.num_requests
+        pool.close()
+
+    def get_stats(self) -> Dict:
+        """
+        获取连接复用统计
+
+        Returns:
+            Dict: 请求数、新建连接数、复用连接数及复用率
+        """
+        pools = self.adapter.poolmanager.pools
+        with pools.lock:
+            # 按原顺序逐个访问，不改变LRU淘汰顺序
+            active = [pools[key] for key in list(pools.keys())]
+
+        with self._lock:
+            connections = self._disposed_connections + sum(pool.num_connections for pool in active)
+            requests_sent = self._disposed_requests + sum(pool.num_requests for pool in active)
+            evicted = self.evicted_pools
+
+        reused = max(requests_sent - connections, 0)
+        return {
+            'requests': requests_sent,
+            'connections_opened': connections,
+            'connections_reused': reused,
+            'reuse_ratio': reused / requests_sent if requests_sent else 0.0,
+            'active_pools': len(active),
+            'evicted_pools': evicted
+        }
+
+    def close(self) -> None:
+        """关闭所有连接"""
+        self.session.close()
+        with self._lock:
+            self._last_used.clear()
+
+def create_transport(per_host_limit: Optional[int] = None) -> HttpTransport:
+    """
+    根据配置创建传输层
+
+    Args:
+        per_host_limit: 每个主机最多保持的连接数，默认使用CONFIG['POOL_PER_HOST']
+
+    Returns:
+        HttpTransport: CONFIG['HTTP_CACHE']为True时返回带磁盘缓存的传输层
+    """
+    if CONFIG['HTTP_CACHE']:
+        from lianjia_spider.utils.http_cache import CachingTransport
+        return CachingTransport(per_host_limit=per_host_limit)
+    return HttpTransport(per_host_limit=per_host_limit)
@@ -0,0 +1,397 @@
+"""
+任务队列模块，为分布式抓取提供带租约和确认的共享任务队列
+"""
+import os
+import json
+import time
+import heapq
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from lianjia_spider.config.settings import CONFIG
+
+# 任务状态
+READY = 0
+LEASED = 1
+DONE = 2
+FAILED = 3
+
+STATE_NAMES = {READY: 'ready', LEASED: 'leased', DONE: 'done', FAILED: 'failed'}
+
+# 任务类型及其优先级：优先处理详情页，避免列表页展开的任务堆积
+PRIORITIES = {'list': 0, 'detail': 1}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,
+    worker TEXT,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (state, priority, id);
+'''
+
+class Task(NamedTuple):
+    """已租用的任务"""
+    id: int
+    kind: str               # 任务类型: list 或 detail
+    key: str                # 同类型内唯一的去重键，如页码、房源ID
+    payload: Dict
+    attempt: int            # 第几次分配，确认和释放时用于识别租约
+
+
+class WorkQueue(ABC):
+    """
+    任务队列基类
+
+    任务以(类型, 键)去重，同一个键只会入队一次，已完成的任务保留在队列中，
+    因此队列同时作为各节点共用的已抓取ID集合。
+    lease取出的任务在visibility_timeout秒内对其他节点不可见，超时未确认的任务
+    重新变为可租用；每个任务最多分配max_attempts次，之后标记为失败。
+    ack和release只对当前租约有效，租约已超时并被其他节点取走时返回False。
+    """
+
+    def __init__(self, visibility_timeout: Optional[float] = None, max_attempts: Optional[int] = None):
+        """
+        初始化任务队列
+
+        Args:
+            visibility_timeout: 租约超时秒数，默认使用CONFIG['QUEUE_VISIBILITY_TIMEOUT']
+            max_attempts: 单个任务最多分配次数，默认使用CONFIG['QUEUE_MAX_ATTEMPTS']
+        """
+        self.visibility_timeout = visibility_timeout or CONFIG['QUEUE_VISIBILITY_TIMEOUT']
+        self.max_attempts = max_attempts or CONFIG['QUEUE_MAX_ATTEMPTS']
+
+    def put(self, kind: str, key: str, payload: Optional[Dict] = None) -> bool:
+        """
+        添加一个任务
+
+        Returns:
+            bool: 任务为新增时返回True，键已存在时返回False
+        """
+        return self.put_many(kind, [(key, payload or {})]) > 0
+
+    @abstractmethod
+    def put_many(self, kind: str, items: Iterable[Tuple[str, Dict]]) -> int:
+        """
+        批量添加任务，已存在的键被忽略
+
+        Args:
+            kind: 任务类型
+            items: (键, 任务数据)序列
+
+        Returns:
+            int: 新增的任务数
+        """
+
+    @abstractmethod
+    def mark_done(self, kind: str, keys: Iterable[str]) -> int:
+        """
+        将键记录为已完成，用于导入单机模式已抓取的房源ID
+
+        Returns:
+            int: 新增的键数
+        """
+
+    @abstractmethod
+    def lease(self, worker: str) -> Optional[Task]:
+        """
+        租用一个可处理的任务
+
+        Args:
+            worker: 节点标识
+
+        Returns:
+            Optional[Task]: 任务，暂时没有可租用的任务时返回None
+        """
+
+    @abstractmethod
+    def ack(self, task: Task) -> bool:
+        """确认任务已完成"""
+
+    @abstractmethod
+    def release(self, task: Task) -> bool:
+        """释放处理失败的任务，分配次数用完时标记为失败"""
+
+    @abstractmethod
+    def reset(self, kind: str) -> int:
+        """
+        将某类型的全部任务重新置为可租用，用于重新抓取列表页
+
+        Returns:
+            int: 重置的任务数
+        """
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """各状态的任务数"""
+
+    def unfinished(self) -> int:
+        """等待处理或正在处理的任务数"""
+        stats = self.stats()
+        return stats['ready'] + stats['leased']
+
+    def close(self) -> None:
+        """关闭队列"""
+
+
+class MemoryWorkQueue(WorkQueue):
+    """
+    进程内任务队列
+
+    语义与SQLiteWorkQueue相同，供同一进程中的多个工作线程和测试使用。
+    可租用的任务和已租用任务的租约到期时间各用一个堆索引，租用的代价与已完成任务的数量无关；
+    状态改变后堆中的旧条目不删除，取出时与任务记录核对后跳过。
+    """
+
+    def __init__(self, visibility_timeout: Optional[float] = None, max_attempts: Optional[int] = None):
+        super().__init__(visibility_timeout, max_attempts)
+        self._lock = threading.Lock()
+        self._tasks: Dict[Tuple[str, str], Dict] = {}
+        # 可租用任务: (-优先级, 任务ID, 类型, 键)
+        self._ready: List[Tuple[int, int, str, str]] = []
+        # 已租用任务: (租约到期时间, 分配次数, 类型, 键)
+        self._leases: List[Tuple[float, int, str, str]] = []
+
+    def _push_ready(self, task: Dict) -> None:
+        """将任务置为可租用并加入索引，调用方持有锁"""
+        task['state'] = READY
+        heapq.heappush(self._ready, (-task['priority'], task['id'], task['kind'], task['key']))
+
+    def _insert(self, kind: str, items: Iterable[Tuple[str, Dict]], state: int) -> int:
+        added = 0
+        with self._lock:
+            for key, payload in items:
+                if (kind, str(key)) in self._tasks:
+                    continue
+                task = self._tasks[(kind, str(key))] = {
+                    'id': len(self._tasks) + 1, 'kind': kind, 'key': str(key), 'payload': payload,
+                    'priority': PRIORITIES.get(kind, 0), 'state': state, 'attempts': 0, 'lease_until': 0.0
+                }
+                if state == READY:
+                    self._push_ready(task)
+                added += 1
+        return added
+
+    def put_many(self, kind: str, items: Iterable[Tuple[str, Dict]]) -> int:
+        return self._insert(kind, items, READY)
+
+    def mark_done(self, kind: str, keys: Iterable[str]) -> int:
+        return self._insert(kind, ((key, {}) for key in keys), DONE)
+
+    def lease(self, worker: str) -> Optional[Task]:
+        now = time.monotonic()
+        with self._lock:
+            # 租约超时的任务重新变为可租用，分配次数用完时标记为失败
+            while self._leases and self._leases[0][0] < now:
+                _, attempts, kind, key = heapq.heappop(self._leases)
+                task = self._tasks[(kind, key)]
+                if task['state'] != LEASED or task['attempts'] != attempts:
+                    continue
+                if task['attempts'] >= self.max_attempts:
+                    task['state'] = FAILED
+                else:
+                    self._push_ready(task)
+
+            while self._ready:
+                _, _, kind, key = heapq.heappop(self._ready)
+                task = self._tasks[(kind, key)]
+                if task['state'] == READY:
+                    break
+            else:
+                return None
+            task['state'] = LEASED
+            task['attempts'] += 1
+            task['lease_until'] = now + self.visibility_timeout
+            task['worker'] = worker
+            heapq.heappush(self._leases, (task['lease_until'], task['attempts'], kind, key))
+            return Task(task['id'], task['kind'], task['key'], task['payload'], task['attempts'])
+
+    def _current(self, task: Task) -> Optional[Dict]:
+        """租约仍然有效时返回任务记录"""
+        record = self._tasks.get((task.kind, task.key))
+        if record is None or record['state'] != LEASED or record['attempts'] != task.attempt:
+            return None
+        return record
+
+    def ack(self, task: Task) -> bool:
+        with self._lock:
+            record = self._current(task)
+            if record is None:
+                return False
+            record['state'] = DONE
+            return True
+
+    def release(self, task: Task) -> bool:
+        with self._lock:
+            record = self._current(task)
+            if record is None:
+                return False
+            if record['attempts'] >= self.max_attempts:
+                record['state'] = FAILED
+            else:
+                self._push_ready(record)
+            return True
+
+    def reset(self, kind: str) -> int:
+        count = 0
+        with self._lock:
+            for task in self._tasks.values():
+                if task['kind'] == kind:
+                    task['attempts'] = 0
+                    self._push_ready(task)
+                    count += 1
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        counts = dict.fromkeys(STATE_NAMES.values(), 0)
+        with self._lock:
+            for task in self._tasks.values():
+                counts[STATE_NAMES[task['state']]] += 1
+        return counts
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    SQLite任务队列
+
+    同一台机器上的多个工作进程各自打开同一个数据库文件，租用在IMMEDIATE事务中完成，
+    同一任务不会同时分配给两个节点。SQLite的文件锁在网络文件系统上不可靠，
+    跨机器部署时需要实现基于网络服务的WorkQueue子类。租约时间使用墙上时钟。
+    """
+
+    def __init__(self, db_file: str, visibility_timeout: Optional[float] = None,
+                 max_attempts: Optional[int] = None):
+        """
+        初始化SQLite任务队列
+
+        Args:
+            db_file: 队列数据库文件路径
+            visibility_timeout: 租约超时秒数，默认使用CONFIG['QUEUE_VISIBILITY_TIMEOUT']
+            max_attempts: 单个任务最多分配次数，默认使用CONFIG['QUEUE_MAX_ATTEMPTS']
+        """
+        super().__init__(visibility_timeout, max_attempts)
+        self.db_file = db_file
+        os.makedirs(os.path.dirname(db_file) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        # 手动管理事务，租用时用BEGIN IMMEDIATE先取得写锁
+        self._conn = sqlite3.connect(db_file, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def _write(self, sql: str, params=()) -> int:
+        """在单独的事务中执行一条写语句，返回影响的行数"""
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def _insert(self, kind: str, items: Iterable[Tuple[str, Dict]], state: int) -> int:
+        """在一个事务中插入任务，返回新增的行数"""
+        rows = [(kind, str(key), json.dumps(payload, ensure_ascii=False), PRIORITIES.get(kind, 0), state)
+                for key, payload in items]
+        if not rows:
+            return 0
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO tasks (kind, key, payload, priority, state) VALUES (?, ?, ?, ?, ?)', rows
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+            return self._conn.total_changes - before
+
+    def put_many(self, kind: str, items: Iterable[Tuple[str, Dict]]) -> int:
+        return self._insert(kind, items, READY)
+
+    def mark_done(self, kind: str, keys: Iterable[str]) -> int:
+        return self._insert(kind, ((key, {}) for key in keys), DONE)
+
+    def lease(self, worker: str) -> Optional[Task]:
+        with self._lock:
+            now = time.time()
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                # 超时的租约：分配次数用完的标记为失败，其余重新变为可租用
+                self._conn.execute(
+                    'UPDATE tasks SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, lease_until = NULL '
+                    'WHERE state = ? AND lease_until < ?',
+                    (self.max_attempts, FAILED, READY, LEASED, now)
+                )
+                row = self._conn.execute(
+                    'SELECT id, kind, key, payload, attempts FROM tasks WHERE state = ? '
+                    'ORDER BY priority DESC, id LIMIT 1', (READY,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute('COMMIT')
+                    return None
+                task_id, kind, key, payload, attempts = row
+                self._conn.execute(
+                    'UPDATE tasks SET state = ?, attempts = ?, lease_until = ?, worker = ? WHERE id = ?',
+                    (LEASED, attempts + 1, now + self.visibility_timeout, worker, task_id)
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return Task(task_id, kind, key, json.loads(payload), attempts + 1)
+
+    def ack(self, task: Task) -> bool:
+        return self._write(
+            'UPDATE tasks SET state = ?, lease_until = NULL WHERE id = ? AND state = ? AND attempts = ?',
+            (DONE, task.id, LEASED, task.attempt)
+        ) > 0
+
+    def release(self, task: Task) -> bool:
+        return self._write(
+            'UPDATE tasks SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, lease_until = NULL '
+            'WHERE id = ? AND state = ? AND attempts = ?',
+            (self.max_attempts, FAILED, READY, task.id, LEASED, task.attempt)
+        ) > 0
+
+    def reset(self, kind: str) -> int:
+        return self._write(
+            'UPDATE tasks SET state = ?, attempts = 0, lease_until = NULL WHERE kind = ?', (READY, kind)
+        )
+
+    def stats(self) -> Dict[str, int]:
+        counts = dict.fromkeys(STATE_NAMES.values(), 0)
+        with self._lock:
+            for state, count in self._conn.execute('SELECT state, COUNT(*) FROM tasks GROUP BY state'):
+                counts[STATE_NAMES[state]] = count
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_work_queue(data_dir: Optional[str] = None, backend: Optional[str] = None) -> WorkQueue:
+    """
+    按配置创建任务队列
+
+    Args:
+        data_dir: 队列数据库所在目录，默认使用CONFIG['DATA_DIR']
+        backend: 队列后端，默认使用CONFIG['QUEUE_BACKEND']
+
+    Returns:
+        WorkQueue: 任务队列
+    """
+    backend = backend or CONFIG['QUEUE_BACKEND']
+    if backend == 'memory':
+        return MemoryWorkQueue()
+    if backend == 'sqlite':
+        return SQLiteWorkQueue(os.path.join(data_dir or CONFIG['DATA_DIR'], CONFIG['QUEUE_DB']))
+    raise ValueError(f"未知的队列后端: {backend}")
@@ -0,0 +1,192 @@
+"""
+测试原始页面归档和批量重新解析
+"""
+import unittest
+import os
+import shutil
+from unittest.mock import patch
+from lianjia_spider.utils.archive import PageArchive, create_archive
+from lianjia_spider.reparse import reparse_archive
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.utils.state import StateManager
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import StubLianjiaServer, read_rows
+
+class TestPageArchive(unittest.TestCase):
+    """测试PageArchive类的功能"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.archive_dir = os.path.join(self.test_dir, 'archive')
+        self.stub = StubLianjiaServer(pages=1, per_page=1)
+
+    def tearDown(self):
+        """测试后清理"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_append_and_read(self):
+        """测试追加和按索引读取"""
+        archive = PageArchive(self.archive_dir)
+        html = self.stub.detail_page('101')
+        record = archive.append('https://cd.lianjia.com/ershoufang/101.html', html)
+        list_record = archive.append('https://cd.lianjia.com/ershoufang/pg1/', '<html>列表</html>')
+
+        self.assertEqual(record.house_id, '101')
+        self.assertIsNone(list_record.house_id)
+        self.assertEqual(archive.read(record), html)
+        self.assertEqual(archive.lookup('101'), [record])
+        self.assertLess(record.length, len(html.encode('utf-8')))
+        # 列表页不参与重新解析
+        self.assertEqual(archive.records(), [record])
+        archive.close()
+
+    def test_segment_rotation(self):
+        """测试分段写满后新建分段，重新打开后继续追加"""
+        archive = PageArchive(self.archive_dir, segment_bytes=2000)
+        pages = {str(i): self.stub.detail_page(str(i)) * 3 for i in range(10)}
+        for house_id, html in pages.items():
+            archive.append(f'http://a/{house_id}.html', html)
+        archive.close()
+
+        archive = PageArchive(self.archive_dir, segment_bytes=2000)
+        archive.append('http://a/10.html', self.stub.detail_page('10'))
+        stats = archive.get_stats()
+        self.assertGreater(stats['segments'], 2)
+        self.assertEqual(stats['pages'], 11)
+        for house_id, html in pages.items():
+            self.assertEqual(archive.read(archive.lookup(house_id)[0]), html)
+        archive.close()
+
+    def test_versions_and_time_filter(self):
+        """测试同一房源的多个版本及时间范围过滤"""
+        archive = PageArchive(self.archive_dir)
+        archive.append('http://a/1.html', 'v1', crawl_time='2025-01-01 00:00:00')
+        archive.append('http://a/2.html', 'v1', crawl_time='2025-01-01 00:00:00')
+        archive.append('http://a/1.html', 'v2', crawl_time='2025-02-01 00:00:00')
+
+        versions = archive.lookup('1')
+        self.assertEqual([archive.read(record) for record in versions], ['v1', 'v2'])
+        latest = archive.records()
+        self.assertEqual(sorted((r.house_id, archive.read(r)) for r in latest), [('1', 'v2'), ('2', 'v1')])
+        self.assertEqual(len(archive.records(latest_only=False)), 3)
+        self.assertEqual([r.house_id for r in archive.records(since='2025-01-15 00:00:00')], ['1'])
+        self.assertEqual(len(archive.records(latest_only=False, until='2025-01-15 00:00:00')), 2)
+        archive.close()
+
+    def test_mixed_compression(self):
+        """测试更换压缩格式后新旧分段都能读取"""
+        archive = PageArchive(self.archive_dir, compression='zstd')
+        first = archive.append('http://a/1.html', 'zstd页面')
+        archive.close()
+        archive = PageArchive(self.archive_dir, compression='zlib')
+        second = archive.append('http://a/2.html', 'zlib页面')
+        self.assertNotEqual(first.segment, second.segment)
+        self.assertTrue(second.segment.endswith('.zz'))
+        self.assertEqual(archive.read(first), 'zstd页面')
+        self.assertEqual(archive.read(second), 'zlib页面')
+        archive.close()
+
+    def test_invalid_compression(self):
+        """测试未知的压缩格式"""
+        with self.assertRaises(ValueError):
+            PageArchive(self.archive_dir, compression='lz4')
+
+    def test_create_archive(self):
+        """测试根据配置创建归档"""
+        with patch.dict(CONFIG, {'ARCHIVE': False}):
+            self.assertIsNone(create_archive(self.test_dir))
+        with patch.dict(CONFIG, {'ARCHIVE': True}):
+            archive = create_archive(self.test_dir)
+            self.assertEqual(archive.archive_dir, self.archive_dir)
+            archive.close()
+
+
+class TestReparse(unittest.TestCase):
+    """测试从归档批量重新解析"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.archive = PageArchive(os.path.join(self.test_dir, 'archive'), segment_bytes=4096)
+        stub = StubLianjiaServer(pages=1, per_page=1)
+        self.house_ids = [str(200000 + i) for i in range(1200)]
+        for i, house_id in enumerate(self.house_ids):
+            self.archive.append(f'http://a/{house_id}.html', stub.detail_page(house_id),
+                                crawl_time=f'2025-02-10 12:{i // 60 % 60:02d}:{i % 60:02d}')
+
+    def tearDown(self):
+        """测试后清理"""
+        self.archive.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _reparse(self, name, workers):
+        pipeline = CSVPipeline(os.path.join(self.test_dir, name, 'houses.csv'))
+        count = reparse_archive(self.archive, pipeline, workers=workers)
+        pipeline.close()
+        return count, read_rows(pipeline.file_path)
+
+    def test_parallel_matches_serial(self):
+        """测试多进程重新解析与单进程输出一致且保持归档顺序"""
+        serial_count, serial_rows = self._reparse('serial', workers=0)
+        parallel_count, parallel_rows = self._reparse('parallel', workers=2)
+
+        self.assertEqual(serial_count, 1200)
+        self.assertEqual(parallel_count, 1200)
+        self.assertEqual(parallel_rows, serial_rows)
+        self.assertEqual([row['房源ID'] for row in parallel_rows], self.house_ids)
+        # 保留原始抓取时间
+        self.assertEqual(parallel_rows[61]['抓取时间'], '2025-02-10 12:01:01')
+        self.assertEqual(parallel_rows[0]['小区名'], '测试小区')
+
+
+class TestSpiderArchive(unittest.TestCase):
+    """测试爬虫归档抓取的页面"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.server = StubLianjiaServer(pages=2, per_page=5).start()
+        self.config_patch = patch.dict(CONFIG, {
+            'BASE_URL': self.server.base_url,
+            'DATA_DIR': self.test_dir,
+            'ARCHIVE': True,
+            'RATE_LIMIT': 0
+        })
+        self.config_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.config_patch.stop()
+        self.server.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_run_archives_pages(self):
+        """测试运行后全部页面已归档，重新解析得到相同输出"""
+        spider = LianjiaSpider()
+        spider.state_manager = StateManager(os.path.join(self.test_dir, 'progress.json'))
+        spider.pipeline = CSVPipeline(os.path.join(self.test_dir, 'houses.csv'))
+        with patch.object(LianjiaSpider, '_random_delay'):
+            spider.run()
+
+        archive = PageArchive(os.path.join(self.test_dir, 'archive'))
+        stats = archive.get_stats()
+        # 3个列表页（最后一页为空）+ 10个详情页
+        self.assertEqual(stats['pages'], 13)
+        self.assertEqual(stats['houses'], 10)
+
+        pipeline = CSVPipeline(os.path.join(self.test_dir, 'reparse', 'houses.csv'))
+        reparse_archive(archive, pipeline)
+        pipeline.close()
+        archive.close()
+        strip_time = lambda rows: [{k: v for k, v in row.items() if k != '抓取时间'} for row in rows]
+        self.assertEqual(strip_time(read_rows(pipeline.file_path)),
+                         strip_time(read_rows(spider.pipeline.file_path)))
+
+if __name__ == '__main__':
+    unittest.main()
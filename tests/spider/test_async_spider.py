@@ -0,0 +1,118 @@
+"""
+测试异步爬虫引擎
+"""
+import unittest
+import os
+import time
+import shutil
+import threading
+from unittest.mock import patch
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.async_spider import AsyncLianjiaSpider
+from lianjia_spider.utils.state import StateManager
+from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import StubLianjiaServer, read_rows
+
+class TestAsyncLianjiaSpider(unittest.TestCase):
+    """测试AsyncLianjiaSpider类的功能"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.server = StubLianjiaServer(pages=2, per_page=10, latency=0.05).start()
+        self.config_patch = patch.dict(CONFIG, {'BASE_URL': self.server.base_url, 'RATE_LIMIT': 0})
+        self.config_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.config_patch.stop()
+        self.server.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _prepare(self, spider, name):
+        """将爬虫的输出重定向到测试目录"""
+        spider.state_manager = StateManager(
+            os.path.join(self.test_dir, f'{name}_progress.json')
+        )
+        spider.pipeline = CSVPipeline(
+            os.path.join(self.test_dir, f'{name}_houses.csv')
+        )
+        return spider
+
+    def _timed_run(self, spider):
+        start = time.perf_counter()
+        spider.run()
+        return time.perf_counter() - start
+
+    def test_run_matches_serial_output(self):
+        """测试异步模式与串行模式输出一致"""
+        serial = self._prepare(LianjiaSpider(), 'serial')
+        with patch.object(LianjiaSpider, '_random_delay'):
+            serial_elapsed = self._timed_run(serial)
+
+        concurrent = self._prepare(AsyncLianjiaSpider(concurrency=10, delay_range=(0, 0)), 'async')
+        async_elapsed = self._timed_run(concurrent)
+
+        serial_rows = read_rows(serial.pipeline.file_path)
+        async_rows = read_rows(concurrent.pipeline.file_path)
+
+        # 验证输出行和顺序一致（忽略抓取时间）
+        strip_time = lambda rows: [{k: v for k, v in row.items() if k != '抓取时间'} for row in rows]
+        self.assertEqual(len(async_rows), len(self.server.house_ids()))
+        self.assertEqual(strip_time(async_rows), strip_time(serial_rows))
+        self.assertEqual([row['房源ID'] for row in async_rows], self.server.house_ids())
+
+        # 验证状态
+        for house_id in self.server.house_ids():
+            self.assertTrue(concurrent.state_manager.is_scraped(house_id))
+        self.assertEqual(concurrent.state_manager.get_total_items(), 20)
+
+        # 验证吞吐量
+        listings = len(self.server.house_ids())
+        print(f"\n串行: {listings / serial_elapsed:.1f} 房源/秒, "
+              f"异步: {listings / async_elapsed:.1f} 房源/秒")
+        self.assertLess(async_elapsed, serial_elapsed / 2)
+
+    def test_skip_scraped(self):
+        """测试跳过已爬取的房源"""
+        spider = self._prepare(AsyncLianjiaSpider(concurrency=4, delay_range=(0, 0)), 'skip')
+        scraped = self.server.house_ids()[:5]
+        spider.state_manager.update_progress(1, scraped)
+
+        spider.run()
+
+        rows = read_rows(spider.pipeline.file_path)
+        self.assertEqual(len(rows), len(self.server.house_ids()) - len(scraped))
+        requested = [path for path in self.server.request_paths if path.endswith('.html')]
+        for house_id in scraped:
+            self.assertNotIn(f'/ershoufang/{house_id}.html', requested)
+
+    def test_concurrency_limit(self):
+        """测试同时进行的请求数不超过并发上限"""
+        spider = self._prepare(AsyncLianjiaSpider(concurrency=3, delay_range=(0, 0)), 'limit')
+        in_flight = []
+        active = [0]
+        lock = threading.Lock()
+        original = spider._fetch_page
+
+        def tracking_fetch(url):
+            with lock:
+                active[0] += 1
+                in_flight.append(active[0])
+            try:
+                return original(url)
+            finally:
+                with lock:
+                    active[0] -= 1
+
+        spider._fetch_page = tracking_fetch
+        spider.run()
+
+        self.assertLessEqual(max(in_flight), 3)
+        self.assertEqual(len(read_rows(spider.pipeline.file_path)), 20)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+测试布隆过滤器和已爬取ID预过滤
+"""
+import unittest
+import os
+import shutil
+from unittest.mock import patch
+from lianjia_spider.utils.bloom import BloomFilter, ScalableBloomFilter
+from lianjia_spider.utils.state import create_state_manager
+from lianjia_spider.config.settings import CONFIG
+
+class TestBloomFilter(unittest.TestCase):
+    """测试BloomFilter和ScalableBloomFilter类的功能"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+
+    def tearDown(self):
+        """测试后清理"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_no_false_negatives(self):
+        """测试已插入的键都能查到，误判率接近设计值"""
+        bloom = BloomFilter(os.path.join(self.test_dir, 'test.bloom'), 10000, 0.01)
+        for i in range(10000):
+            bloom.add(str(106000000000 + i))
+        self.assertTrue(all(str(106000000000 + i) in bloom for i in range(10000)))
+        false_positives = sum(str(107000000000 + i) in bloom for i in range(10000))
+        self.assertLess(false_positives / 10000, 0.02)
+        self.assertEqual(os.path.getsize(bloom.path), (bloom.num_bits + 7) // 8)
+        bloom.close()
+
+    def test_scalable_growth(self):
+        """测试超过容量后新建分片，总误判率仍在上限附近"""
+        bloom = ScalableBloomFilter(self.test_dir, error_rate=0.01, initial_capacity=1000)
+        bloom.update(str(i) for i in range(5000))
+        self.assertEqual(len(bloom.slices), 3)
+        self.assertEqual(len(bloom), 5000)
+        self.assertTrue(all(str(i) in bloom for i in range(5000)))
+        stats = bloom.get_stats()
+        self.assertLess(stats['estimated_error_rate'], 0.01)
+        self.assertEqual(len(os.listdir(self.test_dir)), 3)
+
+        # 重建时删除旧分片并按预计数量预留容量
+        bloom.clear(expected=5000)
+        self.assertEqual((len(bloom.slices), bloom.slices[0].capacity, len(bloom)), (1, 10000, 0))
+        self.assertEqual(os.listdir(self.test_dir), ['slice-0.bloom'])
+        bloom.close()
+
+
+class TestFilteredStateManager(unittest.TestCase):
+    """测试各状态后端在启用ID过滤器时的行为"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.progress_file = os.path.join(self.test_dir, 'progress.json')
+        self.config_patch = patch.dict(CONFIG, {'ID_FILTER': True, 'ID_FILTER_CAPACITY': 1000})
+        self.config_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.config_patch.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_sqlite_backend(self):
+        """测试过滤器排除新房源，重新打开时由数据库重建"""
+        for batch_size in (1, 10000):
+            with self.subTest(batch_size=batch_size), \
+                    patch('lianjia_spider.utils.sqlite_state.FETCH_BATCH_SIZE', batch_size):
+                state = create_state_manager(self.progress_file, 'sqlite')
+                state.update_progress(1, ['106000000001', 'BJ0001'])
+                self.assertTrue(state.is_scraped('106000000001'))
+                self.assertTrue(state.is_scraped('BJ0001'))
+                self.assertFalse(state.is_scraped('106000000002'))
+                state.close()
+
+                state = create_state_manager(self.progress_file, 'sqlite')
+                self.assertEqual(len(state.id_filter), 2)
+                with patch.object(state, '_contains', wraps=state._contains) as contains:
+                    results = [state.is_scraped(str(107000000000 + i)) for i in range(500)]
+                    self.assertFalse(any(results))
+                    # 绝大多数新房源由过滤器直接排除，不查询精确集合
+                    self.assertLess(contains.call_count, 10)
+                    self.assertTrue(state.is_scraped('106000000001'))
+                stats = state.get_filter_stats()
+                self.assertEqual(stats['lookups'], 501)
+                self.assertEqual(stats['false_positives'], contains.call_count - 1)
+                state.close()
+                shutil.rmtree(self.test_dir)
+
+    def test_memory_backends(self):
+        """测试已爬取ID在内存中的后端不使用过滤器"""
+        for backend in ('json', 'journal'):
+            with self.subTest(backend=backend):
+                state = create_state_manager(self.progress_file, backend)
+                self.assertIsNone(state.id_filter)
+                state.close()
+
+    def test_replace_ids_rebuilds_filter(self):
+        """测试替换已爬取ID后过滤器同步重建"""
+        state = create_state_manager(self.progress_file, 'sqlite')
+        state.update_progress(1, ['1', '2'])
+        state.scraped_ids = ['3']
+        self.assertFalse(state.is_scraped('1'))
+        self.assertTrue(state.is_scraped('3'))
+        self.assertEqual(len(state.id_filter), 1)
+        state.close()
+
+    def test_disabled(self):
+        """测试未启用时不创建过滤器"""
+        with patch.dict(CONFIG, {'ID_FILTER': False}):
+            state = create_state_manager(self.progress_file, 'sqlite')
+            self.assertIsNone(state.id_filter)
+            self.assertIsNone(state.get_filter_stats())
+            state.close()
+
+if __name__ == '__main__':
+    unittest.main()
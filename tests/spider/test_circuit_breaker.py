@@ -0,0 +1,212 @@
+"""
+测试熔断模块和重试的错误分类
+"""
+import unittest
+import os
+import time
+import shutil
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest.mock import Mock, patch
+import requests
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.utils.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from lianjia_spider.utils.retry import BlockedError, RetryStrategy, is_retriable, parse_retry_after
+from lianjia_spider.utils.metrics import REGISTRY
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import StubLianjiaServer
+
+def http_error(status: int) -> requests.HTTPError:
+    """生成带响应的HTTPError"""
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+class TestCircuitBreaker(unittest.TestCase):
+    """测试CircuitBreaker类的功能"""
+
+    def setUp(self):
+        """测试前准备"""
+        REGISTRY.reset()
+        self.breaker = CircuitBreaker(window=10, min_requests=4, failure_rate=0.5,
+                                      open_seconds=0.1, max_open_seconds=0.3)
+
+    def tearDown(self):
+        """测试后清理"""
+        REGISTRY.reset()
+
+    def _request(self, success: bool) -> None:
+        self.breaker.before_request()
+        self.breaker.record(success)
+
+    def test_opens_on_failure_rate(self):
+        """测试请求数达到下限且失败率达到阈值时打开"""
+        with patch('builtins.print'):
+            for success in (False, True, False):
+                self._request(success)
+            self.assertEqual(self.breaker.state, CLOSED)
+            self._request(False)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(REGISTRY.snapshot()['counters']['circuit_open'], 1)
+
+    def test_half_open_probe(self):
+        """测试打开期间等待，探测失败时暂停时间加倍，探测成功后关闭"""
+        with patch('builtins.print'):
+            for _ in range(4):
+                self._request(False)
+            start = time.monotonic()
+            self._request(False)
+            self.assertGreaterEqual(time.monotonic() - start, 0.09)
+            self.assertEqual(self.breaker.state, OPEN)
+
+            start = time.monotonic()
+            self._request(True)
+            self.assertGreaterEqual(time.monotonic() - start, 0.19)
+        self.assertEqual(self.breaker.state, CLOSED)
+        counters = REGISTRY.snapshot()['counters']
+        self.assertEqual((counters['circuit_open'], counters['circuit_half_open'], counters['circuit_closed']),
+                         (2, 2, 1))
+        self.assertEqual(self.breaker.get_stats()['opened'], 2)
+        self.assertIn('circuit_wait_seconds', REGISTRY.snapshot()['timers'])
+
+    def test_retry_after(self):
+        """测试Retry-After延长暂停时间，不超过上限"""
+        with patch('builtins.print'):
+            for _ in range(3):
+                self._request(False)
+            self.breaker.before_request()
+            self.breaker.record(False, retry_after=3600)
+            start = time.monotonic()
+            self._request(True)
+        self.assertGreaterEqual(time.monotonic() - start, 0.29)
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_single_probe(self):
+        """测试半开状态下只放行一个请求，其他请求等探测结果"""
+        with patch('builtins.print'):
+            for _ in range(4):
+                self._request(False)
+            time.sleep(0.11)
+            self.breaker.before_request()
+            self.assertEqual(self.breaker.state, HALF_OPEN)
+            passed = threading.Event()
+            waiter = threading.Thread(target=lambda: (self.breaker.before_request(), passed.set()))
+            waiter.start()
+            self.assertFalse(passed.wait(0.05))
+            self.breaker.record(True)
+            self.assertTrue(passed.wait(1))
+            waiter.join()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_ignores_stale_results(self):
+        """测试打开之前已发出的请求的结果不影响熔断器"""
+        with patch('builtins.print'):
+            for _ in range(4):
+                self._request(False)
+            self.breaker.record(True)
+            self.assertEqual(self.breaker.state, OPEN)
+
+
+class TestRetryClassification(unittest.TestCase):
+    """测试重试的错误分类和Retry-After"""
+
+    def test_is_retriable(self):
+        """测试致命错误和可重试错误的分类"""
+        self.assertFalse(is_retriable(http_error(403)))
+        self.assertFalse(is_retriable(http_error(404)))
+        self.assertFalse(is_retriable(BlockedError('captcha')))
+        self.assertTrue(is_retriable(http_error(429)))
+        self.assertTrue(is_retriable(http_error(503)))
+        self.assertTrue(is_retriable(requests.ConnectionError()))
+        self.assertTrue(is_retriable(ValueError()))
+
+    def test_fatal_not_retried(self):
+        """测试致命错误不重试、不等待"""
+        func = Mock(side_effect=http_error(403))
+        with patch('lianjia_spider.utils.retry.time') as mock_time:
+            with self.assertRaises(requests.HTTPError):
+                RetryStrategy(max_retries=3).execute(func)
+        self.assertEqual(func.call_count, 1)
+        mock_time.sleep.assert_not_called()
+
+    def test_parse_retry_after(self):
+        """测试解析秒数和HTTP日期格式的Retry-After"""
+        self.assertEqual(parse_retry_after('120'), 120.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after('soon'))
+        when = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+        self.assertAlmostEqual(parse_retry_after(when), 60, delta=2)
+        self.assertEqual(parse_retry_after('Mon, 10 Feb 2025 12:00:00 GMT'), 0.0)
+
+
+class TestSpiderCircuitBreaker(unittest.TestCase):
+    """测试爬虫请求经过熔断器和错误分类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.server = StubLianjiaServer(pages=1, per_page=10).start()
+        self.config_patch = patch.dict(CONFIG, {
+            'BASE_URL': self.server.base_url,
+            'DATA_DIR': self.test_dir,
+            'RATE_LIMIT': 0,
+            'CIRCUIT_BREAKER': True,
+            'CIRCUIT_WINDOW': 10,
+            'CIRCUIT_MIN_REQUESTS': 4,
+            'CIRCUIT_FAILURE_RATE': 0.5,
+            'CIRCUIT_OPEN_SECONDS': 0.1,
+            'CIRCUIT_MAX_OPEN_SECONDS': 1
+        })
+        self.config_patch.start()
+        REGISTRY.reset()
+        self.spider = LianjiaSpider()
+        self.urls = [f"{self.server.base_url}{house_id}.html" for house_id in self.server.house_ids()]
+
+    def tearDown(self):
+        """测试后清理"""
+        self.spider.transport.close()
+        self.spider.state_manager.close()
+        self.config_patch.stop()
+        self.server.stop()
+        REGISTRY.reset()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_blocking_pauses_crawl(self):
+        """测试403不重试，失败率过高时暂停，探测成功后恢复"""
+        self.server.inject_faults(403, count=5)
+        start = time.monotonic()
+        with patch('builtins.print'):
+            for url in self.urls[:5]:
+                with self.assertRaises(requests.HTTPError):
+                    self.spider._fetch_page(url)
+            for url in self.urls[5:]:
+                self.spider._fetch_page(url)
+        # 每个失败的页面只请求一次；第5个是第一次探测，失败后暂停加倍
+        self.assertEqual(self.server.request_count, 10)
+        self.assertGreaterEqual(time.monotonic() - start, 0.29)
+        counters = REGISTRY.snapshot()['counters']
+        self.assertEqual(counters['fatal_errors'], 5)
+        self.assertNotIn('retries', counters)
+        self.assertEqual((counters['circuit_open'], counters['circuit_closed']), (2, 1))
+        self.assertEqual(self.spider.circuit_breaker.state, CLOSED)
+
+    def test_captcha_redirect(self):
+        """测试重定向到验证码页时抛出BlockedError，不重试"""
+        self.server.inject_faults(302, headers={'Location': '/captcha?redirect=1'})
+        with self.assertRaises(BlockedError):
+            self.spider._fetch_page(self.urls[0])
+        self.assertEqual(self.server.request_paths[-1], '/captcha?redirect=1')
+        self.assertEqual(self.server.request_count, 2)
+        self.assertEqual(REGISTRY.snapshot()['counters']['blocked_responses'], 1)
+
+    def test_retry_after(self):
+        """测试重试等待时间不少于Retry-After"""
+        self.server.inject_faults(503, headers={'Retry-After': '7'})
+        with patch('lianjia_spider.utils.retry.time') as mock_time, patch('builtins.print'):
+            self.spider._fetch_page(self.urls[0])
+        mock_time.sleep.assert_called_once_with(7.0)
+
+if __name__ == '__main__':
+    unittest.main()
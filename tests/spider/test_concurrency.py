@@ -0,0 +1,244 @@
+"""
+测试自适应并发控制模块
+"""
+import unittest
+import os
+import json
+import shutil
+import asyncio
+from unittest.mock import patch
+from lianjia_spider.utils.concurrency import AIMDController, AdaptiveSlots, create_concurrency_controller
+from lianjia_spider.utils.rate_limiter import RateLimiter
+from lianjia_spider.utils.retry import RetryStrategy
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.async_spider import AsyncLianjiaSpider
+from lianjia_spider.utils.state import StateManager
+from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import StubLianjiaServer, read_rows
+
+class TestAIMDController(unittest.TestCase):
+    """测试AIMDController类的功能"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.limiter = RateLimiter(rate=1.0, burst=1, jitter=0)
+
+    def tearDown(self):
+        """测试后清理"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _controller(self, **kwargs):
+        options = dict(initial_limit=4, min_limit=1, max_limit=6, latency_target=1.0,
+                       backoff=0.5, cooldown=0, rate_limiter=self.limiter, rate_step=0.5,
+                       min_rate=0.1, max_rate=2.0)
+        options.update(kwargs)
+        return AIMDController(**options)
+
+    def test_additive_increase(self):
+        """测试每完成limit个正常请求加性增加"""
+        controller = self._controller()
+        for _ in range(3):
+            controller.record(0.1, 200)
+        self.assertEqual(controller.limit, 4)
+        controller.record(0.1, 200)
+        self.assertEqual(controller.limit, 5)
+        self.assertEqual(controller.rate, 1.5)
+        self.assertEqual(self.limiter.rate, 1.5)
+
+        # 不超过上限
+        for _ in range(100):
+            controller.record(0.1, 200)
+        self.assertEqual(controller.limit, 6)
+        self.assertEqual(controller.rate, 2.0)
+
+    def test_multiplicative_decrease(self):
+        """测试429、5xx、连接失败和高延迟时乘性减小"""
+        for latency, status, reason in [(0.1, 429, 'status_429'), (0.1, 503, 'status_503'),
+                                        (0.1, None, 'error'), (1.5, 200, 'latency')]:
+            self.limiter.set_rate(1.0)
+            controller = self._controller()
+            controller.record(latency, status)
+            self.assertEqual(controller.limit, 2)
+            self.assertEqual(controller.rate, 0.5)
+            self.assertEqual(self.limiter.rate, 0.5)
+            self.assertEqual(controller.history[-1]['reason'], reason)
+
+        # 不低于下限
+        for _ in range(10):
+            controller.record(0.1, 500)
+        self.assertEqual(controller.limit, 1)
+        self.assertEqual(controller.rate, 0.1)
+
+    def test_cooldown(self):
+        """测试冷却期内只减小一次"""
+        controller = self._controller(cooldown=60)
+        for _ in range(5):
+            controller.record(0.1, 503)
+        self.assertEqual(controller.limit, 2)
+        self.assertEqual(controller.counters['overloads'], 5)
+        self.assertEqual(controller.counters['decreases'], 1)
+
+    def test_client_errors_ignored(self):
+        """测试与负载无关的4xx不调整设定值"""
+        controller = self._controller()
+        for _ in range(10):
+            controller.record(0.1, 404)
+        self.assertEqual(controller.limit, 4)
+        self.assertEqual(controller.rate, 1.0)
+
+    def test_without_rate_limiter(self):
+        """测试未关联限速器时只调整并发上限"""
+        controller = self._controller(rate_limiter=None)
+        self.assertIsNone(controller.rate)
+        controller.record(0.1, 429)
+        self.assertEqual(controller.limit, 2)
+        self.assertIsNone(controller.setpoint['rate'])
+
+    def test_publish_setpoint(self):
+        """测试设定值发布给订阅者并写入文件"""
+        setpoint_file = os.path.join(self.test_dir, 'setpoint.jsonl')
+        controller = self._controller(setpoint_file=setpoint_file)
+        published = []
+        controller.subscribe(published.append)
+        for _ in range(4):
+            controller.record(0.1, 200)
+        controller.record(0.1, 429)
+
+        self.assertEqual([(p['limit'], p['reason']) for p in published],
+                         [(5, 'increase'), (2, 'status_429')])
+        with open(setpoint_file, 'r', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line['limit'] for line in lines], [4, 5, 2])
+        self.assertEqual(lines[0]['reason'], 'init')
+        self.assertEqual(lines[-1]['rate'], 0.75)
+
+    def test_create_concurrency_controller(self):
+        """测试根据配置创建控制器"""
+        with patch.dict(CONFIG, {'ADAPTIVE_CONCURRENCY': False}):
+            self.assertIsNone(create_concurrency_controller())
+        with patch.dict(CONFIG, {'ADAPTIVE_CONCURRENCY': True, 'DATA_DIR': self.test_dir}):
+            controller = create_concurrency_controller(self.limiter, initial_limit=3)
+            self.assertEqual(controller.limit, 3)
+            self.assertEqual(controller.setpoint_file, os.path.join(self.test_dir, 'setpoint.jsonl'))
+            
+            # 设定值文件写入爬虫自己的数据目录，分布式模式下各工作进程互不覆盖
+            worker_dir = os.path.join(self.test_dir, 'workers', 'w1')
+            spider = LianjiaSpider(data_dir=worker_dir)
+            self.assertEqual(spider.concurrency_controller.setpoint_file,
+                             os.path.join(worker_dir, 'setpoint.jsonl'))
+            spider.transport.close()
+            spider.state_manager.close()
+
+
+class TestAdaptiveSlots(unittest.TestCase):
+    """测试AdaptiveSlots类的功能"""
+
+    def test_follows_controller_limit(self):
+        """测试并发数跟随控制器上限变化"""
+        controller = AIMDController(initial_limit=4, min_limit=1, max_limit=8, cooldown=0)
+        peaks = []
+
+        async def worker(slots, active):
+            async with slots:
+                active[0] += 1
+                peaks.append(active[0])
+                await asyncio.sleep(0.01)
+                active[0] -= 1
+
+        async def main():
+            slots = AdaptiveSlots(controller)
+            active = [0]
+            await asyncio.gather(*[worker(slots, active) for _ in range(20)])
+            first = max(peaks)
+            peaks.clear()
+            controller.record(0.1, 503)
+            await asyncio.gather(*[worker(slots, active) for _ in range(20)])
+            return first, max(peaks)
+
+        first, second = asyncio.run(main())
+        self.assertEqual(first, 4)
+        self.assertEqual(second, 2)
+
+
+class TestSpiderAdaptiveConcurrency(unittest.TestCase):
+    """测试爬虫在桩服务器注入延迟和错误时自动调整设定值"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        # 重试等待缩短，避免测试过慢
+        self.retry_patch = patch.object(RetryStrategy, '_calculate_wait_time', return_value=0.05)
+        self.retry_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.retry_patch.stop()
+        self.config_patch.stop()
+        self.server.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _start(self, server, **config):
+        self.server = server.start()
+        options = {
+            'BASE_URL': self.server.base_url,
+            'DATA_DIR': self.test_dir,
+            'ADAPTIVE_CONCURRENCY': True,
+            'AIMD_COOLDOWN': 0.2,
+            'AIMD_LATENCY_TARGET': 0.15,
+            'RATE_LIMIT': 0
+        }
+        options.update(config)
+        self.config_patch = patch.dict(CONFIG, options)
+        self.config_patch.start()
+
+    def _prepare(self, spider, name):
+        spider.state_manager = StateManager(os.path.join(self.test_dir, f'{name}_progress.json'))
+        spider.pipeline = CSVPipeline(os.path.join(self.test_dir, f'{name}_houses.csv'))
+        return spider
+
+    def test_fetch_page_reports_latency_and_errors(self):
+        """测试_fetch_page将延迟和raise_for_status失败反馈给控制器"""
+        self._start(StubLianjiaServer(pages=1, per_page=5), RATE_LIMIT=20, RATE_JITTER=0,
+                    AIMD_COOLDOWN=0, AIMD_RATE_STEP=1, AIMD_MAX_RATE=50)
+        spider = LianjiaSpider()
+        controller = spider.concurrency_controller
+        url = f"{self.server.base_url}pg1/"
+
+        # 503后重试成功：先减小再加性增加
+        self.server.inject_faults(503, count=1)
+        spider._fetch_page(url)
+        self.assertEqual([(p['reason'], p['rate']) for p in controller.history],
+                         [('init', 20), ('status_503', 10), ('increase', 11)])
+
+        self.server.latency = 0.3
+        spider._fetch_page(url)
+        self.assertEqual(controller.history[-1]['reason'], 'latency')
+        self.assertEqual(spider.rate_limiter.rate, 5.5)
+        self.assertEqual(controller.counters['requests'], 3)
+        spider.transport.close()
+
+    def test_async_converges_below_server_capacity(self):
+        """测试服务器超载返回429时异步引擎降低并发上限"""
+        self._start(StubLianjiaServer(pages=3, per_page=20, latency=0.05, max_in_flight=3),
+                    AIMD_MAX_LIMIT=12)
+        spider = self._prepare(AsyncLianjiaSpider(concurrency=12, delay_range=(0, 0)), 'aimd')
+        spider.run()
+
+        controller = spider.concurrency_controller
+        reasons = [setpoint['reason'] for setpoint in controller.history]
+        self.assertIn('status_429', reasons)
+        self.assertLess(min(setpoint['limit'] for setpoint in controller.history), 12)
+        self.assertLessEqual(controller.limit, 6)
+        # 设定值变化写入数据目录，可直接绘图
+        with open(os.path.join(self.test_dir, 'setpoint.jsonl'), 'r', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), len(controller.history))
+        rows = read_rows(spider.pipeline.file_path)
+        self.assertGreater(len(rows), 50)
+
+if __name__ == '__main__':
+    unittest.main()
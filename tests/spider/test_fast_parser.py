@@ -0,0 +1,138 @@
+"""
+测试lxml快速解析器与BeautifulSoup解析器的输出一致性
+"""
+import unittest
+from unittest.mock import patch
+from lianjia_spider.spider.parser import Parser, create_parser
+from lianjia_spider.spider.fast_parser import LxmlParser
+from tests.spider import test_parser
+from benchmarks.stub_server import StubLianjiaServer
+
+# 额外的边界情况样本
+EDGE_LIST_PAGES = {
+    'empty': '',
+    'whitespace': '   \n  ',
+    'no_total': '<div class="info clear"><a href="/ershoufang/1.html" class="title">A</a>'
+                '<div class="houseInfo">x</div><div class="positionInfo">y</div></div>',
+    'missing_price_span': '''
+        <h2 class="total">共找到<span> 12 </span>套</h2>
+        <div class="info clear">
+            <a href="/ershoufang/111.html" class="title">缺少总价</a>
+            <div class="priceInfo"><div class="totalPrice">500万</div>
+            <div class="unitPrice"><span>1</span></div></div>
+            <div class="houseInfo">x</div><div class="positionInfo">y</div>
+        </div>
+        <div class="info clear">
+            <a href="/ershoufang/222.html" class="title">正常 &amp; 转义&nbsp;</a>
+            <div class="houseInfo">2室1厅 | <b>89</b>平米<!-- 注释 --></div>
+            <div class="positionInfo"><a>小区</a> - <a>区域</a></div>
+        </div>
+        <div class="info clear extra"><a href="/ershoufang/333.html" class="title">多余class</a></div>
+        <div class="info  clear"><a href="/ershoufang/444.html" class="title big">空格</a>
+            <div class="houseInfo">h<script>var x = 1;</script></div><div class="positionInfo">p</div></div>
+        <div class="info clear"><a href="/ershoufang/abc.html" class="title">无ID</a></div>
+        <div class="info clear"><div class="houseInfo">无标题</div></div>
+        <div class="info clear"><a href="/ershoufang/555.html" class="title">缺少位置</a>
+            <div class="houseInfo">h</div></div>
+    ''',
+    'bad_total': '<h2 class="total">共找到<span>很多</span>套</h2>',
+}
+
+EDGE_DETAIL_PAGES = {
+    'empty': '',
+    'only_title': '<h1 class="main title">  标题  </h1>',
+    'labels': '''
+        <span class="total">  320 </span><span class="unitPriceValue">3<i>2</i>000<i>元</i></span>
+        <ul>
+            <li class="base"><span class="label">房屋户型</span>3室2厅</li>
+            <li class="base"><span class="label">所在楼层：</span>高楼层 (共32层)</li>
+            <li class="base"><span class="label">梯户比例：</span>两梯四户</li>
+            <li class="base"><span class="label">未知字段：</span>忽略</li>
+            <li class="base">没有标签</li>
+            <li class="base"><span class="label">建筑面积：</span>建筑面积：120㎡</li>
+            <li class="base"><span class="label">产权年限：</span><style>.a{}</style>70年</li>
+        </ul>
+        <div class="communityName"><span>小区名称</span><a class="info">测试小区</a><a>地图</a></div>
+        <div class="areaName"><span>所在区域</span><span class="info"><a>高新</a>&nbsp;<a> 天府三街 </a></span></div>
+    ''',
+    'community_without_link': '''
+        <h1 class="main">标题</h1>
+        <div class="communityName">没有链接</div>
+        <div class="areaName"><a>不会被解析</a></div>
+    ''',
+}
+
+# 标签未闭合时lxml与BeautifulSoup构建的树不同，输出不一致的样本
+MALFORMED_DETAIL_PAGES = {
+    'unclosed_li': '''
+        <ul><li class="base"><span class="label">房屋户型</span>2室
+        <li class="base"><span class="label">所在楼层</span>中楼层</ul>
+    ''',
+}
+
+class TestLxmlParserParity(unittest.TestCase):
+    """测试LxmlParser与Parser的输出完全一致"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """读取test_parser.py中的样本"""
+        fixtures = test_parser.TestParser('test_parse_list_page')
+        fixtures.setUp()
+        cls.list_pages = dict(EDGE_LIST_PAGES, fixture=fixtures.list_page_html)
+        cls.detail_pages = dict(EDGE_DETAIL_PAGES, fixture=fixtures.detail_page_html)
+        
+        stub = StubLianjiaServer(pages=1, per_page=3).start()
+        cls.list_pages['stub'] = stub.list_page(1)
+        cls.detail_pages['stub'] = stub.detail_page('106100001000')
+        stub.stop()
+    
+    def setUp(self):
+        """测试前准备"""
+        self.reference = Parser()
+        self.fast = LxmlParser()
+    
+    def _items(self, detail):
+        return list(detail.items())
+    
+    def test_list_page_parity(self):
+        """测试列表页解析结果一致"""
+        for name, html in self.list_pages.items():
+            with self.subTest(page=name):
+                with patch('builtins.print'):
+                    expected = self.reference.parse_list_page(html)
+                    actual = self.fast.parse_list_page(html)
+                self.assertEqual([self._items(h) for h in actual[0]],
+                                 [self._items(h) for h in expected[0]])
+                self.assertEqual(actual[1], expected[1])
+    
+    def test_detail_page_parity(self):
+        """测试详情页解析结果一致（包括键的顺序）"""
+        for name, html in self.detail_pages.items():
+            with self.subTest(page=name):
+                with patch('builtins.print'):
+                    expected = self.reference.parse_detail_page(html, '123456')
+                    actual = self.fast.parse_detail_page(html, '123456')
+                expected.pop('crawl_time')
+                actual.pop('crawl_time')
+                self.assertEqual(self._items(actual), self._items(expected))
+    
+    def test_malformed_difference(self):
+        """测试标签未闭合时两者结果不同，因此auto不使用lxml"""
+        html = MALFORMED_DETAIL_PAGES['unclosed_li']
+        with patch('builtins.print'):
+            expected = self.reference.parse_detail_page(html, '123456')
+            actual = self.fast.parse_detail_page(html, '123456')
+        self.assertEqual(expected['house_type'], '2室\n        所在楼层中楼层')
+        self.assertEqual(actual['house_type'], '2室')
+        self.assertNotIsInstance(create_parser('auto'), LxmlParser)
+    
+    def test_create_parser(self):
+        """测试按后端名称创建解析器"""
+        self.assertIsInstance(create_parser('lxml'), LxmlParser)
+        self.assertNotIsInstance(create_parser('auto'), LxmlParser)
+        self.assertNotIsInstance(create_parser('bs4'), LxmlParser)
+        with self.assertRaises(ValueError):
+            create_parser('selectolax')
+
+if __name__ == '__main__':
+    unittest.main()
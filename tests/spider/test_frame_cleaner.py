@@ -0,0 +1,148 @@
+"""
+测试按列清洗模块
+"""
+import unittest
+import os
+import shutil
+import pandas as pd
+from unittest.mock import patch
+from lianjia_spider.spider.frame_cleaner import clean_frame, clean_table, normalize_frame
+from lianjia_spider.spider.pipeline import CSVPipeline, BufferedCSVPipeline
+from lianjia_spider.spider.parquet_pipeline import ParquetPipeline
+from lianjia_spider.normalize import normalize_csv
+from lianjia_spider.config.settings import CONFIG, CSV_HEADERS
+
+def make_item(index: int) -> dict:
+    """生成一个解析结果"""
+    return {
+        'house_id': str(106100000000 + index),
+        'title': f' 测试房源{index} ',
+        'total_price': f'{300 + index}.5万',
+        'unit_price': '50,000元/平米',
+        'community': '测试小区',
+        'district': '高新 天府软件园',
+        'house_type': '2室1厅',
+        'area': '89.12平米',
+        'orientation': '南 北',
+        'decoration': '精装',
+        'has_elevator': '有',
+        'floor': '中楼层(共18层)',
+        'build_year': '2010年建',
+        'crawl_time': '2025-02-10 21:00:00'
+    }
+
+class TestFrameCleaner(unittest.TestCase):
+    """测试clean_table、clean_frame和normalize_frame的功能"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+
+    def tearDown(self):
+        """测试后清理"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_matches_clean_item(self):
+        """测试按列清洗与逐条清洗的结果相同，包括空值、缺失字段和非ASCII数字"""
+        items = [make_item(i) for i in range(5)]
+        items[0].update(title=None, total_price=None, area=' 89m² ')
+        items[1].update(build_year='２０１０年', unit_price='')
+        items[2].update(house_id=' 123 ', community='　测试\xa0')
+        del items[3]['district']
+        items[4]['extra'] = '忽略'
+        pipeline = CSVPipeline.__new__(CSVPipeline)
+        expected = [dict(dict.fromkeys(CSV_HEADERS, ''), **pipeline._clean_item(item)) for item in items]
+
+        self.assertEqual(clean_table(items).to_pylist(), expected)
+        self.assertEqual(clean_frame(items).to_dict('records'), expected)
+        self.assertEqual(expected[0]['面积'], '89m²')
+        self.assertEqual(expected[1]['建筑年代'], '２０１０')
+
+    def test_missing_crawl_time(self):
+        """测试抓取时间为空时使用当前时间"""
+        item = make_item(0)
+        del item['crawl_time']
+        self.assertRegex(clean_table([item]).column('抓取时间')[0].as_py(), r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$')
+
+    def test_normalize_frame(self):
+        """测试类型转换和楼层、户型拆分"""
+        items = [make_item(0), make_item(1), make_item(2)]
+        items[1].update(floor='高楼层 (共6层)', house_type='3房2厅', area='', build_year='')
+        items[2].update(floor='共3层', house_type='别墅')
+        frame = normalize_frame(clean_frame(items))
+
+        self.assertEqual(list(frame.columns[:10]), ['房源ID', '标题', '总价', '单价', '小区名', '区域',
+                                                    '户型', '室', '厅', '面积'])
+        self.assertEqual(list(frame.columns[-5:]), ['楼层', '楼层位置', '总楼层', '建筑年代', '抓取时间'])
+        self.assertEqual(frame['总价'].tolist(), [300.5, 301.5, 302.5])
+        self.assertEqual(frame['面积'].dtype, 'float64')
+        self.assertEqual(frame['面积'][0], 89.12)
+        self.assertTrue(pd.isna(frame['面积'][1]))
+        self.assertEqual(frame['室'].tolist(), [2, 3, pd.NA])
+        self.assertEqual(frame['厅'].tolist(), [1, 2, pd.NA])
+        self.assertEqual(frame['楼层位置'].tolist(), ['中楼层', '高楼层', pd.NA])
+        self.assertEqual(frame['总楼层'].tolist(), [18, 6, pd.NA])
+        self.assertEqual(frame['建筑年代'].tolist(), [2010, pd.NA, 2010])
+        self.assertEqual(frame['抓取时间'][0], pd.Timestamp('2025-02-10 21:00:00'))
+
+    def test_normalize_csv(self):
+        """测试从输出CSV转换并保存"""
+        pipeline = CSVPipeline(os.path.join(self.test_dir, 'houses.csv'))
+        pipeline.process_items([make_item(i) for i in range(3)])
+        output = os.path.join(self.test_dir, 'houses_normalized.parquet')
+        self.assertEqual(normalize_csv(pipeline.file_path, output), 3)
+        frame = pd.read_parquet(output)
+        self.assertEqual(frame['房源ID'].tolist(), ['106100000000', '106100000001', '106100000002'])
+        self.assertEqual(frame['单价'].tolist(), [50000.0] * 3)
+
+
+class TestBatchCleaning(unittest.TestCase):
+    """测试数据管道批量写入时的按列清洗"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.items = [make_item(i) for i in range(20)]
+        self.items[3]['title'] = None
+        del self.items[5]['floor']
+
+    def tearDown(self):
+        """测试后清理"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _write(self, make_pipeline, name, batch_rows, items):
+        path = os.path.join(self.test_dir, name)
+        with patch.dict(CONFIG, {'CLEAN_BATCH_ROWS': batch_rows}):
+            pipeline = make_pipeline(path)
+            pipeline.process_items(items)
+            pipeline.close()
+        return pipeline
+
+    def test_same_output(self):
+        """测试各数据管道按列清洗与逐条清洗的输出相同"""
+        for cls in (CSVPipeline, BufferedCSVPipeline):
+            with self.subTest(pipeline=cls.__name__):
+                with patch.object(cls, '_clean_item', wraps=cls._clean_item, autospec=True) as clean_item:
+                    batch = self._write(cls, f'{cls.__name__}-batch.csv', 10, self.items)
+                    self.assertEqual(clean_item.call_count, 0)
+                rowwise = self._write(cls, f'{cls.__name__}-rows.csv', 0, self.items)
+                with open(batch.file_path, 'rb') as f1, open(rowwise.file_path, 'rb') as f2:
+                    self.assertEqual(f1.read(), f2.read())
+
+        batch = self._write(ParquetPipeline, 'parquet-batch', 10, self.items)
+        rowwise = self._write(ParquetPipeline, 'parquet-rows', 0, self.items)
+        pd.testing.assert_frame_equal(pd.read_parquet(batch.file_path), pd.read_parquet(rowwise.file_path))
+
+    def test_fallback_to_rows(self):
+        """测试含非字符串字段时退回逐条清洗，只跳过有问题的数据项"""
+        self.items[7]['total_price'] = 500
+        batch = self._write(CSVPipeline, 'batch.csv', 10, self.items)
+        rowwise = self._write(CSVPipeline, 'rows.csv', 0, self.items)
+        with open(batch.file_path, 'rb') as f1, open(rowwise.file_path, 'rb') as f2:
+            self.assertEqual(f1.read(), f2.read())
+        self.assertEqual(len(pd.read_csv(batch.file_path)), 19)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+"""
+测试HTTP响应缓存模块
+"""
+import unittest
+import os
+import shutil
+import requests
+from unittest.mock import patch
+from lianjia_spider.utils.http_cache import HttpCache, CachingTransport
+from lianjia_spider.utils.transport import HttpTransport, create_transport
+from lianjia_spider.utils.headers import HeadersManager
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.utils.state import StateManager
+from lianjia_spider.replay import replay_from_cache
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import StubLianjiaServer, read_rows
+
+def make_response(body: bytes, headers=None) -> requests.Response:
+    """构造测试用的200响应"""
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response.encoding = 'utf-8'
+    response.headers.update(headers or {})
+    return response
+
+class TestHttpCache(unittest.TestCase):
+    """测试HttpCache类的功能"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.cache_dir = os.path.join(self.test_dir, 'http_cache')
+        self.cache = HttpCache(self.cache_dir, ttl=3600, max_bytes=1024 ** 2)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.cache.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_store_and_read(self):
+        """测试压缩保存和读取"""
+        body = '<html>测试房源详情</html>'.encode('utf-8') * 100
+        self.cache.store('http://a/1.html', make_response(body, {'ETag': '"v1"'}))
+
+        entry = self.cache.lookup('http://a/1.html')
+        self.assertEqual(entry.etag, '"v1"')
+        self.assertTrue(self.cache.is_fresh(entry))
+        self.assertEqual(self.cache.read(entry), body)
+        self.assertLess(self.cache.total_bytes, len(body) / 10)
+        self.assertIsNone(self.cache.lookup('http://a/2.html'))
+
+    def test_content_addressed(self):
+        """测试内容相同的页面只保存一份"""
+        body = b'same body'
+        self.cache.store('http://a/1.html', make_response(body))
+        self.cache.store('http://a/2.html', make_response(body))
+        objects = [name for _, _, names in os.walk(self.cache.objects_dir) for name in names]
+        self.assertEqual(len(objects), 1)
+        self.assertEqual(len(self.cache), 2)
+
+        # 覆盖其中一个后共享内容仍然保留
+        self.cache.store('http://a/1.html', make_response(b'new body'))
+        self.assertEqual(self.cache.read(self.cache.lookup('http://a/2.html')), body)
+
+        # 同一URL再次保存相同内容
+        self.cache.store('http://a/2.html', make_response(body))
+        self.assertEqual(self.cache.read(self.cache.lookup('http://a/2.html')), body)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_lru_eviction(self):
+        """测试超过大小上限时淘汰最久未访问的条目"""
+        self.cache.close()
+        self.cache = HttpCache(self.cache_dir, ttl=3600, max_bytes=2500)
+        bodies = {f'http://a/{i}.html': os.urandom(1000) for i in range(3)}
+        for url in list(bodies)[:2]:
+            self.cache.store(url, make_response(bodies[url]))
+        # 访问第一个条目，使第二个成为最久未使用
+        self.cache.read(self.cache.lookup('http://a/0.html'))
+        self.cache.store('http://a/2.html', make_response(bodies['http://a/2.html']))
+
+        self.assertIsNotNone(self.cache.lookup('http://a/0.html'))
+        self.assertIsNone(self.cache.lookup('http://a/1.html'))
+        self.assertIsNotNone(self.cache.lookup('http://a/2.html'))
+        self.assertLessEqual(self.cache.total_bytes, 2500)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_ttl(self):
+        """测试有效期"""
+        self.cache.ttl = 0
+        self.cache.store('http://a/1.html', make_response(b'body'))
+        self.assertFalse(self.cache.is_fresh(self.cache.lookup('http://a/1.html')))
+
+    def test_corrupted_object(self):
+        """测试缓存文件损坏时删除条目"""
+        self.cache.store('http://a/1.html', make_response(b'body'))
+        entry = self.cache.lookup('http://a/1.html')
+        with open(self.cache._object_path(entry.digest), 'wb') as f:
+            f.write(b'broken')
+        self.assertIsNone(self.cache.read(entry))
+        self.assertIsNone(self.cache.lookup('http://a/1.html'))
+
+    def test_reopen(self):
+        """测试重新打开后索引和大小统计保留"""
+        self.cache.store('http://a/1.html', make_response(b'body' * 100))
+        total = self.cache.total_bytes
+        self.cache.close()
+        self.cache = HttpCache(self.cache_dir)
+        self.assertEqual(self.cache.total_bytes, total)
+        self.assertEqual(self.cache.read(self.cache.lookup('http://a/1.html')), b'body' * 100)
+
+
+class TestCachingTransport(unittest.TestCase):
+    """测试CachingTransport类的功能"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.server = StubLianjiaServer(pages=1, per_page=5).start()
+        self.headers = HeadersManager().get_headers()
+        self.url = f"{self.server.base_url}{self.server.house_ids()[0]}.html"
+
+    def tearDown(self):
+        """测试后清理"""
+        self.server.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _transport(self, ttl):
+        return CachingTransport(HttpCache(os.path.join(self.test_dir, 'http_cache'), ttl=ttl))
+
+    def test_fresh_hit(self):
+        """测试有效期内不访问网络"""
+        transport = self._transport(ttl=3600)
+        first = transport.get(self.url, headers=self.headers)
+        self.assertFalse(transport.is_fresh(f"{self.server.base_url}pg1/"))
+        self.assertTrue(transport.is_fresh(self.url))
+        self.assertIsNone(transport.get_cached(f"{self.server.base_url}pg1/"))
+        self.assertEqual(transport.get_cached(self.url).text, first.text)
+        second = transport.get(self.url, headers=self.headers)
+
+        self.assertEqual(second.text, first.text)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(self.server.request_count, 1)
+        stats = transport.get_stats()
+        self.assertEqual((stats['cache_hits'], stats['cache_misses']), (2, 1))
+        transport.close()
+
+    def test_conditional_revalidation(self):
+        """测试过期后按ETag重新验证"""
+        transport = self._transport(ttl=0)
+        first = transport.get(self.url, headers=self.headers)
+        second = transport.get(self.url, headers=self.headers)
+        self.assertEqual(self.server.status_counts, {200: 1, 304: 1})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.text, first.text)
+        self.assertEqual(transport.get_stats()['cache_revalidated'], 1)
+
+        # 页面变化后返回新内容并更新缓存
+        house_id = self.server.house_ids()[0]
+        self.server.revisions[house_id] = 1
+        third = transport.get(self.url, headers=self.headers)
+        self.assertIn('修订1', third.text)
+        self.assertEqual(transport.cache.read(transport.cache.lookup(self.url)), third.content)
+        transport.close()
+
+    def test_error_not_cached(self):
+        """测试错误响应不写入缓存"""
+        transport = self._transport(ttl=3600)
+        self.server.inject_faults(503)
+        response = transport.get(self.url, headers=self.headers)
+        self.assertEqual(response.status_code, 503)
+        self.assertIsNone(transport.cache.lookup(self.url))
+        transport.close()
+
+    def test_create_transport(self):
+        """测试根据配置创建传输层"""
+        with patch.dict(CONFIG, {'HTTP_CACHE': False}):
+            transport = create_transport()
+            self.assertIs(type(transport), HttpTransport)
+            self.assertFalse(transport.is_fresh(self.url))
+            transport.close()
+        with patch.dict(CONFIG, {'HTTP_CACHE': True, 'DATA_DIR': self.test_dir}):
+            transport = create_transport(per_host_limit=3)
+            self.assertIsInstance(transport, CachingTransport)
+            self.assertEqual(transport.per_host_limit, 3)
+            transport.close()
+
+
+class TestSpiderWithCache(unittest.TestCase):
+    """测试爬虫重复运行时使用缓存及离线重放"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.server = StubLianjiaServer(pages=2, per_page=5).start()
+        self.config_patch = patch.dict(CONFIG, {
+            'BASE_URL': self.server.base_url,
+            'DATA_DIR': self.test_dir,
+            'HTTP_CACHE': True,
+            'HTTP_CACHE_TTL': 3600,
+            'RATE_LIMIT': 0
+        })
+        self.config_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.config_patch.stop()
+        self.server.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _run(self, name):
+        spider = LianjiaSpider()
+        spider.state_manager = StateManager(os.path.join(self.test_dir, f'{name}_progress.json'))
+        spider.pipeline = CSVPipeline(os.path.join(self.test_dir, f'{name}_houses.csv'))
+        with patch.object(LianjiaSpider, '_random_delay') as mock_delay:
+            spider.run()
+        return spider, mock_delay
+
+    def test_rerun_uses_cache(self):
+        """测试重新运行时不再下载页面"""
+        self._run('first')
+        requests_sent = self.server.request_count
+        spider, _ = self._run('second')
+
+        self.assertEqual(self.server.request_count, requests_sent)
+        strip_time = lambda rows: [{k: v for k, v in row.items() if k != '抓取时间'} for row in rows]
+        self.assertEqual(strip_time(read_rows(spider.pipeline.file_path)),
+                         strip_time(read_rows(os.path.join(self.test_dir, 'first_houses.csv'))))
+
+    def test_lost_body_throttled(self):
+        """测试缓存内容丢失时回退到网络请求，仍经过限速"""
+        self._run('first')
+        requests_sent = self.server.request_count
+        spider = LianjiaSpider()
+        url = f"{self.server.base_url}{self.server.house_ids()[0]}.html"
+        with patch.object(spider.transport.cache, 'read', return_value=None), \
+                patch.object(spider, '_throttle') as mock_throttle:
+            spider._fetch_page(url)
+        mock_throttle.assert_called_once_with(url)
+        self.assertEqual(self.server.request_count, requests_sent + 1)
+        spider.transport.close()
+        spider.state_manager.close()
+
+    def test_replay_offline(self):
+        """测试离线重放不访问网络"""
+        self._run('first')
+        self.server.stop()
+
+        cache = HttpCache(os.path.join(self.test_dir, 'http_cache'))
+        pipeline = CSVPipeline(os.path.join(self.test_dir, 'replay', 'houses.csv'))
+        count = replay_from_cache(cache, pipeline)
+        pipeline.close()
+        cache.close()
+
+        rows = read_rows(pipeline.file_path)
+        self.assertEqual(count, 10)
+        self.assertEqual([row['房源ID'] for row in rows], self.server.house_ids())
+        self.assertEqual(rows[0]['小区名'], '测试小区')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+测试增量抓取和列表页字段快照
+"""
+import unittest
+import os
+import shutil
+from unittest.mock import patch
+from lianjia_spider.utils.listing_store import ListingStore, create_listing_store
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.async_spider import AsyncLianjiaSpider
+from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.utils.state import StateManager
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import StubLianjiaServer, read_rows
+
+def make_house(house_id, total_price='100', unit_price='10000', title='测试房源'):
+    """构造列表页房源"""
+    return {'house_id': house_id, 'title': title, 'link': f'http://a/{house_id}.html',
+            'total_price': total_price, 'unit_price': unit_price}
+
+class TestListingStore(unittest.TestCase):
+    """测试ListingStore类的功能"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.db_path = os.path.join(self.test_dir, 'listings.db')
+        self.history_file = os.path.join(self.test_dir, 'price_history.csv')
+        self.store = ListingStore(self.db_path, self.history_file)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.store.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_compare_and_record(self):
+        """测试新增、未变化和变化的判断"""
+        house = make_house('1')
+        self.assertEqual(self.store.compare(house), 'new')
+        self.assertEqual(self.store.record(house, '2025-02-10 12:00:00'), 'new')
+        self.assertEqual(self.store.compare(house), 'unchanged')
+        self.assertEqual(self.store.record(house), 'unchanged')
+
+        changed = make_house('1', total_price='95', unit_price='9500')
+        self.assertEqual(self.store.compare(changed), 'changed')
+        self.assertEqual(self.store.record(changed, '2025-02-11 12:00:00'), 'changed')
+        self.assertEqual(self.store.compare(changed), 'unchanged')
+        self.assertEqual(self.store.changes, 1)
+        self.assertEqual(len(self.store), 1)
+
+        self.store.flush()
+        self.assertEqual(read_rows(self.history_file), [{
+            '房源ID': '1', '变更时间': '2025-02-11 12:00:00', '原标题': '测试房源', '标题': '测试房源',
+            '原总价': '100', '总价': '95', '原单价': '10000', '单价': '9500'
+        }])
+
+    def test_reopen(self):
+        """测试重新打开后快照保留，历史文件不重复写表头"""
+        self.store.record(make_house('1'))
+        self.store.record(make_house('1', title='新标题'))
+        self.store.close()
+
+        self.store = ListingStore(self.db_path, self.history_file)
+        self.assertEqual(self.store.compare(make_house('1', title='新标题')), 'unchanged')
+        self.store.record(make_house('1', title='再次修改'))
+        self.store.flush()
+        rows = read_rows(self.history_file)
+        self.assertEqual([row['标题'] for row in rows], ['新标题', '再次修改'])
+
+    def test_create_listing_store(self):
+        """测试根据配置创建快照"""
+        with patch.dict(CONFIG, {'INCREMENTAL': False}):
+            self.assertIsNone(create_listing_store(self.test_dir))
+        with patch.dict(CONFIG, {'INCREMENTAL': True}):
+            store = create_listing_store(self.test_dir)
+            self.assertEqual(store.db_path, os.path.join(self.test_dir, 'listings.db'))
+            store.close()
+
+
+class TestIncrementalSpider(unittest.TestCase):
+    """测试增量模式只重新抓取变化的房源"""
+
+    spider_class = LianjiaSpider
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.server = StubLianjiaServer(pages=2, per_page=5).start()
+        self.config_patch = patch.dict(CONFIG, {
+            'BASE_URL': self.server.base_url,
+            'DATA_DIR': self.test_dir,
+            'INCREMENTAL': True,
+            'RATE_LIMIT': 0,
+            'DELAY_RANGE': (0, 0)
+        })
+        self.config_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.config_patch.stop()
+        self.server.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _run(self):
+        spider = self.spider_class()
+        spider.state_manager = StateManager(os.path.join(self.test_dir, 'progress.json'))
+        spider.pipeline = CSVPipeline(os.path.join(self.test_dir, 'houses.csv'))
+        start = len(self.server.request_paths)
+        spider.run()
+        return [path for path in self.server.request_paths[start:] if path.endswith('.html')]
+
+    def test_refetch_changed_only(self):
+        """测试第二次运行只抓取价格变化的房源并记录历史"""
+        house_ids = self.server.house_ids()
+        self.assertEqual(len(self._run()), 10)
+
+        # 没有变化时不抓取详情页
+        self.assertEqual(self._run(), [])
+
+        self.server.list_prices[house_ids[3]] = 88
+        fetched = self._run()
+        self.assertEqual(fetched, [f'/ershoufang/{house_ids[3]}.html'])
+
+        rows = read_rows(os.path.join(self.test_dir, 'houses.csv'))
+        self.assertEqual(len(rows), 11)
+        history = read_rows(os.path.join(self.test_dir, 'price_history.csv'))
+        self.assertEqual(len(history), 1)
+        self.assertEqual((history[0]['房源ID'], history[0]['原总价'], history[0]['总价']),
+                         (house_ids[3], '103', '88'))
+
+    def test_bootstrap_from_state(self):
+        """测试启用增量模式前已爬取的房源只记录快照"""
+        house_ids = self.server.house_ids()
+        state = StateManager(os.path.join(self.test_dir, 'progress.json'))
+        state.update_progress(3, house_ids[:4])
+        state.save_state()
+
+        fetched = self._run()
+        self.assertEqual(sorted(fetched), [f'/ershoufang/{house_id}.html' for house_id in house_ids[4:]])
+        self.assertEqual(self._run(), [])
+
+
+class TestIncrementalAsyncSpider(TestIncrementalSpider):
+    """测试异步引擎的增量模式"""
+
+    spider_class = AsyncLianjiaSpider
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+测试仅列表模式和后台详情页补抓
+"""
+import unittest
+import os
+import shutil
+from unittest.mock import patch
+from lianjia_spider.spider.parser import Parser
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.async_spider import AsyncLianjiaSpider
+from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.utils.state import StateManager
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import StubLianjiaServer, read_rows
+
+class TestParseListItem(unittest.TestCase):
+    """测试列表页房源信息解析"""
+
+    def test_parse_house_info(self):
+        """测试完整的房源信息"""
+        info = Parser.parse_house_info('2室1厅 | 89.12平米 | 南 北 | 精装 | 中楼层(共18层) | 2010年建 | 板楼')
+        self.assertEqual(info, {
+            'house_type': '2室1厅',
+            'area': '89.12平米',
+            'orientation': '南 北',
+            'decoration': '精装',
+            'floor': '中楼层(共18层)',
+            'build_year': '2010年建'
+        })
+
+    def test_parse_house_info_missing_fields(self):
+        """测试缺少部分字段时按内容识别"""
+        info = Parser.parse_house_info('4室2厅 | 210平米 | 东南 | 共3层 | 别墅')
+        self.assertEqual(info, {'house_type': '4室2厅', 'area': '210平米', 'orientation': '东南',
+                                'floor': '共3层'})
+        self.assertEqual(Parser.parse_house_info(''), {})
+
+    def test_parse_list_item_matches_detail(self):
+        """测试列表页生成的数据与详情页清洗后的户型、面积等字段一致"""
+        with StubLianjiaServer(pages=1, per_page=1) as stub:
+            house = Parser.parse_list_page(stub.list_page(1))[0][0]
+            detail = Parser.parse_detail_page(stub.detail_page(house['house_id']), house['house_id'])
+        item = Parser.parse_list_item(house)
+
+        test_dir = 'tests/test_data'
+        try:
+            pipeline = CSVPipeline(os.path.join(test_dir, 'houses.csv'))
+            from_list = pipeline._clean_item(item)
+            from_detail = pipeline._clean_item(detail)
+        finally:
+            shutil.rmtree(test_dir)
+        for field in ['房源ID', '户型', '面积', '朝向', '装修', '楼层', '建筑年代']:
+            self.assertEqual(from_list[field], from_detail[field])
+        self.assertEqual((from_list['总价'], from_list['小区名'], from_list['区域']), ('100', '测试小区0', '高新'))
+
+
+class TestListOnlySpider(unittest.TestCase):
+    """测试仅列表模式的爬虫"""
+
+    spider_class = LianjiaSpider
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.server = StubLianjiaServer(pages=2, per_page=5).start()
+        self.config_patch = patch.dict(CONFIG, {
+            'BASE_URL': self.server.base_url,
+            'DATA_DIR': self.test_dir,
+            'LIST_ONLY': True,
+            'ENRICH_DETAILS': False,
+            'RATE_LIMIT': 0,
+            'DELAY_RANGE': (0, 0)
+        })
+        self.config_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.config_patch.stop()
+        self.server.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _run(self):
+        spider = self.spider_class()
+        spider.state_manager = StateManager(os.path.join(self.test_dir, 'progress.json'))
+        spider.pipeline = CSVPipeline(os.path.join(self.test_dir, 'houses.csv'))
+        spider.run()
+        return read_rows(spider.pipeline.file_path)
+
+    def _detail_requests(self):
+        return [path for path in self.server.request_paths if path.endswith('.html')]
+
+    def test_list_only(self):
+        """测试只请求列表页"""
+        rows = self._run()
+        self.assertEqual(self.server.request_count, 3)
+        self.assertEqual([row['房源ID'] for row in rows], self.server.house_ids())
+        self.assertEqual((rows[1]['户型'], rows[1]['面积'], rows[1]['楼层'], rows[1]['建筑年代']),
+                         ('2室1厅', '89.12平米', '中楼层(共18层)', '2010'))
+        self.assertEqual((rows[1]['小区名'], rows[1]['单价']), ('测试小区1', '10001'))
+
+    def test_background_enrichment(self):
+        """测试后台补抓详情页，重新运行时不重复补抓"""
+        with patch.dict(CONFIG, {'ENRICH_DETAILS': True}):
+            self._run()
+            enriched_file = os.path.join(self.test_dir, 'enriched', 'houses.csv')
+            enriched = read_rows(enriched_file)
+            self.assertEqual(sorted(row['房源ID'] for row in enriched), sorted(self.server.house_ids()))
+            self.assertEqual(enriched[0]['电梯'], '有')
+            self.assertEqual(len(self._detail_requests()), 10)
+
+            self._run()
+            self.assertEqual(len(self._detail_requests()), 10)
+            self.assertEqual(len(read_rows(enriched_file)), 10)
+
+
+class TestListOnlyAsyncSpider(TestListOnlySpider):
+    """测试异步引擎的仅列表模式"""
+
+    spider_class = AsyncLianjiaSpider
+
+if __name__ == '__main__':
+    unittest.main()
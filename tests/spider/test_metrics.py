@@ -0,0 +1,130 @@
+"""
+测试运行指标模块
+"""
+import unittest
+import os
+import json
+import socket
+import shutil
+import requests
+from unittest.mock import patch
+from lianjia_spider.utils.metrics import Histogram, MetricsRegistry, MetricsReporter, REGISTRY, timed
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import StubLianjiaServer
+
+class TestMetricsRegistry(unittest.TestCase):
+    """测试Histogram和MetricsRegistry类的功能"""
+
+    def test_histogram(self):
+        """测试分桶计数和分位数估算"""
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.05, 0.5, 3.0):
+            histogram.observe(value)
+        data = histogram.to_dict()
+        self.assertEqual(data['buckets'], {'0.1': 2, '1.0': 1, '+Inf': 1})
+        self.assertEqual((data['count'], data['max']), (4, 3.0))
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(0.95), 3.0)
+
+    def test_prometheus_text(self):
+        """测试导出Prometheus文本格式"""
+        registry = MetricsRegistry()
+        registry.inc('retries', 2)
+        registry.observe('fetch_seconds', 0.2)
+        registry.observe('fetch_seconds', 20)
+        text = registry.to_prometheus()
+        self.assertIn('# TYPE lianjia_retries_total counter\nlianjia_retries_total 2\n', text)
+        self.assertIn('lianjia_fetch_seconds_bucket{le="0.25"} 1\n', text)
+        self.assertIn('lianjia_fetch_seconds_bucket{le="+Inf"} 2\n', text)
+        self.assertIn('lianjia_fetch_seconds_count 2\n', text)
+
+    def test_timed(self):
+        """测试装饰器在异常时也记录耗时"""
+        REGISTRY.reset()
+
+        @timed('work_seconds')
+        def work(fail):
+            if fail:
+                raise ValueError()
+
+        work(False)
+        with self.assertRaises(ValueError):
+            work(True)
+        self.assertEqual(REGISTRY.snapshot()['timers']['work_seconds']['count'], 2)
+
+    def test_final_summary_once(self):
+        """测试结束时只输出一次最终指标，不再重复写入日志"""
+        reporter = MetricsReporter(MetricsRegistry(), interval=0).start()
+        with patch('builtins.print') as mock_print, \
+                patch('lianjia_spider.utils.metrics.logger') as mock_logger:
+            reporter.stop()
+        self.assertEqual(mock_print.call_count, 1)
+        self.assertTrue(mock_print.call_args[0][0].startswith('运行指标'))
+        mock_logger.info.assert_not_called()
+
+    def test_endpoint(self):
+        """测试本机/metrics端点"""
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        registry = MetricsRegistry()
+        reporter = MetricsReporter(registry, interval=0, port=port).start()
+        try:
+            registry.inc('pages_fetched', 3)
+            response = requests.get(f'http://127.0.0.1:{port}/metrics', timeout=5)
+            self.assertIn('lianjia_pages_fetched_total 3', response.text)
+            self.assertEqual(requests.get(f'http://127.0.0.1:{port}/', timeout=5).status_code, 404)
+        finally:
+            reporter.stop()
+
+
+class TestSpiderMetrics(unittest.TestCase):
+    """测试爬虫运行时采集的指标"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.server = StubLianjiaServer(pages=2, per_page=3).start()
+        self.config_patch = patch.dict(CONFIG, {
+            'BASE_URL': self.server.base_url,
+            'DATA_DIR': self.test_dir,
+            'RATE_LIMIT': 0,
+            'DELAY_RANGE': (0, 0),
+            'METRICS': True,
+            'METRICS_INTERVAL': 0,
+            'METRICS_PORT': 0
+        })
+        self.config_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.config_patch.stop()
+        self.server.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_run_writes_metrics(self):
+        """测试运行结束后写出指标文件，包含各热点路径的耗时和重试次数"""
+        self.server.inject_faults(503)
+        with patch('lianjia_spider.utils.retry.time'):
+            LianjiaSpider().run()
+        with open(os.path.join(self.test_dir, 'metrics.json'), encoding='utf-8') as f:
+            metrics = json.load(f)
+
+        counters = metrics['counters']
+        # 3个列表页和6个详情页，其中一次503后重试成功
+        self.assertEqual(counters['pages_fetched'], 9)
+        self.assertEqual(counters['retries'], 1)
+        self.assertGreater(counters['bytes_downloaded'], 0)
+        self.assertGreater(metrics['pages_per_second'], 0)
+        timers = metrics['timers']
+        self.assertEqual(timers['fetch_seconds']['count'], 10)
+        self.assertEqual(timers['parse_list_seconds']['count'], 3)
+        self.assertEqual(timers['parse_detail_seconds']['count'], 6)
+        self.assertEqual(timers['pipeline_item_seconds']['count'], 6)
+        self.assertEqual(timers['delay_seconds']['count'], 6)
+        self.assertGreaterEqual(timers['save_state_seconds']['count'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+测试Parquet数据处理管道模块
+"""
+import unittest
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from lianjia_spider.spider.parquet_pipeline import ParquetPipeline
+from lianjia_spider.spider.pipeline import create_pipeline
+from lianjia_spider.config.settings import CSV_HEADERS
+
+class TestParquetPipeline(unittest.TestCase):
+    """测试ParquetPipeline类的功能"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.output_dir = os.path.join(self.test_dir, 'houses_parquet')
+        self.item = {
+            'house_id': '123456',
+            'title': '测试房源',
+            'total_price': '500万',
+            'unit_price': '50000元/平米',
+            'community': '测试小区',
+            'district': '朝阳区 望京',
+            'house_type': '2室1厅',
+            'area': '89.12平米',
+            'floor': '中楼层(共18层)',
+            'orientation': '南',
+            'decoration': '精装',
+            'has_elevator': '有',
+            'build_year': '2010年建',
+            'crawl_time': '2025-02-10 21:00:00'
+        }
+    
+    def tearDown(self):
+        """测试后清理"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_typed_columns(self):
+        """测试列类型"""
+        pipeline = ParquetPipeline(self.output_dir)
+        pipeline.process_item(self.item)
+        pipeline.process_item({'house_id': '789012'})
+        pipeline.close()
+        
+        table = pq.read_table(pipeline.file_path)
+        self.assertEqual(table.column_names, CSV_HEADERS)
+        self.assertEqual(table.schema.field('总价').type, pa.float64())
+        self.assertEqual(table.schema.field('面积').type, pa.float64())
+        self.assertEqual(table.schema.field('建筑年代').type, pa.int32())
+        for name in ('区域', '朝向', '装修'):
+            self.assertTrue(pa.types.is_dictionary(table.schema.field(name).type))
+        
+        rows = table.to_pylist()
+        self.assertEqual(rows[0]['房源ID'], '123456')
+        self.assertEqual(rows[0]['总价'], 500.0)
+        self.assertEqual(rows[0]['单价'], 50000.0)
+        self.assertEqual(rows[0]['面积'], 89.12)
+        self.assertEqual(rows[0]['建筑年代'], 2010)
+        self.assertEqual(rows[0]['区域'], '朝阳区 望京')
+        self.assertIsNone(rows[1]['总价'])
+        self.assertIsNone(rows[1]['朝向'])
+    
+    def test_incremental_row_groups(self):
+        """测试按行组增量写出"""
+        pipeline = ParquetPipeline(self.output_dir, row_group_size=4)
+        items = []
+        for i in range(10):
+            item = dict(self.item)
+            item['house_id'] = str(100000 + i)
+            items.append(item)
+        
+        pipeline.process_items(items[:5])
+        self.assertEqual(pipeline.row_groups, 1)
+        pipeline.process_items(items[5:])
+        self.assertEqual(pipeline.row_groups, 2)
+        pipeline.close()
+        
+        metadata = pq.ParquetFile(pipeline.file_path).metadata
+        self.assertEqual(metadata.num_row_groups, 3)
+        self.assertEqual(metadata.num_rows, 10)
+    
+    def test_flush_rolls_over(self):
+        """测试flush关闭当前分片使其可读，之后的数据写入新的分片"""
+        pipeline = ParquetPipeline(self.output_dir, row_group_size=4)
+        items = [dict(self.item, house_id=str(100000 + i)) for i in range(6)]
+        pipeline.process_items(items[:5])
+        self.assertEqual(pipeline.pending_rows, 5)
+        pipeline.flush()
+        self.assertEqual(pipeline.pending_rows, 0)
+        first = pipeline.file_path
+        self.assertEqual(pq.ParquetFile(first).metadata.num_rows, 5)
+        
+        pipeline.process_item(items[5])
+        pipeline.close()
+        self.assertNotEqual(pipeline.file_path, first)
+        self.assertEqual(pipeline.parts, 2)
+        self.assertEqual(sorted(pd.read_parquet(self.output_dir)['房源ID']), [item['house_id'] for item in items])
+        
+        # 没有新数据时flush不生成空分片
+        pipeline.flush()
+        self.assertEqual(len(os.listdir(self.output_dir)), 2)
+    
+    def test_read_directory_with_pandas(self):
+        """测试多次运行的分片可以一次读取"""
+        for house_id in ('100001', '100002'):
+            pipeline = create_pipeline(self.test_dir, 'parquet')
+            item = dict(self.item)
+            item['house_id'] = house_id
+            pipeline.process_item(item)
+            pipeline.close()
+        
+        df = pd.read_parquet(self.output_dir)
+        self.assertEqual(sorted(df['房源ID']), ['100001', '100002'])
+        self.assertEqual(df['总价'].dtype, 'float64')
+
+if __name__ == '__main__':
+    unittest.main()
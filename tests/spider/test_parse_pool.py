@@ -0,0 +1,174 @@
+"""
+测试多进程解析模块
+"""
+import unittest
+import os
+import asyncio
+import shutil
+from unittest.mock import patch
+from lianjia_spider.spider.parse_pool import ParsePool
+from lianjia_spider.spider.parser import Parser
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.async_spider import AsyncLianjiaSpider
+from lianjia_spider.utils.state import StateManager
+from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import StubLianjiaServer, read_rows
+
+class TestParsePool(unittest.TestCase):
+    """测试ParsePool类的功能"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.stub = StubLianjiaServer(pages=1, per_page=1)
+        self.pool = ParsePool(workers=2, max_pending=3, backend='bs4')
+    
+    def tearDown(self):
+        """测试后清理"""
+        self.pool.close()
+    
+    def _html(self, house_id, padding):
+        # 前面的页面更大，解析更慢，用于验证结果按提交顺序写出
+        return self.stub.detail_page(house_id) + '<p>填充</p>' * padding
+    
+    def test_results_in_submit_order(self):
+        """测试结果按提交顺序回调"""
+        written = []
+        house_ids = [str(100000 + i) for i in range(12)]
+        for i, house_id in enumerate(house_ids):
+            self.pool.submit(self._html(house_id, (12 - i) * 200), house_id, written.append)
+        self.pool.join()
+        
+        self.assertEqual([item['house_id'] for item in written], house_ids)
+        expected = Parser.parse_detail_page(self._html(house_ids[0], 0), house_ids[0])
+        expected.pop('crawl_time')
+        written[0].pop('crawl_time')
+        self.assertEqual(written[0], expected)
+    
+    def test_backpressure(self):
+        """测试等待写出的结果数不超过上限"""
+        written = []
+        for i in range(10):
+            self.pool.submit(self._html(str(i), 50), str(i), written.append)
+            self.assertLessEqual(self.pool.pending, 3)
+        self.pool.join()
+        self.assertEqual(len(written), 10)
+        self.assertEqual(self.pool.pending, 0)
+    
+    def test_async_backpressure(self):
+        """测试parse_async未完成的解析任务数不超过上限"""
+        running = []
+        submit = self.pool.executor.submit
+        
+        def counting_submit(*args):
+            running.append(1)
+            self.assertLessEqual(len(running), 3)
+            future = submit(*args)
+            future.add_done_callback(lambda _: running.pop())
+            return future
+        
+        async def parse_all():
+            return await asyncio.gather(*[self.pool.parse_async(self._html(str(i), 50), str(i))
+                                          for i in range(10)])
+        
+        with patch.object(self.pool.executor, 'submit', side_effect=counting_submit):
+            items = asyncio.run(parse_all())
+        self.assertEqual([item['house_id'] for item in items], [str(i) for i in range(10)])
+    
+    def test_callback_error(self):
+        """测试单个回调失败不影响后续结果"""
+        written = []
+        
+        def callback(item):
+            if item['house_id'] == '2':
+                raise ValueError('写入失败')
+            written.append(item['house_id'])
+        
+        with patch('builtins.print') as mock_print:
+            for i in range(4):
+                self.pool.submit(self._html(str(i), 0), str(i), callback)
+            self.pool.join()
+        self.assertEqual(written, ['0', '1', '3'])
+        mock_print.assert_any_call('处理房源2失败: 写入失败')
+    
+    def test_parse_error(self):
+        """测试解析失败时调用on_error而不是回调"""
+        written = []
+        failed = []
+        with patch('builtins.print'):
+            self.pool.submit(None, '0', written.append, lambda: failed.append('0'))
+            self.pool.submit(self._html('1', 0), '1', written.append, lambda: failed.append('1'))
+            self.pool.join()
+        self.assertEqual(failed, ['0'])
+        self.assertEqual([item['house_id'] for item in written], ['1'])
+
+
+class TestSpiderWithParsePool(unittest.TestCase):
+    """测试爬虫使用解析进程池时的输出"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.server = StubLianjiaServer(pages=2, per_page=10).start()
+        self.config_patch = patch.dict(CONFIG, {
+            'BASE_URL': self.server.base_url,
+            'RATE_LIMIT': 0,
+            'PARSE_WORKERS': 2,
+            'PARSE_MAX_PENDING': 4
+        })
+        self.config_patch.start()
+    
+    def tearDown(self):
+        """测试后清理"""
+        self.config_patch.stop()
+        self.server.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def _prepare(self, spider, name):
+        spider.state_manager = StateManager(os.path.join(self.test_dir, f'{name}_progress.json'))
+        spider.pipeline = CSVPipeline(os.path.join(self.test_dir, f'{name}_houses.csv'))
+        return spider
+    
+    def test_serial_run(self):
+        """测试串行引擎使用进程池解析，输出顺序与列表页一致"""
+        spider = self._prepare(LianjiaSpider(), 'serial')
+        with patch.object(LianjiaSpider, '_random_delay'):
+            spider.run()
+        
+        rows = read_rows(spider.pipeline.file_path)
+        self.assertEqual([row['房源ID'] for row in rows], self.server.house_ids())
+        self.assertEqual(rows[0]['小区名'], '测试小区')
+        for house_id in self.server.house_ids():
+            self.assertTrue(spider.state_manager.is_scraped(house_id))
+        self.assertIsNone(spider.parse_pool)
+    
+    def test_repeated_listing(self):
+        """测试结果写入前下一列表页再次出现的房源不重复抓取，输出与串行解析一致"""
+        house_id = self.server.house_ids()[-1 - self.server.per_page]
+        original = self.server._house_id
+        self.server._house_id = lambda page, index: house_id if (page, index) == (2, 0) else original(page, index)
+        
+        with patch.object(LianjiaSpider, '_random_delay'), patch('builtins.print'):
+            spider = self._prepare(LianjiaSpider(), 'pool')
+            spider.run()
+            with patch.dict(CONFIG, {'PARSE_WORKERS': 0}):
+                serial = self._prepare(LianjiaSpider(), 'serial')
+                serial.run()
+        
+        ids = [row['房源ID'] for row in read_rows(spider.pipeline.file_path)]
+        self.assertEqual(ids.count(house_id), 1)
+        self.assertEqual(ids, [row['房源ID'] for row in read_rows(serial.pipeline.file_path)])
+        self.assertFalse(spider._parsing_ids)
+    
+    def test_async_run(self):
+        """测试异步引擎使用进程池解析"""
+        spider = self._prepare(AsyncLianjiaSpider(concurrency=4, delay_range=(0, 0)), 'async')
+        spider.run()
+        
+        rows = read_rows(spider.pipeline.file_path)
+        self.assertEqual([row['房源ID'] for row in rows], self.server.house_ids())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,8 +6,9 @@ import os
 import csv
 import shutil
 from datetime import datetime
-from lianjia_spider.spider.pipeline import CSVPipeline
-from lianjia_spider.config.settings import CSV_HEADERS
+from unittest.mock import patch
+from lianjia_spider.spider.pipeline import CSVPipeline, BufferedCSVPipeline, create_pipeline
+from lianjia_spider.config.settings import CONFIG, CSV_HEADERS
 
 class TestCSVPipeline(unittest.TestCase):
     """测试CSVPipeline类的功能"""
@@ -134,5 +135,89 @@ class TestCSVPipeline(unittest.TestCase):
             rows = list(reader)
             self.assertEqual(len(rows), 2)  # 表头 + 两条记录
 
+
+class TestBufferedCSVPipeline(unittest.TestCase):
+    """测试BufferedCSVPipeline类的功能"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.csv_file = os.path.join(self.test_dir, 'test_houses.csv')
+        self.items = [{'house_id': str(100000 + i), 'title': f'测试房源{i}', 'total_price': '500万'}
+                      for i in range(5)]
+    
+    def tearDown(self):
+        """测试后清理"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def _read_rows(self):
+        with open(self.csv_file, 'r', encoding='utf-8', newline='') as f:
+            return list(csv.DictReader(f))
+    
+    def test_flush_on_row_threshold(self):
+        """测试达到行数阈值时批量写入"""
+        pipeline = BufferedCSVPipeline(self.csv_file, buffer_rows=3, fsync='never')
+        for item in self.items[:2]:
+            pipeline.process_item(item)
+        self.assertEqual(len(self._read_rows()), 0)
+        
+        pipeline.process_item(self.items[2])
+        self.assertEqual(len(self._read_rows()), 3)
+        
+        pipeline.process_items(self.items[3:])
+        self.assertEqual(len(self._read_rows()), 3)
+        pipeline.close()
+        
+        rows = self._read_rows()
+        self.assertEqual([row['房源ID'] for row in rows], [item['house_id'] for item in self.items])
+        self.assertEqual(rows[0]['总价'], '500')
+    
+    def test_flush_on_byte_threshold(self):
+        """测试达到字节阈值时批量写入"""
+        pipeline = BufferedCSVPipeline(self.csv_file, buffer_rows=1000, buffer_bytes=1, fsync='never')
+        pipeline.process_item(self.items[0])
+        self.assertEqual(len(self._read_rows()), 1)
+        pipeline.close()
+    
+    def test_fsync_policy(self):
+        """测试fsync策略"""
+        with patch('os.fsync') as mock_fsync:
+            pipeline = BufferedCSVPipeline(self.csv_file, buffer_rows=2, fsync='flush')
+            pipeline.process_items(self.items[:2])
+            self.assertEqual(mock_fsync.call_count, 1)
+            pipeline.close()
+        
+        with patch('os.fsync') as mock_fsync:
+            pipeline = BufferedCSVPipeline(self.csv_file, buffer_rows=2, fsync='never')
+            pipeline.process_items(self.items)
+            pipeline.close()
+            mock_fsync.assert_not_called()
+        
+        with self.assertRaises(ValueError):
+            BufferedCSVPipeline(self.csv_file, fsync='always')
+    
+    def test_process_items_single_write(self):
+        """测试批量处理只打开一次文件"""
+        pipeline = CSVPipeline(self.csv_file)
+        with patch('builtins.open', wraps=open) as mock_open:
+            pipeline.process_items(self.items)
+            self.assertEqual(mock_open.call_count, 1)
+        self.assertEqual(len(self._read_rows()), 5)
+
+    def test_create_pipeline_overwrite(self):
+        """测试overwrite为True时重复运行不追加重复数据"""
+        with patch.dict(CONFIG, {'OUTPUT_FILE': 'test_houses.csv', 'PIPELINE_BUFFER_ROWS': 0}):
+            for _ in range(2):
+                pipeline = create_pipeline(self.test_dir, 'csv', overwrite=True)
+                pipeline.process_items(self.items)
+                pipeline.close()
+            self.assertEqual(len(self._read_rows()), 5)
+            
+            pipeline = create_pipeline(self.test_dir, 'csv')
+            pipeline.process_items(self.items)
+            self.assertEqual(len(self._read_rows()), 10)
+
 if __name__ == '__main__':
     unittest.main()
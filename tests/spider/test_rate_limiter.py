@@ -0,0 +1,180 @@
+"""
+测试限速模块
+"""
+import unittest
+import os
+import time
+import shutil
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from lianjia_spider.utils.rate_limiter import TokenBucket, RateLimiter, create_rate_limiter
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.async_spider import AsyncLianjiaSpider
+from lianjia_spider.utils.state import StateManager
+from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import StubLianjiaServer, read_rows
+
+class TestTokenBucket(unittest.TestCase):
+    """测试TokenBucket类的功能"""
+
+    @patch('lianjia_spider.utils.rate_limiter.time.monotonic')
+    def test_burst_then_rate(self, mock_monotonic):
+        """测试突发令牌用完后按速率排队"""
+        mock_monotonic.return_value = 100.0
+        bucket = TokenBucket(rate=10, burst=2)
+        waits = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 0.1)
+        self.assertAlmostEqual(waits[3], 0.2)
+
+    @patch('lianjia_spider.utils.rate_limiter.time.monotonic')
+    def test_refill(self, mock_monotonic):
+        """测试令牌按时间补充且不超过桶容量"""
+        mock_monotonic.return_value = 100.0
+        bucket = TokenBucket(rate=10, burst=2)
+        bucket.reserve()
+        bucket.reserve()
+        mock_monotonic.return_value = 110.0
+        self.assertEqual([bucket.reserve() for _ in range(2)], [0.0, 0.0])
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+
+    @patch('lianjia_spider.utils.rate_limiter.time.monotonic')
+    def test_set_rate(self, mock_monotonic):
+        """测试调整速率"""
+        mock_monotonic.return_value = 100.0
+        bucket = TokenBucket(rate=10, burst=1)
+        bucket.reserve()
+        bucket.set_rate(2)
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+
+    def test_invalid_rate(self):
+        """测试非法速率"""
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """测试RateLimiter类的功能"""
+
+    @patch('lianjia_spider.utils.rate_limiter.time.monotonic')
+    def test_per_host_buckets(self, mock_monotonic):
+        """测试不同主机使用独立的令牌桶"""
+        mock_monotonic.return_value = 100.0
+        limiter = RateLimiter(rate=1, burst=1, jitter=0, per_host=True)
+        self.assertEqual(limiter.reserve('https://cd.lianjia.com/ershoufang/pg1/'), 0.0)
+        self.assertEqual(limiter.reserve('https://bj.lianjia.com/ershoufang/pg1/'), 0.0)
+        self.assertAlmostEqual(limiter.reserve('https://cd.lianjia.com/ershoufang/pg2/'), 1.0)
+        self.assertEqual(limiter.get_stats()['hosts'], 2)
+
+        shared = RateLimiter(rate=1, burst=1, jitter=0, per_host=False)
+        shared.reserve('https://cd.lianjia.com/')
+        self.assertAlmostEqual(shared.reserve('https://bj.lianjia.com/'), 1.0)
+
+    def test_jitter(self):
+        """测试抖动范围且不消耗额外令牌"""
+        limiter = RateLimiter(rate=1000, burst=100, jitter=0.5, per_host=True)
+        waits = [limiter.reserve('http://127.0.0.1/') for _ in range(50)]
+        self.assertTrue(all(0 <= wait <= 0.5 for wait in waits))
+        self.assertGreater(len(set(waits)), 1)
+        self.assertEqual(limiter.get_stats()['requests'], 50)
+
+    def test_shared_across_threads(self):
+        """测试多个线程共享限速器时总速率不超过设定值"""
+        limiter = RateLimiter(rate=50, burst=1, jitter=0)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(limiter.acquire, ['http://127.0.0.1/'] * 20))
+        elapsed = time.perf_counter() - start
+        # 第一个请求使用突发令牌，其余19个按每秒50个排队
+        self.assertGreaterEqual(elapsed, 19 / 50 * 0.95)
+        self.assertLess(elapsed, 19 / 50 + 0.3)
+
+    def test_acquire_async(self):
+        """测试异步等待不阻塞事件循环"""
+        limiter = RateLimiter(rate=50, burst=1, jitter=0)
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.02)
+
+        async def main():
+            await asyncio.gather(
+                ticker(),
+                *[limiter.acquire_async('http://127.0.0.1/') for _ in range(10)]
+            )
+
+        start = time.perf_counter()
+        asyncio.run(main())
+        self.assertGreaterEqual(time.perf_counter() - start, 9 / 50 * 0.95)
+        self.assertEqual(len(ticks), 5)
+
+    def test_create_rate_limiter(self):
+        """测试根据配置创建限速器"""
+        with patch.dict(CONFIG, {'RATE_LIMIT': 0}):
+            self.assertIsNone(create_rate_limiter())
+        with patch.dict(CONFIG, {'RATE_LIMIT': 2, 'RATE_BURST': 3}):
+            limiter = create_rate_limiter()
+            self.assertEqual(limiter.rate, 2)
+            self.assertEqual(limiter.burst, 3)
+
+
+class TestSpiderRateLimit(unittest.TestCase):
+    """测试爬虫按限速器的速率发送请求"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.server = StubLianjiaServer(pages=1, per_page=10).start()
+        self.config_patch = patch.dict(CONFIG, {
+            'BASE_URL': self.server.base_url,
+            'RATE_LIMIT': 40,
+            'RATE_BURST': 1,
+            'RATE_JITTER': 0
+        })
+        self.config_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.config_patch.stop()
+        self.server.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _prepare(self, spider, name):
+        spider.state_manager = StateManager(os.path.join(self.test_dir, f'{name}_progress.json'))
+        spider.pipeline = CSVPipeline(os.path.join(self.test_dir, f'{name}_houses.csv'))
+        return spider
+
+    def _assert_paced(self, spider):
+        start = time.perf_counter()
+        spider.run()
+        elapsed = time.perf_counter() - start
+
+        # 列表页2次 + 详情页10次，第一个请求使用突发令牌
+        requests = self.server.request_count
+        self.assertEqual(requests, 12)
+        self.assertGreaterEqual(elapsed, (requests - 1) / 40 * 0.95)
+        self.assertEqual(spider.rate_limiter.get_stats()['requests'], requests)
+        self.assertEqual(len(read_rows(spider.pipeline.file_path)), 10)
+
+    def test_serial_uses_rate_limiter(self):
+        """测试串行引擎使用限速器代替随机延迟"""
+        spider = self._prepare(LianjiaSpider(), 'serial')
+        with patch.object(LianjiaSpider, '_random_delay') as mock_delay:
+            self._assert_paced(spider)
+        mock_delay.assert_not_called()
+
+    def test_async_uses_rate_limiter(self):
+        """测试异步引擎在事件循环中等待令牌，每个请求只取一次令牌"""
+        spider = self._prepare(AsyncLianjiaSpider(concurrency=4), 'async')
+        with patch.object(AsyncLianjiaSpider, '_async_delay') as mock_delay:
+            self._assert_paced(spider)
+        mock_delay.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+测试多城市调度器
+"""
+import unittest
+import os
+import shutil
+from unittest.mock import patch
+from lianjia_spider.spider.scheduler import CrawlTarget, MultiCityScheduler
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import StubLianjiaServer, read_rows
+
+class TestCrawlTarget(unittest.TestCase):
+    """测试CrawlTarget类的功能"""
+
+    def test_parse(self):
+        """测试解析各种形式的目标配置"""
+        self.assertEqual(CrawlTarget.parse('cd'), CrawlTarget('cd', 'ershoufang', 1))
+        self.assertEqual(CrawlTarget.parse('bj/ershoufang:3'), CrawlTarget('bj', 'ershoufang', 3))
+        self.assertEqual(CrawlTarget.parse({'city': 'sh', 'weight': 2}), CrawlTarget('sh', 'ershoufang', 2))
+        target = CrawlTarget('cd')
+        self.assertEqual(target.base_url, 'https://cd.lianjia.com/ershoufang/')
+        self.assertEqual(target.data_dir('data'), os.path.join('data', 'cd', 'ershoufang'))
+
+    def test_invalid(self):
+        """测试未知频道、尚无解析器的频道和非法权重"""
+        for spec in ('cd/xinfang', 'bj/chengjiao', {'city': 'sh', 'category': 'zufang'}):
+            with self.assertRaises(ValueError):
+                CrawlTarget.parse(spec)
+        with self.assertRaises(ValueError):
+            CrawlTarget.parse('cd/ershoufang:0')
+
+
+class TestMultiCityScheduler(unittest.TestCase):
+    """测试MultiCityScheduler类的功能"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.servers = {
+            'cd/ershoufang': StubLianjiaServer(pages=2, per_page=5).start(),
+            'bj/ershoufang': StubLianjiaServer(pages=1, per_page=3).start()
+        }
+        self.config_patch = patch.dict(CONFIG, {
+            'DATA_DIR': self.test_dir,
+            'RATE_LIMIT': 0,
+            'DELAY_RANGE': (0, 0)
+        })
+        self.config_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.config_patch.stop()
+        for server in self.servers.values():
+            server.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _scheduler(self, targets, **kwargs):
+        base_urls = {name: server.base_url for name, server in self.servers.items()}
+        return MultiCityScheduler(targets, base_urls=base_urls, **kwargs)
+
+    def test_partitions(self):
+        """测试各目标的进度和输出写入各自的目录"""
+        scheduler = self._scheduler(['cd/ershoufang:2', 'bj/ershoufang'], workers=2)
+        scheduler.run()
+        for name, server in self.servers.items():
+            target_dir = os.path.join(self.test_dir, *name.split('/'))
+            rows = read_rows(os.path.join(target_dir, 'houses.csv'))
+            self.assertEqual([row['房源ID'] for row in rows], server.house_ids())
+            self.assertTrue(os.path.exists(os.path.join(target_dir, 'progress.json')))
+            self.assertEqual(scheduler.passes[name], 1)
+        self.assertEqual(scheduler.pages, {'cd/ershoufang': 3, 'bj/ershoufang': 2})
+
+        # 重新运行时各目标从保存的页码继续，不再请求详情页
+        detail_requests = {name: server.request_count - scheduler.pages[name]
+                           for name, server in self.servers.items()}
+        self._scheduler(['cd/ershoufang:2', 'bj/ershoufang'], workers=2).run()
+        for name, server in self.servers.items():
+            self.assertEqual(len([p for p in server.request_paths if p.endswith('.html')]), detail_requests[name])
+
+    def test_weighted_refresh(self):
+        """测试刷新模式需要增量模式，权重高的目标分到更多列表页"""
+        with self.assertRaises(ValueError):
+            self._scheduler(['cd/ershoufang'], rounds=2)
+        
+        CONFIG['INCREMENTAL'] = True
+        scheduler = self._scheduler(['cd/ershoufang:2', 'bj/ershoufang:1'], workers=1, rounds=3)
+        scheduler.run()
+        # 平滑加权轮询按A、B、A的顺序选择，B完成第3遍时A已抓取11个列表页
+        self.assertEqual(scheduler.pages, {'cd/ershoufang': 11, 'bj/ershoufang': 6})
+        self.assertEqual(scheduler.passes, {'cd/ershoufang': 3, 'bj/ershoufang': 3})
+
+if __name__ == '__main__':
+    unittest.main()
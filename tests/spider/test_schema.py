@@ -0,0 +1,64 @@
+"""
+测试输出字段定义模块
+"""
+import unittest
+from lianjia_spider.spider.schema import SCHEMA, Schema, extract_number
+from lianjia_spider.spider.parser import Parser
+from lianjia_spider.config.settings import CSV_HEADERS
+
+class TestSchema(unittest.TestCase):
+    """测试Schema的编译和清洗"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.item = {
+            'house_id': 106100000000,
+            'title': ' 测试房源 ',
+            'total_price': '300.5万',
+            'unit_price': '50,000元/平米',
+            'area': ' 89m² ',
+            'build_year': '２０１０年建',
+            'crawl_time': '2025-02-10 21:00:00',
+            'structure': '平层'
+        }
+
+    def test_clean_row(self):
+        """测试元组按列顺序排列，缺失字段为空字符串，并与clean_dict一致"""
+        row = SCHEMA.clean_row(self.item)
+        self.assertEqual(len(row), len(CSV_HEADERS))
+        cleaned = SCHEMA.to_dict(row)
+        self.assertEqual(cleaned['房源ID'], '106100000000')
+        self.assertEqual(cleaned['标题'], '测试房源')
+        self.assertEqual(cleaned['总价'], '300.5')
+        self.assertEqual(cleaned['单价'], '50000')
+        self.assertEqual(cleaned['面积'], '89m²')
+        self.assertEqual(cleaned['建筑年代'], '２０１０')
+        self.assertEqual(cleaned['小区名'], '')
+        self.assertEqual(dict(dict.fromkeys(CSV_HEADERS, ''), **SCHEMA.clean_dict(self.item)), cleaned)
+
+    def test_missing_crawl_time(self):
+        """测试抓取时间为空时使用当前时间"""
+        self.item['crawl_time'] = ''
+        row = SCHEMA.clean_row(self.item)
+        self.assertRegex(row[CSV_HEADERS.index('抓取时间')], r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$')
+
+    def test_extract_number(self):
+        """测试与str.isdigit()的判断一致"""
+        self.assertEqual(extract_number('89m²'), '89²')
+        self.assertEqual(extract_number('1,234.5万'), '1234.5')
+        self.assertEqual(extract_number(''), '')
+
+    def test_labels(self):
+        """测试详情页标签映射由字段定义编译，并包含不输出的标签"""
+        self.assertIs(Parser.FIELD_MAPPING, SCHEMA.labels)
+        self.assertEqual(SCHEMA.labels['房屋户型'], 'house_type')
+        self.assertEqual(SCHEMA.labels['户型结构'], 'structure')
+        self.assertEqual(SCHEMA.number_columns, ('总价', '单价', '建筑年代'))
+
+    def test_subset_headers(self):
+        """测试只编译部分列"""
+        schema = Schema(('房源ID', '抓取时间'))
+        self.assertEqual(schema.clean_row(self.item), ('106100000000', '2025-02-10 21:00:00'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+"""
+测试分片规划和分片并行爬虫
+"""
+import unittest
+import os
+import shutil
+import requests
+from unittest.mock import patch
+from lianjia_spider.spider.parser import Parser
+from lianjia_spider.spider.shards import Shard, ShardPlanner
+from lianjia_spider.spider.sharded_spider import ShardedLianjiaSpider
+from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.utils.state import StateManager, JournaledStateManager
+from lianjia_spider.utils.sqlite_state import SQLiteStateManager
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import ShardedStubServer, read_rows
+
+REGIONS = {
+    'jinjiang': {'chunxilu': 40, 'hongxing': 4},
+    'gaoxin': {'tianfu': 6},
+    'wuhou': {}
+}
+
+SHARD_CONFIG = {
+    'SHARD_PAGE_CAP': 3,
+    'SHARD_PRICE_FILTERS': ['p1', 'p2', 'p3'],
+    'SHARD_AREA_FILTERS': ['a1', 'a2']
+}
+
+class TestShard(unittest.TestCase):
+    """测试Shard类的功能"""
+
+    def test_url(self):
+        """测试分片URL"""
+        base = 'https://cd.lianjia.com/ershoufang/'
+        self.assertEqual(Shard().url(2, base), f'{base}pg2/')
+        self.assertEqual(Shard('jinjiang', 'p3a2').url(1, base), f'{base}jinjiang/pg1p3a2/')
+        self.assertEqual(Shard('jinjiang', 'p3').key, 'jinjiang/p3')
+        shard = Shard('gaoxin', '', 6, 2)
+        self.assertEqual(Shard.from_dict(shard.to_dict()), shard)
+
+    def test_parse_regions(self):
+        """测试解析区域筛选栏"""
+        with ShardedStubServer(REGIONS) as stub:
+            self.assertEqual(Parser.parse_regions(stub.sharded_list_page(None, 1)),
+                             (['jinjiang', 'gaoxin', 'wuhou'], []))
+            self.assertEqual(Parser.parse_regions(stub.sharded_list_page('hongxing', 1)),
+                             (['jinjiang', 'gaoxin', 'wuhou'], ['chunxilu', 'hongxing']))
+        self.assertEqual(Parser.parse_regions('<div></div>'), ([], []))
+
+
+class TestShardPlanner(unittest.TestCase):
+    """测试ShardPlanner类的功能"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.server = ShardedStubServer(REGIONS).start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.server.stop()
+
+    def _planner(self, **kwargs):
+        fetch = lambda url: requests.get(url, timeout=10).text
+        options = dict(page_cap=3, price_filters=['p1', 'p2', 'p3'], area_filters=['a1', 'a2'])
+        options.update(kwargs)
+        with patch.dict(CONFIG, {'BASE_URL': self.server.base_url}):
+            planner = ShardPlanner(fetch, **options)
+            return planner, planner.plan()
+
+    def test_split_by_region_and_price(self):
+        """测试超过上限的城区按商圈拆分，商圈仍超过上限时按价格段拆分"""
+        planner, shards = self._planner()
+        self.assertEqual([shard.key for shard in shards],
+                         ['chunxilu/p1', 'chunxilu/p2', 'chunxilu/p3', 'hongxing/', 'gaoxin/'])
+        self.assertEqual(sum(shard.total for shard in shards), 50)
+        self.assertEqual([shard.pages for shard in shards], [3, 3, 3, 1, 2])
+        self.assertEqual(planner.truncated, [])
+
+    def test_split_by_area(self):
+        """测试价格段仍超过上限时再按面积段拆分"""
+        planner, shards = self._planner(page_cap=2)
+        keys = [shard.key for shard in shards]
+        self.assertEqual(keys[:6], ['chunxilu/p1a1', 'chunxilu/p1a2', 'chunxilu/p2a1', 'chunxilu/p2a2',
+                                    'chunxilu/p3a1', 'chunxilu/p3a2'])
+        self.assertEqual(sum(shard.total for shard in shards), 50)
+
+    def test_small_city(self):
+        """测试全城不超过上限时只有一个分片"""
+        planner, shards = self._planner(page_cap=20)
+        self.assertEqual(shards, [Shard('', '', 50, 10)])
+        self.assertEqual(planner.probes, 1)
+
+    def test_truncated(self):
+        """测试无法继续拆分的分片记录为截断"""
+        planner, shards = self._planner(page_cap=1, area_filters=[])
+        self.assertIn('chunxilu/p1', [shard.key for shard in planner.truncated])
+
+
+class TestShardState(unittest.TestCase):
+    """测试各状态后端保存分片游标"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.progress_file = os.path.join(self.test_dir, 'progress.json')
+
+    def tearDown(self):
+        """测试后清理"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_backends(self):
+        """测试分片计划和游标在重新打开后保留"""
+        for manager_class in (StateManager, JournaledStateManager, SQLiteStateManager):
+            with self.subTest(backend=manager_class.__name__):
+                state = manager_class(self.progress_file)
+                state.set_shards({'a/': Shard('a').to_dict(), 'b/p1': Shard('b', 'p1').to_dict()})
+                state.update_shard('a/', page=3)
+                state.update_shard('b/p1', done=True)
+                state.close()
+
+                state = manager_class(self.progress_file)
+                shards = state.get_shards()
+                self.assertEqual((shards['a/']['page'], shards['a/']['done']), (3, False))
+                self.assertTrue(shards['b/p1']['done'])
+                state.close()
+                shutil.rmtree(self.test_dir)
+
+
+class TestShardedSpider(unittest.TestCase):
+    """测试分片并行爬虫"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.server = ShardedStubServer(REGIONS).start()
+        self.config_patch = patch.dict(CONFIG, dict(
+            SHARD_CONFIG,
+            BASE_URL=self.server.base_url,
+            DATA_DIR=self.test_dir,
+            RATE_LIMIT=0,
+            DELAY_RANGE=(0, 0)
+        ))
+        self.config_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.config_patch.stop()
+        self.server.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _spider(self):
+        spider = ShardedLianjiaSpider(workers=3)
+        spider.state_manager = StateManager(os.path.join(self.test_dir, 'progress.json'))
+        spider.pipeline = CSVPipeline(os.path.join(self.test_dir, 'houses.csv'))
+        return spider
+
+    def test_run_all_shards(self):
+        """测试并行抓取全部分片，重新运行时不再请求"""
+        self._spider().run()
+        rows = read_rows(os.path.join(self.test_dir, 'houses.csv'))
+        self.assertEqual(sorted(row['房源ID'] for row in rows), sorted(self.server.house_ids()))
+
+        state = StateManager(os.path.join(self.test_dir, 'progress.json'))
+        self.assertTrue(all(shard['done'] for shard in state.get_shards().values()))
+        self.assertEqual(state.get_total_items(), 50)
+
+        requests_sent = self.server.request_count
+        self._spider().run()
+        self.assertEqual(self.server.request_count, requests_sent)
+
+    def test_resume_from_cursor(self):
+        """测试中断后从分片游标继续"""
+        spider = self._spider()
+        spider.plan_shards()
+        spider.state_manager.update_shard('chunxilu/p1', page=3)
+        spider.state_manager.update_shard('gaoxin/', done=True)
+        spider.state_manager.save_state()
+        planned = self.server.request_count
+
+        self._spider().run()
+        paths = self.server.request_paths[planned:]
+        list_paths = sorted(path for path in paths if not path.endswith('.html'))
+        self.assertEqual(list_paths, [
+            '/ershoufang/chunxilu/pg1p2/', '/ershoufang/chunxilu/pg1p3/',
+            '/ershoufang/chunxilu/pg2p2/', '/ershoufang/chunxilu/pg2p3/',
+            '/ershoufang/chunxilu/pg3p1/', '/ershoufang/chunxilu/pg3p2/', '/ershoufang/chunxilu/pg3p3/',
+            '/ershoufang/hongxing/pg1/'
+        ])
+        self.assertEqual(len([path for path in paths if path.endswith('.html')]), 40 + 4 - 10)
+
+if __name__ == '__main__':
+    unittest.main()
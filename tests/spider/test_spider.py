@@ -7,9 +7,9 @@ import shutil
 from unittest.mock import Mock, patch
 from lianjia_spider.spider.spider import LianjiaSpider
 from lianjia_spider.utils.headers import HeadersManager
-from lianjia_spider.utils.state import StateManager
+from lianjia_spider.utils.state import StateManager, JournaledStateManager
 from lianjia_spider.spider.parser import Parser
-from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.spider.pipeline import CSVPipeline, BufferedCSVPipeline
 
 class TestLianjiaSpider(unittest.TestCase):
     """测试LianjiaSpider类的功能"""
@@ -50,8 +50,9 @@ class TestLianjiaSpider(unittest.TestCase):
         </div>
         '''
         
-        # 初始化爬虫
+        # 初始化爬虫（限速器单独测试）
         self.spider = LianjiaSpider()
+        self.spider.rate_limiter = None
         
         # 修改文件路径到测试目录
         self.spider.state_manager = StateManager(
@@ -67,7 +68,7 @@ class TestLianjiaSpider(unittest.TestCase):
         if os.path.exists(self.test_dir):
             shutil.rmtree(self.test_dir)
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_fetch_page(self, mock_get):
         """测试页面获取"""
         # 配置mock
@@ -96,7 +97,7 @@ class TestLianjiaSpider(unittest.TestCase):
         self.assertGreaterEqual(delay, 2)
         self.assertLessEqual(delay, 5)
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_crawl_list_page(self, mock_get):
         """测试列表页爬取"""
         # 配置mock
@@ -113,7 +114,7 @@ class TestLianjiaSpider(unittest.TestCase):
         self.assertEqual(len(houses), 1)
         self.assertEqual(houses[0]['house_id'], '123456')
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_crawl_detail_page(self, mock_get):
         """测试详情页爬取"""
         # 配置mock
@@ -130,7 +131,7 @@ class TestLianjiaSpider(unittest.TestCase):
         self.assertEqual(detail['title'], '测试房源详情')
         self.assertEqual(detail['total_price'], '500')
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_retry_mechanism(self, mock_get):
         """测试重试机制"""
         # 配置mock先失败后成功
@@ -147,7 +148,7 @@ class TestLianjiaSpider(unittest.TestCase):
         self.assertEqual(html, self.test_list_html)
         self.assertEqual(mock_get.call_count, 3)
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     @patch('time.sleep')
     def test_run(self, mock_sleep, mock_get):
         """测试爬虫运行"""
@@ -173,7 +174,7 @@ class TestLianjiaSpider(unittest.TestCase):
         # 验证数据保存
         self.assertTrue(os.path.exists(self.spider.pipeline.file_path))
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_error_handling(self, mock_get):
         """测试错误处理"""
         # 配置mock始终失败
@@ -188,7 +189,7 @@ class TestLianjiaSpider(unittest.TestCase):
     def test_keyboard_interrupt_handling(self):
         """测试中断处理"""
         # 模拟运行时的键盘中断
-        with patch('requests.get') as mock_get:
+        with patch('requests.Session.get') as mock_get:
             mock_get.side_effect = KeyboardInterrupt()
             
             try:
@@ -199,5 +200,45 @@ class TestLianjiaSpider(unittest.TestCase):
             # 验证状态是否保存
             self.assertTrue(os.path.exists(self.spider.state_manager.file_path))
 
+    @patch('requests.Session.get')
+    @patch('time.sleep')
+    def test_keyboard_interrupt_flushes_buffer(self, mock_sleep, mock_get):
+        """测试中断时写入缓冲的数据"""
+        self.spider.pipeline = BufferedCSVPipeline(
+            os.path.join(self.test_dir, 'test_buffered.csv'), buffer_rows=100
+        )
+        mock_get.side_effect = [
+            Mock(text=self.test_list_html, raise_for_status=Mock()),
+            Mock(text=self.test_detail_html, raise_for_status=Mock()),
+            KeyboardInterrupt()
+        ]
+        
+        self.spider.run()
+        
+        with open(self.spider.pipeline.file_path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('123456,'))
+
+    def test_progress_waits_for_buffer(self):
+        """测试缓冲的数据写出之前不提交其进度，被强制终止时这些房源会重新抓取"""
+        progress_file = os.path.join(self.test_dir, 'test_journal.json')
+        self.spider.state_manager = JournaledStateManager(progress_file)
+        self.spider.pipeline = BufferedCSVPipeline(
+            os.path.join(self.test_dir, 'test_buffered.csv'), buffer_rows=2
+        )
+        with patch('builtins.print'):
+            self.spider._store_detail(1, '123456', {'house_id': '123456'})
+            self.assertTrue(self.spider._is_scraped('123456'))
+            # 模拟进程被终止后重新加载进度
+            self.assertFalse(JournaledStateManager(progress_file).is_scraped('123456'))
+            
+            self.spider._store_detail(2, '123457', {'house_id': '123457'})
+            reloaded = JournaledStateManager(progress_file)
+        self.assertTrue(reloaded.is_scraped('123456'))
+        self.assertTrue(reloaded.is_scraped('123457'))
+        self.assertEqual(reloaded.current_page, 2)
+        self.spider.pipeline.close()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,177 @@
+"""
+测试SQLite状态后端模块
+"""
+import unittest
+import os
+import json
+import shutil
+import sqlite3
+from unittest.mock import patch
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.utils.state import StateManager, JournaledStateManager, create_state_manager
+from lianjia_spider.utils.sqlite_state import SQLiteStateManager
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import StubLianjiaServer
+
+class TestSQLiteStateManager(unittest.TestCase):
+    """测试SQLiteStateManager类的功能"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.state_file = os.path.join(self.test_dir, 'test_progress.json')
+        self.db_file = os.path.join(self.test_dir, 'test_progress.db')
+    
+    def tearDown(self):
+        """测试后清理"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_wal_mode(self):
+        """测试数据库使用WAL模式"""
+        manager = SQLiteStateManager(self.state_file)
+        self.assertEqual(manager.db_file, self.db_file)
+        mode = manager._conn.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+        manager.close()
+    
+    def test_update_and_reload(self):
+        """测试更新进度后重新加载"""
+        manager = SQLiteStateManager(self.state_file, batch_size=10)
+        manager.update_progress(2, ['123456', '789012'], 100)
+        manager.update_progress(3, ['123456', 'BJ0001'])
+        self.assertTrue(manager.is_scraped('789012'))
+        self.assertFalse(manager.is_scraped('345678'))
+        self.assertEqual(manager.get_progress()['scraped_count'], 3)
+        manager.close()
+        
+        reloaded = SQLiteStateManager(self.state_file)
+        self.assertEqual(reloaded.current_page, 3)
+        self.assertEqual(reloaded.total_items, 100)
+        self.assertEqual(reloaded.get_scraped_ids(), ['123456', '789012', 'BJ0001'])
+        self.assertEqual(reloaded.get_progress()['scraped_count'], 3)
+        reloaded.close()
+    
+    def test_page_monotonic(self):
+        """测试较早页面的更新晚到时不回退页码"""
+        manager = SQLiteStateManager(self.state_file)
+        manager.update_progress(3, ['123456'])
+        manager.update_progress(2, ['789012'])
+        manager.close()
+        
+        reloaded = SQLiteStateManager(self.state_file)
+        self.assertEqual(reloaded.current_page, 3)
+        self.assertTrue(reloaded.is_scraped('789012'))
+        reloaded.close()
+    
+    def test_batch_commit(self):
+        """测试累计batch_size次更新后才提交"""
+        manager = SQLiteStateManager(self.state_file, batch_size=3)
+        manager.update_progress(1, ['100001'])
+        manager.update_progress(1, ['100002'])
+        self.assertEqual(SQLiteStateManager.read_progress(self.db_file)['scraped_count'], 0)
+        
+        manager.update_progress(1, ['100003'])
+        self.assertEqual(SQLiteStateManager.read_progress(self.db_file)['scraped_count'], 3)
+        
+        manager.update_progress(2, ['100004'])
+        manager.checkpoint()
+        self.assertEqual(SQLiteStateManager.read_progress(self.db_file)['current_page'], 1)
+        manager.save_state()
+        self.assertEqual(SQLiteStateManager.read_progress(self.db_file)['current_page'], 2)
+        manager.close()
+    
+    def test_concurrent_reader(self):
+        """测试写入事务未提交时其他连接仍可读取"""
+        manager = SQLiteStateManager(self.state_file, batch_size=100)
+        manager.update_progress(1, ['100001'])
+        manager.save_state()
+        manager.update_progress(2, ['100002'])
+        
+        reader = sqlite3.connect(f"file:{self.db_file}?mode=ro", uri=True)
+        count = reader.execute('SELECT COUNT(*) FROM scraped_ids').fetchone()[0]
+        reader.close()
+        self.assertEqual(count, 1)
+        manager.close()
+    
+    def test_migrate_from_json(self):
+        """测试从已有的progress.json导入"""
+        legacy = StateManager(self.state_file)
+        legacy.update_progress(7, ['123456', '789012'], 500)
+        legacy.save_state()
+        
+        manager = SQLiteStateManager(self.state_file)
+        self.assertEqual(manager.current_page, 7)
+        self.assertEqual(manager.total_items, 500)
+        self.assertTrue(manager.is_scraped('123456'))
+        self.assertTrue(manager.is_scraped('789012'))
+        manager.close()
+        
+        # 数据库已有数据时不再重复导入
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump({'current_page': 1, 'scraped_ids': ['999999']}, f)
+        manager = SQLiteStateManager(self.state_file)
+        self.assertEqual(manager.current_page, 7)
+        self.assertFalse(manager.is_scraped('999999'))
+        manager.close()
+    
+    def test_migrate_read_only(self):
+        """测试导入时重放日志，不修改旧的进度文件和日志"""
+        legacy = JournaledStateManager(self.state_file)
+        legacy.update_progress(3, ['123456'], 500)
+        legacy.update_shard('a', page=4)
+        legacy.update_progress(5, ['789012'])
+        legacy.checkpoint()
+        journal_file = legacy.journal_file
+        before = {path: open(path, 'rb').read() for path in (self.state_file, journal_file)}
+        
+        manager = SQLiteStateManager(self.state_file)
+        self.assertEqual(manager.current_page, 5)
+        self.assertEqual(manager.total_items, 500)
+        self.assertEqual(manager.get_shards(), {'a': {'page': 4}})
+        self.assertEqual(manager.get_scraped_ids(), ['123456', '789012'])
+        manager.close()
+        self.assertEqual({path: open(path, 'rb').read() for path in before}, before)
+        legacy.close()
+    
+    def test_invalid_progress_file(self):
+        """测试旧版进度文件损坏时记录错误并从空状态开始"""
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            f.write('invalid json')
+        with patch('builtins.print') as mock_print:
+            manager = SQLiteStateManager(self.state_file)
+        self.assertTrue(mock_print.call_args_list[0][0][0].startswith('加载状态文件失败'))
+        self.assertEqual(manager.current_page, 1)
+        self.assertEqual(manager.get_progress()['scraped_count'], 0)
+        manager.close()
+    
+    def test_create_state_manager(self):
+        """测试通过工厂函数选择SQLite后端"""
+        manager = create_state_manager(self.state_file, 'sqlite')
+        self.assertIsInstance(manager, SQLiteStateManager)
+        manager.close()
+    
+    def test_spider_batch_commit(self):
+        """测试爬虫每处理完一个房源做检查点时仍按batch_size批量提交"""
+        server = StubLianjiaServer(pages=2, per_page=10).start()
+        try:
+            with patch.dict(CONFIG, {'BASE_URL': server.base_url, 'DATA_DIR': self.test_dir,
+                                     'RATE_LIMIT': 0, 'SAVE_INTERVAL': 100}):
+                spider = LianjiaSpider()
+                spider.state_manager.close()
+                manager = SQLiteStateManager(self.state_file, batch_size=5)
+                spider.state_manager = manager
+                spider.pipeline = CSVPipeline(os.path.join(self.test_dir, 'houses.csv'))
+                with patch.object(manager, 'save_state', wraps=manager.save_state) as save_state, \
+                        patch.object(LianjiaSpider, '_random_delay'), patch('builtins.print'):
+                    spider.run()
+        finally:
+            server.stop()
+        # 20个房源和2次总数更新共22次更新，每5次提交一次，另有结束时的提交
+        self.assertLessEqual(save_state.call_count, 22 // 5 + 2)
+        self.assertEqual(SQLiteStateManager.read_progress(self.db_file)['scraped_count'], 20)
+
+if __name__ == '__main__':
+    unittest.main()
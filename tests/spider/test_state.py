@@ -6,7 +6,7 @@ import os
 import json
 import shutil
 from datetime import datetime
-from lianjia_spider.utils.state import StateManager
+from lianjia_spider.utils.state import StateManager, JournaledStateManager, create_state_manager
 
 class TestStateManager(unittest.TestCase):
     """测试StateManager类的功能"""
@@ -147,5 +147,136 @@ class TestStateManager(unittest.TestCase):
             self.assertIn('123456', state['scraped_ids'])
             self.assertIn('789012', state['scraped_ids'])
 
+    def test_compact_serialization(self):
+        """测试已爬取ID以差分编码紧凑保存"""
+        self.state_manager.update_progress(3, ['106100000300', '106100000100', '106100000200', 'BJ0001'])
+        self.state_manager.save_state()
+        
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+            self.assertEqual(state['scraped_id_deltas'], [106100000100, 100, 100])
+            self.assertEqual(state['scraped_ids'], ['BJ0001'])
+        
+        new_manager = StateManager(self.state_file)
+        for house_id in ['106100000100', '106100000200', '106100000300', 'BJ0001']:
+            self.assertTrue(new_manager.is_scraped(house_id))
+        self.assertFalse(new_manager.is_scraped('106100000400'))
+        self.assertEqual(new_manager.get_progress()['scraped_count'], 4)
+    
+    def test_load_legacy_state(self):
+        """测试加载旧版字符串列表格式的进度文件"""
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(self.test_state, f)
+        
+        new_manager = StateManager(self.state_file)
+        self.assertTrue(new_manager.is_scraped('123456'))
+        self.assertTrue(new_manager.is_scraped('789012'))
+        self.assertEqual(new_manager.total_items, 100)
+        
+        # 重新保存后转换为紧凑格式
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+            self.assertEqual(state['scraped_ids'], [])
+            self.assertEqual(state['scraped_id_deltas'], [123456, 789012 - 123456])
+    
+    def test_duplicate_ids(self):
+        """测试重复ID只记录一次"""
+        self.state_manager.update_progress(1, ['123456', '123456'])
+        self.state_manager.update_progress(2, ['123456'])
+        self.assertEqual(self.state_manager.get_scraped_ids(), ['123456'])
+    
+    def test_page_monotonic(self):
+        """测试较早页面的更新晚到时不回退页码"""
+        self.state_manager.update_progress(3, ['123456'])
+        self.state_manager.update_progress(2, ['789012'])
+        self.assertEqual(self.state_manager.current_page, 3)
+        self.assertTrue(self.state_manager.is_scraped('789012'))
+
+
+class TestJournaledStateManager(unittest.TestCase):
+    """测试JournaledStateManager类的功能"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.state_file = os.path.join(self.test_dir, 'test_progress.json')
+        self.journal_file = f"{self.state_file}.journal"
+    
+    def tearDown(self):
+        """测试后清理"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+    
+    def test_update_appends_journal(self):
+        """测试每次更新只追加日志，不重写快照"""
+        manager = JournaledStateManager(self.state_file, compact_interval=100)
+        snapshot_mtime = os.path.getmtime(self.state_file)
+        
+        manager.update_progress(1, ['123456'], 50)
+        manager.update_progress(1, ['789012'])
+        manager.checkpoint()
+        
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(records, [{'p': 1, 'ids': ['123456'], 't': 50}, {'p': 1, 'ids': ['789012']}])
+        self.assertEqual(os.path.getmtime(self.state_file), snapshot_mtime)
+    
+    def test_recover_without_save(self):
+        """测试未保存快照时崩溃，重启后重放日志恢复"""
+        manager = JournaledStateManager(self.state_file, compact_interval=100)
+        manager.update_progress(2, ['123456', '789012'], 100)
+        manager.update_progress(3, ['345678'])
+        manager.checkpoint()
+        # 不调用save_state/close，模拟进程崩溃
+        
+        recovered = JournaledStateManager(self.state_file, compact_interval=100)
+        self.assertEqual(recovered.current_page, 3)
+        self.assertEqual(recovered.total_items, 100)
+        for house_id in ['123456', '789012', '345678']:
+            self.assertTrue(recovered.is_scraped(house_id))
+    
+    def test_truncated_record(self):
+        """测试忽略崩溃时写了一半的日志记录"""
+        manager = JournaledStateManager(self.state_file, compact_interval=100)
+        manager.update_progress(1, ['123456'])
+        manager.checkpoint()
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write('{"p":2,"ids":["7890')
+        
+        recovered = JournaledStateManager(self.state_file, compact_interval=100)
+        self.assertTrue(recovered.is_scraped('123456'))
+        self.assertEqual(recovered.current_page, 1)
+        
+        # 后续追加的记录不受残缺记录影响
+        recovered.update_progress(2, ['789012'])
+        again = JournaledStateManager(self.state_file, compact_interval=100)
+        self.assertTrue(again.is_scraped('789012'))
+        self.assertEqual(again.current_page, 2)
+    
+    def test_compaction(self):
+        """测试日志达到阈值后合并进快照"""
+        manager = JournaledStateManager(self.state_file, compact_interval=3)
+        for i in range(3):
+            manager.update_progress(i + 1, [str(100000 + i)])
+        
+        self.assertEqual(os.path.getsize(self.journal_file), 0)
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+            self.assertEqual(state['current_page'], 3)
+            self.assertEqual(state['scraped_id_deltas'], [100000, 1, 1])
+        
+        manager.update_progress(4, ['100003'])
+        manager.close()
+        self.assertEqual(os.path.getsize(self.journal_file), 0)
+        self.assertTrue(StateManager(self.state_file).is_scraped('100003'))
+    
+    def test_create_state_manager(self):
+        """测试按后端名称创建状态管理器"""
+        self.assertIsInstance(create_state_manager(self.state_file, 'journal'), JournaledStateManager)
+        self.assertNotIsInstance(create_state_manager(self.state_file, 'json'), JournaledStateManager)
+        with self.assertRaises(ValueError):
+            create_state_manager(self.state_file, 'unknown')
+
 if __name__ == '__main__':
     unittest.main()
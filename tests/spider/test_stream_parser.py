@@ -0,0 +1,154 @@
+"""
+测试详情页流式解析模块
+"""
+import unittest
+import os
+import shutil
+from unittest.mock import patch
+from lianjia_spider.spider.parser import Parser
+from lianjia_spider.spider.spider import LianjiaSpider
+from lianjia_spider.spider.async_spider import AsyncLianjiaSpider
+from lianjia_spider.spider.pipeline import CSVPipeline
+from lianjia_spider.spider.stream_parser import DetailStreamParser
+from lianjia_spider.utils.state import StateManager
+from lianjia_spider.utils.metrics import REGISTRY
+from lianjia_spider.config.settings import CONFIG
+from tests.spider import test_parser
+from tests.spider.test_fast_parser import EDGE_DETAIL_PAGES
+from benchmarks.stub_server import StubLianjiaServer, read_rows
+
+# 额外的边界情况样本
+STREAM_DETAIL_PAGES = {
+    'unclosed': '''
+        <h1 class="main">标题<br>换行<img src="x.png"/></h1>
+        <span class="total">1<b>0</span>0</b>
+        <div><ul><li class="base"><span class="label">房屋户型：</span>2室<p>1厅</li>
+        <li class="base"><span class="label">配备电梯：<span>有</li></ul></div>
+        </div>
+    ''',
+    'entities': '''
+        <h1 class="main">A &amp; B&nbsp;&#21335;</h1>
+        <div class="communityName"><a>小区<!-- 注释 --><script>var a = "<a>";</script>名</a></div>
+    ''',
+    'two_lists': '''
+        <ul><li class="base"><span class="label">房屋户型：</span>1室</li></ul>
+        <ul><li class="base"><span class="label">房屋户型：</span>2室</li></ul>
+    ''',
+}
+
+class TestDetailStreamParser(unittest.TestCase):
+    """测试DetailStreamParser与Parser的输出一致"""
+
+    @classmethod
+    def setUpClass(cls):
+        """读取test_parser.py和test_fast_parser.py中的样本"""
+        fixtures = test_parser.TestParser('test_parse_detail_page')
+        fixtures.setUp()
+        cls.pages = dict(EDGE_DETAIL_PAGES, fixture=fixtures.detail_page_html, **STREAM_DETAIL_PAGES)
+        stub = StubLianjiaServer(pages=1, per_page=3)
+        stub.detail_padding = 100
+        cls.pages['stub'] = stub.detail_page('106100001000')
+
+    def _parse(self, html, chunk_size):
+        parser = DetailStreamParser()
+        for start in range(0, len(html), chunk_size):
+            parser.feed(html[start:start + chunk_size])
+        parser.close()
+        return parser
+
+    def test_parity(self):
+        """测试按任意大小分块输入时解析结果一致（包括键的顺序）"""
+        for name, html in self.pages.items():
+            for chunk_size in (1, 7, len(html) or 1):
+                with self.subTest(page=name, chunk_size=chunk_size):
+                    with patch('builtins.print'):
+                        expected = Parser.parse_detail_page(html, '123456')
+                        actual = self._parse(html, chunk_size).result('123456')
+                    expected.pop('crawl_time')
+                    actual.pop('crawl_time')
+                    self.assertEqual(list(actual.items()), list(expected.items()))
+
+    def test_complete(self):
+        """测试必需区块都结束后complete为True，缺少区块时始终为False"""
+        html = self.pages['stub']
+        parser = DetailStreamParser()
+        parser.feed(html[:html.index('<div class="comments">')])
+        self.assertTrue(parser.complete)
+        self.assertFalse(self._parse(self.pages['fixture'].replace('areaName', 'other'), 64).complete)
+        self.assertFalse(self._parse(self.pages['labels'], 64).complete)
+
+
+class TestStreamingSpider(unittest.TestCase):
+    """测试爬虫流式解析详情页"""
+
+    spider_class = LianjiaSpider
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.server = StubLianjiaServer(pages=1, per_page=5).start()
+        self.server.detail_padding = 200 * 1024
+        self.config_patch = patch.dict(CONFIG, {
+            'BASE_URL': self.server.base_url,
+            'DATA_DIR': self.test_dir,
+            'RATE_LIMIT': 0,
+            'DELAY_RANGE': (0, 0),
+            'STREAM_DETAIL': True,
+            'STREAM_CHUNK_SIZE': 4096,
+            'STREAM_DRAIN_BYTES': 0,
+            'CONCURRENCY': 1
+        })
+        self.config_patch.start()
+        REGISTRY.reset()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.config_patch.stop()
+        self.server.stop()
+        REGISTRY.reset()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _run(self, name):
+        spider = self.spider_class()
+        spider.state_manager = StateManager(os.path.join(self.test_dir, f'{name}.json'))
+        spider.pipeline = CSVPipeline(os.path.join(self.test_dir, f'{name}.csv'))
+        spider.run()
+        rows = read_rows(spider.pipeline.file_path)
+        for row in rows:
+            row.pop('抓取时间')
+        return rows
+
+    def test_stops_download(self):
+        """测试输出与完整解析相同，详情页只下载必需字段所在的部分"""
+        rows = self._run('stream')
+        counters = REGISTRY.snapshot()['counters']
+        self.assertEqual(counters['detail_streams_stopped'], 5)
+        page_bytes = len(self.server.detail_page(self.server.house_ids()[0]).encode('utf-8'))
+        self.assertLess(counters['bytes_downloaded'], page_bytes)
+        # 每个详情页停止下载时关闭连接，之后的请求重新建立连接
+        self.assertGreaterEqual(self.server.connection_count, 5)
+
+        with patch.dict(CONFIG, {'STREAM_DETAIL': False}):
+            expected = self._run('full')
+        self.assertEqual(rows, expected)
+        self.assertEqual(rows[0]['区域'], '高新 天府软件园')
+
+    def test_drain_small_remainder(self):
+        """测试剩余内容较少时读完响应，继续复用连接"""
+        self.server.detail_padding = 100
+        with patch.dict(CONFIG, {'STREAM_DRAIN_BYTES': 64 * 1024}):
+            rows = self._run('stream')
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(self.server.connection_count, 1)
+        self.assertNotIn('detail_streams_stopped', REGISTRY.snapshot()['counters'])
+
+
+class TestStreamingAsyncSpider(TestStreamingSpider):
+    """测试异步引擎流式解析详情页"""
+
+    spider_class = AsyncLianjiaSpider
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+测试HTTP传输层模块
+"""
+import unittest
+import time
+from concurrent.futures import ThreadPoolExecutor
+from lianjia_spider.utils.transport import HttpTransport
+from lianjia_spider.utils.headers import HeadersManager
+from benchmarks.stub_server import StubLianjiaServer
+
+class TestHttpTransport(unittest.TestCase):
+    """测试HttpTransport类的功能"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.server = StubLianjiaServer(pages=1, per_page=5).start()
+        self.headers_manager = HeadersManager()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.server.stop()
+
+    def test_connection_reuse(self):
+        """测试串行请求复用同一连接"""
+        transport = HttpTransport(pool_size=2, per_host_limit=2, idle_timeout=60)
+        for _ in range(20):
+            response = transport.get(f"{self.server.base_url}pg1/",
+                                     headers=self.headers_manager.get_headers())
+            response.raise_for_status()
+
+        stats = transport.get_stats()
+        self.assertEqual(stats['requests'], 20)
+        self.assertEqual(stats['connections_opened'], 1)
+        self.assertEqual(stats['connections_reused'], 19)
+        self.assertAlmostEqual(stats['reuse_ratio'], 0.95)
+        transport.close()
+
+    def test_per_host_limit(self):
+        """测试并发请求时每个主机的连接数不超过上限"""
+        transport = HttpTransport(pool_size=2, per_host_limit=3, idle_timeout=60)
+        url = f"{self.server.base_url}pg1/"
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(lambda _: transport.get(url), range(40)))
+
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        stats = transport.get_stats()
+        self.assertEqual(stats['requests'], 40)
+        self.assertLessEqual(stats['connections_opened'], 3)
+        transport.close()
+
+    def test_idle_eviction(self):
+        """测试空闲超时后关闭连接池"""
+        transport = HttpTransport(pool_size=2, per_host_limit=2, idle_timeout=0.05)
+        url = f"{self.server.base_url}pg1/"
+        transport.get(url)
+        transport.get(url)
+        time.sleep(0.1)
+        transport.get(url)
+
+        stats = transport.get_stats()
+        self.assertEqual(stats['evicted_pools'], 1)
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['connections_opened'], 2)
+        transport.close()
+
+    def test_header_rotation(self):
+        """测试每个请求使用各自的请求头"""
+        transport = HttpTransport()
+        user_agents = ['UA-1', 'UA-2', 'UA-3']
+        for user_agent in user_agents:
+            headers = self.headers_manager.get_headers()
+            headers['User-Agent'] = user_agent
+            transport.get(f"{self.server.base_url}pg1/", headers=headers)
+
+        self.assertEqual(self.server.user_agents, user_agents)
+        transport.close()
+
+if __name__ == '__main__':
+    unittest.main()
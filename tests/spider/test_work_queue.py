@@ -0,0 +1,222 @@
+"""
+测试共享任务队列和分布式工作节点
+"""
+import unittest
+import os
+import time
+import shutil
+import threading
+from unittest.mock import patch
+from lianjia_spider.utils.work_queue import WorkQueue, MemoryWorkQueue, SQLiteWorkQueue
+from lianjia_spider.spider.queue_worker import Coordinator, QueueWorker, merge_partitions, worker_dir
+from lianjia_spider.config.settings import CONFIG
+from benchmarks.stub_server import StubLianjiaServer, read_rows
+
+class NoScanDict(dict):
+    """遍历全部任务时报错的字典"""
+
+    def values(self):
+        raise AssertionError('租用时遍历了全部任务')
+
+
+class TestWorkQueue(unittest.TestCase):
+    """测试各队列后端的租约和确认语义"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+
+    def tearDown(self):
+        """测试后清理"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _queues(self, **kwargs):
+        yield MemoryWorkQueue(**kwargs)
+        queue = SQLiteWorkQueue(os.path.join(self.test_dir, 'queue.db'), **kwargs)
+        try:
+            yield queue
+        finally:
+            queue.close()
+            shutil.rmtree(self.test_dir)
+
+    def test_lease_and_ack(self):
+        """测试任务去重、详情页优先和确认"""
+        for queue in self._queues():
+            with self.subTest(backend=type(queue).__name__):
+                self.assertTrue(queue.put('list', '1', {'page': 1}))
+                self.assertEqual(queue.put_many('detail', [('101', {'link': 'a'}), ('102', {})]), 2)
+                self.assertEqual(queue.put_many('detail', [('101', {}), ('103', {})]), 1)
+
+                task = queue.lease('w1')
+                self.assertEqual((task.kind, task.key, task.payload), ('detail', '101', {'link': 'a'}))
+                self.assertTrue(queue.ack(task))
+                self.assertFalse(queue.ack(task))
+                self.assertEqual(queue.stats(), {'ready': 3, 'leased': 0, 'done': 1, 'failed': 0})
+
+                keys = [queue.lease('w1').key for _ in range(3)]
+                self.assertEqual(keys, ['102', '103', '1'])
+                self.assertIsNone(queue.lease('w1'))
+                self.assertEqual(queue.unfinished(), 3)
+
+    def test_visibility_timeout(self):
+        """测试超时的租约重新分配，原租约的确认失效"""
+        for queue in self._queues(visibility_timeout=0.05, max_attempts=2):
+            with self.subTest(backend=type(queue).__name__):
+                queue.put('detail', '101')
+                first = queue.lease('w1')
+                self.assertIsNone(queue.lease('w2'))
+                time.sleep(0.1)
+                second = queue.lease('w2')
+                self.assertEqual((second.key, second.attempt), ('101', 2))
+                self.assertFalse(queue.ack(first))
+
+                # 分配次数用完后超时的任务标记为失败
+                time.sleep(0.1)
+                self.assertIsNone(queue.lease('w3'))
+                self.assertEqual(queue.stats()['failed'], 1)
+                self.assertEqual(queue.unfinished(), 0)
+
+    def test_release_and_mark_done(self):
+        """测试释放失败的任务和导入已完成的键"""
+        for queue in self._queues(max_attempts=2):
+            with self.subTest(backend=type(queue).__name__):
+                self.assertEqual(queue.mark_done('detail', ['101', '102']), 2)
+                self.assertFalse(queue.put('detail', '101'))
+                queue.put('list', '1', {'page': 1})
+                self.assertTrue(queue.release(queue.lease('w1')))
+                self.assertTrue(queue.release(queue.lease('w1')))
+                self.assertEqual(queue.stats(), {'ready': 0, 'leased': 0, 'done': 2, 'failed': 1})
+                self.assertEqual(queue.reset('list'), 1)
+                self.assertEqual(queue.lease('w1').attempt, 1)
+
+    def test_memory_ready_index(self):
+        """测试进程内队列租用时不遍历已完成的任务，任务被重新置为可租用时顺序不变"""
+        queue = MemoryWorkQueue(max_attempts=3)
+        queue.mark_done('detail', (str(i) for i in range(10000)))
+        queue.put_many('list', [('2', {}), ('1', {})])
+        queue._tasks = NoScanDict(queue._tasks)
+        first = queue.lease('w1')
+        self.assertEqual(first.key, '2')
+        queue.release(first)
+        queue._tasks = dict(queue._tasks)
+        queue.reset('list')
+        self.assertEqual([queue.lease('w1').key for _ in range(2)], ['2', '1'])
+        self.assertIsNone(queue.lease('w1'))
+
+    def test_abstract_base(self):
+        """测试基类不能直接实例化"""
+        with self.assertRaises(TypeError):
+            WorkQueue()
+
+    def test_sqlite_shared_between_connections(self):
+        """测试多个连接同时租用时任务不会重复分配"""
+        db_file = os.path.join(self.test_dir, 'queue.db')
+        queues = [SQLiteWorkQueue(db_file) for _ in range(4)]
+        queues[0].put_many('detail', ((str(i), {}) for i in range(200)))
+        leased = []
+
+        def drain(queue, name):
+            while True:
+                task = queue.lease(name)
+                if task is None:
+                    return
+                leased.append(task.key)
+                queue.ack(task)
+
+        threads = [threading.Thread(target=drain, args=(queue, f'w{i}')) for i, queue in enumerate(queues)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for queue in queues:
+            queue.close()
+        self.assertEqual(sorted(leased, key=int), [str(i) for i in range(200)])
+
+
+class TestQueueWorker(unittest.TestCase):
+    """测试多个工作节点共用一个队列抓取"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.test_dir = 'tests/test_data'
+        self.server = StubLianjiaServer(pages=3, per_page=5).start()
+        self.config_patch = patch.dict(CONFIG, {
+            'BASE_URL': self.server.base_url,
+            'DATA_DIR': self.test_dir,
+            'RATE_LIMIT': 0,
+            'DELAY_RANGE': (0, 0),
+            'QUEUE_ACK_BATCH': 3,
+            'QUEUE_POLL_INTERVAL': 0.01
+        })
+        self.config_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.config_patch.stop()
+        self.server.stop()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _run_workers(self, make_queue, count=3):
+        workers = [QueueWorker(make_queue(), f'w{i}') for i in range(count)]
+        threads = [threading.Thread(target=worker.run) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return workers
+
+    def _check_partitions(self, workers):
+        ids = []
+        for worker in workers:
+            rows = read_rows(os.path.join(worker_dir(worker.worker_id, self.test_dir), 'houses.csv'))
+            ids.extend(row['房源ID'] for row in rows)
+        self.assertEqual(sorted(ids), sorted(self.server.house_ids()))
+        detail_requests = [path for path in self.server.request_paths if path.endswith('.html')]
+        self.assertEqual(len(detail_requests), 15)
+
+    def test_memory_queue(self):
+        """测试进程内队列：每个房源只抓取一次，分别写入各节点的分区"""
+        queue = MemoryWorkQueue()
+        Coordinator(queue).seed()
+        workers = self._run_workers(lambda: queue)
+        self._check_partitions(workers)
+        self.assertEqual(queue.stats(), {'ready': 0, 'leased': 0, 'done': 18, 'failed': 0})
+
+        merged = os.path.join(self.test_dir, 'merged.csv')
+        self.assertEqual(merge_partitions(self.test_dir, merged), 15)
+        self.assertEqual(len(read_rows(merged)), 15)
+
+    def test_sqlite_queue(self):
+        """测试每个节点各自打开队列数据库，再次投放时不重复抓取"""
+        db_file = os.path.join(self.test_dir, 'queue.db')
+        Coordinator(SQLiteWorkQueue(db_file)).seed(scraped_ids=[self.server.house_ids()[0]])
+        workers = self._run_workers(lambda: SQLiteWorkQueue(db_file))
+        ids = []
+        for worker in workers:
+            worker.queue.close()
+            rows = read_rows(os.path.join(worker_dir(worker.worker_id, self.test_dir), 'houses.csv'))
+            ids.extend(row['房源ID'] for row in rows)
+        self.assertEqual(sorted(ids), sorted(self.server.house_ids()[1:]))
+
+        requests_sent = self.server.request_count
+        queue = SQLiteWorkQueue(db_file)
+        Coordinator(queue).seed(refresh=True)
+        self._run_workers(lambda: SQLiteWorkQueue(db_file), count=2)
+        # 只重新请求列表页
+        self.assertEqual(self.server.request_count - requests_sent, 3)
+        queue.close()
+
+    def test_failed_task_is_retried(self):
+        """测试处理失败的任务释放后重新分配"""
+        self.server.inject_faults(500, count=CONFIG['MAX_RETRIES'] + 1)
+        queue = MemoryWorkQueue()
+        Coordinator(queue).seed()
+        with patch('lianjia_spider.utils.retry.time'):
+            workers = self._run_workers(lambda: queue, count=1)
+        self._check_partitions(workers)
+        self.assertEqual(queue.stats()['failed'], 0)
+
+if __name__ == '__main__':
+    unittest.main()